@@ -4,24 +4,53 @@ Main FastAPI application.
 This module creates and configures the FastAPI application.
 """
 
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from typing import Dict
 
 import uvicorn
 from fastapi import FastAPI
 
 from routes import api_router
-from services.db.connector import close_connections
+from config.settings import settings
+from services.db.connector import (
+    close_connections,
+    prune_connections_periodically,
+    warm_connections,
+)
+from services.file_cache import file_cache
+from services.streaming import close_io_executor
 from errors.handlers import register_exception_handlers
+from middleware.stack import register_middleware
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Handle application startup and shutdown events."""
-    # Startup code (if any)
+    background = []
+    # Startup code: open the pool's minimum connections without delaying
+    # startup, and close expired pooled connections even without traffic
+    if settings.databricks_warehouse_id and settings.sql_pool_min_size > 0:
+        background.append(
+            asyncio.create_task(
+                asyncio.to_thread(warm_connections, settings.databricks_warehouse_id)
+            )
+        )
+    if settings.sql_pool_prune_interval_seconds > 0:
+        background.append(
+            asyncio.create_task(
+                prune_connections_periodically(settings.sql_pool_prune_interval_seconds)
+            )
+        )
     yield
     # Shutdown code
+    for task in background:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
     close_connections()
+    close_io_executor()
+    file_cache.close()
 
 
 # Create the main FastAPI application
@@ -35,6 +64,9 @@ app = FastAPI(
 # Register exception handlers
 register_exception_handlers(app)
 
+# Register middleware
+register_middleware(app)
+
 # Include the API router
 app.include_router(api_router)
 
@@ -0,0 +1,250 @@
+"""
+Load test concurrent volume downloads through GET /api/v1/download.
+
+Fifty clients download large files at once while another client polls
+`/api/v1/healthcheck`; the benchmark reports the aggregate download
+throughput and the health check's latency. Storage is replaced by a fake
+blocking stream with a fixed time to first byte and per-stream bandwidth.
+
+The `blocking` case reproduces the former behaviour: the download is opened
+inline on the event loop and its chunks are read through Starlette's thread
+pool one at a time. The `read-ahead` case is the current behaviour. Each case
+runs in its own process, with the app served by uvicorn on a local port.
+Run from the fastapi directory:
+
+    python -m benchmarks.bench_downloads --files 50 --file-mb 32
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from benchmarks.common import print_table, run_isolated
+
+CASES = ["blocking", "read-ahead"]
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class FakeStorageStream:
+    """A blocking download stream delivering bytes at a fixed bandwidth."""
+
+    def __init__(self, size: int, mb_per_sec: float):
+        self._remaining = size
+        self._seconds_per_byte = 1 / (mb_per_sec * 2**20)
+        self._chunk = b"x" * CHUNK_SIZE
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        while True:
+            chunk = self.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+    def read(self, n: int = -1) -> bytes:
+        n = min(self._remaining if n < 0 else n, self._remaining, CHUNK_SIZE)
+        time.sleep(n * self._seconds_per_byte)
+        self._remaining -= n
+        return self._chunk[:n]
+
+    def close(self):
+        self._remaining = 0
+
+
+def fake_workspace(size: int, first_byte_seconds: float, mb_per_sec: float):
+    """Build a workspace client whose Files API serves fake files."""
+    from databricks.sdk.service.files import DownloadResponse, GetMetadataResponse
+
+    def download(file_path):
+        time.sleep(first_byte_seconds)
+        return DownloadResponse(contents=FakeStorageStream(size, mb_per_sec))
+
+    w = MagicMock()
+    w.files.get_metadata.return_value = GetMetadataResponse(
+        content_length=size, last_modified="Wed, 01 Jan 2025 00:00:00 GMT"
+    )
+    w.files.download.side_effect = download
+    return w
+
+
+def blocking_patches():
+    """Patch the download route back to inline opens and per-chunk reads."""
+
+    async def run_inline(func, *args, **kwargs):
+        return func(*args, **kwargs)
+
+    def iterate(contents, chunk_size, read_ahead):
+        with contents as stream:
+            for chunk in stream:
+                yield chunk
+
+    return [
+        patch("routes.v1.volumes.run_io", run_inline),
+        patch("routes.v1.volumes.read_ahead", iterate),
+    ]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _load(base_url: str, files: int, probe_interval: float) -> dict:
+    """Download `files` files concurrently while probing the health check."""
+    import httpx
+
+    done = asyncio.Event()
+    latencies = []
+
+    async def download(client, i):
+        received = 0
+        async with client.stream(
+            "GET",
+            "/api/v1/download",
+            params={"file_path": f"/Volumes/main/default/bench/file-{i}.bin"},
+        ) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_raw():
+                received += len(chunk)
+        return received
+
+    async def probe(client):
+        while not done.is_set():
+            start = time.perf_counter()
+            response = await client.get("/api/v1/healthcheck")
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(probe_interval)
+
+    limits = httpx.Limits(max_connections=files + 1)
+    timeout = httpx.Timeout(600)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=timeout
+    ) as client, httpx.AsyncClient(base_url=base_url, timeout=timeout) as prober:
+        probe_task = asyncio.ensure_future(probe(prober))
+        start = time.perf_counter()
+        received = await asyncio.gather(*(download(client, i) for i in range(files)))
+        seconds = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    latencies.sort()
+    return {
+        "seconds": seconds,
+        "bytes": sum(received),
+        "probes": len(latencies),
+        "p50": statistics.median(latencies),
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+
+def run_case(
+    case: str, files: int, file_mb: int, first_byte_ms: float, mb_per_sec: float
+) -> dict:
+    """Serve the app with fake storage and run the load against it."""
+    import uvicorn
+
+    from app import app
+
+    size = file_mb * 2**20
+    patches = [
+        patch(
+            "routes.v1.volumes.w",
+            fake_workspace(size, first_byte_ms / 1000, mb_per_sec),
+        )
+    ]
+    if case == "blocking":
+        patches += blocking_patches()
+
+    for p in patches:
+        p.start()
+    port = _free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            time.sleep(0.01)
+        result = asyncio.run(_load(f"http://127.0.0.1:{port}", files, 0.02))
+    finally:
+        server.should_exit = True
+        thread.join()
+        for p in reversed(patches):
+            p.stop()
+
+    return {
+        "case": case,
+        "files": files,
+        "file_mb": file_mb,
+        "aggregate_mb_per_sec": result["bytes"] / 2**20 / result["seconds"],
+        "seconds": result["seconds"],
+        "healthcheck_p50_ms": result["p50"] * 1000,
+        "healthcheck_p99_ms": result["p99"] * 1000,
+        "probes": result["probes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--file-mb", type=int, default=32)
+    parser.add_argument(
+        "--first-byte-ms", type=float, default=100, help="Storage time to first byte"
+    )
+    parser.add_argument(
+        "--mb-per-sec", type=float, default=100, help="Storage bandwidth per stream"
+    )
+    parser.add_argument("--case", choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        result = run_case(
+            args.case, args.files, args.file_mb, args.first_byte_ms, args.mb_per_sec
+        )
+        print(json.dumps(result))
+        return
+
+    options = [
+        "--files",
+        str(args.files),
+        "--file-mb",
+        str(args.file_mb),
+        "--first-byte-ms",
+        str(args.first_byte_ms),
+        "--mb-per-sec",
+        str(args.mb_per_sec),
+    ]
+    results = [
+        run_isolated(__spec__.name, [*options, "--case", case]) for case in CASES
+    ]
+    print_table(
+        results,
+        [
+            "case",
+            "files",
+            "file_mb",
+            "aggregate_mb_per_sec",
+            "seconds",
+            "healthcheck_p50_ms",
+            "healthcheck_p99_ms",
+            "probes",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark batched inserts against a single INSERT statement.
+
+Each case inserts the same synthetic records through `insert_data` in its
+own process, against a fake warehouse with a fixed per-statement latency,
+reporting statement count and size, wall time and peak RSS growth. Run
+from the fastapi directory:
+
+    python -m benchmarks.bench_insert --rows 10000 100000
+"""
+
+import argparse
+import json
+from unittest.mock import patch
+
+from benchmarks.common import (
+    FakeConnection,
+    make_arrow_table,
+    measure,
+    print_table,
+    run_isolated,
+)
+
+MODES = ["single", "batched"]
+
+
+def run_case(mode: str, rows: int, latency: float) -> dict:
+    """Insert `rows` records in one statement or in batches and time it."""
+    from services.db.connector import insert_data
+
+    data = make_arrow_table(rows).to_pylist()
+    connection = FakeConnection(make_arrow_table(0), latency=latency)
+    statements = []
+
+    original_cursor = connection.cursor
+
+    def cursor():
+        fake = original_cursor()
+        statements.append(fake.executed)
+        return fake
+
+    connection.cursor = cursor
+
+    if mode == "single":
+        # The previous behaviour: every record in one statement
+        options = {"max_rows": rows, "max_parameters": rows * 5, "parallelism": 1}
+    else:
+        options = {}
+
+    with patch("services.db.connector.get_connection", return_value=connection):
+        with measure() as result:
+            insert_data("main.default.benchmark", data, "benchmark", **options)
+
+    sizes = [len(sql) for executed in statements for sql in executed]
+    return {
+        "mode": mode,
+        "rows": rows,
+        "statements": len(sizes),
+        "max_statement_kb": max(sizes) / 1024,
+        "seconds": result["seconds"],
+        "rows_per_sec": rows / result["seconds"],
+        "peak_rss_growth_mb": result["peak_rss_growth_mb"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.05,
+        help="Simulated warehouse latency per statement, in seconds",
+    )
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_case(args.mode, args.rows[0], args.latency)))
+        return
+
+    results = [
+        run_isolated(
+            __spec__.name,
+            ["--rows", str(rows), "--latency", str(args.latency), "--mode", mode],
+        )
+        for rows in args.rows
+        for mode in MODES
+    ]
+    print_table(
+        results,
+        [
+            "mode",
+            "rows",
+            "statements",
+            "max_statement_kb",
+            "seconds",
+            "rows_per_sec",
+            "peak_rss_growth_mb",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark the response formats and JSON shapes of GET /api/v1/table.
+
+Each format is measured in its own process against a fake warehouse that
+returns the same synthetic result, reporting throughput, response size and
+peak RSS growth. Run from the fastapi directory:
+
+    python -m benchmarks.bench_table_formats --rows 1000000
+"""
+
+import argparse
+import json
+from unittest.mock import patch
+
+from benchmarks.common import (
+    FakeConnection,
+    make_arrow_table,
+    measure,
+    print_table,
+    run_isolated,
+)
+
+# Query parameters of each case
+CASES = {
+    "json": {"format": "json"},
+    "json-columnar": {"format": "json", "shape": "columnar"},
+    "arrow": {"format": "arrow"},
+    "parquet": {"format": "parquet"},
+}
+
+
+def run_case(case: str, rows: int) -> dict:
+    """Fetch `rows` rows through the app in one format and time it."""
+    from fastapi.testclient import TestClient
+
+    from app import app
+    from config.settings import settings
+
+    settings.databricks_warehouse_id = "benchmark"
+    connection = FakeConnection(make_arrow_table(rows))
+
+    with patch("services.db.connector.get_connection", return_value=connection):
+        with TestClient(app) as client:
+            with measure() as result:
+                response = client.get(
+                    "/api/v1/table",
+                    params={
+                        "catalog": "main",
+                        "schema": "default",
+                        "table": "benchmark",
+                        **CASES[case],
+                    },
+                )
+                response.raise_for_status()
+
+    return {
+        "format": case,
+        "rows": rows,
+        "rows_per_sec": rows / result["seconds"],
+        "seconds": result["seconds"],
+        "response_mb": len(response.content) / 2**20,
+        "peak_rss_growth_mb": result["peak_rss_growth_mb"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--case", choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.rows)))
+        return
+
+    results = [
+        run_isolated(__spec__.name, ["--rows", str(args.rows), "--case", case])
+        for case in CASES
+    ]
+    print_table(
+        results,
+        [
+            "format",
+            "rows",
+            "rows_per_sec",
+            "seconds",
+            "response_mb",
+            "peak_rss_growth_mb",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark requests per second for JSON pages of GET /api/v1/table.
+
+The `validated` case returns the page as a `TableResponse`, so FastAPI
+validates and serializes every row against the response model, as the
+endpoint used to. The `pre-encoded` case is the current behaviour: the rows
+are encoded directly with orjson. Each case runs in its own process against
+a fake warehouse returning the same page. Run from the fastapi directory:
+
+    python -m benchmarks.bench_table_pages --rows 1000 --requests 200
+"""
+
+import argparse
+import json
+from unittest.mock import patch
+
+from benchmarks.common import (
+    FakeConnection,
+    make_arrow_table,
+    measure,
+    print_table,
+    run_isolated,
+)
+
+CASES = ["validated", "pre-encoded"]
+
+
+def run_case(case: str, rows: int, requests: int) -> dict:
+    """Fetch `requests` pages of `rows` rows through the app and time it."""
+    from fastapi.testclient import TestClient
+
+    from app import app
+    from config.settings import settings
+    from models.tables import TableResponse
+
+    settings.databricks_warehouse_id = "benchmark"
+    connection = FakeConnection(make_arrow_table(rows))
+
+    patches = [patch("services.db.connector.get_connection", return_value=connection)]
+    if case == "validated":
+        # Return the model instead, as before, so FastAPI revalidates the rows
+        patches.append(
+            patch(
+                "routes.v1.tables.FastJSONResponse",
+                side_effect=lambda content: TableResponse(**content),
+            )
+        )
+
+    for p in patches:
+        p.start()
+    try:
+        with TestClient(app) as client:
+            with measure() as result:
+                for i in range(requests):
+                    response = client.get(
+                        "/api/v1/table",
+                        params={
+                            "catalog": "main",
+                            "schema": "default",
+                            "table": "benchmark",
+                            "limit": rows,
+                            # A distinct query per request, so none is cached
+                            "offset": i * rows,
+                        },
+                    )
+                    response.raise_for_status()
+    finally:
+        for p in reversed(patches):
+            p.stop()
+
+    return {
+        "case": case,
+        "rows": rows,
+        "requests": requests,
+        "requests_per_sec": requests / result["seconds"],
+        "ms_per_request": result["seconds"] * 1000 / requests,
+        "response_kb": len(response.content) / 1024,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--case", choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.rows, args.requests)))
+        return
+
+    results = [
+        run_isolated(
+            __spec__.name,
+            [
+                "--rows",
+                str(args.rows),
+                "--requests",
+                str(args.requests),
+                "--case",
+                case,
+            ],
+        )
+        for case in CASES
+    ]
+    print_table(
+        results,
+        [
+            "case",
+            "rows",
+            "requests",
+            "requests_per_sec",
+            "ms_per_request",
+            "response_kb",
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
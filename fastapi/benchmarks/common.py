@@ -0,0 +1,167 @@
+"""
+Shared helpers for the benchmarks.
+
+The benchmarks replace the SQL warehouse with an in-process fake so that
+they measure the application's own overhead. Importing the application
+still requires Databricks authentication to be configured (for example
+through a `~/.databrickscfg` profile), exactly as when running it locally.
+"""
+
+import json
+import resource
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+
+
+def make_arrow_table(rows: int) -> pa.Table:
+    """
+    Build a synthetic result set with a mix of common column types.
+
+    Args:
+        rows: Number of rows to generate
+
+    Returns:
+        An Arrow table with `rows` rows
+    """
+    start = datetime(2025, 1, 1)
+    return pa.table(
+        {
+            "id": pa.array(range(rows), type=pa.int64()),
+            "name": pa.array([f"name-{i % 1000}" for i in range(rows)]),
+            "amount": pa.array(
+                [Decimal(i % 10000) / 100 for i in range(rows)],
+                type=pa.decimal128(10, 2),
+            ),
+            "score": pa.array([i * 0.5 for i in range(rows)], type=pa.float64()),
+            "created_at": pa.array(
+                [start + timedelta(seconds=i) for i in range(rows)],
+                type=pa.timestamp("us"),
+            ),
+        }
+    )
+
+
+class FakeCursor:
+    """A cursor that returns a fixed Arrow result, like the SQL connector."""
+
+    def __init__(self, table: pa.Table, latency: float = 0.0):
+        self._table = table
+        self._latency = latency
+        self._offset = 0
+        self.description = [(name,) for name in table.column_names]
+        self.rowcount = -1
+        self.executed: List[str] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, operation: str, parameters: Optional[Any] = None):
+        if self._latency:
+            time.sleep(self._latency)
+        self.executed.append(operation)
+        self._offset = 0
+
+    def fetchall_arrow(self) -> pa.Table:
+        return self._table
+
+    def fetchall(self) -> List[tuple]:
+        # The real connector builds Row objects from its Arrow batches
+        return list(zip(*(col.to_pylist() for col in self._table.columns)))
+
+    def fetchmany_arrow(self, size: int) -> pa.Table:
+        batch = self._table.slice(self._offset, size)
+        self._offset += batch.num_rows
+        return batch
+
+    def fetchmany(self, size: int) -> List[tuple]:
+        batch = self.fetchmany_arrow(size)
+        return list(zip(*(col.to_pylist() for col in batch.columns)))
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """A connection handing out `FakeCursor`s over a fixed result."""
+
+    def __init__(self, table: pa.Table, latency: float = 0.0):
+        self._table = table
+        self._latency = latency
+        self.open = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self._table, self._latency)
+
+    def close(self):
+        self.open = False
+
+
+def peak_rss_mb() -> float:
+    """Return this process's peak resident set size in MiB."""
+    # ru_maxrss is reported in KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+@contextmanager
+def measure() -> Iterator[Dict[str, float]]:
+    """Measure the wall time and peak RSS growth of the enclosed block."""
+    result: Dict[str, float] = {}
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    yield result
+    result["seconds"] = time.perf_counter() - start
+    result["peak_rss_growth_mb"] = peak_rss_mb() - rss_before
+
+
+def run_isolated(module: str, args: List[str]) -> Dict[str, Any]:
+    """
+    Run a benchmark case in a fresh interpreter and return its JSON result.
+
+    Peak RSS is a high-water mark, so each case needs its own process for
+    the numbers to be comparable.
+    """
+    output = subprocess.run(
+        [sys.executable, "-m", module, *args],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def print_table(rows: List[Dict[str, Any]], columns: List[str]) -> None:
+    """Print benchmark results as an aligned text table."""
+    widths = {
+        col: max(len(col), *(len(_fmt(row[col])) for row in rows)) for col in columns
+    }
+    print("  ".join(col.ljust(widths[col]) for col in columns))
+    for row in rows:
+        print("  ".join(_fmt(row[col]).ljust(widths[col]) for col in columns))
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:,.2f}"
+    if isinstance(value, int):
+        return f"{value:,}"
+    return str(value)
@@ -30,6 +30,242 @@ class Settings(BaseSettings):
         description="Maximum number of records that can be returned in a single request",
     )
 
+    stream_batch_size: int = Field(
+        default=10000,
+        description="Number of rows fetched from the warehouse per batch when streaming results",
+    )
+
+    query_timeout_seconds: float = Field(
+        default=300.0,
+        description="Default time limit for table queries; 0 disables it",
+    )
+
+    # Query result cache
+    query_cache_ttl_seconds: float = Field(
+        default=30.0,
+        description="How long query results are cached; 0 disables caching of results "
+        "without a TTL of their own",
+    )
+
+    query_cache_max_entries: int = Field(
+        default=1024,
+        description="Maximum number of cached query results",
+    )
+
+    query_cache_max_bytes: int = Field(
+        default=256 * 1024 * 1024,
+        description="Maximum estimated memory used by cached query results",
+    )
+
+    count_cache_ttl_seconds: float = Field(
+        default=60.0,
+        description="How long total row counts for a table and filter are cached",
+    )
+
+    table_version_cache_ttl_seconds: float = Field(
+        default=10.0,
+        description="How long Delta table versions used for ETags are cached",
+    )
+
+    schema_cache_ttl_seconds: float = Field(
+        default=300.0,
+        description="How long Unity Catalog table schemas used to validate "
+        "columns are cached; 0 disables local validation",
+    )
+
+    # Table previews
+    preview_sample_rows: int = Field(
+        default=100000,
+        description="Rows sampled with TABLESAMPLE for /table/preview statistics "
+        "when no sample percentage is given",
+    )
+
+    preview_cache_ttl_seconds: float = Field(
+        default=3600.0,
+        description="How long previews pinned to a Delta table version are cached",
+    )
+
+    # SQL connection pool
+    sql_pool_min_size: int = Field(
+        default=1,
+        description="Number of connections per warehouse opened at startup and "
+        "kept open despite the idle timeout",
+    )
+
+    sql_pool_max_size: int = Field(
+        default=10,
+        description="Maximum number of open connections per warehouse",
+    )
+
+    sql_pool_idle_timeout_seconds: float = Field(
+        default=300.0,
+        description="Close pooled connections that have been idle for longer than this",
+    )
+
+    sql_pool_max_lifetime_seconds: float = Field(
+        default=3600.0,
+        description="Close pooled connections that have been open for longer than this",
+    )
+
+    sql_pool_checkout_timeout_seconds: float = Field(
+        default=30.0,
+        description="Maximum time to wait for a free connection when the pool is exhausted",
+    )
+
+    sql_pool_ping_after_seconds: float = Field(
+        default=60.0,
+        description="Run a round-trip liveness check on connections idle for longer than this",
+    )
+
+    sql_pool_prune_interval_seconds: float = Field(
+        default=30.0,
+        description="How often idle connections past their idle timeout or lifetime "
+        "are closed when there is no traffic; 0 disables background pruning",
+    )
+
+    # Batched inserts
+    insert_batch_max_rows: int = Field(
+        default=1000,
+        description="Maximum number of rows per INSERT statement",
+    )
+
+    insert_batch_max_parameters: int = Field(
+        default=5000,
+        description="Maximum number of bound parameters per INSERT statement",
+    )
+
+    insert_parallelism: int = Field(
+        default=4,
+        description="Maximum number of INSERT statements run concurrently",
+    )
+
+    # Staged bulk ingest
+    staging_volume_path: Optional[str] = Field(
+        default=None,
+        description="Volume directory for staging bulk ingest files, "
+        "e.g. /Volumes/main/default/staging",
+    )
+
+    bulk_ingest_min_rows: int = Field(
+        default=5000,
+        description="Payloads with at least this many rows are loaded with COPY INTO",
+    )
+
+    # Thread pool for blocking SQL connector calls
+    sql_executor_max_workers: int = Field(
+        default=16,
+        description="Number of threads used to run blocking warehouse calls off the event loop",
+    )
+
+    # Volume file downloads
+    download_chunk_size: int = Field(
+        default=1024 * 1024,
+        description="Bytes read from the Files API per chunk of a volume download",
+    )
+
+    download_read_ahead_chunks: int = Field(
+        default=4,
+        description="Chunks of a download read ahead of the client, so storage "
+        "reads overlap client writes",
+    )
+
+    download_max_workers: int = Field(
+        default=64,
+        description="Number of threads used for blocking Files API reads",
+    )
+
+    # Disk cache of downloaded volume files
+    file_cache_dir: str = Field(
+        default="",
+        description="Directory of the disk caches of downloaded volume files; "
+        "each server process caches files in a subdirectory named after its "
+        "process ID, removed at shutdown. Defaults to volume-file-cache in the "
+        "system temporary directory",
+    )
+
+    file_cache_max_bytes: int = Field(
+        default=1024 * 1024 * 1024,
+        description="Maximum total size of cached volume files; 0 disables the cache",
+    )
+
+    file_cache_max_file_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description="Largest volume file kept in the disk cache",
+    )
+
+    # Volume directory listings
+    volume_list_cache_ttl_seconds: float = Field(
+        default=30.0,
+        description="How long volume directory listings are cached; 0 disables "
+        "the cache",
+    )
+
+    volume_list_cache_max_entries: int = Field(
+        default=64,
+        description="Maximum number of cached volume directory listings",
+    )
+
+    volume_list_cache_max_bytes: int = Field(
+        default=128 * 1024 * 1024,
+        description="Maximum estimated memory used by cached volume directory listings",
+    )
+
+    volume_list_max_walkers: int = Field(
+        default=8,
+        description="Directories listed concurrently by a recursive volume listing",
+    )
+
+    # Volume file uploads
+    upload_part_size: int = Field(
+        default=16 * 1024 * 1024,
+        description="Bytes per part of a multipart volume upload; each upload "
+        "holds about this many bytes in memory per part in flight",
+    )
+
+    upload_parallelism: int = Field(
+        default=4,
+        description="Parts of one volume upload sent to storage in parallel",
+    )
+
+    upload_buffer_chunks: int = Field(
+        default=16,
+        description="Request body chunks buffered ahead of an upload",
+    )
+
+    # Response compression
+    compression_min_size: int = Field(
+        default=1024,
+        description="Smallest complete response body, in bytes, that is compressed",
+    )
+
+    compression_encodings: str = Field(
+        default="zstd,br,gzip",
+        description="Comma-separated content encodings to offer, in order of "
+        "preference; br is only used when the brotli package is installed. "
+        "Empty disables compression",
+    )
+
+    # Per-request profiling
+    profiling_enabled: bool = Field(
+        default=False,
+        description="Allow requests sent with an X-Profile header to be profiled",
+    )
+
+    profile_dir: str = Field(
+        default="/tmp/profiles",
+        description="Directory where request profiles are stored",
+    )
+
+    profile_interval_seconds: float = Field(
+        default=0.001,
+        description="Sampling interval of the request profiler",
+    )
+
+    profile_max_files: int = Field(
+        default=100,
+        description="Number of most recent profiles kept in the profile directory",
+    )
+
     # Use model_config instead of class Config
     model_config = {
         "env_file": ".env",
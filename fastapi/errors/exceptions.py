@@ -54,3 +54,14 @@ class ValidationError(BaseAppException):
         details: Optional[Dict[str, Any]] = None,
     ):
         super().__init__(message=message, status_code=400, details=details)
+
+
+class QueryTimeoutError(BaseAppException):
+    """Exception raised when a query does not finish within its time limit."""
+
+    def __init__(
+        self,
+        message: str = "Query timed out",
+        details: Optional[Dict[str, Any]] = None,
+    ):
+        super().__init__(message=message, status_code=504, details=details)
@@ -0,0 +1 @@
+"""Middleware for the application."""
@@ -0,0 +1,253 @@
+"""
+Response compression middleware.
+
+This module compresses response bodies with the best encoding the client
+accepts: zstd, Brotli (when the `brotli` package is installed) or gzip.
+Streamed responses are compressed chunk by chunk, each chunk being flushed
+to the client as it is produced, so the body is never buffered.
+"""
+
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+# Content types that are already compressed and would not shrink further
+_COMPRESSED_TYPES = re.compile(
+    r"^(image/(?!svg)|video/|audio/|font/woff)"
+    r"|^application/(zip|gzip|x-gzip|zstd|x-zstd|x-bzip2|x-xz|x-brotli"
+    r"|x-compress|x-7z-compressed|x-rar-compressed|vnd\.apache\.parquet|pdf)"
+)
+
+# Responses without a body, or with part of one, are sent as is
+_UNCOMPRESSED_STATUSES = {204, 206, 304}
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """
+    Return whether a content type is worth compressing.
+
+    Args:
+        content_type: The response's Content-Type, if any
+
+    Returns:
+        False for already compressed types such as Parquet, zip or images
+    """
+    if not content_type:
+        return True
+    return not _COMPRESSED_TYPES.match(content_type.lower())
+
+
+def available_encodings(preferred: Sequence[str]) -> List[str]:
+    """Filter the preferred encodings down to those supported here."""
+    supported = {"zstd", "gzip"} | ({"br"} if brotli is not None else set())
+    return [encoding for encoding in preferred if encoding in supported]
+
+
+def negotiate_encoding(
+    accept_encoding: Optional[str], encodings: Sequence[str]
+) -> Optional[str]:
+    """
+    Choose a content encoding from an Accept-Encoding header.
+
+    Args:
+        accept_encoding: The request's Accept-Encoding header, if any
+        encodings: The server's encodings in order of preference
+
+    Returns:
+        The encoding with the highest client weight, ties broken by the
+        server's preference, or None if none is acceptable
+    """
+    if not accept_encoding:
+        return None
+
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        match = re.search(r"q\s*=\s*([0-9.]+)", params)
+        if match:
+            try:
+                weight = float(match.group(1))
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class _Compressor:
+    """Incremental compressor for one response body."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "gzip":
+            # wbits 31 writes a gzip header and trailer
+            self._zlib = zlib.compressobj(6, zlib.DEFLATED, 31)
+        elif encoding == "zstd":
+            self._zstd = zstandard.ZstdCompressor(level=3).compressobj()
+        elif encoding == "br":
+            self._brotli = brotli.Compressor(quality=4)
+        else:
+            raise ValueError(f"Unsupported encoding: {encoding}")
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so the client can decode it now."""
+        if self.encoding == "gzip":
+            return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "zstd":
+            return self._zstd.compress(data) + self._zstd.flush(
+                zstandard.COMPRESSOBJ_FLUSH_BLOCK
+            )
+        return self._brotli.process(data) + self._brotli.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        """Compress the last chunk and end the stream."""
+        if self.encoding == "gzip":
+            return self._zlib.compress(data) + self._zlib.flush()
+        if self.encoding == "zstd":
+            return self._zstd.compress(data) + self._zstd.flush()
+        return self._brotli.process(data) + self._brotli.finish()
+
+
+class CompressionMiddleware:
+    """
+    Compress responses with the encoding negotiated from Accept-Encoding.
+
+    Complete responses smaller than `minimum_size` are sent as is. Streamed
+    responses are always compressed, one flushed chunk at a time. Responses
+    that are already encoded, already compressed (by content type) or
+    partial, and responses to requests for a byte range, are left untouched.
+    A compressed response no longer offers byte ranges, and its ETag is made
+    weak, since both describe the unencoded body.
+
+    Args:
+        app: The ASGI application
+        minimum_size: Smallest complete body worth compressing, in bytes
+        encodings: Encodings to offer, in order of preference
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        encodings: Sequence[str] = ("zstd", "br", "gzip"),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = available_encodings(encodings)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        encoding = negotiate_encoding(headers.get("accept-encoding"), self.encodings)
+        if encoding is None or "range" in headers:
+            # Byte ranges refer to the unencoded body
+            await self.app(scope, receive, send)
+            return
+
+        await _CompressedResponder(self.app, encoding, self.minimum_size)(
+            scope, receive, send
+        )
+
+
+class _CompressedResponder:
+    """Compress the response of one request."""
+
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start = message
+            headers = Headers(raw=message.get("headers", []))
+            self.passthrough = (
+                message["status"] in _UNCOMPRESSED_STATUSES
+                or "content-encoding" in headers
+                or "content-range" in headers
+                or not is_compressible(headers.get("content-type"))
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            # e.g. a server extension sending the body itself
+            if self.start is not None:
+                self.passthrough = True
+                await self.send(self.start)
+                self.start = None
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start is not None:
+            start, self.start = self.start, None
+            if self.passthrough or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding)
+            headers = MutableHeaders(raw=start.setdefault("headers", []))
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            # Offsets into the encoded body would not match the file's
+            if "accept-ranges" in headers:
+                del headers["Accept-Ranges"]
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+            if more_body:
+                # The compressed length is not known until the end
+                del headers["Content-Length"]
+                body = self.compressor.compress(body)
+            else:
+                body = self.compressor.finish(body)
+                headers["Content-Length"] = str(len(body))
+            await self.send(start)
+            await self.send(
+                {"type": "http.response.body", "body": body, "more_body": more_body}
+            )
+            return
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        body = (
+            self.compressor.compress(body)
+            if more_body
+            else self.compressor.finish(body)
+        )
+        await self.send(
+            {"type": "http.response.body", "body": body, "more_body": more_body}
+        )
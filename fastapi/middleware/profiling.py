@@ -0,0 +1,168 @@
+"""
+Per-request profiling middleware.
+
+When profiling is enabled, requests sent with an `X-Profile` header are
+sampled with pyinstrument. The profile is stored in the speedscope format
+(https://www.speedscope.app), which renders it as a flame graph, under the
+ID returned in the `X-Profile-Id` header: the request's ID followed by a
+random suffix, so that profile IDs can be neither guessed nor reused by
+another client.
+
+Time spent waiting on the warehouse appears as `await` on the executor call,
+separately from validation and encoding on the event loop.
+"""
+
+import asyncio
+import os
+import re
+import uuid
+from typing import Optional
+
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+PROFILE_HEADER = "x-profile"
+PROFILE_ID_HEADER = "x-profile-id"
+REQUEST_ID_HEADER = "x-request-id"
+PROFILE_SUFFIX = ".speedscope.json"
+
+# Profile IDs become file names, so only simple IDs are accepted
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Characters of a client's request ID that cannot be part of a file name
+_UNSAFE = re.compile(r"[^A-Za-z0-9_-]")
+
+# Longest part of a profile ID taken from the client's request ID, leaving
+# room for the random suffix
+_MAX_CLIENT_ID_LENGTH = 31
+
+
+def is_profile_id(value: str) -> bool:
+    """Return whether a value can name a stored profile."""
+    return bool(_REQUEST_ID.match(value))
+
+
+def profile_path(profile_dir: str, profile_id: str) -> str:
+    """
+    Return the path of a stored profile.
+
+    Args:
+        profile_dir: The directory profiles are stored in
+        profile_id: The request ID of the profile
+
+    Returns:
+        The path of the profile file
+    """
+    return os.path.join(profile_dir, f"{profile_id}{PROFILE_SUFFIX}")
+
+
+def write_profile(
+    profile_dir: str, profile_id: str, profile: str, max_files: int
+) -> str:
+    """
+    Store a profile, removing the oldest ones beyond `max_files`.
+
+    Args:
+        profile_dir: The directory profiles are stored in
+        profile_id: The request ID of the profile
+        profile: The rendered profile
+        max_files: Number of most recent profiles to keep
+
+    Returns:
+        The path of the profile file
+    """
+    os.makedirs(profile_dir, exist_ok=True)
+    path = profile_path(profile_dir, profile_id)
+    with open(path, "w") as f:
+        f.write(profile)
+
+    stored = [
+        entry
+        for entry in os.scandir(profile_dir)
+        if entry.is_file() and entry.name.endswith(PROFILE_SUFFIX)
+    ]
+    if len(stored) > max_files:
+        stored.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in stored[: len(stored) - max_files]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                # Removed concurrently by another request
+                pass
+    return path
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests that ask for it with an `X-Profile` header.
+
+    The middleware is only registered when profiling is enabled, so it adds
+    no overhead otherwise. Requests without the header are passed through.
+
+    Args:
+        app: The ASGI application
+        profile_dir: The directory profiles are stored in
+        interval: The sampling interval in seconds
+        max_files: Number of most recent profiles to keep
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        profile_dir: str,
+        interval: float = 0.001,
+        max_files: int = 100,
+    ):
+        self.app = app
+        self.profile_dir = profile_dir
+        self.interval = interval
+        self.max_files = max_files
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        if PROFILE_HEADER not in headers:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = self._profile_id(headers.get(REQUEST_ID_HEADER))
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (PROFILE_ID_HEADER.encode(), profile_id.encode()),
+                    ],
+                }
+            await send(message)
+
+        profiler = Profiler(interval=self.interval, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            session = profiler.stop()
+            # Rendering and writing may take a while for long requests
+            await asyncio.get_running_loop().run_in_executor(
+                None,
+                lambda: write_profile(
+                    self.profile_dir,
+                    profile_id,
+                    SpeedscopeRenderer().render(session),
+                    self.max_files,
+                ),
+            )
+
+    @staticmethod
+    def _profile_id(request_id: Optional[str]) -> str:
+        """Build a unique profile ID, prefixed with the client's request ID."""
+        suffix = uuid.uuid4().hex
+        prefix = _UNSAFE.sub("", request_id or "")[:_MAX_CLIENT_ID_LENGTH]
+        return f"{prefix}-{suffix}" if prefix else suffix
@@ -0,0 +1,48 @@
+"""
+Middleware registration.
+
+This module adds the application's middleware to the FastAPI application.
+"""
+
+from fastapi import FastAPI
+
+from config.settings import Settings, settings as default_settings
+
+from .compression import CompressionMiddleware
+from .profiling import ProfilingMiddleware
+from .timing import ServerTimingMiddleware
+
+
+def register_middleware(app: FastAPI, settings: Settings = default_settings) -> None:
+    """
+    Register middleware with the FastAPI application.
+
+    Args:
+        app: The FastAPI application
+        settings: The application settings
+    """
+    # Middleware added later wraps the middleware added before it
+    encodings = [
+        encoding.strip().lower()
+        for encoding in settings.compression_encodings.split(",")
+        if encoding.strip()
+    ]
+    if encodings:
+        app.add_middleware(
+            CompressionMiddleware,
+            minimum_size=settings.compression_min_size,
+            encodings=encodings,
+        )
+
+    # Outside compression, so that it counts the bytes actually sent
+    app.add_middleware(ServerTimingMiddleware)
+
+    # Added last so that it is outermost and profiles the whole stack;
+    # not registered at all when disabled
+    if settings.profiling_enabled:
+        app.add_middleware(
+            ProfilingMiddleware,
+            profile_dir=settings.profile_dir,
+            interval=settings.profile_interval_seconds,
+            max_files=settings.profile_max_files,
+        )
@@ -0,0 +1,54 @@
+"""
+Server-Timing middleware.
+
+This module reports how long each request spent in the timed query phases
+(see `services.metrics`) through the `Server-Timing` response header, and
+counts the response bytes sent per route.
+"""
+
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from services.metrics import RESPONSE_BYTES, Timings, current_timings
+
+
+class ServerTimingMiddleware:
+    """
+    Add a `Server-Timing` header with the request's phase timings.
+
+    The header is sent with the response headers, so phases that run while
+    the body is being streamed are not included, apart from the time spent
+    before the first byte in `app`.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = Timings()
+        token = current_timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_with_timings(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                timings.add("app", time.perf_counter() - start)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timings.server_timing().encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body":
+                # Route paths are relative to their router, so label with the
+                # request path; the API has no path parameters, and unmatched
+                # requests are grouped to bound the label values
+                route = scope["path"] if "route" in scope else "unmatched"
+                RESPONSE_BYTES.labels(route).inc(len(message.get("body", b"")))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timings)
+        finally:
+            current_timings.reset(token)
@@ -4,8 +4,8 @@ Data models for table operations.
 This module defines Pydantic models for table queries and responses.
 """
 
-from typing import Dict, List, Optional
-from pydantic import BaseModel, Field, field_validator
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
 
 
 class TableQueryParams(BaseModel):
@@ -18,6 +18,22 @@ class TableQueryParams(BaseModel):
     offset: int = Field(0, description="Number of records to skip")
     columns: str = Field("*", description="Comma-separated list of columns to retrieve")
     filter_expr: Optional[str] = Field(None, description="Optional SQL WHERE clause")
+    response_format: str = Field(
+        "json",
+        description="Response format: json, arrow (Arrow IPC stream) or parquet",
+        alias="format",
+    )
+    order_by: Optional[str] = Field(
+        None, description="Unique column to order by for keyset pagination"
+    )
+    cursor: Optional[str] = Field(
+        None, description="Cursor returned as next_cursor by the previous page"
+    )
+    shape: str = Field(
+        "rows",
+        description="JSON layout: rows (one object per record) or columnar "
+        "(column names once, then one array of values per column)",
+    )
 
     @field_validator("limit")
     @classmethod
@@ -37,6 +53,220 @@ class TableQueryParams(BaseModel):
             raise ValueError("Offset must be non-negative")
         return v
 
+    @field_validator("response_format")
+    @classmethod
+    def validate_response_format(cls, v):
+        """Validate that the response format is supported."""
+        if v not in ("json", "arrow", "parquet"):
+            raise ValueError("Format must be one of: json, arrow, parquet")
+        return v
+
+    @field_validator("shape")
+    @classmethod
+    def validate_shape(cls, v):
+        """Validate that the JSON shape is supported."""
+        if v not in ("rows", "columnar"):
+            raise ValueError("Shape must be one of: rows, columnar")
+        return v
+
+    @model_validator(mode="after")
+    def validate_pagination(self):
+        """Validate that keyset and offset pagination are not mixed."""
+        if self.cursor is not None and self.order_by is None:
+            raise ValueError("cursor requires order_by")
+        if self.order_by is not None and self.offset:
+            raise ValueError("offset cannot be combined with order_by; use cursor")
+        return self
+
+    @model_validator(mode="after")
+    def validate_shape_format(self):
+        """Validate that a JSON shape is only requested for JSON responses."""
+        if self.shape != "rows" and self.response_format != "json":
+            raise ValueError("shape only applies to the json format")
+        return self
+
+
+class TableStreamParams(BaseModel):
+    """Query parameters for streaming a table export."""
+
+    catalog: str = Field(..., description="The catalog name")
+    schema_name: str = Field(..., description="The schema name", alias="schema")
+    table: str = Field(..., description="The table name")
+    columns: str = Field("*", description="Comma-separated list of columns to retrieve")
+    filter_expr: Optional[str] = Field(None, description="Optional SQL WHERE clause")
+    limit: Optional[int] = Field(
+        None, description="Optional maximum number of records to return"
+    )
+    stream_format: str = Field(
+        "ndjson", description="Export format: ndjson or csv", alias="format"
+    )
+    batch_size: Optional[int] = Field(
+        None, description="Number of rows fetched from the warehouse per batch"
+    )
+
+    @field_validator("limit", "batch_size")
+    @classmethod
+    def validate_positive(cls, v):
+        """Validate that optional sizes are positive integers."""
+        if v is not None and v <= 0:
+            raise ValueError("Value must be greater than 0")
+        return v
+
+    @field_validator("stream_format")
+    @classmethod
+    def validate_stream_format(cls, v):
+        """Validate that the export format is supported."""
+        if v not in ("ndjson", "csv"):
+            raise ValueError("Format must be one of: ndjson, csv")
+        return v
+
+
+class TableAggregateParams(BaseModel):
+    """Query parameters for aggregating a table on the warehouse."""
+
+    catalog: str = Field(..., description="The catalog name")
+    schema_name: str = Field(..., description="The schema name", alias="schema")
+    table: str = Field(..., description="The table name")
+    group_by: Optional[str] = Field(
+        None, description="Comma-separated list of columns to group by"
+    )
+    aggregates: str = Field(
+        ..., description="Comma-separated list of aggregates, e.g. count(*)"
+    )
+    filter_expr: Optional[str] = Field(None, description="Optional SQL WHERE clause")
+    limit: int = Field(1000, description="Maximum number of groups to return")
+    shape: str = Field(
+        "rows",
+        description="JSON layout: rows (one object per group) or columnar "
+        "(column names once, then one array of values per column)",
+    )
+
+    @field_validator("limit")
+    @classmethod
+    def validate_limit(cls, v):
+        """Validate that limit is a positive integer and not too large."""
+        if v <= 0:
+            raise ValueError("Limit must be greater than 0")
+        if v > 10000:
+            raise ValueError("Limit cannot exceed 10000")
+        return v
+
+    @field_validator("shape")
+    @classmethod
+    def validate_shape(cls, v):
+        """Validate that the JSON shape is supported."""
+        if v not in ("rows", "columnar"):
+            raise ValueError("Shape must be one of: rows, columnar")
+        return v
+
+
+class TableAggregateResponse(BaseModel):
+    """Response model for aggregated table data."""
+
+    data: List[Dict] = Field(..., description="One record per group")
+    count: int = Field(..., description="The number of groups returned")
+    truncated: bool = Field(
+        False, description="Whether there are more groups than `limit`"
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "data": [
+                    {"region": "EMEA", "count": 1250, "p95_latency": 0.42},
+                    {"region": "US", "count": 3100, "p95_latency": 0.37},
+                ],
+                "count": 2,
+                "truncated": False,
+            }
+        }
+    }
+
+
+class TablePreviewParams(BaseModel):
+    """Query parameters for previewing a sample of a table."""
+
+    catalog: str = Field(..., description="The catalog name")
+    schema_name: str = Field(..., description="The schema name", alias="schema")
+    table: str = Field(..., description="The table name")
+    columns: str = Field("*", description="Comma-separated list of columns to retrieve")
+    limit: int = Field(100, description="Maximum number of sample records to return")
+    sample_percent: Optional[float] = Field(
+        None, description="Percentage of the table to sample at random"
+    )
+
+    @field_validator("limit")
+    @classmethod
+    def validate_limit(cls, v):
+        """Validate that limit is a positive integer and not too large."""
+        if v <= 0:
+            raise ValueError("Limit must be greater than 0")
+        if v > 1000:
+            raise ValueError("Limit cannot exceed 1000")
+        return v
+
+    @field_validator("sample_percent")
+    @classmethod
+    def validate_sample_percent(cls, v):
+        """Validate that the sample percentage is within (0, 100]."""
+        if v is not None and not 0 < v <= 100:
+            raise ValueError("sample_percent must be greater than 0 and at most 100")
+        return v
+
+
+class ColumnStats(BaseModel):
+    """Approximate statistics of a column, computed over a sample."""
+
+    null_fraction: Optional[float] = Field(
+        None, description="Share of null values in the sample"
+    )
+    approx_distinct: Optional[int] = Field(
+        None, description="Approximate number of distinct values in the sample"
+    )
+    min: Optional[Any] = Field(None, description="Smallest value in the sample")
+    max: Optional[Any] = Field(None, description="Largest value in the sample")
+
+
+class TablePreviewResponse(BaseModel):
+    """Response model for table previews."""
+
+    data: List[Dict] = Field(..., description="Sample records")
+    count: int = Field(..., description="The number of sample records returned")
+    version: Optional[int] = Field(
+        None, description="Delta table version the sample was read from"
+    )
+    sample_rows: Optional[int] = Field(
+        None, description="Number of sampled rows the statistics describe"
+    )
+    stats: Optional[Dict[str, ColumnStats]] = Field(
+        None, description="Approximate statistics of each column"
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "data": [{"id": 1, "name": "Example"}],
+                "count": 1,
+                "version": 42,
+                "sample_rows": 100000,
+                "stats": {
+                    "id": {
+                        "null_fraction": 0.0,
+                        "approx_distinct": 99873,
+                        "min": 1,
+                        "max": 1000000,
+                    },
+                    "name": {
+                        "null_fraction": 0.02,
+                        "approx_distinct": 512,
+                        "min": "Aaron",
+                        "max": "Zoe",
+                    },
+                },
+            }
+        }
+    }
+
 
 class TableResponse(BaseModel):
     """Response model for table data."""
@@ -46,6 +276,11 @@ class TableResponse(BaseModel):
     total: Optional[int] = Field(
         None, description="The total number of records (if available)"
     )
+    next_cursor: Optional[str] = Field(
+        None,
+        description="Cursor for the next page when using keyset pagination; "
+        "null on the last page",
+    )
 
     model_config = {
         "json_schema_extra": {
@@ -56,11 +291,35 @@ class TableResponse(BaseModel):
                 ],
                 "count": 2,
                 "total": 100,
+                "next_cursor": None,
             }
         }
     }
 
 
+class TableInsertBatch(BaseModel):
+    """Outcome of one INSERT statement of a batched insert."""
+
+    index: int = Field(..., description="Position of the batch, starting at 0")
+    rows: int = Field(..., description="Number of records in the batch")
+    rowcount: Optional[int] = Field(
+        None, description="Number of records inserted (None if not run)"
+    )
+    status: str = Field(..., description="One of inserted, failed or skipped")
+    error: Optional[str] = Field(None, description="The error if the batch failed")
+
+
+class TableInsertResponse(TableResponse):
+    """Response model for inserts, with the outcome of each batch."""
+
+    mode: str = Field(
+        "insert", description="How the records were loaded: insert or copy"
+    )
+    batches: List[TableInsertBatch] = Field(
+        default_factory=list, description="The outcome of each INSERT statement"
+    )
+
+
 class TableInsertRequest(BaseModel):
     """Request model for inserting data into a table."""
 
@@ -68,6 +327,19 @@ class TableInsertRequest(BaseModel):
     schema_name: str = Field(..., description="The schema name", alias="schema")
     table: str = Field(..., description="The table name")
     data: List[Dict] = Field(..., description="The records to insert")
+    mode: str = Field(
+        "auto",
+        description="Load with INSERT statements (insert), a staged file and "
+        "COPY INTO (copy), or choose by payload size (auto)",
+    )
+
+    @field_validator("mode")
+    @classmethod
+    def validate_mode(cls, v):
+        """Validate that the ingest mode is supported."""
+        if v not in ("auto", "insert", "copy"):
+            raise ValueError("Mode must be one of: auto, insert, copy")
+        return v
 
     model_config = {
         "json_schema_extra": {
@@ -82,3 +354,35 @@ class TableInsertRequest(BaseModel):
             }
         }
     }
+
+
+class TableIngestParams(BaseModel):
+    """Query parameters for ingesting an NDJSON or CSV body into a table."""
+
+    catalog: str = Field(..., description="The catalog name")
+    schema_name: str = Field(..., description="The schema name", alias="schema")
+    table: str = Field(..., description="The table name")
+    body_format: str = Field(
+        "ndjson", description="Body format: ndjson or csv", alias="format"
+    )
+    mode: str = Field(
+        "auto",
+        description="Load with INSERT statements (insert), a staged file and "
+        "COPY INTO (copy), or choose by payload size (auto)",
+    )
+
+    @field_validator("body_format")
+    @classmethod
+    def validate_body_format(cls, v):
+        """Validate that the body format is supported."""
+        if v not in ("ndjson", "csv"):
+            raise ValueError("Format must be one of: ndjson, csv")
+        return v
+
+    @field_validator("mode")
+    @classmethod
+    def validate_mode(cls, v):
+        """Validate that the ingest mode is supported."""
+        if v not in ("auto", "insert", "copy"):
+            raise ValueError("Mode must be one of: auto, insert, copy")
+        return v
@@ -3,6 +3,8 @@
 from fastapi import APIRouter
 
 from .healthcheck import router as healthcheck_router
+from .metrics import router as metrics_router
+from .profiles import router as profiles_router
 from .tables import router as tables_router
 from .volumes import router as volumes_router
 
@@ -11,5 +13,7 @@ router = APIRouter()
 
 # Include endpoint-specific routers
 router.include_router(healthcheck_router)
+router.include_router(metrics_router)
+router.include_router(profiles_router)
 router.include_router(tables_router)
 router.include_router(volumes_router)
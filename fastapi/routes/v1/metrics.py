@@ -0,0 +1,14 @@
+"""Prometheus metrics endpoint for the V1 API."""
+
+from fastapi import APIRouter, Response
+
+from services.metrics import render_metrics
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=Response)
+async def metrics() -> Response:
+    """Return the application's metrics in the Prometheus text format."""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,44 @@
+"""Request profile endpoint for the V1 API."""
+
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+
+from config.settings import Settings, get_settings
+from middleware.profiling import is_profile_id, profile_path
+
+router = APIRouter(tags=["profiling"])
+
+
+@router.get(
+    "/profile",
+    response_class=FileResponse,
+    responses={
+        200: {"description": "The profile in the speedscope JSON format"},
+        404: {"description": "Profiling is disabled or the profile does not exist"},
+    },
+)
+async def get_profile(
+    profile_id: str = Query(
+        ..., description="The `X-Profile-Id` returned with the profiled response"
+    ),
+    settings: Settings = Depends(get_settings),
+) -> FileResponse:
+    """
+    Download a stored request profile.
+
+    Open the file at https://www.speedscope.app to view it as a flame graph.
+    """
+    if not settings.profiling_enabled:
+        raise HTTPException(status_code=404, detail="Profiling is disabled.")
+
+    if not is_profile_id(profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found.")
+    path = profile_path(settings.profile_dir, profile_id)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found.")
+
+    return FileResponse(
+        path, media_type="application/json", filename=os.path.basename(path)
+    )
@@ -5,17 +5,278 @@ This module provides endpoints for querying data from
 Databricks Unity Catalog tables.
 """
 
-from fastapi import APIRouter, Depends, Query
+import asyncio
+from typing import Annotated, Any, Awaitable, Dict, Iterable, List, Optional, Union
+
+import anyio
+import pyarrow as pa
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
 from config.settings import Settings, get_settings
-from errors.exceptions import ConfigurationError, DatabaseError
-from models.tables import TableQueryParams, TableResponse, TableInsertRequest
-from services.db.connector import query, insert_data
+from errors.exceptions import ConfigurationError, DatabaseError, QueryTimeoutError
+from models.tables import (
+    TableAggregateParams,
+    TableAggregateResponse,
+    TableIngestParams,
+    TableInsertBatch,
+    TableInsertResponse,
+    TableQueryParams,
+    TableResponse,
+    TableInsertRequest,
+    TablePreviewParams,
+    TablePreviewResponse,
+    TableStreamParams,
+)
+from services.db.connector import (
+    InsertError,
+    InsertResult,
+    query_async,
+    query_arrow_async,
+    stream_query_arrow_async,
+    insert_data_async,
+)
+from services.db.query_builder import (
+    build_aggregate_query,
+    build_count_query,
+    build_sample_source,
+    build_select_query,
+    build_stats_query,
+    decode_cursor,
+    encode_cursor,
+    parse_aggregates,
+    quote_identifier,
+    split_columns,
+    validate_identifier,
+)
+from services.db.versions import compute_etag, etag_matches, table_version_async
+from services.encoding import (
+    BINARY_MEDIA_TYPES,
+    STREAM_MEDIA_TYPES,
+    FastJSONResponse,
+    TimedJSONResponse,
+    encode_binary,
+    encode_stream_batch,
+    to_columnar,
+)
+from services.ingest import (
+    INGEST_MEDIA_TYPES,
+    bulk_ingest_async,
+    choose_ingest_mode,
+    read_records,
+    records_to_arrow,
+)
+from services.metrics import ROWS_RETURNED, timed
+from services.preview import column_stats, stats_columns
+from services.schema import (
+    TableSchema,
+    column_converters,
+    convert_rows,
+    filter_columns,
+    is_schema_mismatch,
+    plain_result_columns,
+    requested_columns,
+    schema_registry,
+    validate_columns,
+)
 
 router = APIRouter(tags=["tables"])
 
+# How often to check whether the client is still waiting for a response
+_DISCONNECT_POLL_SECONDS = 0.5
+
+
+class _ClientDisconnected(Exception):
+    """The client went away before the response was ready."""
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while not await request.is_disconnected():
+        await asyncio.sleep(_DISCONNECT_POLL_SECONDS)
+
+
+def _deadline(timeout: Optional[float]) -> Optional[float]:
+    """Get the event loop time at which `timeout` seconds from now run out."""
+    if timeout is None:
+        return None
+    return asyncio.get_running_loop().time() + timeout
+
+
+async def _run_cancellable(
+    aw: Awaitable[Any],
+    request: Optional[Request],
+    timeout: Optional[float],
+    deadline: Optional[float] = None,
+) -> Any:
+    """
+    Await a query, cancelling it if the client disconnects or time runs out.
+
+    Cancelling the query also cancels its statements on the warehouse, so
+    they do not keep running for a response nobody will read.
+
+    Args:
+        aw: The query to await
+        request: The request to watch for a disconnect, if any
+        timeout: Time limit in seconds, or None for no limit
+        deadline: When `timeout` runs out, as returned by `_deadline`, if
+            the query shares it with queries run before it
+
+    Returns:
+        The query's result
+
+    Raises:
+        QueryTimeoutError: If the query did not finish in time
+        _ClientDisconnected: If the client went away
+    """
+    remaining = timeout
+    if deadline is not None:
+        remaining = max(deadline - asyncio.get_running_loop().time(), 0)
+
+    task = asyncio.ensure_future(aw)
+    waiting = {task}
+    if request is not None:
+        waiting.add(asyncio.ensure_future(_wait_for_disconnect(request)))
+
+    try:
+        done, _ = await asyncio.wait(
+            waiting, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+        )
+    finally:
+        for pending in waiting:
+            pending.cancel()
+        # Let cancelled work unwind, so its statements are being cancelled
+        # and any generator it was driving can be closed
+        await asyncio.wait(waiting)
+
+    if task in done:
+        return task.result()
+    if done:
+        raise _ClientDisconnected()
+    raise QueryTimeoutError(
+        message=f"Query did not finish within {timeout:g} seconds",
+        details={"timeout_seconds": timeout},
+    )
+
+
+async def _gather(*aws: Awaitable[Any]) -> List[Any]:
+    """Run awaitables concurrently, cancelling the others if one fails."""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+
+def _insert_batches(result: InsertResult) -> List[TableInsertBatch]:
+    """Convert per-batch insert results to response models."""
+    return [
+        TableInsertBatch(
+            index=batch.index,
+            rows=batch.rows,
+            rowcount=batch.rowcount,
+            status=batch.status,
+            error=batch.error,
+        )
+        for batch in result.batches
+    ]
+
+
+def _result_column(names: Iterable[str], column: str) -> str:
+    """Find a column among a result's columns, ignoring case like Databricks SQL."""
+    for name in names:
+        if name.lower() == column.lower():
+            return name
+    return column
+
+
+def _next_cursor(
+    order_by: str, last_key: Any, page_nulls: int, after_nulls: int
+) -> str:
+    """
+    Encode the cursor following a page of a keyset listing.
+
+    Args:
+        order_by: The ordering key column
+        last_key: The key of the page's last row
+        page_nulls: Number of rows of the page with a NULL key
+        after_nulls: Number of rows with a NULL key returned by earlier pages
+    """
+    if last_key is None:
+        # Count the NULL keys returned so far, to skip them next time
+        return encode_cursor(order_by, None, after_nulls + page_nulls)
+    return encode_cursor(order_by, last_key)
+
+
+async def _table_schema(
+    table_path: str,
+    columns: str,
+    filter_expr: Optional[str],
+    order_by: Optional[str] = None,
+) -> Optional[TableSchema]:
+    """
+    Check the columns a request names against the table's cached schema.
+
+    Returns:
+        The table's schema, or None if it is not known
+
+    Raises:
+        ValidationError: If a named column does not exist
+    """
+    table_schema = await schema_registry.get_async(table_path)
+    if table_schema is not None:
+        names = requested_columns(columns) + filter_columns(filter_expr)
+        if order_by is not None:
+            names.append(order_by)
+        validate_columns(table_schema, names)
+    return table_schema
+
 
-@router.get("/table", response_model=TableResponse)
+def _query_error(
+    e: Exception, table_path: str, catalog: str, schema: str, table: str
+) -> DatabaseError:
+    """Wrap a failed table query, dropping the cached schema if it is stale."""
+    if is_schema_mismatch(e):
+        schema_registry.invalidate(table_path)
+    return DatabaseError(
+        message=f"Failed to query table: {str(e)}",
+        details={"catalog": catalog, "schema": schema, "table": table},
+    )
+
+
+async def _count_rows(
+    table_path: str,
+    filter_expr: Optional[str],
+    warehouse_id: str,
+    ttl: float,
+    version: Optional[int] = None,
+) -> int:
+    """Count the rows matching a filter, caching the count for `ttl` seconds."""
+    rows = await query_async(
+        build_count_query(table_path, filter_expr, version=version),
+        warehouse_id=warehouse_id,
+        cache_ttl=ttl,
+    )
+    return int(rows[0]["total"])
+
+
+@router.get(
+    "/table",
+    response_model=TableResponse,
+    response_class=TimedJSONResponse,
+    responses={
+        200: {
+            "content": {
+                media_type: {"schema": {"type": "string", "format": "binary"}}
+                for media_type in BINARY_MEDIA_TYPES.values()
+            },
+            "description": "Table records as JSON, or as an Arrow IPC stream or "
+            "Parquet file when `format` is `arrow` or `parquet`",
+        }
+    },
+)
 async def table(
     catalog: str = Query(..., description="The catalog name"),
     schema: str = Query(..., description="The schema name"),
@@ -27,10 +288,65 @@ async def table(
     ),
     filter_expr: str = Query(None, description="Optional SQL WHERE clause"),
     settings: Settings = Depends(get_settings),
-) -> TableResponse:
+    format: Annotated[
+        str,
+        Query(description="Response format: json, arrow (Arrow IPC stream) or parquet"),
+    ] = "json",
+    order_by: Annotated[
+        Optional[str],
+        Query(description="Unique column to order by for keyset pagination"),
+    ] = None,
+    cursor: Annotated[
+        Optional[str],
+        Query(description="The next_cursor value returned by the previous page"),
+    ] = None,
+    include_total: Annotated[
+        bool,
+        Query(description="Also count all records matching the filter"),
+    ] = False,
+    timeout_seconds: Annotated[
+        Optional[float],
+        Query(gt=0, description="Time limit for the query, in seconds"),
+    ] = None,
+    shape: Annotated[
+        str,
+        Query(
+            description="JSON layout: rows (one object per record) or columnar "
+            '(`{"columns": [...], "data": [[...], ...]}` with one array per column)'
+        ),
+    ] = "rows",
+    request: Request = None,
+) -> Union[TableResponse, Response]:
     """
     Retrieve data from a Unity Catalog table with filtering and pagination.
 
+    Pages can be fetched with `limit`/`offset`, or with keyset pagination by
+    passing `order_by`: each page then returns a `next_cursor` (or an
+    `X-Next-Cursor` header for binary formats) to pass as `cursor` for the
+    following page, so deep pages are as fast as the first one. Rows with
+    a NULL key come last; as NULL keys cannot be compared, they are paged by
+    position, read at the same table version.
+
+    With `shape=columnar` the JSON body lists the column names once and then
+    one array of values per column, converted straight from Arrow and encoded
+    with orjson, so wide or long pages are smaller and faster to produce.
+
+    Column names in `columns`, `order_by` and backticked in `filter_expr`
+    are checked against the table's schema, cached from Unity Catalog, so
+    unknown columns are rejected without running a query.
+
+    With `include_total` the matching records are counted concurrently with
+    the page query. Counts are cached briefly per table and filter, so paging
+    through a result set does not recount on every page.
+
+    The warehouse statements are cancelled if the client disconnects or the
+    query runs longer than `timeout_seconds` (default `query_timeout_seconds`).
+
+    Responses from Delta tables carry an ETag derived from the table version
+    and the query, and their rows are read at that version. A request whose
+    `If-None-Match` matches the current ETag gets `304 Not Modified` without
+    the data query being run.
+
     Args:
         catalog: The catalog name
         schema: The schema name
@@ -40,13 +356,25 @@ async def table(
         columns: Comma-separated list of columns to retrieve
         filter_expr: Optional SQL WHERE clause
         settings: Application settings
+        format: Response format (json, arrow or parquet)
+        order_by: Unique column to order by for keyset pagination
+        cursor: Cursor of the page to continue from
+        include_total: Whether to return the total number of matching records
+        timeout_seconds: Time limit for the query, in seconds
+        shape: JSON layout (rows or columnar)
+        request: The incoming request, watched for client disconnects and
+            checked for If-None-Match
 
     Returns:
-        TableResponse containing the requested data
+        The requested data as JSON in the TableResponse layout (encoded
+        without revalidating the rows) or the columnar layout, or as an
+        Arrow IPC stream or Parquet file for the binary formats
 
     Raises:
         ConfigurationError: If the SQL warehouse ID is not configured
+        ValidationError: If a column does not exist in the table's schema
         DatabaseError: If the query fails
+        QueryTimeoutError: If the query does not finish in time
     """
     # Validate query parameters using Pydantic model
     params = TableQueryParams(
@@ -57,6 +385,10 @@ async def table(
         offset=offset,
         columns=columns,
         filter_expr=filter_expr,
+        format=format,
+        order_by=order_by,
+        cursor=cursor,
+        shape=shape,
     )
 
     # Get warehouse ID from settings
@@ -67,57 +399,710 @@ async def table(
             details={"setting": "databricks_warehouse_id"},
         )
 
+    # Reject unknown columns before going to the warehouse
+    table_path = f"{params.catalog}.{params.schema_name}.{params.table}"
+    table_schema = await _table_schema(
+        table_path, params.columns, params.filter_expr, params.order_by
+    )
+
+    # Build the SQL query
+    order_by = params.order_by
+    keyset = order_by is not None
+    select_columns = params.columns
+    drop_key = False
+
+    if keyset:
+        if table_schema is not None:
+            # Result columns carry the key's real name, whatever its case here
+            order_by = table_schema.column(order_by).name
+        # Reject a malformed key before any query is run
+        quoted_key = quote_identifier(order_by)
+        # The key is needed to build the cursor even if not requested
+        requested = {col.lower() for col in split_columns(params.columns)}
+        if "*" not in requested and order_by.lower() not in requested:
+            select_columns = f"{params.columns}, {quoted_key}"
+            drop_key = True
+
+    after, after_nulls = (
+        decode_cursor(params.cursor, order_by) if params.cursor else (None, 0)
+    )
+    timeout = timeout_seconds or settings.query_timeout_seconds or None
+
+    async def count(version: Optional[int]) -> Optional[int]:
+        if not include_total:
+            return None
+        return await _count_rows(
+            table_path,
+            params.filter_expr,
+            warehouse_id,
+            settings.count_cache_ttl_seconds,
+            version,
+        )
+
     try:
-        # Build the SQL query
-        table_path = f"{params.catalog}.{params.schema_name}.{params.table}"
-        where_clause = f"WHERE {params.filter_expr}" if params.filter_expr else ""
+        # The version lookup and the query share one time limit
+        deadline = _deadline(timeout)
+        version = await _run_cancellable(
+            table_version_async(
+                table_path, warehouse_id, settings.table_version_cache_ttl_seconds
+            ),
+            request,
+            timeout,
+            deadline,
+        )
+        # Read the version behind the ETag, so cached rows cannot be older
+        sql_query, parameters = build_select_query(
+            table_path,
+            columns=select_columns,
+            filter_expr=params.filter_expr,
+            # Fetch one extra row to learn whether there is a next page
+            limit=params.limit + 1 if keyset else params.limit,
+            # Rows with a NULL key are paged by position
+            offset=(after_nulls or None) if keyset else params.offset,
+            order_by=order_by,
+            after=after,
+            has_after=params.cursor is not None,
+            version=version,
+        )
+
+        # Answer from the table version alone if the client's copy is current
+        etag = None
+        if version is not None:
+            etag = compute_etag(
+                table_path,
+                version,
+                sql_query,
+                parameters,
+                params.response_format,
+                params.shape,
+                include_total,
+                drop_key,
+            )
+        headers = {"ETag": etag} if etag else {}
+        if etag and request is not None:
+            if etag_matches(request.headers.get("if-none-match"), etag):
+                return Response(status_code=304, headers=headers)
+
+        if params.response_format in BINARY_MEDIA_TYPES or params.shape == "columnar":
+            # Build the body straight from Arrow without per-row objects
+            arrow_table, total = await _run_cancellable(
+                _gather(
+                    query_arrow_async(
+                        sql_query, warehouse_id=warehouse_id, parameters=parameters
+                    ),
+                    count(version),
+                ),
+                request,
+                timeout,
+                deadline,
+            )
+            next_cursor = None
+            if keyset:
+                key = _result_column(arrow_table.column_names, order_by)
+                if arrow_table.num_rows > params.limit:
+                    arrow_table = arrow_table.slice(0, params.limit)
+                    keys = arrow_table.column(key)
+                    next_cursor = _next_cursor(
+                        order_by, keys[-1].as_py(), keys.null_count, after_nulls
+                    )
+                if drop_key:
+                    arrow_table = arrow_table.drop_columns([key])
+
+            if params.shape == "columnar":
+                ROWS_RETURNED.labels("table", "json").inc(arrow_table.num_rows)
+                # Skip response model validation of the (large) data arrays
+                return FastJSONResponse(
+                    {
+                        **to_columnar(arrow_table),
+                        "count": arrow_table.num_rows,
+                        "total": total,
+                        "next_cursor": next_cursor,
+                    },
+                    headers=headers,
+                )
 
-        sql_query = f"""
-            SELECT {params.columns}
-            FROM {table_path}
-            {where_clause}
-            LIMIT {params.limit} OFFSET {params.offset}
-        """
+            if total is not None:
+                headers["X-Total-Count"] = str(total)
+            if next_cursor is not None:
+                headers["X-Next-Cursor"] = next_cursor
 
-        # Execute the query
-        results = query(sql_query, warehouse_id=warehouse_id)
+            with timed("serialize"):
+                body = await run_in_threadpool(
+                    encode_binary, arrow_table, params.response_format
+                )
+            headers["X-Row-Count"] = str(arrow_table.num_rows)
+            ROWS_RETURNED.labels("table", params.response_format).inc(
+                arrow_table.num_rows
+            )
+            return Response(
+                content=body,
+                media_type=BINARY_MEDIA_TYPES[params.response_format],
+                headers=headers,
+            )
 
-        # Create the response
-        return TableResponse(
-            data=results,
-            count=len(results),
-            # Total is not available without an additional count query
-            total=None,
+        # Execute the query, and the count alongside it
+        results, total = await _run_cancellable(
+            _gather(
+                query_async(
+                    sql_query, warehouse_id=warehouse_id, parameters=parameters
+                ),
+                count(version),
+            ),
+            request,
+            timeout,
+            deadline,
         )
+
+        next_cursor = None
+        if keyset and results:
+            key = _result_column(results[0].keys(), order_by)
+            if len(results) > params.limit:
+                results = results[: params.limit]
+                next_cursor = _next_cursor(
+                    order_by,
+                    results[-1][key],
+                    sum(row[key] is None for row in results),
+                    after_nulls,
+                )
+            if drop_key:
+                for row in results:
+                    row.pop(key, None)
+        if table_schema is not None and results:
+            # Convert typed columns up front rather than value by value
+            plain = plain_result_columns(select_columns, results[0])
+            convert_rows(results, column_converters(table_schema, plain))
+
+        ROWS_RETURNED.labels("table", "json").inc(len(results))
+
+        # The rows come straight from the connector, so encode them directly
+        # instead of validating every row against the response model again
+        return FastJSONResponse(
+            {
+                "data": results,
+                "count": len(results),
+                "total": total,
+                "next_cursor": next_cursor,
+            },
+            headers=headers,
+        )
+    except _ClientDisconnected:
+        # Nobody is left to read the response
+        return Response(status_code=499)
+    except QueryTimeoutError:
+        raise
     except Exception as e:
         # Wrap any exceptions in a DatabaseError
-        raise DatabaseError(
-            message=f"Failed to query table: {str(e)}",
-            details={
-                "catalog": params.catalog,
-                "schema": params.schema_name,
-                "table": params.table,
-            },
+        raise _query_error(
+            e, table_path, params.catalog, params.schema_name, params.table
+        )
+
+
+@router.get(
+    "/table/aggregate",
+    response_model=TableAggregateResponse,
+    response_class=TimedJSONResponse,
+)
+async def aggregate_table(
+    catalog: str = Query(..., description="The catalog name"),
+    schema: str = Query(..., description="The schema name"),
+    table: str = Query(..., description="The table name"),
+    aggregates: str = Query(
+        ...,
+        description="Comma-separated aggregates: count(*), count(col), sum(col), "
+        "avg(col), min(col), max(col), approx_count_distinct(col), median(col) or "
+        "percentile(col, 0.95), each optionally followed by `AS alias`",
+    ),
+    group_by: Annotated[
+        Optional[str],
+        Query(description="Comma-separated list of columns to group by"),
+    ] = None,
+    filter_expr: str = Query(None, description="Optional SQL WHERE clause"),
+    limit: int = Query(1000, description="Maximum number of groups to return"),
+    settings: Settings = Depends(get_settings),
+    timeout_seconds: Annotated[
+        Optional[float],
+        Query(gt=0, description="Time limit for the query, in seconds"),
+    ] = None,
+    shape: Annotated[
+        str,
+        Query(
+            description="JSON layout: rows (one object per group) or columnar "
+            '(`{"columns": [...], "data": [[...], ...]}` with one array per column)'
+        ),
+    ] = "rows",
+    request: Request = None,
+) -> Union[TableAggregateResponse, Response]:
+    """
+    Aggregate a Unity Catalog table on the warehouse.
+
+    The grouping, filter and aggregates are pushed down into a single
+    GROUP BY statement, so only one record per group leaves the warehouse
+    instead of the raw rows. Percentiles and medians use `percentile_approx`.
+
+    The group-by columns and aggregated columns are validated as identifiers
+    and checked against the table's cached schema before any query is run.
+    Groups are ordered by their key; if there are more than `limit`, the
+    first `limit` are returned and `truncated` is set.
+
+    Args:
+        catalog: The catalog name
+        schema: The schema name
+        table: The table name
+        aggregates: Comma-separated list of aggregates
+        group_by: Comma-separated list of columns to group by
+        filter_expr: Optional SQL WHERE clause
+        limit: Maximum number of groups to return
+        settings: Application settings
+        timeout_seconds: Time limit for the query, in seconds
+        shape: JSON layout (rows or columnar)
+        request: The incoming request, watched for client disconnects
+
+    Returns:
+        The groups as JSON in the TableAggregateResponse layout, or in the
+        columnar layout
+
+    Raises:
+        ConfigurationError: If the SQL warehouse ID is not configured
+        ValidationError: If an aggregate or column is invalid or does not
+            exist in the table's schema
+        DatabaseError: If the query fails
+        QueryTimeoutError: If the query does not finish in time
+    """
+    # Validate query parameters using Pydantic model
+    params = TableAggregateParams(
+        catalog=catalog,
+        schema=schema,
+        table=table,
+        group_by=group_by,
+        aggregates=aggregates,
+        filter_expr=filter_expr,
+        limit=limit,
+        shape=shape,
+    )
+
+    # Get warehouse ID from settings
+    warehouse_id = settings.databricks_warehouse_id
+    if not warehouse_id:
+        raise ConfigurationError(
+            message="SQL warehouse ID not configured",
+            details={"setting": "databricks_warehouse_id"},
         )
 
+    # Validate every identifier before anything is pushed down
+    keys = [
+        validate_identifier(column.strip("`"), "column")
+        for column in split_columns(params.group_by or "")
+    ]
+    parsed = parse_aggregates(params.aggregates, keys)
 
-@router.post("/table", response_model=TableResponse)
+    table_path = f"{params.catalog}.{params.schema_name}.{params.table}"
+    names = keys + [aggregate.column for aggregate in parsed if aggregate.column]
+    table_schema = await _table_schema(table_path, ", ".join(names), params.filter_expr)
+
+    sql_query = build_aggregate_query(
+        table_path,
+        keys,
+        parsed,
+        filter_expr=params.filter_expr,
+        # Fetch one extra group to learn whether the result was cut short
+        limit=params.limit + 1,
+    )
+
+    timeout = timeout_seconds or settings.query_timeout_seconds or None
+
+    try:
+        if params.shape == "columnar":
+            arrow_table = await _run_cancellable(
+                query_arrow_async(sql_query, warehouse_id=warehouse_id),
+                request,
+                timeout,
+            )
+            truncated = arrow_table.num_rows > params.limit
+            arrow_table = arrow_table.slice(0, params.limit)
+            ROWS_RETURNED.labels("table_aggregate", "json").inc(arrow_table.num_rows)
+            return FastJSONResponse(
+                {
+                    **to_columnar(arrow_table),
+                    "count": arrow_table.num_rows,
+                    "truncated": truncated,
+                }
+            )
+
+        results = await _run_cancellable(
+            query_async(sql_query, warehouse_id=warehouse_id), request, timeout
+        )
+        truncated = len(results) > params.limit
+        results = results[: params.limit]
+        if table_schema is not None and results:
+            # Only the group keys have the table's column types
+            convert_rows(results, column_converters(table_schema, keys))
+
+        ROWS_RETURNED.labels("table_aggregate", "json").inc(len(results))
+        return FastJSONResponse(
+            {"data": results, "count": len(results), "truncated": truncated}
+        )
+    except _ClientDisconnected:
+        # Nobody is left to read the response
+        return Response(status_code=499)
+    except QueryTimeoutError:
+        raise
+    except Exception as e:
+        # Wrap any exceptions in a DatabaseError
+        raise _query_error(
+            e, table_path, params.catalog, params.schema_name, params.table
+        )
+
+
+@router.get(
+    "/table/preview",
+    response_model=TablePreviewResponse,
+    response_class=TimedJSONResponse,
+)
+async def preview_table(
+    catalog: str = Query(..., description="The catalog name"),
+    schema: str = Query(..., description="The schema name"),
+    table: str = Query(..., description="The table name"),
+    columns: str = Query(
+        "*", description="Comma-separated list of columns to retrieve"
+    ),
+    limit: int = Query(100, description="Maximum number of sample records"),
+    sample_percent: Annotated[
+        Optional[float],
+        Query(
+            description="Percentage of the table to sample at random; by default "
+            "the first `preview_sample_rows` rows found are sampled"
+        ),
+    ] = None,
+    stats: Annotated[
+        bool,
+        Query(description="Also compute approximate statistics of each column"),
+    ] = True,
+    settings: Settings = Depends(get_settings),
+    timeout_seconds: Annotated[
+        Optional[float],
+        Query(gt=0, description="Time limit for the preview, in seconds"),
+    ] = None,
+    request: Request = None,
+) -> Union[TablePreviewResponse, Response]:
+    """
+    Preview a sample of a Unity Catalog table with approximate statistics.
+
+    Instead of reading the whole table, the preview reads a `TABLESAMPLE`:
+    `sample_percent` percent of the table at random, or otherwise the first
+    `preview_sample_rows` rows found. Up to `limit` sampled records are
+    returned, and the null fraction, approximate distinct count, min and max
+    of every column are computed over the whole sample in one statement.
+
+    Delta tables are read at their current version with a fixed sampling
+    seed, so a preview only changes when the table does; it is cached for
+    `preview_cache_ttl_seconds` per version.
+
+    Args:
+        catalog: The catalog name
+        schema: The schema name
+        table: The table name
+        columns: Comma-separated list of columns to retrieve
+        limit: Maximum number of sample records to return
+        sample_percent: Percentage of the table to sample at random
+        stats: Whether to compute column statistics
+        settings: Application settings
+        timeout_seconds: Time limit for the preview, in seconds
+        request: The incoming request, watched for client disconnects
+
+    Returns:
+        The sample records and column statistics as JSON in the
+        TablePreviewResponse layout
+
+    Raises:
+        ConfigurationError: If the SQL warehouse ID is not configured
+        ValidationError: If a column does not exist in the table's schema
+        DatabaseError: If the query fails
+        QueryTimeoutError: If the preview does not finish in time
+    """
+    # Validate query parameters using Pydantic model
+    params = TablePreviewParams(
+        catalog=catalog,
+        schema=schema,
+        table=table,
+        columns=columns,
+        limit=limit,
+        sample_percent=sample_percent,
+    )
+
+    # Get warehouse ID from settings
+    warehouse_id = settings.databricks_warehouse_id
+    if not warehouse_id:
+        raise ConfigurationError(
+            message="SQL warehouse ID not configured",
+            details={"setting": "databricks_warehouse_id"},
+        )
+
+    # Reject unknown columns before going to the warehouse
+    table_path = f"{params.catalog}.{params.schema_name}.{params.table}"
+    table_schema = await _table_schema(table_path, params.columns, None)
+
+    async def preview() -> Dict[str, Any]:
+        version = await table_version_async(
+            table_path, warehouse_id, settings.table_version_cache_ttl_seconds
+        )
+        source = build_sample_source(
+            table_path,
+            version=version,
+            sample_percent=params.sample_percent,
+            sample_rows=settings.preview_sample_rows,
+        )
+        # A sample pinned to a version never changes, so keep it longer
+        ttl = settings.preview_cache_ttl_seconds if version is not None else None
+
+        sql_query, _ = build_select_query(
+            source, columns=params.columns, limit=params.limit
+        )
+        records = await query_arrow_async(
+            sql_query, warehouse_id=warehouse_id, cache_ttl=ttl
+        )
+        ROWS_RETURNED.labels("table_preview", "json").inc(records.num_rows)
+        body = {
+            "data": records.to_pylist(),
+            "count": records.num_rows,
+            "version": version,
+            "sample_rows": None,
+            "stats": None,
+        }
+
+        if stats:
+            # One statement describes every column of the same sample
+            summary_columns = stats_columns(records.schema, table_schema)
+            summary = await query_async(
+                build_stats_query(source, summary_columns),
+                warehouse_id=warehouse_id,
+                cache_ttl=ttl,
+            )
+            body["sample_rows"] = summary[0]["rows"]
+            body["stats"] = column_stats(summary[0], summary_columns)
+        return body
+
+    try:
+        return FastJSONResponse(
+            await _run_cancellable(
+                preview(),
+                request,
+                timeout_seconds or settings.query_timeout_seconds or None,
+            )
+        )
+    except _ClientDisconnected:
+        # Nobody is left to read the response
+        return Response(status_code=499)
+    except QueryTimeoutError:
+        raise
+    except Exception as e:
+        # Wrap any exceptions in a DatabaseError
+        raise _query_error(
+            e, table_path, params.catalog, params.schema_name, params.table
+        )
+
+
+@router.get(
+    "/table/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {media_type: {} for media_type in STREAM_MEDIA_TYPES.values()},
+            "description": "Table records streamed as NDJSON or CSV",
+        }
+    },
+)
+async def stream_table(
+    catalog: str = Query(..., description="The catalog name"),
+    schema: str = Query(..., description="The schema name"),
+    table: str = Query(..., description="The table name"),
+    columns: str = Query(
+        "*", description="Comma-separated list of columns to retrieve"
+    ),
+    filter_expr: str = Query(None, description="Optional SQL WHERE clause"),
+    limit: int = Query(None, description="Optional maximum number of records"),
+    format: str = Query("ndjson", description="Export format: ndjson or csv"),
+    batch_size: int = Query(
+        None, description="Number of rows fetched from the warehouse per batch"
+    ),
+    settings: Settings = Depends(get_settings),
+    timeout_seconds: Annotated[
+        Optional[float],
+        Query(gt=0, description="Time limit for the first batch, in seconds"),
+    ] = None,
+    request: Request = None,
+) -> StreamingResponse:
+    """
+    Stream the contents of a Unity Catalog table as NDJSON or CSV.
+
+    Rows are fetched from the warehouse in batches and written to the client
+    as they arrive, so memory use does not grow with the size of the result.
+    If the client disconnects, or the statement does not return its first
+    batch within `timeout_seconds`, the statement is cancelled.
+
+    Args:
+        catalog: The catalog name
+        schema: The schema name
+        table: The table name
+        columns: Comma-separated list of columns to retrieve
+        filter_expr: Optional SQL WHERE clause
+        limit: Optional maximum number of records to return
+        format: Export format (ndjson or csv)
+        batch_size: Number of rows fetched per batch
+        settings: Application settings
+        timeout_seconds: Time limit for the first batch, in seconds
+        request: The incoming request, watched for client disconnects
+
+    Returns:
+        StreamingResponse with the exported records
+
+    Raises:
+        ConfigurationError: If the SQL warehouse ID is not configured
+        ValidationError: If a column does not exist in the table's schema
+        DatabaseError: If the query fails
+        QueryTimeoutError: If the first batch does not arrive in time
+    """
+    # Validate query parameters using Pydantic model
+    params = TableStreamParams(
+        catalog=catalog,
+        schema=schema,
+        table=table,
+        columns=columns,
+        filter_expr=filter_expr,
+        limit=limit,
+        format=format,
+        batch_size=batch_size,
+    )
+
+    # Get warehouse ID from settings
+    warehouse_id = settings.databricks_warehouse_id
+    if not warehouse_id:
+        raise ConfigurationError(
+            message="SQL warehouse ID not configured",
+            details={"setting": "databricks_warehouse_id"},
+        )
+
+    # Reject unknown columns before going to the warehouse
+    table_path = f"{params.catalog}.{params.schema_name}.{params.table}"
+    await _table_schema(table_path, params.columns, params.filter_expr)
+
+    sql_query, _ = build_select_query(
+        table_path,
+        columns=params.columns,
+        filter_expr=params.filter_expr,
+        limit=params.limit or None,
+    )
+
+    batches = stream_query_arrow_async(
+        sql_query,
+        warehouse_id=warehouse_id,
+        batch_size=params.batch_size or settings.stream_batch_size,
+    )
+
+    try:
+        # Run the statement before sending headers so that failures
+        # still get a proper error response
+        first_batch = await _run_cancellable(
+            anext(batches),
+            request,
+            timeout_seconds or settings.query_timeout_seconds or None,
+        )
+    except _ClientDisconnected:
+        await batches.aclose()
+        return Response(status_code=499)
+    except QueryTimeoutError:
+        await batches.aclose()
+        raise
+    except Exception as e:
+        await batches.aclose()
+        raise _query_error(
+            e, table_path, params.catalog, params.schema_name, params.table
+        )
+
+    async def encode(batch: pa.Table, first: bool) -> bytes:
+        ROWS_RETURNED.labels("table_stream", params.stream_format).inc(batch.num_rows)
+        with timed("serialize"):
+            return await run_in_threadpool(
+                encode_stream_batch, batch, params.stream_format, first
+            )
+
+    async def body():
+        try:
+            yield await encode(first_batch, True)
+            async for batch in batches:
+                yield await encode(batch, False)
+        finally:
+            # Release the cursor as soon as the client goes away
+            with anyio.CancelScope(shield=True):
+                await batches.aclose()
+
+    return StreamingResponse(
+        body(), media_type=STREAM_MEDIA_TYPES[params.stream_format]
+    )
+
+
+async def _load(
+    table_path: str,
+    records: Union[List[Dict], pa.Table],
+    mode: str,
+    warehouse_id: str,
+    settings: Settings,
+) -> TableInsertResponse:
+    """Load records with INSERT statements or a staged file, as chosen."""
+    if mode == "copy":
+        arrow_table = records
+        if not isinstance(records, pa.Table):
+            arrow_table = await run_in_threadpool(records_to_arrow, records)
+        inserted = await bulk_ingest_async(
+            table_path, arrow_table, warehouse_id, settings.staging_volume_path
+        )
+        return TableInsertResponse(data=[], count=inserted, total=inserted, mode="copy")
+
+    if isinstance(records, pa.Table):
+        records = await run_in_threadpool(records.to_pylist)
+    result = await insert_data_async(
+        table_path=table_path, data=records, warehouse_id=warehouse_id
+    )
+    return TableInsertResponse(
+        data=[],
+        count=result.rowcount,
+        total=result.rowcount,  # For inserts, total is the same as count
+        mode="insert",
+        batches=_insert_batches(result),
+    )
+
+
+def _load_error(e: Exception, catalog: str, schema: str, table: str) -> DatabaseError:
+    """Wrap a failed load in a DatabaseError, with per-batch results if any."""
+    details = {"catalog": catalog, "schema": schema, "table": table}
+    if isinstance(e, InsertError):
+        details["batches"] = [batch.model_dump() for batch in _insert_batches(e.result)]
+    return DatabaseError(message=f"Failed to insert data: {str(e)}", details=details)
+
+
+@router.post("/table", response_model=TableInsertResponse)
 async def insert_table_data(
     request: TableInsertRequest,
     settings: Settings = Depends(get_settings),
-) -> TableResponse:
+) -> TableInsertResponse:
     """
     Insert data into a Unity Catalog table.
 
+    Small payloads are inserted in batches bounded by row and parameter
+    count, several batches at a time, and the response reports the outcome
+    of each batch. Payloads of at least `bulk_ingest_min_rows` records are
+    staged as a Parquet file in the staging volume and loaded with a single
+    COPY INTO; `mode` forces either path.
+
     Args:
         request: The request containing the table path and data to insert
         settings: Application settings
 
     Returns:
-        TableResponse containing the number of records inserted
+        TableInsertResponse containing the number of records inserted
 
     Raises:
-        ConfigurationError: If the SQL warehouse ID is not configured
+        ConfigurationError: If the SQL warehouse ID or, for copy mode, the
+            staging volume is not configured
         DatabaseError: If the insert operation fails
     """
     # Get warehouse ID from settings
@@ -128,32 +1113,99 @@ async def insert_table_data(
             details={"setting": "databricks_warehouse_id"},
         )
 
+    mode = choose_ingest_mode(
+        len(request.data),
+        request.mode,
+        settings.staging_volume_path,
+        settings.bulk_ingest_min_rows,
+    )
+
     try:
         # Build the table path
         table_path = f"{request.catalog}.{request.schema_name}.{request.table}"
 
         # Insert the data
-        records_inserted = insert_data(
-            table_path=table_path, data=request.data, warehouse_id=warehouse_id
-        )
-
-        # Ensure records_inserted is not negative
-        if records_inserted < 0:
-            records_inserted = len(request.data)
-
-        # Create the response
-        return TableResponse(
-            data=request.data,  # Return the inserted data
-            count=records_inserted,
-            total=records_inserted,  # For inserts, total is the same as count
-        )
+        response = await _load(table_path, request.data, mode, warehouse_id, settings)
+        response.data = request.data  # Return the inserted data
+        return response
     except Exception as e:
         # Wrap any exceptions in a DatabaseError
-        raise DatabaseError(
-            message=f"Failed to insert data: {str(e)}",
-            details={
-                "catalog": request.catalog,
-                "schema": request.schema_name,
-                "table": request.table,
+        raise _load_error(e, request.catalog, request.schema_name, request.table)
+
+
+@router.post(
+    "/table/ingest",
+    response_model=TableInsertResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                media_type: {"schema": {"type": "string"}}
+                for media_type in INGEST_MEDIA_TYPES.values()
             },
+        }
+    },
+)
+async def ingest_table_data(
+    request: Request,
+    catalog: str = Query(..., description="The catalog name"),
+    schema: str = Query(..., description="The schema name"),
+    table: str = Query(..., description="The table name"),
+    format: str = Query("ndjson", description="Body format: ndjson or csv"),
+    mode: str = Query(
+        "auto", description="Load mode: auto, insert (INSERT) or copy (COPY INTO)"
+    ),
+    settings: Settings = Depends(get_settings),
+) -> TableInsertResponse:
+    """
+    Load an NDJSON or CSV request body into a Unity Catalog table.
+
+    The body is parsed with Arrow and loaded the same way as
+    `POST /table`: large bodies through a staged Parquet file and COPY INTO,
+    small ones with batched INSERT statements. Records are not echoed back.
+
+    Args:
+        request: The incoming request, whose body holds the records
+        catalog: The catalog name
+        schema: The schema name
+        table: The table name
+        format: Body format (ndjson or csv)
+        mode: Load mode (auto, insert or copy)
+        settings: Application settings
+
+    Returns:
+        TableInsertResponse containing the number of records inserted
+
+    Raises:
+        ConfigurationError: If the SQL warehouse ID or, for copy mode, the
+            staging volume is not configured
+        ValidationError: If the body cannot be parsed
+        DatabaseError: If the load fails
+    """
+    # Validate query parameters using Pydantic model
+    params = TableIngestParams(
+        catalog=catalog, schema=schema, table=table, format=format, mode=mode
+    )
+
+    # Get warehouse ID from settings
+    warehouse_id = settings.databricks_warehouse_id
+    if not warehouse_id:
+        raise ConfigurationError(
+            message="SQL warehouse ID not configured",
+            details={"setting": "databricks_warehouse_id"},
         )
+
+    body = await request.body()
+    records = await run_in_threadpool(read_records, body, params.body_format)
+    load_mode = choose_ingest_mode(
+        records.num_rows,
+        params.mode,
+        settings.staging_volume_path,
+        settings.bulk_ingest_min_rows,
+    )
+
+    try:
+        table_path = f"{params.catalog}.{params.schema_name}.{params.table}"
+        return await _load(table_path, records, load_mode, warehouse_id, settings)
+    except Exception as e:
+        raise _load_error(e, params.catalog, params.schema_name, params.table)
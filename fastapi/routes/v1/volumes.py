@@ -1,13 +1,124 @@
 # volumes.py
 
-from fastapi import APIRouter, HTTPException, Query
-from fastapi.responses import StreamingResponse
+from contextlib import aclosing
+from functools import partial
+from typing import Any, AsyncIterator, BinaryIO, Dict, List, Optional
+from urllib.parse import quote
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from databricks.sdk import WorkspaceClient
+from databricks.sdk.errors import AlreadyExists, NotFound, ResourceAlreadyExists
+import mimetypes
 import os
+import uuid
+
+from config.settings import Settings, get_settings
+from services.encoding import PARQUET_MEDIA_TYPE
+from services.file_cache import CachedFile, file_cache
+from services.listing import (
+    decode_page_token,
+    encode_page_token,
+    invalidate_listings,
+    list_volume,
+    normalize_directory,
+    paginate,
+)
+from services.ranges import (
+    RangeNotSatisfiable,
+    closing_boundary,
+    content_range,
+    file_etag,
+    if_range_matches,
+    multipart_length,
+    parse_range,
+    part_header,
+)
+from services.streaming import StreamInterrupted, drain_into, read_ahead, run_io
+from services.uploads import upload_stream
 
 router = APIRouter(tags=["volumes"])
 w = WorkspaceClient()
 
+# Media types of extensions the mimetypes module does not know
+_MEDIA_TYPES = {".parquet": PARQUET_MEDIA_TYPE, ".zst": "application/zstd"}
+
+# Media types of files compressed as a whole, by mimetypes encoding
+_ENCODED_MEDIA_TYPES = {
+    "gzip": "application/gzip",
+    "bzip2": "application/x-bzip2",
+    "xz": "application/x-xz",
+    "br": "application/x-brotli",
+    "compress": "application/x-compress",
+}
+
+
+def guess_media_type(file_name: str) -> str:
+    """
+    Guess a file's media type from its name.
+
+    The media type tells the compression middleware to leave already
+    compressed files, such as Parquet or zip archives, as they are.
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+    if extension in _MEDIA_TYPES:
+        return _MEDIA_TYPES[extension]
+    media_type, encoding = mimetypes.guess_type(file_name)
+    if encoding is not None:
+        # e.g. data.csv.gz is gzip data, not CSV
+        return _ENCODED_MEDIA_TYPES.get(encoding, "application/octet-stream")
+    return media_type or "application/octet-stream"
+
+
+def read_range(file_path: str, start: int, end: int) -> BinaryIO:
+    """
+    Open a byte range of a file for reading.
+
+    The range is requested from the Files API with a `Range` header, so
+    storage only sends those bytes rather than everything preceding them.
+
+    Args:
+        file_path: Full path to the file inside a Unity Catalog volume
+        start: First byte position
+        end: Last byte position, inclusive
+
+    Returns:
+        A stream of the range's bytes
+    """
+    response = w.api_client.do(
+        "GET",
+        f"/api/2.0/fs/files{quote(file_path)}",
+        headers={
+            "Accept": "application/octet-stream",
+            "Range": f"bytes={start}-{end}",
+        },
+        raw=True,
+    )
+    return response["contents"]
+
+
+class _CachedFileResponse(FileResponse):
+    """Send a cached file, releasing it when sent or abandoned."""
+
+    def __init__(self, entry: CachedFile, **kwargs):
+        super().__init__(entry.local_path, **kwargs)
+        self.entry = entry
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            file_cache.release(self.entry)
+
+
+def _databricks_error(e: Exception) -> HTTPException:
+    if isinstance(e, NotFound):
+        return HTTPException(status_code=404, detail=f"File not found: {str(e)}")
+    if isinstance(e, (AlreadyExists, ResourceAlreadyExists)):
+        return HTTPException(status_code=409, detail=f"File already exists: {str(e)}")
+    # Any other Databricks error is reported as a bad request
+    return HTTPException(status_code=400, detail=f"Databricks error: {str(e)}")
+
 
 @router.get(
     "/download",
@@ -15,57 +126,323 @@ w = WorkspaceClient()
     description=(
         "Streams the content of a file stored in a Unity Catalog volume without "
         "loading the entire file into memory. "
-        "Client must call: `/download?file_path=/Volumes/<...>/<filename>`."
+        "Client must call: `/download?file_path=/Volumes/<...>/<filename>`. "
+        "Supports `Range` (including multiple ranges) and `If-Range` requests, "
+        "so interrupted downloads can be resumed and large files fetched in "
+        "parallel parts."
     ),
     responses={
         200: {
             "description": "Streaming binary response; the client should receive "
                            "the file as an attachment."
         },
+        206: {
+            "description": "The requested byte range, or a `multipart/byteranges` "
+            "body for several ranges."
+        },
         400: {"description": "Bad request (e.g. missing file_path or Databricks error)"},
         404: {"description": "File not found in Unity Catalog or underlying storage"},
+        416: {"description": "No requested range overlaps the file"},
     },
 )
 async def download_file(
     file_path: str = Query(
         ..., 
         description="Full path to the file inside a Unity Catalog volume, e.g. `/Volumes/main/data/large.csv`"
-    )
+    ),
+    range_header: Optional[str] = Header(
+        None, alias="Range", description="Byte ranges to download, e.g. `bytes=0-1023`"
+    ),
+    if_range: Optional[str] = Header(
+        None,
+        alias="If-Range",
+        description="Only serve `Range` if the file still has this ETag or "
+        "Last-Modified date",
+    ),
+    settings: Settings = Depends(get_settings),
 ):
     """
     Streams a large file from Unity Catalog to the HTTP client in chunks.
 
     - `file_path`: the path inside your Unity Catalog volume.
+    - `Range`: optional byte ranges; each range is read from storage on its
+      own, without reading the bytes before it, and sent as `206 Partial
+      Content` (several ranges as `multipart/byteranges`).
+    - `If-Range`: optional ETag or date; if the file has changed since, the
+      whole file is sent instead of the ranges.
     - Returns a StreamingResponse so that the API server never holds the full file in RAM.
+      Storage is read on a dedicated thread pool, `download_chunk_size` bytes at a time
+      and up to `download_read_ahead_chunks` chunks ahead of the client, so reads
+      overlap sending and the event loop is never blocked.
+    - Whole files up to `file_cache_max_file_bytes` are kept in an LRU disk
+      cache bounded by `file_cache_max_bytes`, written as they are first
+      streamed; an entry is only served while the file's metadata still
+      matches its ETag, and is sent straight from disk.
     """
     if not file_path:
         raise HTTPException(status_code=400, detail="`file_path` is required.")
 
     try:
-        # Begin the download from Databricks; resp.contents is a generator of bytes
-        resp = w.files.download(file_path)
+        # The size and modification time describe the file without reading it
+        metadata = await run_io(w.files.get_metadata, file_path)
     except Exception as e:
-        # If Databricks returns an error (e.g. path not found), convert to 400
-        raise HTTPException(status_code=400, detail=f"Databricks error: {str(e)}")
+        raise _databricks_error(e)
 
     file_name = os.path.basename(file_path)
-
-    def file_iterator(chunk_size: int = 1024 * 1024):
-        """
-        Read resp.contents in constant‐size chunks (here 1 MB) and yield them
-        directly to the StreamingResponse. FastAPI will stream each chunk
-        to the client without buffering the whole file.
-        """
-        with resp.contents as stream:
-            for chunk in stream:
-                yield chunk
+    media_type = guess_media_type(file_name)
+    size = metadata.content_length
+    etag = file_etag(file_path, size, metadata.last_modified)
 
     headers = {
-        "Content-Disposition": f'attachment; filename="{file_name}"'
+        "Content-Disposition": f'attachment; filename="{file_name}"',
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
     }
+    if metadata.last_modified:
+        headers["Last-Modified"] = metadata.last_modified
+
+    ranges = None
+    if size is not None and if_range_matches(if_range, etag, metadata.last_modified):
+        try:
+            ranges = parse_range(range_header, size)
+        except RangeNotSatisfiable:
+            headers["Content-Range"] = f"bytes */{size}"
+            return Response(status_code=416, headers=headers)
+
+    def stream_contents(contents: BinaryIO) -> AsyncIterator[bytes]:
+        """Yield a download's chunks, reading ahead of the client."""
+        return read_ahead(
+            contents, settings.download_chunk_size, settings.download_read_ahead_chunks
+        )
+
+    cached = ranges is None and range_header is None and file_cache.cacheable(size)
+    if cached:
+        entry = file_cache.get(file_path, etag, size)
+        if entry is not None:
+            return _CachedFileResponse(entry, media_type=media_type, headers=headers)
+
+    if ranges is None:
+        try:
+            # Begin the download from Databricks; resp.contents is a generator of bytes
+            resp = await run_io(w.files.download, file_path)
+        except Exception as e:
+            raise _databricks_error(e)
+        contents = resp.contents
+        if cached:
+            # Cache the file as it is sent
+            contents = file_cache.fill(file_path, etag, size, contents)
+        if size is not None:
+            headers["Content-Length"] = str(size)
+        return StreamingResponse(
+            stream_contents(contents), media_type=media_type, headers=headers
+        )
 
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        try:
+            contents = await run_io(read_range, file_path, start, end)
+        except Exception as e:
+            raise _databricks_error(e)
+        headers["Content-Range"] = content_range(start, end, size)
+        headers["Content-Length"] = str(end - start + 1)
+        return StreamingResponse(
+            stream_contents(contents),
+            status_code=206,
+            media_type=media_type,
+            headers=headers,
+        )
+
+    boundary = uuid.uuid4().hex
+
+    async def multipart():
+        """Yield each range as a part, opening its read only when it is due."""
+        for start, end in ranges:
+            yield part_header(boundary, media_type, start, end, size)
+            contents = await run_io(read_range, file_path, start, end)
+            async with aclosing(stream_contents(contents)) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+            yield b"\r\n"
+        yield closing_boundary(boundary)
+
+    headers["Content-Length"] = str(
+        multipart_length(boundary, media_type, ranges, size)
+    )
     return StreamingResponse(
-        file_iterator(),
-        media_type="application/octet-stream",
+        multipart(),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
         headers=headers,
-    )
\ No newline at end of file
+    )
+
+
+@router.put(
+    "/upload",
+    summary="Stream a file into a Unity Catalog volume",
+    description=(
+        "Streams the request body into a file in a Unity Catalog volume without "
+        "loading the entire file into memory. "
+        "Client must call: `PUT /upload?file_path=/Volumes/<...>/<filename>` with "
+        "the file's bytes as the body. Large files are sent to storage in "
+        "parts, and an interrupted body leaves any existing file unchanged."
+    ),
+    responses={
+        200: {"description": "The file was written"},
+        400: {
+            "description": "Bad request (e.g. missing file_path, interrupted body "
+            "or Databricks error)"
+        },
+        404: {"description": "The volume or directory does not exist"},
+        409: {"description": "The file exists and `overwrite` is false"},
+    },
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/octet-stream": {
+                    "schema": {"type": "string", "format": "binary"}
+                }
+            },
+        }
+    },
+)
+async def upload_file(
+    request: Request,
+    file_path: str = Query(
+        ...,
+        description="Full path of the file to write inside a Unity Catalog volume, e.g. `/Volumes/main/data/large.csv`",
+    ),
+    overwrite: bool = Query(False, description="Replace the file if it exists"),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Streams a large request body from the HTTP client to Unity Catalog.
+
+    - `file_path`: the path inside your Unity Catalog volume.
+    - `overwrite`: whether an existing file is replaced.
+    - The body is passed to storage as it arrives, so the API server never
+      holds the full file in RAM. It is uploaded in `upload_part_size` parts,
+      up to `upload_parallelism` at once, retrying a failed part on its own,
+      so memory stays around `upload_part_size * upload_parallelism` whatever
+      the file's size.
+    - If the body is interrupted or a part fails for good, the upload is
+      aborted before the file is written, so an existing file is left as it
+      was.
+    """
+    if not file_path:
+        raise HTTPException(status_code=400, detail="`file_path` is required.")
+
+    upload = partial(
+        upload_stream,
+        w,
+        file_path,
+        overwrite=overwrite,
+        part_size=settings.upload_part_size,
+        parallelism=settings.upload_parallelism,
+    )
+    try:
+        size = await drain_into(request.stream(), upload, settings.upload_buffer_chunks)
+    except StreamInterrupted as e:
+        raise HTTPException(status_code=400, detail=f"Upload interrupted: {str(e)}")
+    except Exception as e:
+        raise _databricks_error(e)
+
+    invalidate_listings(file_path)
+    return {"file_path": file_path, "size": size}
+
+
+def list_directory(directory_path: str) -> List[Dict[str, Any]]:
+    """
+    List the entries of one volume directory.
+
+    The Files API's own pages are followed until the directory is complete.
+
+    Args:
+        directory_path: Full path to the directory
+
+    Returns:
+        The directory's files and subdirectories
+    """
+    return [
+        {
+            "path": normalize_directory(entry.path),
+            "name": entry.name,
+            "is_directory": bool(entry.is_directory),
+            "size": entry.file_size,
+            "last_modified": entry.last_modified,
+        }
+        for entry in w.files.list_directory_contents(directory_path)
+    ]
+
+
+@router.get(
+    "/volumes/list",
+    summary="List a Unity Catalog volume directory",
+    description=(
+        "Lists the files and subdirectories of a directory in a Unity Catalog "
+        "volume, optionally recursively, one page at a time. "
+        "Client must call: `/volumes/list?path=/Volumes/<...>/<directory>`, then "
+        "pass each response's `next_page_token` as `page_token` until it is null."
+    ),
+    responses={
+        200: {"description": "One page of the listing, sorted by path"},
+        400: {
+            "description": "Bad request (e.g. invalid page token or Databricks error)"
+        },
+        404: {"description": "The directory does not exist"},
+    },
+)
+async def list_volume_directory(
+    path: str = Query(
+        ...,
+        description="Full path to a directory inside a Unity Catalog volume, e.g. `/Volumes/main/data/files`",
+    ),
+    recursive: bool = Query(
+        False, description="Also list the contents of all subdirectories"
+    ),
+    page_size: int = Query(
+        1000, ge=1, le=10000, description="Maximum number of entries per page"
+    ),
+    page_token: Optional[str] = Query(
+        None, description="The next_page_token value returned by the previous page"
+    ),
+    settings: Settings = Depends(get_settings),
+):
+    """
+    Lists a volume directory, page by page.
+
+    - `path`: the directory inside your Unity Catalog volume.
+    - `recursive`: whether everything below the directory is listed; the
+      subdirectories are walked by up to `volume_list_max_walkers` concurrent
+      Files API listings.
+    - The complete listing is cached for `volume_list_cache_ttl_seconds`, so
+      paging through a large volume lists it from storage once; an upload
+      through `/upload` drops the cached listings of its directories.
+    - Pages are sorted by path and continue after the last path returned, so
+      a page token stays valid when the listing is refreshed.
+    """
+    root = normalize_directory(path)
+    after = None
+    if page_token:
+        try:
+            after = decode_page_token(page_token, root, recursive)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        entries = await list_volume(
+            list_directory, root, recursive, settings.volume_list_max_walkers
+        )
+    except Exception as e:
+        raise _databricks_error(e)
+
+    page, more = paginate(entries, page_size, after)
+    next_page_token = (
+        encode_page_token(root, recursive, page[-1]["path"]) if more else None
+    )
+    return {
+        "path": root,
+        "recursive": recursive,
+        "entries": page,
+        "next_page_token": next_page_token,
+    }
@@ -0,0 +1,306 @@
+"""
+In-memory cache for query results.
+
+This module provides a thread-safe cache bounded by entry count and total
+size, with a per-entry TTL and invalidation by table name.
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, Optional, Sequence, Set
+
+from services.metrics import (
+    QUERY_CACHE_BYTES,
+    QUERY_CACHE_ENTRIES,
+    QUERY_CACHE_EVICTIONS,
+    QUERY_CACHE_INVALIDATIONS,
+    QUERY_CACHE_REQUESTS,
+)
+
+# Quoted literals and identifiers, which must be kept verbatim
+_QUOTED = re.compile(r"""('(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*"|`[^`]*`)""")
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Table references following FROM / JOIN / INTO / UPDATE / DESCRIBE HISTORY
+_TABLE_REF = re.compile(
+    r"\b(?:FROM|JOIN|INTO|UPDATE|HISTORY)\s+((?:`[^`]+`|[\w$]+)(?:\s*\.\s*(?:`[^`]+`|[\w$]+))*)",
+    re.IGNORECASE,
+)
+
+# Number of rows sampled when estimating the size of a result
+_SIZE_SAMPLE_ROWS = 100
+
+
+def normalize_sql(sql_query: str) -> str:
+    """
+    Normalize a SQL statement for use in a cache key.
+
+    Runs of whitespace outside quoted literals and identifiers are collapsed
+    to a single space, so formatting differences do not split the cache.
+
+    Args:
+        sql_query: The SQL statement
+
+    Returns:
+        The normalized statement
+    """
+    parts = _QUOTED.split(sql_query)
+    # Even indexes are unquoted text, odd indexes are the quoted parts
+    for i in range(0, len(parts), 2):
+        parts[i] = _WHITESPACE.sub(" ", parts[i])
+    return "".join(parts).strip()
+
+
+def normalize_table_name(table_name: str) -> str:
+    """Normalize a table name (case, backticks and whitespace) for comparisons."""
+    return "".join(table_name.replace("`", "").split()).lower()
+
+
+def referenced_tables(sql_query: str) -> FrozenSet[str]:
+    """
+    Find the tables a SQL statement reads from or writes to.
+
+    Args:
+        sql_query: The SQL statement
+
+    Returns:
+        Normalized names of the referenced tables
+    """
+    unquoted = _QUOTED.sub(
+        lambda m: m.group(0) if m.group(0).startswith("`") else "''", sql_query
+    )
+    return frozenset(
+        normalize_table_name(match) for match in _TABLE_REF.findall(unquoted)
+    )
+
+
+def estimate_rows_size(rows: Sequence[Sequence[Any]]) -> int:
+    """
+    Estimate the memory used by a list of result rows.
+
+    The size is extrapolated from a sample of rows, which is accurate enough
+    for bounding the cache without walking every value.
+
+    Args:
+        rows: The result rows
+
+    Returns:
+        Estimated size in bytes
+    """
+    if not rows:
+        return sys.getsizeof(rows)
+
+    sample = rows[:_SIZE_SAMPLE_ROWS]
+    sample_size = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        for row in sample
+    )
+    return sys.getsizeof(rows) + sample_size * len(rows) // len(sample)
+
+
+@dataclass
+class _Entry:
+    value: Any
+    size: int
+    expires_at: float
+    tables: FrozenSet[str]
+
+
+class QueryCache:
+    """
+    A TTL + LRU cache for query results.
+
+    The cache is bounded both by number of entries and by the total estimated
+    size of the cached values; the least recently used entries are evicted
+    first. Entries are tagged with the tables they read so that writes can
+    invalidate them.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, default_ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._by_table: Dict[str, Set[Hashable]] = {}
+        self._table_versions: Dict[str, int] = {}
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether results are cached at all."""
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def caches(self, ttl: Optional[float] = None) -> bool:
+        """
+        Return whether values put with a TTL are cached.
+
+        Callers with their own TTL, such as row counts, keep caching when the
+        default TTL is 0.
+
+        Args:
+            ttl: The TTL the value would be put with (defaults to the cache's TTL)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        return self.enabled and ttl > 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up a cached value.
+
+        Args:
+            key: The cache key
+
+        Returns:
+            The cached value, or None if it is missing or expired
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                QUERY_CACHE_REQUESTS.labels("miss").inc()
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            QUERY_CACHE_REQUESTS.labels("hit").inc()
+            return entry.value
+
+    def table_versions(self, tables: Iterable[str]) -> Dict[str, int]:
+        """
+        Snapshot the invalidation counters of some tables.
+
+        Take the snapshot before running a query and pass it to `put`, so
+        that a result which raced with a write is not cached.
+        """
+        with self._lock:
+            return {table: self._table_versions.get(table, 0) for table in tables}
+
+    def put(
+        self,
+        key: Hashable,
+        value: Any,
+        size: int,
+        tables: FrozenSet[str] = frozenset(),
+        ttl: Optional[float] = None,
+        versions: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Store a value in the cache.
+
+        Args:
+            key: The cache key
+            value: The value to cache
+            size: Estimated size of the value in bytes
+            tables: Tables the value was read from
+            ttl: Time to live in seconds (defaults to the cache's TTL)
+            versions: Table versions taken before the value was computed
+        """
+        if not self.caches(ttl) or size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else ttl
+
+        with self._lock:
+            if versions is not None and any(
+                self._table_versions.get(table, 0) != version
+                for table, version in versions.items()
+            ):
+                # A table was written to while the query ran
+                return
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = _Entry(
+                value=value,
+                size=size,
+                expires_at=time.monotonic() + ttl,
+                tables=tables,
+            )
+            self._bytes += size
+            for table in tables:
+                self._by_table.setdefault(table, set()).add(key)
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+                QUERY_CACHE_EVICTIONS.inc()
+            self._report_size()
+
+    def invalidate_table(self, table_name: str) -> int:
+        """
+        Remove all entries that read from a table.
+
+        Args:
+            table_name: The table name (normalized internally)
+
+        Returns:
+            The number of entries removed
+        """
+        table = normalize_table_name(table_name)
+        with self._lock:
+            self._table_versions[table] = self._table_versions.get(table, 0) + 1
+            keys = list(self._by_table.get(table, ()))
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            QUERY_CACHE_INVALIDATIONS.inc(len(keys))
+            return len(keys)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._by_table.clear()
+            self._table_versions.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+            self._report_size()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        """Remove an entry. Must be called with the lock held."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+        self._report_size()
+        for table in entry.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def _report_size(self) -> None:
+        """Export the current size. Must be called with the lock held."""
+        QUERY_CACHE_ENTRIES.set(len(self._entries))
+        QUERY_CACHE_BYTES.set(self._bytes)
@@ -0,0 +1,91 @@
+"""
+Cancellation of running warehouse statements.
+
+The SQL connector blocks a worker thread for the whole statement, so
+cancelling the awaiting coroutine does not stop it. A `StatementCanceller`
+tracks the cursors opened on behalf of one call and cancels them on the
+warehouse when the call is abandoned.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional, Set
+
+
+class StatementCancelledError(Exception):
+    """Raised when a statement is started after its call was cancelled."""
+
+
+class StatementCanceller:
+    """
+    Cancel the statements running on behalf of one call.
+
+    Cursors register for the duration of their statement. Cancelling is
+    thread-safe and may happen before, during or after the statement runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cursors: Set[Any] = set()
+        self.cancelled = False
+
+    @contextmanager
+    def track(self, cursor: Any) -> Iterator[Any]:
+        """
+        Register a cursor while its statement runs.
+
+        Raises:
+            StatementCancelledError: If the call was already cancelled
+        """
+        with self._lock:
+            if self.cancelled:
+                raise StatementCancelledError("Statement cancelled")
+            self._cursors.add(cursor)
+        try:
+            yield cursor
+        finally:
+            with self._lock:
+                self._cursors.discard(cursor)
+
+    def cancel(self) -> None:
+        """Cancel the running statements and any not yet started."""
+        with self._lock:
+            self.cancelled = True
+            cursors = list(self._cursors)
+
+        for cursor in cursors:
+            try:
+                cursor.cancel()
+            except Exception:
+                # The statement may have finished in the meantime
+                pass
+
+
+# The canceller of the call being run on the current worker thread
+current_canceller: ContextVar[Optional[StatementCanceller]] = ContextVar(
+    "current_canceller", default=None
+)
+
+
+@contextmanager
+def cancellable(
+    cursor: Any, canceller: Optional[StatementCanceller] = None
+) -> Iterator[Any]:
+    """
+    Make a cursor's statement cancellable for the duration of the block.
+
+    Args:
+        cursor: The cursor about to run a statement
+        canceller: The canceller to register with (defaults to the current one)
+
+    Yields:
+        The cursor
+    """
+    canceller = canceller or current_canceller.get()
+    if canceller is None:
+        yield cursor
+        return
+
+    with canceller.track(cursor):
+        yield cursor
@@ -3,25 +3,84 @@ Database connector for Databricks SQL.
 
 This module provides functions to connect to Databricks SQL warehouses
 and execute queries against Unity Catalog tables.
-"""
 
-from functools import lru_cache
-from typing import Dict, List, Optional, Union
+The SQL connector is blocking, so async callers should use the `*_async`
+variants, which run the work on a dedicated thread pool instead of the
+event loop.
+
+Results of `query` and `query_arrow` are cached for a short time, keyed by
+the normalized SQL and warehouse. Inserting into a table invalidates the
+cached results that read from it. Identical queries issued concurrently
+through the async API share a single warehouse statement.
+"""
 
+import asyncio
+import contextvars
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import partial
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+import anyio
 import pandas as pd
+import pyarrow as pa
 from databricks import sql
 from databricks.sdk.core import Config
 
+from config.settings import settings
+from services.metrics import (
+    REGISTRY,
+    PoolCollector,
+    SingleFlightCollector,
+    observe,
+    timed,
+)
+from .cache import QueryCache, estimate_rows_size, normalize_sql, referenced_tables
+from .cancel import StatementCanceller, cancellable, current_canceller
+from .pool import ConnectionPool
+from .query_builder import build_insert_query, insert_batch_size
+from .singleflight import SingleFlight
+
 # Use Databricks SDK Config for authentication
 # In Databricks Apps, auth is handled automatically
 cfg = Config()
 
+# One connection pool per SQL warehouse
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+# Short-lived cache of query results
+query_cache = QueryCache(
+    max_entries=settings.query_cache_max_entries,
+    max_bytes=settings.query_cache_max_bytes,
+    default_ttl=settings.query_cache_ttl_seconds,
+)
+
+# Coalesces identical in-flight queries from async callers
+query_flights = SingleFlight()
 
-@lru_cache(maxsize=1)
-def get_connection(warehouse_id: str):
+# Dedicated threads for blocking warehouse calls
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _connect(warehouse_id: str):
     """
-    Get or create a connection to the Databricks SQL warehouse.
-    Connection is cached using lru_cache to avoid creating multiple connections.
+    Open a new connection to the Databricks SQL warehouse.
 
     Args:
         warehouse_id: The ID of the SQL warehouse to connect to
@@ -37,17 +96,266 @@ def get_connection(warehouse_id: str):
     )
 
 
+def get_pool(warehouse_id: str) -> ConnectionPool:
+    """
+    Get or create the connection pool for a SQL warehouse.
+
+    Args:
+        warehouse_id: The ID of the SQL warehouse to connect to
+
+    Returns:
+        The connection pool for the warehouse
+    """
+    with _pools_lock:
+        pool = _pools.get(warehouse_id)
+        if pool is None:
+            pool = ConnectionPool(
+                connect=lambda: _connect(warehouse_id),
+                min_size=settings.sql_pool_min_size,
+                max_size=settings.sql_pool_max_size,
+                idle_timeout=settings.sql_pool_idle_timeout_seconds,
+                max_lifetime=settings.sql_pool_max_lifetime_seconds,
+                checkout_timeout=settings.sql_pool_checkout_timeout_seconds,
+                ping_after=settings.sql_pool_ping_after_seconds,
+            )
+            _pools[warehouse_id] = pool
+        return pool
+
+
+@contextmanager
+def get_connection(warehouse_id: str) -> Iterator:
+    """
+    Check out a pooled connection to the Databricks SQL warehouse.
+    The connection is returned to the pool when the `with` block exits.
+
+    Args:
+        warehouse_id: The ID of the SQL warehouse to connect to
+
+    Yields:
+        A connection to the SQL warehouse
+    """
+    start = time.perf_counter()
+    with get_pool(warehouse_id).connection() as conn:
+        observe("checkout", time.perf_counter() - start)
+        yield conn
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Get the usage of each warehouse's connection pool.
+
+    Returns:
+        Pool stats (see `ConnectionPool.stats`) keyed by warehouse ID
+    """
+    with _pools_lock:
+        pools = dict(_pools)
+    return {warehouse_id: pool.stats() for warehouse_id, pool in pools.items()}
+
+
+# Report pool usage on the /metrics endpoint
+REGISTRY.register(PoolCollector(pool_stats))
+
+# Report query coalescing on the /metrics endpoint
+REGISTRY.register(SingleFlightCollector(query_flights.stats))
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """
+    Get or create the thread pool used for blocking database calls.
+
+    Returns:
+        The database thread pool executor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.sql_executor_max_workers,
+                thread_name_prefix="databricks-sql",
+            )
+        return _executor
+
+
+async def run_in_executor(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking function on the database thread pool.
+
+    If the caller is cancelled (for example because the client went away or
+    a timeout expired), the statements the function is running on the
+    warehouse are cancelled too, and statements it has not started yet fail
+    straight away.
+
+    Args:
+        func: The blocking function to run
+        *args: Positional arguments for the function
+        **kwargs: Keyword arguments for the function
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    canceller = StatementCanceller()
+    # Propagate context variables (e.g. request-scoped state) to the worker
+    ctx = contextvars.copy_context()
+    ctx.run(current_canceller.set, canceller)
+    try:
+        return await loop.run_in_executor(
+            get_executor(), partial(ctx.run, func, *args, **kwargs)
+        )
+    except asyncio.CancelledError:
+        # Cancelling is a blocking call too; keep it off the event loop and
+        # off the database pool, whose workers may all be busy
+        loop.run_in_executor(None, canceller.cancel)
+        raise
+
+
 def close_connections():
     """
-    Close all open connections.
+    Close all open connections and stop the database thread pool.
     This should be called when shutting down the application.
     """
-    # Clear the lru_cache to close connections
-    get_connection.cache_clear()
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+
+    for pool in pools:
+        pool.close()
+
+
+def prune_connections() -> None:
+    """
+    Close the idle connections of every pool that are past their idle
+    timeout or lifetime, and reopen those needed to keep `min_size` open.
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.prune()
+        pool.fill()
+
+
+def warm_connections(warehouse_id: str) -> None:
+    """
+    Open a warehouse's `sql_pool_min_size` connections ahead of its first query.
+
+    Args:
+        warehouse_id: The ID of the SQL warehouse to connect to
+    """
+    get_pool(warehouse_id).fill()
+
+
+async def prune_connections_periodically(interval: float) -> None:
+    """
+    Prune the connection pools every `interval` seconds, until cancelled.
+
+    Pools also prune on checkout and checkin; this closes expired warehouse
+    sessions when there is no traffic at all.
+
+    Args:
+        interval: Seconds between prunes
+    """
+    while True:
+        await asyncio.sleep(interval)
+        # Closing connections is blocking network I/O
+        await asyncio.to_thread(prune_connections)
+
+
+def _fingerprint(
+    kind: str,
+    sql_query: str,
+    warehouse_id: str,
+    parameters: Optional[List[Any]] = None,
+) -> tuple:
+    """Identify equivalent queries for caching and coalescing."""
+    bound = json.dumps(parameters, default=str) if parameters else None
+    return (kind, warehouse_id, normalize_sql(sql_query), bound)
+
+
+@contextmanager
+def _open_cursor(conn, canceller: Optional[StatementCanceller] = None) -> Iterator:
+    """Open a cursor whose statement can be cancelled while it runs."""
+    with conn.cursor() as cursor, cancellable(cursor, canceller):
+        yield cursor
+
+
+def _execute(cursor, sql_query: str, parameters: Optional[List[Any]]) -> None:
+    """Execute a statement, binding positional parameters if there are any."""
+    with timed("execute"):
+        if parameters:
+            cursor.execute(sql_query, parameters)
+        else:
+            cursor.execute(sql_query)
+
+
+def _fetch_rows(
+    sql_query: str,
+    warehouse_id: str,
+    parameters: Optional[List[Any]] = None,
+    cache_ttl: Optional[float] = None,
+) -> Tuple[List[str], List]:
+    """
+    Execute a query and return its column names and rows, using the cache.
+
+    Raises:
+        Exception: If the query fails
+    """
+    cache_key = _fingerprint("rows", sql_query, warehouse_id, parameters)
+    cached = query_cache.get(cache_key) if query_cache.caches(cache_ttl) else None
+    if cached is not None:
+        return cached
+
+    tables = referenced_tables(sql_query)
+    versions = query_cache.table_versions(tables)
+
+    try:
+        with get_connection(warehouse_id) as conn, _open_cursor(conn) as cursor:
+            _execute(cursor, sql_query, parameters)
+
+            # Use fetchall directly for non-Arrow results
+            with timed("fetch"):
+                result = cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+
+    except Exception as e:
+        # The pool decides whether the connection is still usable
+        raise Exception(f"Query failed: {str(e)}")
+
+    query_cache.put(
+        cache_key,
+        (columns, result),
+        size=estimate_rows_size(result),
+        tables=tables,
+        ttl=cache_ttl,
+        versions=versions,
+    )
+    return columns, result
+
+
+def _to_result(
+    columns: List[str], rows: List, as_dict: bool
+) -> Union[List[Dict], pd.DataFrame]:
+    """Convert fetched rows to the format requested by the caller."""
+    with timed("convert"):
+        if as_dict:
+            # Convert to list of dictionaries
+            return [dict(zip(columns, row)) for row in rows]
+        else:
+            # Convert to pandas DataFrame
+            return pd.DataFrame(rows, columns=columns)
 
 
 def query(
-    sql_query: str, warehouse_id: str, as_dict: bool = True
+    sql_query: str,
+    warehouse_id: str,
+    as_dict: bool = True,
+    parameters: Optional[List[Any]] = None,
+    cache_ttl: Optional[float] = None,
 ) -> Union[List[Dict], pd.DataFrame]:
     """
     Execute a query against a Databricks SQL Warehouse.
@@ -56,6 +364,8 @@ def query(
         sql_query: SQL query to execute
         warehouse_id: The ID of the SQL warehouse to connect to
         as_dict: Whether to return results as dictionaries (True) or pandas DataFrame (False)
+        parameters: Optional values for `?` markers in the query
+        cache_ttl: How long to cache the result (defaults to the cache's TTL)
 
     Returns:
         Query results as a list of dictionaries or pandas DataFrame
@@ -63,76 +373,445 @@ def query(
     Raises:
         Exception: If the query fails
     """
-    conn = get_connection(warehouse_id)
+    columns, rows = _fetch_rows(sql_query, warehouse_id, parameters, cache_ttl)
+    return _to_result(columns, rows, as_dict)
+
+
+def query_arrow(
+    sql_query: str,
+    warehouse_id: str,
+    parameters: Optional[List[Any]] = None,
+    cache_ttl: Optional[float] = None,
+) -> pa.Table:
+    """
+    Execute a query and return the result as an Arrow table.
+
+    The result is fetched in the connector's native Arrow format, so no
+    per-row Python objects are created.
+
+    Args:
+        sql_query: SQL query to execute
+        warehouse_id: The ID of the SQL warehouse to connect to
+        parameters: Optional values for `?` markers in the query
+        cache_ttl: How long to cache the result (defaults to the cache's TTL)
+
+    Returns:
+        Query results as a pyarrow Table
+
+    Raises:
+        Exception: If the query fails
+    """
+    cache_key = _fingerprint("arrow", sql_query, warehouse_id, parameters)
+    cached = query_cache.get(cache_key) if query_cache.caches(cache_ttl) else None
+    if cached is not None:
+        return cached
+
+    tables = referenced_tables(sql_query)
+    versions = query_cache.table_versions(tables)
 
     try:
-        with conn.cursor() as cursor:
-            cursor.execute(sql_query)
+        with get_connection(warehouse_id) as conn, _open_cursor(conn) as cursor:
+            _execute(cursor, sql_query, parameters)
+            with timed("fetch"):
+                result = cursor.fetchall_arrow()
 
-            # Use fetchall directly for non-Arrow results
-            # and convert to appropriate format
-            result = cursor.fetchall()
-            columns = [col[0] for col in cursor.description]
+    except Exception as e:
+        raise Exception(f"Query failed: {str(e)}")
+
+    query_cache.put(
+        cache_key,
+        result,
+        size=result.nbytes,
+        tables=tables,
+        ttl=cache_ttl,
+        versions=versions,
+    )
+    return result
 
-            if as_dict:
-                # Convert to list of dictionaries
-                return [dict(zip(columns, row)) for row in result]
-            else:
-                # Convert to pandas DataFrame
-                return pd.DataFrame(result, columns=columns)
+
+def stream_query_arrow(
+    sql_query: str,
+    warehouse_id: str,
+    batch_size: int,
+    canceller: Optional[StatementCanceller] = None,
+) -> Iterator[pa.Table]:
+    """
+    Execute a query and yield the result in Arrow batches.
+
+    The connection stays checked out until the generator is exhausted or
+    closed, so callers must close it when they stop early.
+
+    Args:
+        sql_query: SQL query to execute
+        warehouse_id: The ID of the SQL warehouse to connect to
+        batch_size: Maximum number of rows per batch
+        canceller: Optional canceller for the statement
+
+    Yields:
+        pyarrow Tables of at most `batch_size` rows. The first batch is
+        always yielded, even when empty, so consumers see the schema.
+
+    Raises:
+        Exception: If the query fails
+    """
+    try:
+        with get_connection(warehouse_id) as conn, _open_cursor(
+            conn, canceller
+        ) as cursor:
+            _execute(cursor, sql_query, None)
+
+            first = True
+            while True:
+                with timed("fetch"):
+                    batch = cursor.fetchmany_arrow(batch_size)
+                if batch.num_rows == 0 and not first:
+                    return
+                first = False
+                yield batch
 
     except Exception as e:
-        # Don't close the cached connection on error
         raise Exception(f"Query failed: {str(e)}")
 
 
-def insert_data(table_path: str, data: List[Dict], warehouse_id: str) -> int:
+def execute_statement(
+    sql_query: str, warehouse_id: str, parameters: Optional[List[Any]] = None
+) -> List[Dict]:
+    """
+    Execute a statement that writes data, bypassing the result cache.
+
+    Cached reads of the tables the statement refers to are invalidated.
+
+    Args:
+        sql_query: SQL statement to execute
+        warehouse_id: The ID of the SQL warehouse to connect to
+        parameters: Optional values for `?` markers in the statement
+
+    Returns:
+        The rows returned by the statement, as dictionaries
+
+    Raises:
+        Exception: If the statement fails
+    """
+    try:
+        with get_connection(warehouse_id) as conn, _open_cursor(conn) as cursor:
+            _execute(cursor, sql_query, parameters)
+            result = cursor.fetchall() if cursor.description else []
+            columns = [col[0] for col in cursor.description or []]
+    except Exception as e:
+        raise Exception(f"Query failed: {str(e)}")
+    finally:
+        for table in referenced_tables(sql_query):
+            query_cache.invalidate_table(table)
+
+    return _to_result(columns, result, as_dict=True)
+
+
+@dataclass
+class InsertBatchResult:
+    """Outcome of one INSERT statement of a batched insert."""
+
+    index: int
+    rows: int
+    rowcount: Optional[int] = None
+    error: Optional[str] = None
+
+    @property
+    def status(self) -> str:
+        """One of "inserted", "failed" or "skipped" (not run after a failure)."""
+        if self.error is not None:
+            return "failed"
+        return "skipped" if self.rowcount is None else "inserted"
+
+
+@dataclass
+class InsertResult:
+    """Outcome of a batched insert."""
+
+    batches: List[InsertBatchResult]
+
+    @property
+    def rowcount(self) -> int:
+        """Total number of rows inserted by the successful batches."""
+        return sum(batch.rowcount or 0 for batch in self.batches)
+
+
+class InsertError(Exception):
+    """Raised when a batch of a batched insert fails."""
+
+    def __init__(self, message: str, result: InsertResult):
+        super().__init__(message)
+        self.result = result
+
+
+def record_columns(data: List[Dict]) -> List[str]:
+    """
+    Get the columns of records to insert, checking that all records share them.
+
+    Args:
+        data: The records, at least one
+
+    Returns:
+        The columns, in the order of the first record
+
+    Raises:
+        Exception: If a record has other columns than the first
+    """
+    columns = list(data[0].keys())
+    expected = set(columns)
+    for i, record in enumerate(data):
+        if set(record.keys()) != expected:
+            raise Exception(
+                f"Failed to insert data: record {i} has columns "
+                f"{sorted(record.keys())}, expected {sorted(expected)}"
+            )
+    return columns
+
+
+def _plan_insert(
+    data: List[Dict], max_rows: Optional[int], max_parameters: Optional[int]
+) -> Tuple[List[str], List[List[Dict]]]:
+    """Check that all records share the same columns and split them into batches."""
+    columns = record_columns(data)
+    size = insert_batch_size(
+        len(columns),
+        max_rows or settings.insert_batch_max_rows,
+        max_parameters or settings.insert_batch_max_parameters,
+    )
+    return columns, [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def _insert_batch(
+    table_path: str,
+    columns: List[str],
+    batch: List[Dict],
+    warehouse_id: str,
+    result: InsertBatchResult,
+) -> None:
+    """Insert one batch on a pooled connection, recording the outcome."""
+    insert_query = build_insert_query(table_path, columns, len(batch))
+    values = [record[col] for record in batch for col in columns]
+    try:
+        with get_connection(warehouse_id) as conn, _open_cursor(conn) as cursor:
+            _execute(cursor, insert_query, values)
+            rowcount = cursor.rowcount
+    except Exception as e:
+        result.error = str(e)
+        raise
+    # The connector reports -1 when the count is unknown
+    result.rowcount = rowcount if rowcount >= 0 else len(batch)
+
+
+def _finish_insert(result: InsertResult) -> InsertResult:
+    """Raise an InsertError if any batch failed."""
+    failed = [batch for batch in result.batches if batch.error is not None]
+    if failed:
+        raise InsertError(
+            f"Failed to insert data: batch {failed[0].index + 1} of "
+            f"{len(result.batches)} failed: {failed[0].error}",
+            result,
+        )
+    return result
+
+
+def insert_data(
+    table_path: str,
+    data: List[Dict],
+    warehouse_id: str,
+    max_rows: Optional[int] = None,
+    max_parameters: Optional[int] = None,
+    parallelism: Optional[int] = None,
+) -> InsertResult:
     """
     Insert data into a Databricks Unity Catalog table.
 
+    The records are split into batches bounded by row and parameter count,
+    and the batches are inserted concurrently on pooled connections. Batches
+    are separate statements: when one fails, batches that have not started
+    are skipped, but batches that already succeeded stay inserted.
+
     Args:
         table_path: Full path to the table (catalog.schema.table)
         data: List of dictionaries containing the records to insert
         warehouse_id: The ID of the SQL warehouse to connect to
+        max_rows: Maximum rows per statement (defaults to the setting)
+        max_parameters: Maximum parameters per statement (defaults to the setting)
+        parallelism: Maximum concurrent statements (defaults to the setting)
 
     Returns:
-        Number of records inserted
+        The per-batch results
 
     Raises:
-        Exception: If the insert operation fails
+        InsertError: If a batch fails, carrying the per-batch results
+        Exception: If the records do not share the same columns
     """
     if not data:
-        return 0
+        return InsertResult(batches=[])
+
+    columns, batches = _plan_insert(data, max_rows, max_parameters)
+    result = InsertResult(
+        batches=[
+            InsertBatchResult(index=i, rows=len(batch))
+            for i, batch in enumerate(batches)
+        ]
+    )
+    failed = threading.Event()
 
-    conn = get_connection(warehouse_id)
+    def run(batch: List[Dict], batch_result: InsertBatchResult) -> None:
+        if failed.is_set():
+            return
+        try:
+            _insert_batch(table_path, columns, batch, warehouse_id, batch_result)
+        except Exception:
+            failed.set()
 
+    workers = min(parallelism or settings.insert_parallelism, len(batches))
     try:
-        with conn.cursor() as cursor:
-            # Get column names from the first record
-            columns = list(data[0].keys())
-            columns_str = ", ".join(columns)
+        if workers <= 1:
+            for batch, batch_result in zip(batches, result.batches):
+                run(batch, batch_result)
+        else:
+            with ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="databricks-insert"
+            ) as pool:
+                list(pool.map(run, batches, result.batches))
+    finally:
+        # Cached reads of this table are now stale
+        query_cache.invalidate_table(table_path)
+
+    return _finish_insert(result)
+
+
+async def query_async(
+    sql_query: str,
+    warehouse_id: str,
+    as_dict: bool = True,
+    parameters: Optional[List[Any]] = None,
+    cache_ttl: Optional[float] = None,
+) -> Union[List[Dict], pd.DataFrame]:
+    """
+    Execute a query without blocking the event loop.
+
+    Concurrent calls with the same SQL and warehouse share one statement;
+    each caller still gets its own result objects.
+
+    See `query` for arguments and return values.
+    """
+    columns, rows = await query_flights.do(
+        _fingerprint("rows", sql_query, warehouse_id, parameters),
+        lambda: run_in_executor(
+            _fetch_rows, sql_query, warehouse_id, parameters, cache_ttl
+        ),
+    )
+    # Converting a large result takes a while, so keep it off the event loop
+    return await run_in_executor(_to_result, columns, rows, as_dict)
 
-            # Create placeholders for a single row
-            placeholders = ", ".join(["?"] * len(columns))
 
-            # Build the INSERT statement with multiple VALUES clauses
-            values_clauses = []
-            all_values = []
+async def query_arrow_async(
+    sql_query: str,
+    warehouse_id: str,
+    parameters: Optional[List[Any]] = None,
+    cache_ttl: Optional[float] = None,
+) -> pa.Table:
+    """
+    Execute a query returning Arrow without blocking the event loop.
+
+    Concurrent calls with the same SQL and warehouse share one statement.
 
-            for record in data:
-                values_clauses.append(f"({placeholders})")
-                all_values.extend(record[col] for col in columns)
+    See `query_arrow` for arguments and return values.
+    """
+    return await query_flights.do(
+        _fingerprint("arrow", sql_query, warehouse_id, parameters),
+        lambda: run_in_executor(
+            query_arrow, sql_query, warehouse_id, parameters, cache_ttl
+        ),
+    )
 
-            insert_query = f"""
-                INSERT INTO {table_path} ({columns_str})
-                VALUES {", ".join(values_clauses)}
-            """
 
-            # Execute the insert with all values in a single statement
-            cursor.execute(insert_query, all_values)
+async def stream_query_arrow_async(
+    sql_query: str, warehouse_id: str, batch_size: int
+) -> AsyncIterator[pa.Table]:
+    """
+    Stream a query's Arrow batches without blocking the event loop.
 
-            # Get the number of affected rows
-            return cursor.rowcount
+    Each batch is fetched on the database thread pool. If the consumer stops
+    early (for example because the client disconnected), a running statement
+    is cancelled, the cursor closed and the connection returned to the pool
+    straight away.
 
-    except Exception as e:
-        raise Exception(f"Failed to insert data: {str(e)}")
+    See `stream_query_arrow` for arguments and yielded values.
+    """
+    canceller = StatementCanceller()
+    batches = stream_query_arrow(sql_query, warehouse_id, batch_size, canceller)
+    pending = None
+
+    try:
+        while True:
+            # Shield the fetch so it is never abandoned mid-call; the
+            # generator cannot be closed while it is still running.
+            pending = asyncio.ensure_future(run_in_executor(next, batches, None))
+            batch = await asyncio.shield(pending)
+            if batch is None:
+                return
+            yield batch
+    finally:
+        # Clean up even when the consumer is being cancelled
+        with anyio.CancelScope(shield=True):
+            if pending is not None and not pending.done():
+                # Stop the statement rather than wait for it to finish
+                await asyncio.get_running_loop().run_in_executor(None, canceller.cancel)
+                await asyncio.wait([pending])
+            await run_in_executor(batches.close)
+
+
+async def insert_data_async(
+    table_path: str,
+    data: List[Dict],
+    warehouse_id: str,
+    max_rows: Optional[int] = None,
+    max_parameters: Optional[int] = None,
+    parallelism: Optional[int] = None,
+) -> InsertResult:
+    """
+    Insert data without blocking the event loop.
+
+    Each batch runs on the database thread pool, with at most `parallelism`
+    batches in flight. See `insert_data` for arguments and return values.
+    """
+    if not data:
+        return InsertResult(batches=[])
+
+    columns, batches = _plan_insert(data, max_rows, max_parameters)
+    result = InsertResult(
+        batches=[
+            InsertBatchResult(index=i, rows=len(batch))
+            for i, batch in enumerate(batches)
+        ]
+    )
+    semaphore = asyncio.Semaphore(parallelism or settings.insert_parallelism)
+    failed = False
+
+    async def run(batch: List[Dict], batch_result: InsertBatchResult) -> None:
+        nonlocal failed
+        async with semaphore:
+            if failed:
+                return
+            try:
+                await run_in_executor(
+                    _insert_batch,
+                    table_path,
+                    columns,
+                    batch,
+                    warehouse_id,
+                    batch_result,
+                )
+            except Exception:
+                failed = True
+
+    try:
+        await asyncio.gather(
+            *(run(batch, res) for batch, res in zip(batches, result.batches))
+        )
+    finally:
+        query_cache.invalidate_table(table_path)
+
+    return _finish_insert(result)
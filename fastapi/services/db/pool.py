@@ -0,0 +1,290 @@
+"""
+Connection pool for Databricks SQL connections.
+
+This module provides a bounded, thread-safe pool of connections to a single
+SQL warehouse. Connections are checked out for the duration of a statement
+and returned afterwards, so concurrent requests do not share one session.
+"""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Iterator, List
+
+from errors.exceptions import DatabaseError
+
+
+@dataclass
+class PooledConnection:
+    """A connection together with the bookkeeping the pool needs."""
+
+    connection: Any
+    created_at: float
+    last_used_at: float
+
+
+class ConnectionPool:
+    """
+    A bounded pool of connections to one SQL warehouse.
+
+    Idle connections are reused most-recently-used first. Connections are
+    evicted lazily on checkout and checkin once they have been idle for
+    longer than `idle_timeout` (while more than `min_size` are open) or open
+    for longer than `max_lifetime`. `fill` opens connections up to
+    `min_size`, e.g. at startup and after evictions.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        min_size: int = 1,
+        max_size: int = 10,
+        idle_timeout: float = 300.0,
+        max_lifetime: float = 3600.0,
+        checkout_timeout: float = 30.0,
+        ping_after: float = 60.0,
+    ):
+        if max_size <= 0:
+            raise ValueError("max_size must be greater than 0")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_lifetime = max_lifetime
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+
+        self._cond = threading.Condition()
+        self._idle: Deque[PooledConnection] = deque()
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """
+        Check out a connection for the duration of the `with` block.
+
+        Yields:
+            An open SQL connection
+
+        Raises:
+            DatabaseError: If no connection becomes available within the checkout timeout
+        """
+        pooled = self._acquire()
+        try:
+            yield pooled.connection
+        finally:
+            self._release(pooled)
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of the pool's size and utilisation."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "max_size": self.max_size,
+            }
+
+    def prune(self) -> None:
+        """Close idle connections that are past their idle timeout or lifetime."""
+        with self._cond:
+            expired = self._take_expired(time.monotonic())
+        self._close_all(expired)
+
+    def fill(self) -> None:
+        """
+        Open idle connections until at least `min_size` are open.
+
+        Connections are opened one at a time without holding the lock. If
+        one cannot be opened, filling stops there; the error is raised again
+        by the checkout that needs the connection.
+        """
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+
+            try:
+                connection = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                return
+
+            now = time.monotonic()
+            pooled = PooledConnection(connection, created_at=now, last_used_at=now)
+            with self._cond:
+                if self._closed:
+                    self._size -= 1
+                else:
+                    self._idle.append(pooled)
+                    pooled = None
+                self._cond.notify()
+            if pooled is not None:
+                self._close_all([pooled])
+                return
+
+    def close(self) -> None:
+        """
+        Close all idle connections and stop handing out new ones.
+
+        Connections that are checked out are closed when they are returned.
+        """
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def _acquire(self) -> PooledConnection:
+        deadline = time.monotonic() + self.checkout_timeout
+
+        while True:
+            create = False
+            candidate = None
+
+            with self._cond:
+                self._waiting += 1
+                try:
+                    while True:
+                        if self._closed:
+                            raise DatabaseError(message="Connection pool is closed")
+
+                        expired = self._take_expired(time.monotonic())
+                        if expired:
+                            # Closing can block on network I/O, so do it
+                            # without holding the lock.
+                            self._cond.release()
+                            try:
+                                self._close_all(expired)
+                            finally:
+                                self._cond.acquire()
+                            continue
+
+                        if self._idle:
+                            candidate = self._idle.pop()
+                            break
+
+                        if self._size < self.max_size:
+                            self._size += 1
+                            create = True
+                            break
+
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise DatabaseError(
+                                message="Timed out waiting for a SQL connection",
+                                details={
+                                    "max_size": self.max_size,
+                                    "timeout_seconds": self.checkout_timeout,
+                                },
+                            )
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            if create:
+                try:
+                    connection = self._connect()
+                    now = time.monotonic()
+                    return PooledConnection(
+                        connection, created_at=now, last_used_at=now
+                    )
+                except BaseException:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+
+            if self._is_alive(candidate):
+                return candidate
+
+            self._discard(candidate)
+
+    def _release(self, pooled: PooledConnection) -> None:
+        pooled.last_used_at = time.monotonic()
+
+        if not self._is_open(pooled.connection):
+            self._discard(pooled)
+            return
+
+        with self._cond:
+            if self._closed or self._is_expired(pooled, pooled.last_used_at):
+                self._size -= 1
+                to_close = [pooled]
+            else:
+                self._idle.append(pooled)
+                to_close = self._take_expired(pooled.last_used_at)
+            self._cond.notify()
+        self._close_all(to_close)
+
+    def _discard(self, pooled: PooledConnection) -> None:
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._close_all([pooled])
+
+    def _is_expired(self, pooled: PooledConnection, now: float) -> bool:
+        return now - pooled.created_at >= self.max_lifetime
+
+    def _take_expired(self, now: float) -> List[PooledConnection]:
+        """Remove expired idle connections. Must be called with the lock held."""
+        expired = []
+        kept: Deque[PooledConnection] = deque()
+        open_count = self._size
+
+        # Oldest idle connections are at the left of the deque
+        for pooled in self._idle:
+            idle_for = now - pooled.last_used_at
+            if self._is_expired(pooled, now) or (
+                idle_for >= self.idle_timeout and open_count > self.min_size
+            ):
+                expired.append(pooled)
+                open_count -= 1
+            else:
+                kept.append(pooled)
+
+        self._idle = kept
+        self._size = open_count
+        return expired
+
+    def _is_alive(self, pooled: PooledConnection) -> bool:
+        """Check that an idle connection is still usable before handing it out."""
+        if not self._is_open(pooled.connection):
+            return False
+
+        if time.monotonic() - pooled.last_used_at < self.ping_after:
+            return True
+
+        try:
+            with pooled.connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _is_open(connection: Any) -> bool:
+        return bool(getattr(connection, "open", True))
+
+    @staticmethod
+    def _close_all(pooled_connections: List[PooledConnection]) -> None:
+        for pooled in pooled_connections:
+            try:
+                pooled.connection.close()
+            except Exception:
+                # The connection is being thrown away; nothing else to do
+                pass
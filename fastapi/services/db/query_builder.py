@@ -0,0 +1,577 @@
+"""
+SQL statement builders for table operations.
+
+This module builds the SQL sent to the warehouse for the table endpoints,
+validating any identifiers that are interpolated into the statement.
+"""
+
+import base64
+import binascii
+import json
+import re
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+from errors.exceptions import ValidationError
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def validate_identifier(name: str, kind: str = "identifier") -> str:
+    """
+    Validate a simple SQL identifier such as a column name.
+
+    Args:
+        name: The identifier to validate
+        kind: What the identifier names, used in the error message
+
+    Returns:
+        The identifier, unchanged
+
+    Raises:
+        ValidationError: If the identifier contains unsupported characters
+    """
+    if not name or not _IDENTIFIER.match(name):
+        raise ValidationError(
+            message=f"Invalid {kind}: {name!r}",
+            details={kind: name},
+        )
+    return name
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a validated identifier for use in SQL."""
+    return f"`{validate_identifier(name)}`"
+
+
+def split_columns(columns: str) -> List[str]:
+    """Split a comma-separated column list, ignoring surrounding whitespace."""
+    return [col.strip() for col in columns.split(",") if col.strip()]
+
+
+def _versioned(table_path: str, version: Optional[int]) -> str:
+    """Refer to a table, pinned to a Delta version if one is given."""
+    if version is None:
+        return table_path
+    return f"{table_path} VERSION AS OF {int(version)}"
+
+
+def build_select_query(
+    table_path: str,
+    columns: str = "*",
+    filter_expr: Optional[str] = None,
+    limit: Optional[int] = None,
+    offset: Optional[int] = None,
+    order_by: Optional[str] = None,
+    after: Optional[Any] = None,
+    has_after: bool = False,
+    version: Optional[int] = None,
+) -> Tuple[str, List[Any]]:
+    """
+    Build a SELECT statement for a table.
+
+    When `order_by` is given the rows are ordered by that column, and
+    `has_after` restricts them to rows whose key is greater than `after`
+    (keyset pagination). The key value is passed as a bound parameter.
+    Rows with a NULL key sort last. NULL keys cannot be compared, so a NULL
+    `after` continues among the rows with a NULL key, skipping the `offset`
+    of them already returned.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+        columns: Comma-separated list of columns to retrieve
+        filter_expr: Optional SQL WHERE clause
+        limit: Optional maximum number of rows
+        offset: Optional number of rows to skip
+        order_by: Optional ordering key column
+        after: Key value to continue after
+        has_after: Whether `after` is set (it may legitimately be None)
+        version: Optional Delta table version to read
+
+    Returns:
+        The SQL statement and its positional parameters
+    """
+    conditions = []
+    parameters: List[Any] = []
+
+    if filter_expr:
+        conditions.append(filter_expr)
+
+    order_clause = ""
+    if order_by:
+        key = quote_identifier(order_by)
+        order_clause = f"ORDER BY {key} NULLS LAST"
+        if has_after:
+            if conditions:
+                conditions = [f"({filter_expr})"]
+            if after is None:
+                conditions.append(f"{key} IS NULL")
+            else:
+                conditions.append(f"({key} > ? OR {key} IS NULL)")
+                parameters.append(after)
+
+    where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = f"LIMIT {int(limit)}"
+        if offset is not None:
+            limit_clause += f" OFFSET {int(offset)}"
+
+    sql_query = f"""
+            SELECT {columns}
+            FROM {_versioned(table_path, version)}
+            {where_clause}
+            {order_clause}
+            {limit_clause}
+        """
+    return sql_query, parameters
+
+
+def build_count_query(
+    table_path: str, filter_expr: Optional[str] = None, version: Optional[int] = None
+) -> str:
+    """
+    Build a statement counting the rows of a table that match a filter.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+        filter_expr: Optional SQL WHERE clause
+        version: Optional Delta table version to read
+
+    Returns:
+        The SQL statement, returning a single `total` column
+    """
+    where_clause = f"WHERE {filter_expr}" if filter_expr else ""
+
+    return f"""
+            SELECT COUNT(*) AS total
+            FROM {_versioned(table_path, version)}
+            {where_clause}
+        """
+
+
+# Aggregate functions accepted by the aggregate endpoint, and their SQL names
+AGGREGATE_FUNCTIONS = {
+    "count": "COUNT",
+    "sum": "SUM",
+    "avg": "AVG",
+    "min": "MIN",
+    "max": "MAX",
+    "approx_count_distinct": "APPROX_COUNT_DISTINCT",
+    "median": "PERCENTILE_APPROX",
+    "percentile": "PERCENTILE_APPROX",
+}
+
+_AGGREGATE = re.compile(
+    r"^(?P<function>\w+)\s*\(\s*(?P<column>[^,()\s]+)\s*"
+    r"(?:,\s*(?P<fraction>[0-9.]+)\s*)?\)"
+    r"(?:\s+AS\s+(?P<alias>\S+))?$",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class Aggregate:
+    """One aggregate of an aggregate query, such as `sum(amount)`."""
+
+    function: str
+    column: Optional[str]
+    alias: str
+    fraction: Optional[float] = None
+
+    def sql(self) -> str:
+        """Render the aggregate as a SELECT list entry."""
+        argument = "*" if self.column is None else quote_identifier(self.column)
+        if self.fraction is not None:
+            argument += f", {self.fraction!r}"
+        return (
+            f"{AGGREGATE_FUNCTIONS[self.function]}({argument}) "
+            f"AS {quote_identifier(self.alias)}"
+        )
+
+
+def split_aggregates(aggregates: str) -> List[str]:
+    """Split a comma-separated aggregate list, keeping commas inside calls."""
+    entries, depth, current = [], 0, []
+    for char in aggregates:
+        if char == "," and depth == 0:
+            entries.append("".join(current).strip())
+            current = []
+            continue
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        current.append(char)
+    entries.append("".join(current).strip())
+    return [entry for entry in entries if entry]
+
+
+def parse_aggregate(spec: str) -> Aggregate:
+    """
+    Parse an aggregate such as `count(*)`, `avg(price) AS mean_price` or
+    `percentile(latency, 0.95)`.
+
+    Percentiles and medians are computed with `percentile_approx`, which
+    the warehouse evaluates in one pass without sorting each group. Without
+    an alias the result column is named after the function and column, e.g.
+    `sum_amount`, `p95_latency` or `count`.
+
+    Args:
+        spec: The aggregate, as written in the request
+
+    Returns:
+        The parsed aggregate
+
+    Raises:
+        ValidationError: If the function, column, fraction or alias is invalid
+    """
+    match = _AGGREGATE.match(spec.strip())
+    if not match:
+        raise ValidationError(
+            message=f"Invalid aggregate: {spec!r}",
+            details={"aggregate": spec, "functions": sorted(AGGREGATE_FUNCTIONS)},
+        )
+
+    function = match.group("function").lower()
+    if function not in AGGREGATE_FUNCTIONS:
+        raise ValidationError(
+            message=f"Unsupported aggregate function: {function!r}",
+            details={"aggregate": spec, "functions": sorted(AGGREGATE_FUNCTIONS)},
+        )
+
+    column = match.group("column")
+    if column == "*":
+        if function != "count":
+            raise ValidationError(
+                message=f"Only count accepts *: {spec!r}",
+                details={"aggregate": spec},
+            )
+        column = None
+    else:
+        validate_identifier(column.strip("`"), "column")
+        column = column.strip("`")
+
+    fraction = match.group("fraction")
+    if function == "percentile":
+        try:
+            fraction = float(fraction) if fraction is not None else None
+        except ValueError:
+            fraction = None
+        if fraction is None or not 0 <= fraction <= 1:
+            raise ValidationError(
+                message=f"percentile needs a fraction between 0 and 1: {spec!r}",
+                details={"aggregate": spec},
+            )
+    elif function == "median":
+        if fraction is not None:
+            raise ValidationError(
+                message=f"median takes a single column: {spec!r}",
+                details={"aggregate": spec},
+            )
+        fraction = 0.5
+    elif fraction is not None:
+        raise ValidationError(
+            message=f"{function} takes a single column: {spec!r}",
+            details={"aggregate": spec},
+        )
+
+    alias = match.group("alias")
+    if alias is None:
+        if column is None:
+            alias = function
+        elif function == "percentile":
+            alias = f"p{fraction * 100:g}_{column}".replace(".", "_")
+        else:
+            alias = f"{function}_{column}"
+    validate_identifier(alias, "alias")
+
+    return Aggregate(function=function, column=column, alias=alias, fraction=fraction)
+
+
+def parse_aggregates(aggregates: str, group_by: List[str]) -> List[Aggregate]:
+    """
+    Parse a comma-separated aggregate list.
+
+    Args:
+        aggregates: The aggregates, as written in the request
+        group_by: The group-by columns, which share the result's column names
+
+    Returns:
+        The parsed aggregates
+
+    Raises:
+        ValidationError: If an aggregate is invalid, none is given, or two
+            result columns would have the same name
+    """
+    parsed = [parse_aggregate(spec) for spec in split_aggregates(aggregates)]
+    if not parsed:
+        raise ValidationError(message="At least one aggregate is required")
+
+    names = [column.lower() for column in group_by]
+    for aggregate in parsed:
+        if aggregate.alias.lower() in names:
+            raise ValidationError(
+                message=f"Duplicate result column: {aggregate.alias!r}; "
+                "name the aggregate with AS",
+                details={"column": aggregate.alias},
+            )
+        names.append(aggregate.alias.lower())
+    return parsed
+
+
+def build_aggregate_query(
+    table_path: str,
+    group_by: List[str],
+    aggregates: List[Aggregate],
+    filter_expr: Optional[str] = None,
+    limit: Optional[int] = None,
+) -> str:
+    """
+    Build a GROUP BY statement computing aggregates on the warehouse.
+
+    Groups are ordered by their key, so that a limited result is stable.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+        group_by: Columns to group by; none aggregates the whole table
+        aggregates: The aggregates to compute for each group
+        filter_expr: Optional SQL WHERE clause
+        limit: Optional maximum number of groups
+
+    Returns:
+        The SQL statement
+
+    Raises:
+        ValidationError: If a group-by column is not a valid identifier
+    """
+    keys = [quote_identifier(column) for column in group_by]
+    select_list = ", ".join(keys + [aggregate.sql() for aggregate in aggregates])
+    where_clause = f"WHERE {filter_expr}" if filter_expr else ""
+    group_clause = f"GROUP BY {', '.join(keys)}" if keys else ""
+    order_clause = f"ORDER BY {', '.join(keys)}" if keys else ""
+    limit_clause = f"LIMIT {int(limit)}" if limit is not None else ""
+
+    return f"""
+            SELECT {select_list}
+            FROM {table_path}
+            {where_clause}
+            {group_clause}
+            {order_clause}
+            {limit_clause}
+        """
+
+
+def quote_column_name(name: str) -> str:
+    """
+    Quote a column name reported by the warehouse, escaping any backticks.
+
+    Unlike `quote_identifier`, any name is accepted, since it comes from a
+    query result rather than from the request.
+    """
+    return "`" + name.replace("`", "``") + "`"
+
+
+def build_sample_source(
+    table_path: str,
+    version: Optional[int] = None,
+    sample_percent: Optional[float] = None,
+    sample_rows: Optional[int] = None,
+    seed: int = 0,
+) -> str:
+    """
+    Build a FROM source reading a sample of a table.
+
+    A percentage samples that share of the table's files at random, with a
+    fixed seed so the same version always yields the same sample; a row
+    count reads that many rows, stopping as soon as they are found. Pinning
+    the version makes the result depend on nothing but the arguments.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+        version: Optional Delta table version to read
+        sample_percent: Optional percentage of the table to sample
+        sample_rows: Number of rows to sample, if no percentage is given
+        seed: Seed for percentage samples
+
+    Returns:
+        The table reference, to be used in place of the table path
+    """
+    source = _versioned(table_path, version)
+    if sample_percent is not None:
+        percent = Decimal(str(float(sample_percent))).normalize()
+        source += f" TABLESAMPLE ({percent:f} PERCENT) REPEATABLE ({int(seed)})"
+    elif sample_rows is not None:
+        source += f" TABLESAMPLE ({int(sample_rows)} ROWS)"
+    return source
+
+
+def build_stats_query(source: str, columns: List[Tuple[str, str]]) -> str:
+    """
+    Build a statement computing approximate column statistics in one pass.
+
+    The result has a `rows` column, and for column number `i` a non-null
+    count `n{i}`, plus `d{i}` (approximate distinct count) for columns of
+    kind "distinct" or "ordered" and `lo{i}`/`hi{i}` (min/max) for columns
+    of kind "ordered".
+
+    Args:
+        source: The table, or sample of a table, to read
+        columns: Pairs of column name and kind: "ordered", "distinct" or
+            "count" (non-null count only, e.g. for maps and structs)
+
+    Returns:
+        The SQL statement
+    """
+    select_list = ["COUNT(*) AS `rows`"]
+    for i, (name, kind) in enumerate(columns):
+        column = quote_column_name(name)
+        select_list.append(f"COUNT({column}) AS `n{i}`")
+        if kind in ("ordered", "distinct"):
+            select_list.append(f"APPROX_COUNT_DISTINCT({column}) AS `d{i}`")
+        if kind == "ordered":
+            select_list.append(f"MIN({column}) AS `lo{i}`")
+            select_list.append(f"MAX({column}) AS `hi{i}`")
+
+    return f"""
+            SELECT {", ".join(select_list)}
+            FROM {source}
+        """
+
+
+def build_history_query(table_path: str) -> str:
+    """
+    Build a statement returning the latest commit of a Delta table.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+
+    Returns:
+        The SQL statement, whose `version` column is the table version
+    """
+    return f"DESCRIBE HISTORY {table_path} LIMIT 1"
+
+
+def insert_batch_size(column_count: int, max_rows: int, max_parameters: int) -> int:
+    """
+    Work out how many rows fit in one INSERT statement.
+
+    Args:
+        column_count: Number of columns per row
+        max_rows: Maximum number of rows per statement
+        max_parameters: Maximum number of bound parameters per statement
+
+    Returns:
+        The number of rows per batch (at least one)
+    """
+    return max(1, min(max_rows, max_parameters // max(column_count, 1)))
+
+
+def build_insert_query(table_path: str, columns: List[str], row_count: int) -> str:
+    """
+    Build a multi-row INSERT statement with `?` markers for the values.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+        columns: The columns being inserted
+        row_count: Number of rows in the statement
+
+    Returns:
+        The SQL statement, expecting the row values flattened in column order
+    """
+    placeholders = f"({', '.join(['?'] * len(columns))})"
+    values_clause = ", ".join([placeholders] * row_count)
+
+    return f"""
+                INSERT INTO {table_path} ({", ".join(columns)})
+                VALUES {values_clause}
+            """
+
+
+def quote_literal(value: str) -> str:
+    """Quote a string as a SQL string literal."""
+    escaped = value.replace("\\", "\\\\").replace("'", "\\'")
+    return f"'{escaped}'"
+
+
+def build_copy_into_query(
+    table_path: str, source_dir: str, files: List[str], file_format: str = "PARQUET"
+) -> str:
+    """
+    Build a COPY INTO statement loading staged files into a table.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+        source_dir: Directory holding the staged files
+        files: Names of the files to load, relative to `source_dir`
+        file_format: Format of the staged files
+
+    Returns:
+        The SQL statement
+    """
+    file_list = ", ".join(quote_literal(name) for name in files)
+
+    return f"""
+            COPY INTO {table_path}
+            FROM {quote_literal(source_dir)}
+            FILEFORMAT = {validate_identifier(file_format, "file format")}
+            FILES = ({file_list})
+        """
+
+
+def encode_cursor(order_by: str, value: Any, nulls: int = 0) -> str:
+    """
+    Encode the last key of a page as an opaque pagination cursor.
+
+    Args:
+        order_by: The ordering key column
+        value: The key value of the last row returned
+        nulls: Number of rows with a NULL key returned so far, when the
+            last key is NULL
+
+    Returns:
+        A URL-safe cursor string
+    """
+    payload = {"k": order_by, "v": value}
+    if nulls:
+        payload["n"] = nulls
+    encoded = json.dumps(payload, default=str)
+    return base64.urlsafe_b64encode(encoded.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, order_by: str) -> Tuple[Any, int]:
+    """
+    Decode a pagination cursor produced by `encode_cursor`.
+
+    Args:
+        cursor: The cursor string
+        order_by: The ordering key column of the current request
+
+    Returns:
+        The key value to continue after, and the number of rows with a NULL
+        key already returned
+
+    Raises:
+        ValidationError: If the cursor is malformed or for another key
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        key, value = payload["k"], payload["v"]
+        nulls = int(payload.get("n", 0))
+    except (
+        binascii.Error,
+        ValueError,
+        KeyError,
+        TypeError,
+        UnicodeError,
+        AttributeError,
+    ):
+        raise ValidationError(message="Invalid pagination cursor")
+
+    if key != order_by:
+        raise ValidationError(
+            message="Pagination cursor does not match order_by",
+            details={"order_by": order_by},
+        )
+    if nulls < 0 or (nulls and value is not None):
+        raise ValidationError(message="Invalid pagination cursor")
+    return value, nulls
@@ -0,0 +1,81 @@
+"""
+Request coalescing for identical concurrent calls.
+
+This module provides a single-flight group: while a call for a given key is
+running, later callers with the same key wait for and share its result
+instead of starting a duplicate.
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+@dataclass
+class _Call:
+    task: "asyncio.Future[Any]"
+    waiters: int = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key.
+
+    The underlying call is only cancelled when every caller waiting on it has
+    been cancelled, so one client going away does not fail the others.
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, _Call] = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run `fn`, or join an in-flight call with the same key.
+
+        Args:
+            key: Fingerprint identifying equivalent calls
+            fn: Zero-argument coroutine function performing the call
+
+        Returns:
+            The result of the (possibly shared) call
+
+        Raises:
+            Exception: Whatever the shared call raised
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(task=asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.shared += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Every caller has given up on this result
+                call.task.cancel()
+                self._forget(key, call)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of executed, shared and in-flight calls."""
+        return {
+            "executions": self.executions,
+            "shared": self.shared,
+            "in_flight": len(self._calls),
+        }
+
+    def reset(self) -> None:
+        """Reset the counters."""
+        self.executions = 0
+        self.shared = 0
+
+    def _forget(self, key: Hashable, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
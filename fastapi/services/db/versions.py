@@ -0,0 +1,124 @@
+"""
+Delta table versions and the ETags derived from them.
+
+A Delta table's version changes with every commit, so a response built from
+a given version and query stays valid until the version moves on. Version
+lookups go through the query cache and are coalesced, so they are shared
+by all requests for a table.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .connector import query_async
+from .query_builder import build_history_query
+
+# Errors meaning a table has no Delta history, rather than a failed lookup
+_NOT_DELTA = re.compile(
+    r"DELTA_ONLY_OPERATION|DELTA_TABLE_ONLY_OPERATION|EXPECT_TABLE_NOT_VIEW|"
+    r"not a Delta table|only supported for Delta",
+    re.IGNORECASE,
+)
+
+# Tables without a history (e.g. views), until when not to look again,
+# least recently marked first
+_unversioned: "OrderedDict[str, float]" = OrderedDict()
+_unversioned_lock = threading.Lock()
+
+# Most tables remembered as having no history
+_UNVERSIONED_MAX_ENTRIES = 1024
+
+
+def _mark_unversioned(table_path: str, ttl: float) -> None:
+    """Remember a table without a history, dropping expired and old entries."""
+    now = time.monotonic()
+    with _unversioned_lock:
+        _unversioned[table_path] = now + ttl
+        _unversioned.move_to_end(table_path)
+        while _unversioned and next(iter(_unversioned.values())) <= now:
+            _unversioned.popitem(last=False)
+        while len(_unversioned) > _UNVERSIONED_MAX_ENTRIES:
+            _unversioned.popitem(last=False)
+
+
+async def table_version_async(
+    table_path: str, warehouse_id: str, cache_ttl: float
+) -> Optional[int]:
+    """
+    Look up the current version of a Delta table.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+        warehouse_id: The ID of the SQL warehouse to connect to
+        cache_ttl: How long the version is cached
+
+    Returns:
+        The table version, or None if the table has no Delta history or the
+        lookup failed
+    """
+    with _unversioned_lock:
+        expires_at = _unversioned.get(table_path)
+        if expires_at is not None:
+            if expires_at > time.monotonic():
+                return None
+            del _unversioned[table_path]
+
+    try:
+        rows = await query_async(
+            build_history_query(table_path),
+            warehouse_id=warehouse_id,
+            cache_ttl=cache_ttl,
+        )
+    except Exception as e:
+        if _NOT_DELTA.search(str(e)):
+            # Not a Delta table; avoid a failing lookup on every request
+            _mark_unversioned(table_path, cache_ttl)
+        return None
+
+    if not rows or rows[0].get("version") is None:
+        return None
+    return int(rows[0]["version"])
+
+
+def compute_etag(table_path: str, version: int, *query: Any) -> str:
+    """
+    Build a weak ETag for a query result at a table version.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+        version: The table version the result is read from
+        query: Everything else that determines the response, such as the
+            SQL statement, its parameters and the response format
+
+    Returns:
+        The quoted, weak entity tag
+    """
+    key = json.dumps([table_path, version, *query], default=str)
+    return f'W/"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag, using weak comparison.
+
+    Args:
+        if_none_match: The request's If-None-Match header, if any
+        etag: The current ETag of the resource
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+
+    def opaque(tag: str) -> str:
+        tag = tag.strip()
+        return tag[2:] if tag.startswith("W/") else tag
+
+    candidates = [opaque(tag) for tag in if_none_match.split(",")]
+    return "*" in candidates or opaque(etag) in candidates
@@ -0,0 +1,264 @@
+"""
+Response encoders for query results.
+
+This module converts Arrow query results into the formats that the
+table endpoints can return.
+"""
+
+import base64
+import io
+from decimal import Decimal
+from typing import Any, Dict, List
+
+import orjson
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from fastapi.encoders import decimal_encoder, jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from services.metrics import timed
+
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+# Media type for each streaming response format
+STREAM_MEDIA_TYPES = {
+    "ndjson": NDJSON_MEDIA_TYPE,
+    "csv": CSV_MEDIA_TYPE,
+}
+
+# Media type for each binary response format
+BINARY_MEDIA_TYPES = {
+    "arrow": ARROW_STREAM_MEDIA_TYPE,
+    "parquet": PARQUET_MEDIA_TYPE,
+}
+
+
+# Most digits of an integer that always fits in orjson's 64-bit range
+_MAX_INT_DIGITS = 18
+
+
+def to_arrow_ipc(table: pa.Table) -> bytes:
+    """
+    Serialize an Arrow table using the Arrow IPC streaming format.
+
+    Args:
+        table: The Arrow table to serialize
+
+    Returns:
+        The IPC stream as bytes
+    """
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def to_parquet(table: pa.Table) -> bytes:
+    """
+    Serialize an Arrow table as a Parquet file.
+
+    Args:
+        table: The Arrow table to serialize
+
+    Returns:
+        The Parquet file as bytes
+    """
+    sink = io.BytesIO()
+    pq.write_table(table, sink, compression="snappy")
+    return sink.getvalue()
+
+
+def encode_binary(table: pa.Table, response_format: str) -> bytes:
+    """
+    Serialize an Arrow table in one of the binary response formats.
+
+    Args:
+        table: The Arrow table to serialize
+        response_format: Either "arrow" or "parquet"
+
+    Returns:
+        The serialized table
+    """
+    if response_format == "arrow":
+        return to_arrow_ipc(table)
+    if response_format == "parquet":
+        return to_parquet(table)
+    raise ValueError(f"Unsupported binary format: {response_format}")
+
+
+def to_columnar(table: pa.Table) -> Dict[str, Any]:
+    """
+    Convert an Arrow table to a column-major JSON-compatible layout.
+
+    Column names are listed once instead of being repeated in every record,
+    and each column's values are converted in one pass straight from Arrow.
+    Decimals are encoded as in the rows shape.
+
+    Args:
+        table: The Arrow table to convert
+
+    Returns:
+        A dict with the column names and one list of values per column
+    """
+    return {
+        "columns": table.column_names,
+        "data": [_json_values(column) for column in table.columns],
+    }
+
+
+def _json_values(column: pa.ChunkedArray) -> List[Any]:
+    """
+    Convert a column to the values `FastJSONResponse` would encode for it.
+
+    Converting through Decimal objects costs more than everything else in a
+    page, so decimals are cast in Arrow instead: integers when the scale is
+    0 and the values fit in 64 bits, floats when the scale is not 0. Whole
+    decimals of higher precision are cast to strings, and those of at most
+    18 digits turned back into integers, as `json_decimal` does.
+    """
+    if not pa.types.is_decimal(column.type):
+        return column.to_pylist()
+    if column.type.scale != 0:
+        return column.cast(pa.float64()).to_pylist()
+    if column.type.precision <= _MAX_INT_DIGITS:
+        return column.cast(pa.int64()).to_pylist()
+    return [
+        (
+            value
+            if value is None or len(value.lstrip("-")) > _MAX_INT_DIGITS
+            else int(value)
+        )
+        for value in column.cast(pa.string()).to_pylist()
+    ]
+
+
+def to_ndjson(batch: pa.Table) -> bytes:
+    """
+    Serialize a batch of rows as newline-delimited JSON.
+
+    Each row is encoded like a row of a `FastJSONResponse`, so lines have
+    the same shape as the rows of a table page.
+
+    Args:
+        batch: The Arrow batch to serialize
+
+    Returns:
+        One JSON object per row, each terminated by a newline
+    """
+    return b"".join(_dumps_json(row) + b"\n" for row in batch.to_pylist())
+
+
+def to_csv(batch: pa.Table, include_header: bool) -> bytes:
+    """
+    Serialize a batch of rows as CSV.
+
+    Args:
+        batch: The Arrow batch to serialize
+        include_header: Whether to start with a header row
+
+    Returns:
+        The CSV rows as bytes
+    """
+    sink = io.BytesIO()
+    pacsv.write_csv(
+        batch, sink, write_options=pacsv.WriteOptions(include_header=include_header)
+    )
+    return sink.getvalue()
+
+
+def encode_stream_batch(batch: pa.Table, stream_format: str, first: bool) -> bytes:
+    """
+    Serialize one batch of a streamed response.
+
+    Args:
+        batch: The Arrow batch to serialize
+        stream_format: Either "ndjson" or "csv"
+        first: Whether this is the first batch of the response
+
+    Returns:
+        The serialized batch
+    """
+    if stream_format == "ndjson":
+        return to_ndjson(batch)
+    if stream_format == "csv":
+        return to_csv(batch, include_header=first)
+    raise ValueError(f"Unsupported stream format: {stream_format}")
+
+
+class TimedJSONResponse(JSONResponse):
+    """A JSON response that records its rendering as the serialize phase."""
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return super().render(content)
+
+
+def json_decimal(value: Decimal) -> Any:
+    """
+    Encode a decimal like FastAPI's encoder, within orjson's integer range.
+
+    Whole decimals of more than 18 digits become strings instead of
+    integers, which orjson cannot encode beyond 64 bits.
+    """
+    _, digits, exponent = value.as_tuple()
+    if isinstance(exponent, int) and exponent >= 0:
+        if len(digits) + exponent > _MAX_INT_DIGITS:
+            return str(value)
+        return int(value)
+    return decimal_encoder(value)
+
+
+def _wide_ints_to_str(content: Any) -> Any:
+    """Copy JSON content with integers beyond 64 bits replaced by strings."""
+    if isinstance(content, dict):
+        return {key: _wide_ints_to_str(value) for key, value in content.items()}
+    if isinstance(content, (list, tuple)):
+        return [_wide_ints_to_str(value) for value in content]
+    if (
+        isinstance(content, int)
+        and not isinstance(content, bool)
+        and not -(2**63) <= content < 2**64
+    ):
+        return str(content)
+    return content
+
+
+def _json_default(value: Any) -> Any:
+    """Encode the values orjson does not handle natively."""
+    if isinstance(value, Decimal):
+        return json_decimal(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # Binary columns are not necessarily valid UTF-8
+        return base64.b64encode(value).decode("ascii")
+    return jsonable_encoder(value)
+
+
+def _dumps_json(content: Any) -> bytes:
+    """Encode JSON content with orjson, as described by `FastJSONResponse`."""
+    try:
+        return orjson.dumps(content, default=_json_default)
+    except orjson.JSONEncodeError:
+        # Rare: retry with integers orjson cannot encode as strings
+        return orjson.dumps(_wide_ints_to_str(content), default=_json_default)
+
+
+class FastJSONResponse(TimedJSONResponse):
+    """
+    A JSON response rendered with orjson.
+
+    Return it directly from an endpoint to skip response model validation
+    for trusted content, such as rows from the SQL connector. Datetimes,
+    dates and UUIDs are encoded natively as ISO 8601 strings, decimals as
+    numbers (like FastAPI's own encoder) and binary values as base64.
+    Integers too wide for 64 bits, such as DECIMAL(38, 0) values, are
+    encoded as strings.
+    """
+
+    def render(self, content: Any) -> bytes:
+        with timed("serialize"):
+            return _dumps_json(content)
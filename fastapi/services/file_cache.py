@@ -0,0 +1,352 @@
+"""
+On-disk cache of volume files.
+
+Files downloaded from Unity Catalog volumes are kept in a local directory,
+bounded by their total size, with the least recently used files evicted
+first. A file is written to the cache as its first download streams to the
+client. Each entry records the ETag the file had when it was downloaded; the
+ETag is built from the file's metadata, which is cheap to fetch, so a file
+that has changed in storage is downloaded again instead of being served
+stale.
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Optional, Set, Tuple
+
+from config.settings import settings
+from services.metrics import FILE_CACHE_BYTES, FILE_CACHE_EVICTIONS, FILE_CACHE_REQUESTS
+
+# Suffixes of complete and partly downloaded cache files
+_CACHED_SUFFIX = ".cached"
+_PARTIAL_SUFFIX = ".partial"
+
+
+@dataclass
+class CachedFile:
+    """A volume file stored in the cache."""
+
+    file_path: str
+    etag: str
+    size: int
+    local_path: str
+    readers: int = 0
+    removed: bool = False
+
+
+class FileCache:
+    """
+    A size-bounded LRU cache of volume files on local disk.
+
+    Entries being sent to a client are held by a reader count; an entry
+    evicted or replaced meanwhile leaves the index at once, but its file is
+    only deleted when the last reader releases it.
+
+    Args:
+        directory: Directory holding the cached files; files left in it by
+            a previous process are deleted on first use
+        max_bytes: Maximum total size of the cached files; 0 disables the cache
+        max_file_bytes: Largest file that is cached
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_file_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._bytes = 0
+        self._filling: Set[Tuple[str, str]] = set()
+        self._prepared = False
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether files are cached at all."""
+        return self.max_bytes > 0 and self.max_file_bytes > 0
+
+    def cacheable(self, size: Optional[int]) -> bool:
+        """Return whether a file of the given size may be cached."""
+        return (
+            self.enabled
+            and size is not None
+            and size <= min(self.max_bytes, self.max_file_bytes)
+        )
+
+    def get(self, file_path: str, etag: str, size: int) -> Optional[CachedFile]:
+        """
+        Get a file from the cache.
+
+        The entry returned is held for reading, and must be passed to
+        `release` once it has been sent.
+
+        Args:
+            file_path: Full path to the file inside a Unity Catalog volume
+            etag: The file's current ETag
+            size: The file's current size in bytes
+
+        Returns:
+            The cached file, or None if it is not cached with this ETag or
+            cannot be cached at all
+        """
+        if not self.cacheable(size):
+            return None
+        return self._acquire(file_path, etag)
+
+    def fill(
+        self, file_path: str, etag: str, size: int, contents: BinaryIO
+    ) -> BinaryIO:
+        """
+        Cache a file while it is being downloaded.
+
+        Reading the stream returned reads the download and also writes each
+        chunk to the cache, so the client is sent the first chunk without
+        waiting for the whole file. The file is added to the cache once the
+        download has been read to the end with the expected size; a download
+        that fails, is closed early or has another size is discarded. While
+        one download of a file is being cached, concurrent downloads of it
+        are passed through uncached.
+
+        Args:
+            file_path: Full path to the file inside a Unity Catalog volume
+            etag: The file's current ETag
+            size: The file's current size in bytes
+            contents: The download; read and closed on the file I/O thread pool
+
+        Returns:
+            A stream of the download's bytes, to be read and closed in place
+            of `contents`
+        """
+        key = (file_path, etag)
+        if not self.cacheable(size):
+            return contents
+        with self._lock:
+            if key in self._filling:
+                return contents
+            self._filling.add(key)
+        return _CacheFill(self, file_path, etag, size, contents)
+
+    def release(self, entry: CachedFile) -> None:
+        """Stop reading a cached file, deleting it if it has left the cache."""
+        with self._lock:
+            entry.readers -= 1
+            delete = entry.removed and entry.readers == 0
+        if delete:
+            self._unlink(entry.local_path)
+
+    def clear(self) -> None:
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            for entry in list(self._entries.values()):
+                self._remove(entry)
+            self.hits = self.misses = self.evictions = 0
+
+    def close(self) -> None:
+        """Remove all entries and delete the cache directory."""
+        self.clear()
+        with self._lock:
+            if self._prepared:
+                shutil.rmtree(self.directory, ignore_errors=True)
+                self._prepared = False
+
+    def stats(self) -> Dict[str, int]:
+        """Return the cache counters and current size."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+    def _acquire(self, file_path: str, etag: str) -> Optional[CachedFile]:
+        with self._lock:
+            entry = self._entries.get(file_path)
+            result = "miss"
+            if entry is not None and entry.etag != etag:
+                # The file has changed since it was cached
+                self._remove(entry)
+                entry = None
+                result = "stale"
+
+            if entry is None:
+                self.misses += 1
+                FILE_CACHE_REQUESTS.labels(result).inc()
+                return None
+
+            self._entries.move_to_end(file_path)
+            entry.readers += 1
+            self.hits += 1
+            FILE_CACHE_REQUESTS.labels("hit").inc()
+            return entry
+
+    def _partial_path(self) -> str:
+        """Return a new path to download a file to. Runs on the file I/O thread pool."""
+        self._prepare()
+        return os.path.join(self.directory, uuid.uuid4().hex + _PARTIAL_SUFFIX)
+
+    def _add(self, file_path: str, etag: str, size: int, partial_path: str) -> None:
+        """Add a completely downloaded file to the cache."""
+        local_path = partial_path[: -len(_PARTIAL_SUFFIX)] + _CACHED_SUFFIX
+        os.replace(partial_path, local_path)
+        with self._lock:
+            previous = self._entries.get(file_path)
+            if previous is not None:
+                self._remove(previous)
+            self._entries[file_path] = CachedFile(
+                file_path=file_path, etag=etag, size=size, local_path=local_path
+            )
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries.values())))
+                self.evictions += 1
+                FILE_CACHE_EVICTIONS.inc()
+            FILE_CACHE_BYTES.set(self._bytes)
+
+    def _filled(self, file_path: str, etag: str) -> None:
+        """Let the next download of a file be cached."""
+        with self._lock:
+            self._filling.discard((file_path, etag))
+
+    def _prepare(self) -> None:
+        """Create the cache directory, deleting files left by a previous process."""
+        with self._lock:
+            if self._prepared:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            for suffix in (_CACHED_SUFFIX, _PARTIAL_SUFFIX):
+                for path in glob.glob(os.path.join(self.directory, "*" + suffix)):
+                    self._unlink(path)
+            self._prepared = True
+
+    def _remove(self, entry: CachedFile) -> None:
+        """Remove an entry from the index. Must be called with the lock held."""
+        del self._entries[entry.file_path]
+        self._bytes -= entry.size
+        entry.removed = True
+        if entry.readers == 0:
+            self._unlink(entry.local_path)
+        FILE_CACHE_BYTES.set(self._bytes)
+
+    @staticmethod
+    def _unlink(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+class _CacheFill:
+    """
+    A download that writes what is read from it to a cache file.
+
+    Reads and the final close happen one at a time on the file I/O thread
+    pool.
+    """
+
+    def __init__(
+        self, cache: FileCache, file_path: str, etag: str, size: int, contents: BinaryIO
+    ):
+        self._cache = cache
+        self._file_path = file_path
+        self._etag = etag
+        self._size = size
+        self._contents = contents
+        self._partial_path: Optional[str] = None
+        self._file: Optional[BinaryIO] = None
+        self._written = 0
+        self._done = False
+
+    def set_chunk_size(self, chunk_size: int) -> None:
+        """Pass the chunk size on to an SDK download."""
+        if hasattr(self._contents, "set_chunk_size"):
+            self._contents.set_chunk_size(chunk_size)
+
+    def read(self, size: int = -1) -> bytes:
+        """Read from the download, caching the bytes read."""
+        try:
+            chunk = self._contents.read(size)
+        except BaseException:
+            self._discard()
+            raise
+        if self._done:
+            return chunk
+        try:
+            if chunk:
+                self._write(chunk)
+            elif self._written == self._size:
+                self._open_file()
+                self._close_file()
+                self._cache._add(
+                    self._file_path, self._etag, self._size, self._partial_path
+                )
+                self._finish()
+            else:
+                # The file changed after its metadata was read
+                self._discard()
+        except OSError:
+            # Still serve the download if the cache disk fails
+            self._discard()
+        return chunk
+
+    def close(self) -> None:
+        """Close the download, discarding the cache file if it is incomplete."""
+        try:
+            self._contents.close()
+        finally:
+            self._discard()
+
+    def _open_file(self) -> None:
+        if self._file is None:
+            self._partial_path = self._cache._partial_path()
+            self._file = open(self._partial_path, "wb")
+
+    def _write(self, chunk: bytes) -> None:
+        self._open_file()
+        self._written += len(chunk)
+        if self._written > self._size:
+            self._discard()
+            return
+        self._file.write(chunk)
+
+    def _close_file(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+    def _discard(self) -> None:
+        if self._done:
+            return
+        try:
+            self._close_file()
+        finally:
+            if self._partial_path is not None:
+                self._cache._unlink(self._partial_path)
+            self._finish()
+
+    def _finish(self) -> None:
+        self._done = True
+        self._cache._filled(self._file_path, self._etag)
+
+
+# Shared cache of volume files, in a directory of this process's own, as the
+# cache directory is emptied at startup and server workers each have a cache
+file_cache = FileCache(
+    directory=os.path.join(
+        settings.file_cache_dir
+        or os.path.join(tempfile.gettempdir(), "volume-file-cache"),
+        str(os.getpid()),
+    ),
+    max_bytes=settings.file_cache_max_bytes,
+    max_file_bytes=settings.file_cache_max_file_bytes,
+)
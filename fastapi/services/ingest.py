@@ -0,0 +1,191 @@
+"""
+Staged bulk ingest into Unity Catalog tables.
+
+Row-valued INSERT statements are slow and bounded by parameter limits for
+large payloads. Instead, the records are written as a Parquet file to a
+staging volume and loaded with a single COPY INTO statement.
+"""
+
+import io
+import posixpath
+import uuid
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.json as pajson
+
+from errors.exceptions import ConfigurationError, ValidationError
+from services.db.connector import execute_statement, record_columns, run_in_executor
+from services.db.query_builder import build_copy_into_query
+from services.encoding import CSV_MEDIA_TYPE, NDJSON_MEDIA_TYPE, to_parquet
+from services.workspace import get_workspace_client
+
+# Media type of each accepted ingest body format
+INGEST_MEDIA_TYPES = {
+    "ndjson": NDJSON_MEDIA_TYPE,
+    "csv": CSV_MEDIA_TYPE,
+}
+
+
+def choose_ingest_mode(
+    row_count: int, mode: str, staging_path: Optional[str], min_rows: int
+) -> str:
+    """
+    Decide whether to load records with INSERT statements or COPY INTO.
+
+    Args:
+        row_count: Number of records to load
+        mode: The requested mode: auto, insert or copy
+        staging_path: The configured staging volume directory, if any
+        min_rows: Row count from which `auto` uses COPY INTO
+
+    Returns:
+        Either "insert" or "copy"
+
+    Raises:
+        ConfigurationError: If copy is requested without a staging volume
+    """
+    if mode == "copy" and not staging_path:
+        raise ConfigurationError(
+            message="Staging volume not configured",
+            details={"setting": "staging_volume_path"},
+        )
+    if mode == "auto":
+        return "copy" if staging_path and row_count >= min_rows else "insert"
+    return mode
+
+
+def records_to_arrow(records: List[Dict[str, Any]]) -> pa.Table:
+    """
+    Convert records to an Arrow table, inferring the column types.
+
+    The records must all have the same columns, as for INSERT statements;
+    otherwise columns missing from the first record would be dropped.
+
+    Args:
+        records: The records to convert
+
+    Returns:
+        The records as an Arrow table
+
+    Raises:
+        Exception: If a record has other columns than the first
+    """
+    record_columns(records)
+    return pa.Table.from_pylist(records)
+
+
+def read_records(body: bytes, body_format: str) -> pa.Table:
+    """
+    Parse an NDJSON or CSV request body into an Arrow table.
+
+    Args:
+        body: The raw request body
+        body_format: Either "ndjson" or "csv"
+
+    Returns:
+        The parsed records
+
+    Raises:
+        ValidationError: If the body is empty or cannot be parsed
+    """
+    if not body.strip():
+        raise ValidationError(message="Request body is empty")
+
+    try:
+        if body_format == "ndjson":
+            return pajson.read_json(io.BytesIO(body))
+        if body_format == "csv":
+            return pacsv.read_csv(io.BytesIO(body))
+    except pa.ArrowInvalid as e:
+        raise ValidationError(
+            message=f"Invalid {body_format} body: {str(e)}",
+            details={"format": body_format},
+        )
+    raise ValueError(f"Unsupported ingest format: {body_format}")
+
+
+def stage_table(table: pa.Table, staging_path: str, files: Any = None) -> str:
+    """
+    Write an Arrow table as a uniquely named Parquet file in a volume.
+
+    Args:
+        table: The records to stage
+        staging_path: The staging volume directory
+        files: Files API to upload with (defaults to the workspace client's)
+
+    Returns:
+        The path of the staged file
+    """
+    files = files or get_workspace_client().files
+    path = posixpath.join(staging_path, f"ingest-{uuid.uuid4().hex}.parquet")
+    files.upload(path, io.BytesIO(to_parquet(table)), overwrite=False)
+    return path
+
+
+def bulk_ingest(
+    table_path: str,
+    table: pa.Table,
+    warehouse_id: str,
+    staging_path: str,
+    files: Any = None,
+) -> int:
+    """
+    Load records into a table through a staged Parquet file and COPY INTO.
+
+    The staged file is removed once the statement has finished.
+
+    Args:
+        table_path: Full path to the table (catalog.schema.table)
+        table: The records to load
+        warehouse_id: The ID of the SQL warehouse to connect to
+        staging_path: The staging volume directory
+        files: Files API to stage with (defaults to the workspace client's)
+
+    Returns:
+        Number of records inserted
+
+    Raises:
+        Exception: If staging the file or the COPY INTO statement fails
+    """
+    files = files or get_workspace_client().files
+    staged = stage_table(table, staging_path, files)
+
+    try:
+        result = execute_statement(
+            build_copy_into_query(
+                table_path,
+                posixpath.dirname(staged),
+                [posixpath.basename(staged)],
+            ),
+            warehouse_id,
+        )
+    finally:
+        try:
+            files.delete(staged)
+        except Exception:
+            # Best effort: a leftover staged file is harmless, and COPY INTO
+            # would skip it if it were loaded again
+            pass
+
+    if result and result[0].get("num_inserted_rows") is not None:
+        return int(result[0]["num_inserted_rows"])
+    return table.num_rows
+
+
+async def bulk_ingest_async(
+    table_path: str,
+    table: pa.Table,
+    warehouse_id: str,
+    staging_path: str,
+    files: Any = None,
+) -> int:
+    """
+    Load records through a staged file without blocking the event loop.
+
+    See `bulk_ingest` for arguments and return values.
+    """
+    return await run_in_executor(
+        bulk_ingest, table_path, table, warehouse_id, staging_path, files
+    )
@@ -0,0 +1,346 @@
+"""
+Volume directory listings.
+
+A directory is listed with the Files API one directory at a time, and a
+recursive listing walks subdirectories with a bounded number of concurrent
+walkers. Complete listings are cached briefly and sorted by path; pages
+continue after the last path returned, so a page token stays valid when the
+listing is refreshed between pages.
+"""
+
+import asyncio
+import base64
+import binascii
+import bisect
+import json
+import posixpath
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from databricks.sdk.errors import NotFound
+
+from config.settings import settings
+from services.db.singleflight import SingleFlight
+from services.streaming import run_io
+
+# Rough memory used by one cached entry besides its path
+_ENTRY_OVERHEAD_BYTES = 200
+
+
+@dataclass
+class _Listing:
+    entries: List[Dict[str, Any]]
+    size: int
+    expires_at: float
+
+
+class ListingCache:
+    """
+    A TTL + LRU cache of volume directory listings.
+
+    Listings are keyed on the exact directory path, which is case-sensitive,
+    and whether they are recursive. The cache is bounded both by number of
+    listings and by their total estimated size; the least recently used
+    listings are evicted first.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._listings: "OrderedDict[Tuple[str, bool], _Listing]" = OrderedDict()
+        self._bytes = 0
+        self._generation = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether listings are cached at all."""
+        return self.max_entries > 0 and self.max_bytes > 0 and self.ttl > 0
+
+    def get(self, directory: str, recursive: bool) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up a cached listing.
+
+        Args:
+            directory: The normalized directory
+            recursive: Whether the listing is recursive
+
+        Returns:
+            The listing's entries, or None if it is missing or expired
+        """
+        if not self.enabled:
+            return None
+
+        key = (directory, recursive)
+        with self._lock:
+            listing = self._listings.get(key)
+            if listing is None:
+                return None
+            if listing.expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._listings.move_to_end(key)
+            return listing.entries
+
+    def generation(self) -> int:
+        """
+        Return the invalidation counter.
+
+        Take it before listing a directory and pass it to `put`, so that a
+        listing which raced with a write is not cached.
+        """
+        with self._lock:
+            return self._generation
+
+    def put(
+        self,
+        directory: str,
+        recursive: bool,
+        entries: List[Dict[str, Any]],
+        size: int,
+        generation: int,
+    ) -> None:
+        """
+        Store a listing in the cache.
+
+        Args:
+            directory: The normalized directory
+            recursive: Whether the listing is recursive
+            entries: The listing's entries
+            size: Estimated size of the entries in bytes
+            generation: The invalidation counter taken before listing
+        """
+        if not self.enabled or size > self.max_bytes:
+            return
+
+        key = (directory, recursive)
+        with self._lock:
+            if generation != self._generation:
+                # A file was written while the directory was listed
+                return
+            if key in self._listings:
+                self._remove(key)
+            self._listings[key] = _Listing(
+                entries=entries, size=size, expires_at=time.monotonic() + self.ttl
+            )
+            self._bytes += size
+            while (
+                len(self._listings) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._listings)))
+
+    def invalidate_directory(self, directory: str) -> None:
+        """
+        Remove the listings of a directory, recursive or not.
+
+        Args:
+            directory: The normalized directory
+        """
+        with self._lock:
+            self._generation += 1
+            for recursive in (False, True):
+                if (directory, recursive) in self._listings:
+                    self._remove((directory, recursive))
+
+    def clear(self) -> None:
+        """Remove all listings."""
+        with self._lock:
+            self._listings.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Tuple[str, bool]) -> None:
+        """Remove a listing. Must be called with the lock held."""
+        self._bytes -= self._listings.pop(key).size
+
+
+# Listings of volume directories
+listing_cache = ListingCache(
+    max_entries=settings.volume_list_cache_max_entries,
+    max_bytes=settings.volume_list_cache_max_bytes,
+    ttl=settings.volume_list_cache_ttl_seconds,
+)
+
+_listings = SingleFlight()
+
+
+def normalize_directory(path: str) -> str:
+    """Normalize a directory path, without a trailing slash."""
+    return posixpath.normpath("/" + path.strip().lstrip("/"))
+
+
+def encode_page_token(root: str, recursive: bool, last_path: str) -> str:
+    """
+    Encode the last path of a page as an opaque page token.
+
+    Args:
+        root: The listed directory
+        recursive: Whether the listing is recursive
+        last_path: Path of the last entry returned
+
+    Returns:
+        A URL-safe token
+    """
+    payload = json.dumps({"d": root, "r": recursive, "a": last_path})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_page_token(token: str, root: str, recursive: bool) -> str:
+    """
+    Decode a page token produced by `encode_page_token`.
+
+    Args:
+        token: The page token
+        root: The directory listed by the current request
+        recursive: Whether the current request is recursive
+
+    Returns:
+        The path to continue after
+
+    Raises:
+        ValueError: If the token is malformed or for another listing
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+        directory, token_recursive, last_path = payload["d"], payload["r"], payload["a"]
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+        raise ValueError("Invalid page token")
+    if directory != root or token_recursive != recursive:
+        raise ValueError("Page token does not match this listing")
+    return last_path
+
+
+def paginate(
+    entries: List[Dict[str, Any]], page_size: int, after: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Take one page of a listing sorted by path.
+
+    Args:
+        entries: The listing, sorted by path
+        page_size: Maximum number of entries in the page
+        after: Path of the last entry of the previous page, if any
+
+    Returns:
+        The page, and whether entries remain after it
+    """
+    start = (
+        0
+        if after is None
+        else bisect.bisect_right(entries, after, key=lambda entry: entry["path"])
+    )
+    page = entries[start : start + page_size]
+    return page, start + page_size < len(entries)
+
+
+async def walk(
+    list_directory: Callable[[str], List[Dict[str, Any]]],
+    root: str,
+    recursive: bool,
+    max_walkers: int,
+) -> List[Dict[str, Any]]:
+    """
+    List a directory, and optionally everything below it.
+
+    Directories are listed on the file I/O thread pool, by up to
+    `max_walkers` walkers at once. A subdirectory deleted during the walk is
+    skipped.
+
+    Args:
+        list_directory: Lists the entries of one directory; blocking
+        root: The directory to list
+        recursive: Whether to list subdirectories too
+        max_walkers: Maximum number of directories listed concurrently
+
+    Returns:
+        The entries, sorted by path
+
+    Raises:
+        Exception: Whatever listing the root directory, or a subdirectory
+            (other than because it no longer exists), raised
+    """
+    entries: List[Dict[str, Any]] = []
+    pending: asyncio.Queue = asyncio.Queue()
+    pending.put_nowait(root)
+
+    async def walker() -> None:
+        while True:
+            directory = await pending.get()
+            try:
+                try:
+                    children = await run_io(list_directory, directory)
+                except NotFound:
+                    if directory == root:
+                        raise
+                    children = []
+                entries.extend(children)
+                if recursive:
+                    for child in children:
+                        if child["is_directory"]:
+                            pending.put_nowait(child["path"])
+            finally:
+                pending.task_done()
+
+    walkers = [asyncio.ensure_future(walker()) for _ in range(max(max_walkers, 1))]
+    finished = asyncio.ensure_future(pending.join())
+    try:
+        await asyncio.wait([finished, *walkers], return_when=asyncio.FIRST_COMPLETED)
+        for task in walkers:
+            if task.done():
+                # A walker only stops early by raising
+                task.result()
+    finally:
+        for task in [finished, *walkers]:
+            task.cancel()
+        await asyncio.wait([finished, *walkers])
+
+    entries.sort(key=lambda entry: entry["path"])
+    return entries
+
+
+async def list_volume(
+    list_directory: Callable[[str], List[Dict[str, Any]]],
+    root: str,
+    recursive: bool,
+    max_walkers: int,
+) -> List[Dict[str, Any]]:
+    """
+    Get a directory's listing, from the cache if it was listed recently.
+
+    Concurrent requests for the same listing share one walk.
+
+    Args:
+        list_directory: Lists the entries of one directory; blocking
+        root: The normalized directory to list
+        recursive: Whether to list subdirectories too
+        max_walkers: Maximum number of directories listed concurrently
+
+    Returns:
+        The entries, sorted by path
+    """
+    cached = listing_cache.get(root, recursive)
+    if cached is not None:
+        return cached
+
+    async def load() -> List[Dict[str, Any]]:
+        generation = listing_cache.generation()
+        entries = await walk(list_directory, root, recursive, max_walkers)
+        size = sum(len(entry["path"]) + _ENTRY_OVERHEAD_BYTES for entry in entries)
+        listing_cache.put(root, recursive, entries, size, generation)
+        return entries
+
+    return await _listings.do((root, recursive), load)
+
+
+def invalidate_listings(file_path: str) -> None:
+    """Drop cached listings that may include a file that was written."""
+    directory = normalize_directory(posixpath.dirname(file_path))
+    while True:
+        listing_cache.invalidate_directory(directory)
+        if directory == "/":
+            return
+        directory = posixpath.dirname(directory)
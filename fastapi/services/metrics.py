@@ -0,0 +1,232 @@
+"""
+Prometheus metrics and per-request timings.
+
+This module defines the application's metrics and a small timing helper.
+Timed phases are recorded in a histogram and, while a request is being
+handled, in the request's `Timings`, which the Server-Timing middleware
+reports back to the client.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Buckets from 1ms to 1 minute, covering cache hits up to slow warehouses
+_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+QUERY_PHASE_SECONDS = Histogram(
+    "databricks_query_phase_seconds",
+    "Time spent per phase of a query: checkout (waiting for a pooled "
+    "connection), execute, fetch, convert (rows to dicts) and serialize",
+    ["phase"],
+    buckets=_BUCKETS,
+)
+
+ROWS_RETURNED = Counter(
+    "databricks_rows_returned_total",
+    "Table rows returned to clients",
+    ["endpoint", "format"],
+)
+
+RESPONSE_BYTES = Counter(
+    "http_response_bytes_total",
+    "Response body bytes sent to clients",
+    ["route"],
+)
+
+QUERY_CACHE_REQUESTS = Counter(
+    "databricks_query_cache_requests_total",
+    "Query result cache lookups by result: hit or miss",
+    ["result"],
+)
+
+QUERY_CACHE_EVICTIONS = Counter(
+    "databricks_query_cache_evictions_total",
+    "Query results evicted from the cache to stay within its bounds",
+)
+
+QUERY_CACHE_INVALIDATIONS = Counter(
+    "databricks_query_cache_invalidations_total",
+    "Cached query results dropped because a table they read was written to",
+)
+
+QUERY_CACHE_ENTRIES = Gauge(
+    "databricks_query_cache_entries",
+    "Query results held in the cache",
+)
+
+QUERY_CACHE_BYTES = Gauge(
+    "databricks_query_cache_bytes",
+    "Estimated memory used by cached query results",
+)
+
+FILE_CACHE_REQUESTS = Counter(
+    "volume_file_cache_requests_total",
+    "Cacheable volume downloads by result: hit, miss, or stale (cached but "
+    "changed since)",
+    ["result"],
+)
+
+FILE_CACHE_EVICTIONS = Counter(
+    "volume_file_cache_evictions_total",
+    "Volume files evicted from the disk cache to stay within its size",
+)
+
+FILE_CACHE_BYTES = Gauge(
+    "volume_file_cache_bytes",
+    "Bytes of volume files held in the disk cache",
+)
+
+
+class Timings:
+    """Time spent per phase while handling one request."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+
+    def add(self, phase: str, seconds: float) -> None:
+        """Add time to a phase; repeated phases accumulate."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Format the phases as a Server-Timing header value (in ms)."""
+        return ", ".join(
+            f"{phase};dur={seconds * 1000:.1f}"
+            for phase, seconds in self.phases.items()
+        )
+
+
+# Timings of the request being handled, if any
+current_timings: ContextVar[Optional[Timings]] = ContextVar(
+    "current_timings", default=None
+)
+
+
+def observe(phase: str, seconds: float) -> None:
+    """
+    Record the duration of a query phase.
+
+    Args:
+        phase: The phase name
+        seconds: How long the phase took
+    """
+    QUERY_PHASE_SECONDS.labels(phase).observe(seconds)
+    timings = current_timings.get()
+    if timings is not None:
+        timings.add(phase, seconds)
+
+
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    """Record the duration of the enclosed block as a query phase."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(phase, time.perf_counter() - start)
+
+
+class PoolCollector:
+    """
+    Report connection pool usage at scrape time.
+
+    Args:
+        stats: Returns the stats of each warehouse's pool, keyed by warehouse
+    """
+
+    def __init__(self, stats: Callable[[], Dict[str, Dict[str, int]]]):
+        self._stats = stats
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        pools = self._stats()
+        gauges: List[Tuple[str, str, str]] = [
+            ("size", "databricks_sql_pool_connections", "Open pooled connections"),
+            ("in_use", "databricks_sql_pool_in_use", "Checked-out connections"),
+            ("idle", "databricks_sql_pool_idle", "Idle pooled connections"),
+            ("waiting", "databricks_sql_pool_waiting", "Threads waiting to check out"),
+            ("max_size", "databricks_sql_pool_max_size", "Maximum pool size"),
+        ]
+        for key, name, documentation in gauges:
+            family = GaugeMetricFamily(name, documentation, labels=["warehouse"])
+            for warehouse_id, stats in pools.items():
+                family.add_metric([warehouse_id], stats[key])
+            yield family
+
+        saturation = GaugeMetricFamily(
+            "databricks_sql_pool_saturation",
+            "Fraction of the pool's connections checked out",
+            labels=["warehouse"],
+        )
+        for warehouse_id, stats in pools.items():
+            saturation.add_metric(
+                [warehouse_id], stats["in_use"] / max(stats["max_size"], 1)
+            )
+        yield saturation
+
+
+class SingleFlightCollector:
+    """
+    Report how often identical concurrent queries are coalesced, at scrape time.
+
+    Args:
+        stats: Returns the single-flight group's executed, shared and
+            in-flight call counts
+    """
+
+    def __init__(self, stats: Callable[[], Dict[str, int]]):
+        self._stats = stats
+
+    def collect(self) -> Iterator[Union[CounterMetricFamily, GaugeMetricFamily]]:
+        stats = self._stats()
+        yield CounterMetricFamily(
+            "databricks_query_flight_executions",
+            "Queries sent to the warehouse by the single-flight group",
+            value=stats["executions"],
+        )
+        yield CounterMetricFamily(
+            "databricks_query_flight_shared",
+            "Queries answered by joining an identical query already in flight",
+            value=stats["shared"],
+        )
+        yield GaugeMetricFamily(
+            "databricks_query_flight_in_flight",
+            "Distinct queries currently in flight",
+            value=stats["in_flight"],
+        )
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render all metrics in the Prometheus text format.
+
+    Returns:
+        The metrics and their content type
+    """
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
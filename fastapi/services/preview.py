@@ -0,0 +1,85 @@
+"""
+Table previews with approximate column statistics.
+
+A preview reads a `TABLESAMPLE` of a table instead of the whole table, and
+describes each column of the sample (null fraction, approximate distinct
+count, min and max) from a single aggregate statement over the same sample.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+
+from services.schema import TableSchema
+
+# Unity Catalog types that cannot be ordered, or counted distinct
+_UNORDERED_TYPES = {"BINARY", "INTERVAL"}
+_NESTED_TYPES = {"ARRAY", "MAP", "STRUCT", "VARIANT"}
+
+
+def _arrow_kind(data_type: pa.DataType) -> str:
+    if pa.types.is_nested(data_type) or pa.types.is_null(data_type):
+        return "count"
+    if pa.types.is_binary(data_type) or pa.types.is_large_binary(data_type):
+        return "distinct"
+    return "ordered"
+
+
+def stats_columns(
+    arrow_schema: pa.Schema, table_schema: Optional[TableSchema] = None
+) -> List[Tuple[str, str]]:
+    """
+    Choose which statistics can be computed for each column of a sample.
+
+    Complex types are returned by the warehouse as JSON strings, so the
+    table's Unity Catalog types are preferred over the Arrow types when the
+    schema is known.
+
+    Args:
+        arrow_schema: Schema of the sample
+        table_schema: The table's cached schema, if known
+
+    Returns:
+        Pairs of column name and kind, as expected by `build_stats_query`
+    """
+    columns = []
+    for arrow_field in arrow_schema:
+        column = table_schema.column(arrow_field.name) if table_schema else None
+        if column is not None and column.type_name:
+            if column.type_name in _NESTED_TYPES:
+                kind = "count"
+            elif column.type_name in _UNORDERED_TYPES:
+                kind = "distinct"
+            else:
+                kind = "ordered"
+        else:
+            kind = _arrow_kind(arrow_field.type)
+        columns.append((arrow_field.name, kind))
+    return columns
+
+
+def column_stats(
+    row: Dict[str, Any], columns: List[Tuple[str, str]]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Turn the result of a statistics statement into per-column statistics.
+
+    Args:
+        row: The single row returned by the `build_stats_query` statement
+        columns: The columns passed to `build_stats_query`
+
+    Returns:
+        For each column, its null fraction, approximate distinct count, min
+        and max; statistics that were not computed are None
+    """
+    rows = row["rows"]
+    stats = {}
+    for i, (name, _) in enumerate(columns):
+        non_null = row[f"n{i}"]
+        stats[name] = {
+            "null_fraction": 1 - non_null / rows if rows else None,
+            "approx_distinct": row.get(f"d{i}"),
+            "min": row.get(f"lo{i}"),
+            "max": row.get(f"hi{i}"),
+        }
+    return stats
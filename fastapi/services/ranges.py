@@ -0,0 +1,164 @@
+"""
+HTTP byte ranges.
+
+This module parses `Range` and `If-Range` request headers and frames
+`multipart/byteranges` bodies, so that file downloads can be resumed and
+fetched in parallel parts.
+"""
+
+import hashlib
+import re
+from typing import List, Optional, Tuple
+
+# Ranges beyond this many in one request are merged into one span
+MAX_RANGES = 16
+
+_RANGE_SPEC = re.compile(r"^\s*(\d*)\s*-\s*(\d*)\s*$")
+
+
+class RangeNotSatisfiable(Exception):
+    """None of the requested ranges overlaps the file."""
+
+
+def file_etag(file_path: str, size: Optional[int], last_modified: Optional[str]) -> str:
+    """
+    Build a strong ETag for a file from its path, size and modification time.
+
+    Args:
+        file_path: Path of the file
+        size: Size of the file in bytes
+        last_modified: The file's Last-Modified date
+
+    Returns:
+        The quoted entity tag
+    """
+    key = f"{file_path}\0{size}\0{last_modified}"
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def if_range_matches(
+    if_range: Optional[str], etag: str, last_modified: Optional[str]
+) -> bool:
+    """
+    Check whether a range request's `If-Range` precondition holds.
+
+    An entity tag must match exactly (weak tags never match), and a date must
+    equal the file's Last-Modified date.
+
+    Args:
+        if_range: The request's If-Range header, if any
+        etag: The file's current ETag
+        last_modified: The file's current Last-Modified date
+
+    Returns:
+        True if the requested ranges should be served, False if the whole
+        file should be sent instead
+    """
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    return last_modified is not None and if_range == last_modified
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a `Range: bytes=...` header against a file size.
+
+    Overlapping and adjacent ranges are merged, and requests for more than
+    `MAX_RANGES` ranges are served as the single span covering them.
+
+    Args:
+        header: The request's Range header, if any
+        size: Size of the file in bytes
+
+    Returns:
+        Sorted, inclusive `(start, end)` byte positions, or None if the header
+        is absent or malformed, in which case the whole file is sent
+
+    Raises:
+        RangeNotSatisfiable: If no requested range overlaps the file
+    """
+    if not header:
+        return None
+    unit, _, specs = header.partition("=")
+    if unit.strip().lower() != "bytes" or not specs.strip():
+        return None
+
+    ranges = []
+    for spec in specs.split(","):
+        match = _RANGE_SPEC.match(spec)
+        if not match or match.groups() == ("", ""):
+            return None
+        first, last = match.groups()
+        if first == "":
+            # A suffix: the last N bytes
+            length = int(last)
+            if length == 0:
+                continue
+            start, end = max(size - length, 0), size - 1
+        else:
+            start = int(first)
+            end = size - 1 if last == "" else min(int(last), size - 1)
+            if last != "" and int(last) < start:
+                return None
+        if start <= end:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+
+    if len(merged) > MAX_RANGES:
+        return [(merged[0][0], max(end for _, end in merged))]
+    return merged
+
+
+def content_range(start: int, end: int, size: int) -> str:
+    """Format a Content-Range header value for an inclusive byte range."""
+    return f"bytes {start}-{end}/{size}"
+
+
+def part_header(
+    boundary: str, media_type: str, start: int, end: int, size: int
+) -> bytes:
+    """Build the boundary and headers preceding one part of a multipart body."""
+    return (
+        f"--{boundary}\r\n"
+        f"Content-Type: {media_type}\r\n"
+        f"Content-Range: {content_range(start, end, size)}\r\n"
+        "\r\n"
+    ).encode("latin-1")
+
+
+def closing_boundary(boundary: str) -> bytes:
+    """Build the delimiter ending a multipart body."""
+    return f"--{boundary}--\r\n".encode("latin-1")
+
+
+def multipart_length(
+    boundary: str, media_type: str, ranges: List[Tuple[int, int]], size: int
+) -> int:
+    """
+    Work out the length of a `multipart/byteranges` body.
+
+    Each part is its header, the range's bytes and a line break, and the body
+    ends with the closing boundary.
+
+    Returns:
+        The body length in bytes
+    """
+    length = len(closing_boundary(boundary))
+    for start, end in ranges:
+        length += len(part_header(boundary, media_type, start, end, size))
+        length += end - start + 1 + len(b"\r\n")
+    return length
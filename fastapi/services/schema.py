@@ -0,0 +1,320 @@
+"""
+Cached Unity Catalog table schemas.
+
+This module keeps the column names and types of recently used tables, as
+reported by the Unity Catalog tables API, so that requests naming unknown
+columns are rejected without a warehouse round trip, and so that result
+values can be encoded according to their column type.
+"""
+
+import base64
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from config.settings import settings
+from errors.exceptions import ValidationError
+from services.db.query_builder import split_aggregates
+from services.db.singleflight import SingleFlight
+from services.encoding import json_decimal
+from services.workspace import get_workspace_client
+
+# A column list entry that names a column, optionally backticked
+_COLUMN_NAME = re.compile(r"^`([^`]+)`$|^([A-Za-z_][A-Za-z0-9_]*)$")
+
+# The name given to a column list expression, with or without AS
+_ALIAS = re.compile(
+    r"\s(?:AS\s+)?(?:`([^`]+)`|([A-Za-z_][A-Za-z0-9_]*))$", re.IGNORECASE
+)
+
+# Backticked identifiers in a filter, outside string literals
+_QUOTED_IDENTIFIER = re.compile(r"'(?:[^'\\]|\\.)*'|`([^`]+)`")
+
+# Warehouse errors meaning the query no longer matches the table's schema
+_SCHEMA_MISMATCH = re.compile(
+    r"UNRESOLVED_COLUMN|FIELD_NOT_FOUND|cannot be resolved|"
+    r"DELTA_SCHEMA_CHANGED|schema (?:has )?changed",
+    re.IGNORECASE,
+)
+
+
+@dataclass(frozen=True)
+class ColumnSchema:
+    """A table column as described by Unity Catalog."""
+
+    name: str
+    type_name: Optional[str] = None
+    precision: Optional[int] = None
+    scale: Optional[int] = None
+
+
+@dataclass
+class TableSchema:
+    """The columns of a table, keyed by lowercase name."""
+
+    table_path: str
+    columns: Dict[str, ColumnSchema] = field(default_factory=dict)
+
+    def column(self, name: str) -> Optional[ColumnSchema]:
+        """Look up a column by name, ignoring case like Databricks SQL."""
+        return self.columns.get(name.lower())
+
+
+def requested_columns(columns: str) -> List[str]:
+    """
+    Extract the plain column names from a column list.
+
+    Entries that are expressions rather than column names, such as
+    `upper(name) AS n`, are left for the warehouse to check.
+
+    Args:
+        columns: Comma-separated list of columns
+
+    Returns:
+        The column names, without backticks
+    """
+    names = []
+    for entry in columns.split(","):
+        match = _COLUMN_NAME.match(entry.strip())
+        if match:
+            names.append(match.group(1) or match.group(2))
+    return names
+
+
+def plain_result_columns(columns: str, result_names: Iterable[str]) -> List[str]:
+    """
+    Pick the result columns that hold table columns as they are.
+
+    A result column is plain when its table column is selected by name or
+    with `*`, and no expression in the column list is aliased to its name,
+    as in `avg(units) AS units`. Aliased columns, such as `name AS label`,
+    are not plain either, as their result names are not table columns.
+
+    Args:
+        columns: Comma-separated list of selected columns
+        result_names: The result's column names
+
+    Returns:
+        The plain result column names, in result order
+    """
+    entries = split_aggregates(columns)
+    selected = {name.lower() for name in requested_columns(columns)}
+    aliases = set()
+    for entry in entries:
+        if entry != "*" and not _COLUMN_NAME.match(entry):
+            match = _ALIAS.search(entry)
+            if match:
+                aliases.add((match.group(1) or match.group(2)).lower())
+    everything = "*" in entries
+    return [
+        name
+        for name in result_names
+        if (everything or name.lower() in selected) and name.lower() not in aliases
+    ]
+
+
+def filter_columns(filter_expr: Optional[str]) -> List[str]:
+    """Extract the backticked column names from a filter expression."""
+    if not filter_expr:
+        return []
+    return [
+        match.group(1)
+        for match in _QUOTED_IDENTIFIER.finditer(filter_expr)
+        if match.group(1)
+    ]
+
+
+def validate_columns(schema: TableSchema, names: Iterable[str]) -> None:
+    """
+    Check that the named columns exist in a table.
+
+    Args:
+        schema: The table's schema
+        names: Column names used by the request
+
+    Raises:
+        ValidationError: If any column does not exist
+    """
+    unknown = [name for name in names if schema.column(name) is None]
+    if unknown:
+        raise ValidationError(
+            message=f"Unknown column(s) in {schema.table_path}: {', '.join(unknown)}",
+            details={
+                "unknown_columns": unknown,
+                "available_columns": [col.name for col in schema.columns.values()],
+            },
+        )
+
+
+def is_schema_mismatch(error: BaseException) -> bool:
+    """Return whether a query error means the cached schema may be stale."""
+    return bool(_SCHEMA_MISMATCH.search(str(error)))
+
+
+def _decimal_to_float(value: Any) -> float:
+    return float(value)
+
+
+def _decimal_to_int(value: Any) -> int:
+    return int(value)
+
+
+def _binary_to_base64(value: Any) -> str:
+    return base64.b64encode(value).decode("ascii")
+
+
+def column_converters(
+    schema: TableSchema, columns: Iterable[str]
+) -> List[Tuple[str, Callable[[Any], Any]]]:
+    """
+    Choose per-column conversions to JSON-native values from column types.
+
+    Knowing the types up front replaces a per-value type dispatch in the
+    JSON encoder with a direct conversion of the affected columns only.
+    Values are converted exactly as the encoder would: decimals become
+    floats, or ints when the scale is 0 and the precision at most 18
+    digits; wider whole decimals are left to `json_decimal`, which keeps
+    them as ints only while they fit in 64 bits. Binary values become
+    base64.
+
+    Only pass result columns holding a table column's values as they are
+    (see `plain_result_columns`); an expression named like a column does
+    not have its type.
+
+    Args:
+        schema: The table's schema
+        columns: Names of the result columns holding table columns
+
+    Returns:
+        Pairs of result column name and conversion, for the columns needing one
+    """
+    converters = []
+    for name in columns:
+        column = schema.column(name)
+        if column is None:
+            continue
+        if column.type_name == "DECIMAL":
+            if column.scale:
+                converters.append((name, _decimal_to_float))
+            elif (
+                column.scale == 0
+                and column.precision is not None
+                and column.precision <= 18
+            ):
+                converters.append((name, _decimal_to_int))
+            else:
+                converters.append((name, json_decimal))
+        elif column.type_name == "BINARY":
+            converters.append((name, _binary_to_base64))
+    return converters
+
+
+def convert_rows(
+    rows: List[Dict[str, Any]], converters: List[Tuple[str, Callable[[Any], Any]]]
+) -> None:
+    """Apply column conversions to result rows in place."""
+    if not converters:
+        return
+    for row in rows:
+        for name, convert in converters:
+            value = row.get(name)
+            if value is not None:
+                row[name] = convert(value)
+
+
+class SchemaRegistry:
+    """
+    A TTL cache of table schemas loaded from Unity Catalog.
+
+    Tables whose schema cannot be loaded (for example for lack of
+    permission) are cached as unknown, and requests against them are not
+    validated locally.
+
+    Args:
+        ttl: How long a schema is cached, in seconds; 0 disables the registry
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._schemas: Dict[str, Tuple[float, Optional[TableSchema]]] = {}
+        self._loads = SingleFlight()
+
+    async def get_async(self, table_path: str) -> Optional[TableSchema]:
+        """
+        Get a table's schema, loading it on a cache miss.
+
+        The lookup runs off the event loop, and concurrent misses for the
+        same table share one lookup.
+
+        Args:
+            table_path: Full path to the table (catalog.schema.table)
+
+        Returns:
+            The schema, or None if it is not known
+        """
+        if self.ttl <= 0:
+            return None
+        key = table_path.lower()
+        found, schema = self._cached(key)
+        if found:
+            return schema
+        return await self._loads.do(
+            key,
+            lambda: run_in_threadpool(lambda: self._store(key, self._load(table_path))),
+        )
+
+    def invalidate(self, table_path: str) -> None:
+        """Forget a table's schema, so that the next request reloads it."""
+        with self._lock:
+            self._schemas.pop(table_path.lower(), None)
+
+    def clear(self) -> None:
+        """Forget all schemas."""
+        with self._lock:
+            self._schemas.clear()
+
+    def _cached(self, key: str) -> Tuple[bool, Optional[TableSchema]]:
+        with self._lock:
+            entry = self._schemas.get(key)
+            if entry is None:
+                return False, None
+            expires, schema = entry
+            if expires <= time.monotonic():
+                del self._schemas[key]
+                return False, None
+            return True, schema
+
+    def _store(self, key: str, schema: Optional[TableSchema]) -> Optional[TableSchema]:
+        with self._lock:
+            self._schemas[key] = (time.monotonic() + self.ttl, schema)
+        return schema
+
+    @staticmethod
+    def _load(table_path: str) -> Optional[TableSchema]:
+        try:
+            info = get_workspace_client().tables.get(table_path)
+        except Exception:
+            # Leave validation to the warehouse
+            return None
+        if not info.columns:
+            return None
+
+        columns = {}
+        for column in info.columns:
+            type_name = getattr(column.type_name, "value", column.type_name)
+            columns[column.name.lower()] = ColumnSchema(
+                name=column.name,
+                type_name=type_name,
+                precision=column.type_precision,
+                scale=column.type_scale,
+            )
+        return TableSchema(table_path=table_path, columns=columns)
+
+
+# Shared registry of table schemas
+schema_registry = SchemaRegistry(ttl=settings.schema_cache_ttl_seconds)
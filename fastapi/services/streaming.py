@@ -0,0 +1,268 @@
+"""
+Non-blocking streaming of blocking file reads and writes.
+
+Files API downloads are blocking streams. This module reads them on a
+dedicated thread pool, a bounded number of chunks ahead of the consumer, so
+that reading from storage overlaps writing to the client, the event loop is
+never blocked and downloads do not compete with other work for Starlette's
+thread pool. In the other direction, it hands request bodies to blocking
+uploads as a file-like stream fed from the event loop, buffering a bounded
+number of chunks.
+"""
+
+import asyncio
+import concurrent.futures
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterable, AsyncIterator, BinaryIO, Callable, Optional
+
+import anyio
+
+from config.settings import settings
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """
+    Get or create the thread pool used for blocking file reads.
+
+    Returns:
+        The file I/O thread pool executor
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.download_max_workers,
+                thread_name_prefix="volume-io",
+            )
+        return _executor
+
+
+def close_io_executor() -> None:
+    """Stop the file I/O thread pool, e.g. when shutting down."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+async def run_io(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """
+    Run a blocking file operation on the file I/O thread pool.
+
+    Args:
+        func: The blocking function to run
+        *args: Positional arguments for the function
+        **kwargs: Keyword arguments for the function
+
+    Returns:
+        The function's return value
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_io_executor(), partial(func, *args, **kwargs))
+
+
+async def read_ahead(
+    stream: BinaryIO, chunk_size: int, read_ahead: int
+) -> AsyncIterator[bytes]:
+    """
+    Read a blocking stream without blocking the event loop.
+
+    A background task reads chunks on the file I/O thread pool and buffers
+    up to `read_ahead` of them, so the next chunks are already on their way
+    while the current one is sent; once the buffer is full, reading pauses
+    until the consumer catches up. The stream is closed when the consumer
+    finishes or stops early (for example because the client disconnected).
+
+    Args:
+        stream: An open binary stream, such as a Files API download
+        chunk_size: Bytes per read
+        read_ahead: Maximum number of chunks buffered ahead of the consumer
+
+    Yields:
+        The stream's chunks, in order
+    """
+    if hasattr(stream, "set_chunk_size"):
+        # Let SDK streams fetch whole chunks instead of reassembling them
+        stream.set_chunk_size(chunk_size)
+
+    buffer: asyncio.Queue = asyncio.Queue(maxsize=max(read_ahead, 1))
+    pending: Optional[asyncio.Future] = None
+
+    async def produce() -> None:
+        nonlocal pending
+        try:
+            while True:
+                # Shield the read so it is never abandoned mid-call; the
+                # stream cannot be closed while it is still being read.
+                pending = asyncio.ensure_future(run_io(stream.read, chunk_size))
+                chunk = await asyncio.shield(pending)
+                await buffer.put(chunk)
+                if not chunk:
+                    return
+        except Exception as e:
+            await buffer.put(e)
+
+    producer = asyncio.ensure_future(produce())
+    try:
+        while True:
+            chunk = await buffer.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            if not chunk:
+                return
+            yield chunk
+    finally:
+        # Clean up even when the consumer is being cancelled
+        with anyio.CancelScope(shield=True):
+            producer.cancel()
+            await asyncio.wait([producer])
+            if pending is not None and not pending.done():
+                await asyncio.wait([pending])
+            await run_io(stream.close)
+
+
+class StreamInterrupted(Exception):
+    """The stream being written failed before its end."""
+
+
+class _ChunkReader(io.RawIOBase):
+    """
+    A blocking stream of chunks fed from the event loop, read from threads.
+
+    If the source fails, or the reader is aborted, reads raise
+    `StreamInterrupted` instead of ending the stream early, so that a writer
+    gives up rather than finishing with a truncated stream. The failure is
+    also kept in `error`.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, buffer_chunks: int):
+        self._loop = loop
+        self._buffer: asyncio.Queue = asyncio.Queue(maxsize=max(buffer_chunks, 1))
+        self._lock = threading.Lock()
+        self._waiting: Optional[concurrent.futures.Future] = None
+        self._aborted = False
+        self._pending = memoryview(b"")
+        self._ended = False
+        self.error: Optional[BaseException] = None
+        self.bytes_read = 0
+
+    async def feed(self, chunks: AsyncIterable[bytes]) -> None:
+        """Queue a source's chunks, waiting whenever the buffer is full."""
+        try:
+            async for chunk in chunks:
+                if chunk:
+                    await self._buffer.put(chunk)
+        except Exception as e:
+            await self._buffer.put(e)
+        else:
+            await self._buffer.put(b"")
+
+    def abort(self) -> None:
+        """End the stream for a reader waiting on chunks that will not come."""
+        with self._lock:
+            self._aborted = True
+            waiting = self._waiting
+        if waiting is not None:
+            waiting.cancel()
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        """Read `size` bytes, or fewer only at the end of the stream."""
+        if self.error is not None:
+            raise StreamInterrupted(str(self.error)) from self.error
+        data = bytearray()
+        while size < 0 or len(data) < size:
+            if not self._pending:
+                chunk = b"" if self._ended else self._next_chunk()
+                if not chunk:
+                    self._ended = True
+                    break
+                self._pending = memoryview(chunk)
+            n = len(self._pending) if size < 0 else size - len(data)
+            data += self._pending[:n]
+            self._pending = self._pending[n:]
+        self.bytes_read += len(data)
+        return bytes(data)
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def _next_chunk(self) -> bytes:
+        with self._lock:
+            if self._aborted:
+                waiting = None
+            else:
+                waiting = self._waiting = asyncio.run_coroutine_threadsafe(
+                    self._buffer.get(), self._loop
+                )
+        try:
+            item = waiting.result() if waiting is not None else None
+        except concurrent.futures.CancelledError:
+            item = None
+        if item is None:
+            self.error = self.error or StreamInterrupted("The stream was aborted")
+        elif isinstance(item, Exception):
+            self.error = item
+        else:
+            return item
+        raise StreamInterrupted(str(self.error)) from self.error
+
+
+async def drain_into(
+    chunks: AsyncIterable[bytes], write: Callable[[BinaryIO], Any], buffer_chunks: int
+) -> int:
+    """
+    Pass an async stream of chunks to a blocking writer without blocking.
+
+    The writer runs on the file I/O thread pool and reads a file-like stream
+    whose reads wait for the next chunk; the source is consumed at most
+    `buffer_chunks` chunks ahead of the writer, so memory stays bounded
+    however long the stream is. Reads return exactly the requested number
+    of bytes until the end of the stream, as a writer splitting the stream
+    into parts expects.
+
+    Args:
+        chunks: The source, such as a request body stream
+        write: A blocking function writing everything read from the stream
+            it is passed
+        buffer_chunks: Maximum number of chunks buffered ahead of the writer
+
+    Returns:
+        The number of bytes read by the writer
+
+    Raises:
+        StreamInterrupted: If the source failed before its end. The writer's
+            next read raised it, so the writer stopped without finishing.
+            The source's exception is the cause.
+        Exception: Whatever else the writer raised
+    """
+    reader = _ChunkReader(asyncio.get_running_loop(), buffer_chunks)
+    feeder = asyncio.ensure_future(reader.feed(chunks))
+    writer = asyncio.ensure_future(run_io(write, reader))
+    try:
+        # Shield the write so it is never abandoned mid-call
+        await asyncio.shield(writer)
+    except Exception:
+        if reader.error is None:
+            raise
+    finally:
+        # Clean up even when the caller is being cancelled
+        with anyio.CancelScope(shield=True):
+            reader.abort()
+            await asyncio.wait([writer])
+            feeder.cancel()
+            await asyncio.wait([feeder])
+    if reader.error is not None:
+        raise StreamInterrupted(str(reader.error)) from reader.error
+    return reader.bytes_read
@@ -0,0 +1,352 @@
+"""
+Parallel multipart uploads of streams into Unity Catalog volumes.
+
+A stream is cut into parts on the calling thread, and up to `parallelism`
+parts at a time are sent to storage by a small thread pool of the upload's
+own, so memory stays around `part_size * parallelism` whatever the stream's
+length. Each part is retried on its own; if a read or a part fails for
+good, the pending parts are cancelled, the pool is shut down and the
+multipart session is aborted, so no file is written and no thread is left
+behind.
+
+Streams shorter than one part, and workspaces whose storage offers no
+presigned part URLs, are sent in a single Files API request instead.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Set, Tuple
+from urllib.parse import quote
+
+import requests
+from databricks.sdk import WorkspaceClient
+
+# Attempts per part, and the delay before the first retry (doubled after
+# each attempt)
+_PART_ATTEMPTS = 5
+_RETRY_DELAY_SECONDS = 0.5
+
+# Storage responses worth retrying a part after
+_RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Seconds to wait for storage to accept one part
+_PART_TIMEOUT_SECONDS = 300
+
+# How long presigned URLs stay valid
+_URL_LIFETIME = timedelta(hours=1)
+
+_storage: Optional[requests.Session] = None
+_storage_lock = threading.Lock()
+
+
+class RetryablePartError(Exception):
+    """A part failed in a way that sending it again may fix."""
+
+
+class PresignedUrlsUnavailable(Exception):
+    """Storage refused presigned part uploads for this workspace."""
+
+
+def _storage_session() -> requests.Session:
+    """Get or create the session used for presigned storage URLs."""
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            # Presigned URLs carry their own credentials, so the session
+            # must not add the workspace's
+            _storage = requests.Session()
+        return _storage
+
+
+def _expire_time() -> str:
+    expires_at = datetime.now(timezone.utc) + _URL_LIFETIME
+    return expires_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class MultipartSession:
+    """
+    A Files API multipart upload of one file.
+
+    Parts are sent to storage through presigned URLs, one URL per attempt,
+    and the file is only written when the session is completed.
+
+    Args:
+        client: The workspace client used for Files API calls
+        file_path: Full path of the file inside a Unity Catalog volume
+        overwrite: Whether an existing file is replaced
+    """
+
+    def __init__(self, client: WorkspaceClient, file_path: str, overwrite: bool):
+        self._client = client
+        self.file_path = file_path
+        self.overwrite = overwrite
+        self._token: Optional[str] = None
+
+    def start(self) -> bool:
+        """
+        Initiate the upload.
+
+        Returns:
+            False if storage only offers resumable uploads, which are not
+            split into parts
+        """
+        response = self._client.api_client.do(
+            "POST",
+            f"/api/2.0/fs/files{quote(self.file_path)}",
+            query={"action": "initiate-upload", "overwrite": self.overwrite},
+        )
+        if "multipart_upload" not in response:
+            return False
+        self._token = response["multipart_upload"]["session_token"]
+        return True
+
+    def upload_part(self, part_number: int, data: bytes) -> str:
+        """
+        Send one part to storage.
+
+        Args:
+            part_number: The part's position, starting at 1
+            data: The part's bytes
+
+        Returns:
+            The part's ETag, needed to complete the upload
+
+        Raises:
+            RetryablePartError: If sending the part again may succeed
+            PresignedUrlsUnavailable: If storage refused the part
+        """
+        response = self._client.api_client.do(
+            "POST",
+            "/api/2.0/fs/create-upload-part-urls",
+            body={
+                "path": self.file_path,
+                "session_token": self._token,
+                "start_part_number": part_number,
+                "count": 1,
+                "expire_time": _expire_time(),
+            },
+        )
+        url = response["upload_part_urls"][0]
+        headers = {"Content-Type": "application/octet-stream"}
+        headers.update({h["name"]: h["value"] for h in url.get("headers", [])})
+        try:
+            sent = _storage_session().put(
+                url["url"], headers=headers, data=data, timeout=_PART_TIMEOUT_SECONDS
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise RetryablePartError(str(e)) from e
+        if sent.status_code in (200, 201):
+            return sent.headers.get("ETag", "")
+        if sent.status_code in _RETRYABLE_STATUSES or _url_expired(sent):
+            raise RetryablePartError(f"Storage returned {sent.status_code}")
+        if sent.status_code == 403:
+            raise PresignedUrlsUnavailable(sent.text)
+        raise Exception(
+            f"Failed to upload part {part_number}: storage returned "
+            f"{sent.status_code}: {sent.text}"
+        )
+
+    def complete(self, etags: Dict[int, str]) -> None:
+        """
+        Write the file from its uploaded parts.
+
+        Args:
+            etags: Every part's ETag, by part number
+        """
+        self._client.api_client.do(
+            "POST",
+            f"/api/2.0/fs/files{quote(self.file_path)}",
+            query={
+                "action": "complete-upload",
+                "upload_type": "multipart",
+                "session_token": self._token,
+            },
+            body={
+                "parts": [
+                    {"part_number": number, "etag": etags[number]}
+                    for number in sorted(etags)
+                ]
+            },
+        )
+
+    def abort(self) -> None:
+        """Discard the uploaded parts without writing the file."""
+        response = self._client.api_client.do(
+            "POST",
+            "/api/2.0/fs/create-abort-upload-url",
+            body={
+                "path": self.file_path,
+                "session_token": self._token,
+                "expire_time": _expire_time(),
+            },
+        )
+        url = response["abort_upload_url"]
+        headers = {h["name"]: h["value"] for h in url.get("headers", [])}
+        _storage_session().delete(
+            url["url"], headers=headers, timeout=_PART_TIMEOUT_SECONDS
+        )
+
+
+def _url_expired(response: requests.Response) -> bool:
+    """Tell whether storage refused a part because its URL expired."""
+    return response.status_code == 403 and (
+        "Request has expired" in response.text
+        or "Signature not valid in the specified time frame" in response.text
+    )
+
+
+def read_part(contents: BinaryIO, part_size: int) -> bytes:
+    """
+    Read one part of a stream.
+
+    Args:
+        contents: The stream
+        part_size: Bytes per part
+
+    Returns:
+        `part_size` bytes, or fewer only at the end of the stream
+    """
+    part = bytearray()
+    while len(part) < part_size:
+        chunk = contents.read(part_size - len(part))
+        if not chunk:
+            break
+        part += chunk
+    return bytes(part)
+
+
+def _send_part(session: MultipartSession, number: int, data: bytes) -> Tuple[int, str]:
+    """Send a part, retrying it on its own after transient failures."""
+    for attempt in range(_PART_ATTEMPTS):
+        try:
+            return number, session.upload_part(number, data)
+        except RetryablePartError:
+            if attempt == _PART_ATTEMPTS - 1:
+                raise
+        except PresignedUrlsUnavailable as e:
+            if number == 1:
+                raise
+            # Too late to fall back: earlier parts were read and sent
+            raise Exception(f"Failed to upload part {number}: {e}") from e
+            time.sleep(_RETRY_DELAY_SECONDS * 2**attempt)
+
+
+def upload_parts(
+    session: MultipartSession,
+    contents: BinaryIO,
+    part_size: int,
+    parallelism: int,
+    first: bytes,
+) -> None:
+    """
+    Upload a stream in parts, a bounded number at a time, and complete it.
+
+    Parts are read on the calling thread; a part is only read once fewer
+    than `parallelism` parts are in flight. The first part is sent on its
+    own, so that storage refusing presigned uploads is known before more
+    of the stream is read.
+
+    Args:
+        session: The started multipart session
+        contents: The rest of the stream
+        part_size: Bytes per part
+        parallelism: Maximum number of parts sent at once
+        first: The stream's first part, already read
+
+    Raises:
+        Exception: Whatever a read or a part raised. The session was
+            aborted and every part thread has finished.
+    """
+    etags: Dict[int, str] = {}
+    pending: Set[Future] = set()
+    executor = ThreadPoolExecutor(
+        max_workers=max(parallelism, 1), thread_name_prefix="volume-upload"
+    )
+    try:
+        number, part = 1, first
+        while True:
+            pending.add(executor.submit(_send_part, session, number, part))
+            if number == 1 or len(pending) >= parallelism:
+                # Wait for a free slot before reading the next part
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            else:
+                # Stop early if a part has already failed for good
+                done, pending = wait(pending, timeout=0)
+            etags.update(future.result() for future in done)
+            if len(part) < part_size:
+                break
+            number, part = number + 1, read_part(contents, part_size)
+            if not part:
+                break
+        etags.update(future.result() for future in wait(pending)[0])
+    except BaseException:
+        for future in pending:
+            future.cancel()
+        # No part may reach storage after the session is aborted
+        executor.shutdown(wait=True)
+        with suppress(Exception):
+            # Best effort: storage discards abandoned parts eventually
+            session.abort()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+    session.complete(etags)
+
+
+def _chain(first: bytes, contents: BinaryIO, part_size: int) -> Iterator[bytes]:
+    yield first
+    while part := contents.read(part_size):
+        yield part
+
+
+def upload_stream(
+    client: WorkspaceClient,
+    file_path: str,
+    contents: BinaryIO,
+    overwrite: bool,
+    part_size: int,
+    parallelism: int,
+) -> None:
+    """
+    Upload a stream into a Unity Catalog volume.
+
+    Args:
+        client: The workspace client used for Files API calls
+        file_path: Full path of the file inside a Unity Catalog volume
+        contents: The stream to upload
+        overwrite: Whether an existing file is replaced
+        part_size: Bytes per part
+        parallelism: Maximum number of parts sent at once
+
+    Raises:
+        Exception: Whatever a read or the Files API raised; no file was
+            written
+    """
+    first = read_part(contents, part_size)
+    if len(first) < part_size:
+        # The whole stream fits in one part
+        _put(client, file_path, overwrite, first)
+        return
+    session = MultipartSession(client, file_path, overwrite)
+    if session.start():
+        try:
+            upload_parts(session, contents, part_size, parallelism, first)
+            return
+        except PresignedUrlsUnavailable:
+            # Refused on the first part, before anything else was read
+            pass
+    _put(client, file_path, overwrite, _chain(first, contents, part_size))
+
+
+def _put(client: WorkspaceClient, file_path: str, overwrite: bool, data: Any) -> None:
+    """Upload a file in a single Files API request."""
+    client.api_client.do(
+        "PUT",
+        f"/api/2.0/fs/files{quote(file_path)}",
+        query={"overwrite": overwrite},
+        headers={"Content-Type": "application/octet-stream"},
+        data=data,
+    )
@@ -0,0 +1,23 @@
+"""
+Databricks workspace client.
+
+This module provides a shared WorkspaceClient for calls to the workspace
+APIs, such as the Files API used for Unity Catalog volumes.
+"""
+
+from functools import lru_cache
+
+from databricks.sdk import WorkspaceClient
+
+
+@lru_cache(maxsize=None)
+def get_workspace_client() -> WorkspaceClient:
+    """
+    Get the shared workspace client, creating it on first use.
+
+    In Databricks Apps, authentication is configured automatically.
+
+    Returns:
+        The workspace client
+    """
+    return WorkspaceClient()
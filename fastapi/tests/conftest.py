@@ -1,9 +1,12 @@
 """Test configuration for the FastAPI application."""
 
 import pytest
+from databricks.sdk.errors import NotFound
+from databricks.sdk.service.catalog import TableInfo
 from fastapi.testclient import TestClient
 
 from app import app
+from services.schema import schema_registry
 
 
 @pytest.fixture(scope="session")
@@ -21,3 +24,26 @@ def client(app_instance):
         # Setup before test - can add authentication or other context
         yield test_client
         # Teardown after test - can clean up resources
+
+
+@pytest.fixture(autouse=True)
+def table_schemas(mocker):
+    """
+    Serve table schemas from a dict instead of Unity Catalog.
+
+    Tables not in the dict have an unknown schema, so they are not
+    validated locally.
+    """
+    tables = {}
+
+    def get_table(full_name):
+        if full_name not in tables:
+            raise NotFound(f"Table not found: {full_name}")
+        return TableInfo(full_name=full_name, columns=tables[full_name])
+
+    mocker.patch(
+        "services.schema.get_workspace_client",
+        return_value=mocker.Mock(tables=mocker.Mock(get=get_table)),
+    )
+    yield tables
+    schema_registry.clear()
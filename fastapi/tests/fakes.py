@@ -0,0 +1,187 @@
+"""
+In-memory stand-ins for the Databricks services used by the application.
+
+`FakeFilesAPI` mimics `WorkspaceClient.files` and `FakeWarehouse` hands out
+SQL connections that understand the statements the application issues, so
+that ingest and volume code paths can be tested end to end offline.
+"""
+
+import io
+import re
+from typing import Any, BinaryIO, Dict, List, Optional, Set
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from databricks.sdk.errors import AlreadyExists, NotFound
+from databricks.sdk.service.files import DownloadResponse, GetMetadataResponse
+
+_INSERT = re.compile(r"^INSERT INTO (\S+) \(([^)]*)\) VALUES")
+_COPY_INTO = re.compile(
+    r"^COPY INTO (\S+) FROM '([^']*)' FILEFORMAT = PARQUET FILES = \((.*)\)$"
+)
+_HISTORY = re.compile(r"^DESCRIBE HISTORY (\S+) LIMIT 1$")
+_SELECT_ALL = re.compile(
+    r"^SELECT \* FROM (\S+)(?: VERSION AS OF \d+)?"
+    r"(?: LIMIT (\d+)(?: OFFSET (\d+))?)?$"
+)
+
+
+class FakeFilesAPI:
+    """An in-memory Files API."""
+
+    def __init__(self):
+        self.files: Dict[str, bytes] = {}
+        self.deleted: List[str] = []
+
+    def upload(
+        self, file_path: str, contents: BinaryIO, overwrite: Optional[bool] = None
+    ):
+        if not overwrite and file_path in self.files:
+            raise AlreadyExists(f"File already exists: {file_path}")
+        self.files[file_path] = contents.read()
+
+    def download(self, file_path: str) -> DownloadResponse:
+        data = self._get(file_path)
+        return DownloadResponse(
+            contents=io.BytesIO(data),
+            content_length=len(data),
+            content_type="application/octet-stream",
+            last_modified="Wed, 01 Jan 2025 00:00:00 GMT",
+        )
+
+    def get_metadata(self, file_path: str) -> GetMetadataResponse:
+        data = self._get(file_path)
+        return GetMetadataResponse(
+            content_length=len(data),
+            content_type="application/octet-stream",
+            last_modified="Wed, 01 Jan 2025 00:00:00 GMT",
+        )
+
+    def delete(self, file_path: str):
+        self._get(file_path)
+        del self.files[file_path]
+        self.deleted.append(file_path)
+
+    def _get(self, file_path: str) -> bytes:
+        if file_path not in self.files:
+            raise NotFound(f"File not found: {file_path}")
+        return self.files[file_path]
+
+
+class FakeWarehouse:
+    """An in-memory SQL warehouse storing tables as lists of records."""
+
+    def __init__(self, files: Optional[FakeFilesAPI] = None):
+        self.files = files or FakeFilesAPI()
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.versions: Dict[str, int] = {}
+        self.views: Set[str] = set()
+        self.statements: List[str] = []
+
+    def connect(self) -> "FakeConnection":
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    """A connection to a `FakeWarehouse`."""
+
+    def __init__(self, warehouse: FakeWarehouse):
+        self.warehouse = warehouse
+        self.open = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def cursor(self) -> "FakeCursor":
+        return FakeCursor(self.warehouse)
+
+    def close(self):
+        self.open = False
+
+
+class FakeCursor:
+    """
+    A cursor running INSERT, COPY INTO, DESCRIBE HISTORY and paged
+    SELECT * statements.
+    """
+
+    def __init__(self, warehouse: FakeWarehouse):
+        self.warehouse = warehouse
+        self.description = None
+        self.rowcount = -1
+        self._rows: List[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, operation: str, parameters: Optional[List[Any]] = None):
+        statement = " ".join(operation.split())
+        self.warehouse.statements.append(statement)
+
+        if match := _INSERT.match(statement):
+            columns = [col.strip() for col in match.group(2).split(",")]
+            values = list(parameters or [])
+            records = [
+                dict(zip(columns, values[i : i + len(columns)]))
+                for i in range(0, len(values), len(columns))
+            ]
+            self._append(match.group(1), records)
+        elif match := _COPY_INTO.match(statement):
+            source = match.group(2).rstrip("/")
+            records = []
+            for name in re.findall(r"'([^']*)'", match.group(3)):
+                data = self.warehouse.files._get(f"{source}/{name}")
+                records.extend(pq.read_table(io.BytesIO(data)).to_pylist())
+            self._append(match.group(1), records)
+            self._set_result(
+                ["num_affected_rows", "num_inserted_rows"],
+                [(len(records), len(records))],
+            )
+        elif match := _HISTORY.match(statement):
+            if match.group(1) in self.warehouse.views:
+                raise Exception(
+                    "[DELTA_ONLY_OPERATION] DESCRIBE HISTORY is only supported "
+                    "for Delta tables"
+                )
+            if match.group(1) not in self.warehouse.tables:
+                raise Exception(f"Table not found: {match.group(1)}")
+            version = self.warehouse.versions.get(match.group(1), 0)
+            self._set_result(["version"], [(version,)])
+        elif match := _SELECT_ALL.match(statement):
+            records = self.warehouse.tables.get(match.group(1), [])
+            offset = int(match.group(3) or 0)
+            limit = int(match.group(2)) if match.group(2) else len(records)
+            records = records[offset : offset + limit]
+            columns = list(records[0]) if records else []
+            self._set_result(columns, [tuple(r.values()) for r in records])
+        else:
+            raise Exception(f"Unsupported statement: {statement}")
+
+    def fetchall(self) -> List[tuple]:
+        return self._rows
+
+    def fetchall_arrow(self) -> pa.Table:
+        columns = [col[0] for col in self.description]
+        return pa.Table.from_pylist([dict(zip(columns, row)) for row in self._rows])
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _append(self, table: str, records: List[Dict[str, Any]]):
+        self.warehouse.tables.setdefault(table, []).extend(records)
+        self.warehouse.versions[table] = self.warehouse.versions.get(table, 0) + 1
+        self.rowcount = len(records)
+
+    def _set_result(self, columns: List[str], rows: List[tuple]):
+        self.description = [(col,) for col in columns]
+        self._rows = rows
+        self.rowcount = len(rows)
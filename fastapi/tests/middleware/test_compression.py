@@ -0,0 +1,229 @@
+"""Tests for the response compression middleware."""
+
+import gzip
+import zlib
+
+import pytest
+import zstandard
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from middleware import compression
+from middleware.compression import CompressionMiddleware, negotiate_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+ENCODINGS = [
+    "gzip",
+    "zstd",
+    pytest.param(
+        "br", marks=pytest.mark.skipif(brotli is None, reason="brotli not installed")
+    ),
+]
+
+BODY = b'{"id": 1, "name": "Example"}\n' * 200
+
+
+def _decode(encoding: str, data: bytes) -> bytes:
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+    return brotli.decompress(data)
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    async def large():
+        return Response(BODY, media_type="application/json")
+
+    @app.get("/small")
+    async def small():
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(5):
+                yield BODY
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    @app.get("/parquet")
+    async def parquet():
+        return Response(BODY, media_type="application/vnd.apache.parquet")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(
+            gzip.compress(BODY),
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    @app.get("/ranged")
+    async def ranged():
+        return Response(
+            BODY,
+            media_type="text/csv",
+            headers={"Accept-Ranges": "bytes", "ETag": '"v1"'},
+        )
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def _get_raw(client, path, accept_encoding):
+    """Fetch a response without letting the client decode it."""
+    with client.stream(
+        "GET", path, headers={"Accept-Encoding": accept_encoding}
+    ) as response:
+        return response, b"".join(response.iter_raw())
+
+
+class TestNegotiateEncoding:
+    """Tests for choosing an encoding from Accept-Encoding."""
+
+    @pytest.mark.parametrize(
+        "accept_encoding, expected",
+        [
+            ("gzip, deflate", "gzip"),
+            ("gzip, zstd, br", "zstd"),
+            ("gzip;q=1.0, zstd;q=0.5", "gzip"),
+            ("br", "br"),
+            ("*", "zstd"),
+            ("zstd;q=0, gzip", "gzip"),
+            ("identity", None),
+            (None, None),
+        ],
+    )
+    def test_negotiate(self, accept_encoding, expected):
+        """Test that client weights win and ties follow server preference."""
+        encodings = ["zstd", "br", "gzip"]
+        assert negotiate_encoding(accept_encoding, encodings) == expected
+
+    def test_brotli_is_optional(self, monkeypatch):
+        """Test that br is not offered without the brotli package."""
+        monkeypatch.setattr(compression, "brotli", None)
+
+        middleware = CompressionMiddleware(app=None)
+
+        assert middleware.encodings == ["zstd", "gzip"]
+
+
+class TestCompressionMiddleware:
+    """Test suite for CompressionMiddleware."""
+
+    @pytest.mark.parametrize("encoding", ENCODINGS)
+    def test_compresses_large_response(self, client, encoding):
+        """Test that large bodies are compressed with the chosen encoding."""
+        response, raw = _get_raw(client, "/large", encoding)
+
+        assert response.headers["content-encoding"] == encoding
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert int(response.headers["content-length"]) == len(raw)
+        assert len(raw) < len(BODY) / 10
+        assert _decode(encoding, raw) == BODY
+
+    def test_skips_small_response(self, client):
+        """Test that bodies under the threshold are sent as is."""
+        response, raw = _get_raw(client, "/small", "gzip")
+
+        assert "content-encoding" not in response.headers
+        assert raw == b'{"ok": true}'
+
+    def test_skips_without_accept_encoding(self, client):
+        """Test that clients not accepting an encoding get plain bodies."""
+        response, raw = _get_raw(client, "/large", "identity")
+
+        assert "content-encoding" not in response.headers
+        assert raw == BODY
+
+    def test_skips_compressed_content_type(self, client):
+        """Test that already compressed types such as Parquet are left alone."""
+        response, raw = _get_raw(client, "/parquet", "gzip")
+
+        assert "content-encoding" not in response.headers
+        assert raw == BODY
+
+    def test_skips_encoded_response(self, client):
+        """Test that bodies the app encoded itself are not encoded twice."""
+        response, raw = _get_raw(client, "/encoded", "zstd")
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert gzip.decompress(raw) == BODY
+
+    def test_compresses_full_response_offering_ranges(self, client):
+        """Test that a full response is compressed without offering ranges."""
+        response, raw = _get_raw(client, "/ranged", "gzip")
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "accept-ranges" not in response.headers
+        assert response.headers["etag"] == 'W/"v1"'
+        assert gzip.decompress(raw) == BODY
+
+    def test_skips_range_request(self, client):
+        """Test that responses to range requests keep their byte offsets."""
+        with client.stream(
+            "GET", "/ranged", headers={"Accept-Encoding": "gzip", "Range": "bytes=0-9"}
+        ) as response:
+            raw = b"".join(response.iter_raw())
+
+        assert "content-encoding" not in response.headers
+        assert response.headers["accept-ranges"] == "bytes"
+        assert raw == BODY
+
+    @pytest.mark.parametrize("encoding", ENCODINGS)
+    def test_compresses_stream(self, client, encoding):
+        """Test that streamed bodies are compressed without a length."""
+        response, raw = _get_raw(client, "/stream", encoding)
+
+        assert response.headers["content-encoding"] == encoding
+        assert "content-length" not in response.headers
+        assert _decode(encoding, raw) == BODY * 5
+
+    @pytest.mark.asyncio
+    async def test_stream_chunks_are_flushed(self):
+        """Test that each streamed chunk can be decoded as it arrives."""
+        chunks = [b"first chunk " * 50, b"second chunk " * 50]
+
+        async def app(scope, receive, send):
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [(b"content-type", b"text/csv")],
+                }
+            )
+            for i, chunk in enumerate(chunks):
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": i < len(chunks) - 1,
+                    }
+                )
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = CompressionMiddleware(app, encodings=["gzip"])
+        scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+        await middleware(scope, None, send)
+
+        bodies = [m["body"] for m in sent if m["type"] == "http.response.body"]
+        decoder = zlib.decompressobj(31)
+        # The first chunk decodes completely before the stream has ended
+        assert decoder.decompress(bodies[0]) == chunks[0]
+        assert decoder.decompress(bodies[1]) == chunks[1]
+        assert decoder.eof
@@ -0,0 +1,101 @@
+"""Tests for the per-request profiling middleware."""
+
+import json
+import os
+import re
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from config.settings import Settings
+from middleware.profiling import ProfilingMiddleware, is_profile_id, write_profile
+from middleware.stack import register_middleware
+
+
+def _make_app(tmp_path, enabled=True) -> FastAPI:
+    app = FastAPI()
+    settings = Settings(profiling_enabled=enabled, profile_dir=str(tmp_path))
+    register_middleware(app, settings)
+
+    @app.get("/slow")
+    async def slow():
+        time.sleep(0.01)
+        return {"ok": True}
+
+    return app
+
+
+class TestProfilingMiddleware:
+    """Test suite for ProfilingMiddleware."""
+
+    def test_profiles_request_with_header(self, tmp_path):
+        """Test that a profile is stored under the returned request ID."""
+        with TestClient(_make_app(tmp_path)) as client:
+            response = client.get("/slow", headers={"X-Profile": "1"})
+
+        assert response.status_code == 200
+        profile_id = response.headers["x-profile-id"]
+        with open(tmp_path / f"{profile_id}.speedscope.json") as f:
+            profile = json.load(f)
+        assert profile["$schema"].startswith("https://www.speedscope.app")
+
+    def test_uses_client_request_id(self, tmp_path):
+        """Test that the X-Request-ID prefixes a profile ID of its own."""
+        with TestClient(_make_app(tmp_path)) as client:
+            ids = [
+                client.get(
+                    "/slow", headers={"X-Profile": "1", "X-Request-ID": "abc-123"}
+                ).headers["x-profile-id"]
+                for _ in range(2)
+            ]
+
+        assert all(re.fullmatch(r"abc-123-[0-9a-f]{32}", id_) for id_ in ids)
+        assert ids[0] != ids[1]
+        assert sorted(os.listdir(tmp_path)) == sorted(
+            f"{id_}.speedscope.json" for id_ in ids
+        )
+
+    def test_sanitizes_unsafe_request_id(self, tmp_path):
+        """Test that request IDs are not used as paths."""
+        with TestClient(_make_app(tmp_path)) as client:
+            response = client.get(
+                "/slow", headers={"X-Profile": "1", "X-Request-ID": "../escape" * 10}
+            )
+
+        profile_id = response.headers["x-profile-id"]
+        assert is_profile_id(profile_id)
+        assert profile_id.startswith("escapeescape")
+        assert os.listdir(tmp_path) == [f"{profile_id}.speedscope.json"]
+
+    def test_passes_through_without_header(self, tmp_path):
+        """Test that requests without the header are not profiled."""
+        with TestClient(_make_app(tmp_path)) as client:
+            response = client.get("/slow")
+
+        assert "x-profile-id" not in response.headers
+        assert os.listdir(tmp_path) == []
+
+    def test_not_registered_when_disabled(self, tmp_path):
+        """Test that disabled profiling adds no middleware at all."""
+        app = _make_app(tmp_path, enabled=False)
+
+        assert ProfilingMiddleware not in [m.cls for m in app.user_middleware]
+        with TestClient(app) as client:
+            response = client.get("/slow", headers={"X-Profile": "1"})
+        assert "x-profile-id" not in response.headers
+
+
+class TestWriteProfile:
+    """Tests for storing profiles."""
+
+    def test_keeps_most_recent_profiles(self, tmp_path):
+        """Test that the oldest profiles are removed beyond the limit."""
+        for i in range(3):
+            path = write_profile(str(tmp_path), f"p{i}", "{}", max_files=2)
+            os.utime(path, (i, i))
+
+        assert sorted(os.listdir(tmp_path)) == [
+            "p1.speedscope.json",
+            "p2.speedscope.json",
+        ]
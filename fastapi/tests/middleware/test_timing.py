@@ -0,0 +1,64 @@
+"""Tests for the Server-Timing middleware."""
+
+import pytest
+
+from config.settings import Settings, get_settings
+from services.db import connector
+from tests.fakes import FakeWarehouse
+
+
+@pytest.fixture
+def warehouse(mocker, app_instance):
+    """Serve the app from an in-memory warehouse."""
+    warehouse = FakeWarehouse()
+    warehouse.tables["main.default.items"] = [{"id": 1}, {"id": 2}]
+    mocker.patch(
+        "services.db.connector._connect", side_effect=lambda wid: warehouse.connect()
+    )
+
+    settings = Settings()
+    settings.databricks_warehouse_id = "test-warehouse-123"
+    app_instance.dependency_overrides[get_settings] = lambda: settings
+    yield warehouse
+    app_instance.dependency_overrides.clear()
+    connector.close_connections()
+    connector.query_cache.clear()
+
+
+class TestServerTiming:
+    """Test suite for ServerTimingMiddleware."""
+
+    def test_table_response_reports_query_phases(self, client, warehouse):
+        """Test that a table response breaks down where the time went."""
+        response = client.get(
+            "/api/v1/table",
+            params={
+                "catalog": "main",
+                "schema": "default",
+                "table": "items",
+                "columns": "*",
+            },
+        )
+
+        assert response.status_code == 200
+        phases = [
+            entry.split(";")[0].strip()
+            for entry in response.headers["server-timing"].split(",")
+        ]
+        for phase in ("checkout", "execute", "fetch", "convert", "serialize", "app"):
+            assert phase in phases
+
+    def test_counts_rows_and_bytes(self, client, warehouse):
+        """Test that returned rows and bytes are counted."""
+        params = {"catalog": "main", "schema": "default", "table": "items"}
+        client.get("/api/v1/table", params=params)
+
+        metrics = client.get("/api/v1/metrics").text
+
+        assert 'databricks_rows_returned_total{endpoint="table",format="json"}' in (
+            metrics
+        )
+        assert 'http_response_bytes_total{route="/api/v1/table"}' in metrics
+        assert 'databricks_sql_pool_connections{warehouse="test-warehouse-123"}' in (
+            metrics
+        )
@@ -0,0 +1,16 @@
+"""Tests for the metrics endpoint."""
+
+from fastapi import status
+
+
+class TestMetrics:
+    """Test suite for the /metrics endpoint."""
+
+    def test_metrics_endpoint(self, client):
+        """Test that metrics are served in the Prometheus text format."""
+        response = client.get("/api/v1/metrics")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "databricks_query_phase_seconds" in response.text
+        assert "databricks_rows_returned_total" in response.text
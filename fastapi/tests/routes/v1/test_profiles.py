@@ -0,0 +1,46 @@
+"""Tests for the profile endpoint."""
+
+import pytest
+from fastapi import HTTPException
+
+from config.settings import Settings
+from routes.v1.profiles import get_profile
+
+
+@pytest.fixture
+def settings(tmp_path):
+    return Settings(profiling_enabled=True, profile_dir=str(tmp_path))
+
+
+class TestGetProfile:
+    """Test suite for the /profile endpoint."""
+
+    @pytest.mark.asyncio
+    async def test_returns_stored_profile(self, settings, tmp_path):
+        """Test that a stored profile is served as a file."""
+        (tmp_path / "abc.speedscope.json").write_text("{}")
+
+        response = await get_profile(profile_id="abc", settings=settings)
+
+        assert response.path == str(tmp_path / "abc.speedscope.json")
+        assert response.media_type == "application/json"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("profile_id", ["missing", "../etc/passwd"])
+    async def test_unknown_profile(self, settings, profile_id):
+        """Test that missing or unsafe IDs are not found."""
+        with pytest.raises(HTTPException) as exc_info:
+            await get_profile(profile_id=profile_id, settings=settings)
+
+        assert exc_info.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_disabled(self, tmp_path):
+        """Test that profiles are not served when profiling is disabled."""
+        (tmp_path / "abc.speedscope.json").write_text("{}")
+        settings = Settings(profiling_enabled=False, profile_dir=str(tmp_path))
+
+        with pytest.raises(HTTPException) as exc_info:
+            await get_profile(profile_id="abc", settings=settings)
+
+        assert exc_info.value.status_code == 404
@@ -1,11 +1,39 @@
 """Tests for the tables module using pure pytest techniques."""
 
+import asyncio
+import io
+import json
+import re
+from datetime import datetime
+from decimal import Decimal
+from functools import partial
+
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
+from databricks.sdk.service.catalog import ColumnInfo, ColumnTypeName
+from pydantic import ValidationError
 
-from routes.v1.tables import table, insert_table_data
+from routes.v1.tables import (
+    aggregate_table,
+    insert_table_data,
+    preview_table,
+    stream_table,
+    table,
+)
 from models.tables import TableInsertRequest
-from config.settings import Settings
-from errors.exceptions import ConfigurationError, DatabaseError
+from config.settings import Settings, get_settings
+from errors.exceptions import ConfigurationError, DatabaseError, QueryTimeoutError
+from errors.exceptions import ValidationError as AppValidationError
+from services.db import connector, versions
+from services.db.connector import InsertBatchResult, InsertError, InsertResult
+from tests.fakes import FakeWarehouse
+
+
+@pytest.fixture(autouse=True)
+def table_version(mocker):
+    """Report tables as unversioned unless a test sets a version."""
+    return mocker.patch("routes.v1.tables.table_version_async", return_value=None)
 
 
 @pytest.fixture
@@ -24,6 +52,29 @@ def mock_settings_no_warehouse():
     return settings
 
 
+class DisconnectedRequest:
+    """A request whose client has already gone away."""
+
+    async def is_disconnected(self):
+        return True
+
+
+@pytest.fixture
+def hanging_query(mocker):
+    """Patch query_async with a query that never finishes."""
+    state = {"cancelled": False}
+
+    async def mock_query(*args, **kwargs):
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    mocker.patch("routes.v1.tables.query_async", mock_query)
+    return state
+
+
 @pytest.fixture
 def mock_query_result():
     """Factory fixture for query results."""
@@ -45,18 +96,18 @@ class TestTableFunction:
         # Setup
         test_data = mock_query_result()
 
-        # Create a test function to replace query
-        def mock_query(sql_query, warehouse_id, as_dict=True):
+        # Create a test function to replace query_async
+        async def mock_query(sql_query, warehouse_id, as_dict=True, parameters=None):
             assert "test_catalog.test_schema.test_table" in sql_query
             assert "LIMIT 10 OFFSET 0" in sql_query
             assert warehouse_id == "test-warehouse-123"
             return test_data
 
         # Apply the monkeypatch
-        mocker.patch("routes.v1.tables.query", mock_query)
+        mocker.patch("routes.v1.tables.query_async", mock_query)
 
         # Call function directly
-        result = await table(
+        response = await table(
             catalog="test_catalog",
             schema="test_schema",
             table="test_table",
@@ -66,11 +117,183 @@ class TestTableFunction:
             filter_expr=None,
             settings=mock_settings,
         )
+        result = json.loads(response.body)
 
         # Assert result
-        assert result.data == test_data
-        assert result.count == 2
-        assert result.total is None
+        assert result["data"] == test_data
+        assert result["count"] == 2
+        assert result["total"] is None
+
+    async def test_table_function_encodes_connector_types(self, mock_settings, mocker):
+        """Test that Decimal, datetime and bytes values are encoded directly."""
+        row = {
+            "amount": Decimal("12.50"),
+            "quantity": Decimal("3"),
+            "created_at": datetime(2025, 1, 2, 3, 4, 5),
+            "payload": b"\xff\x00",
+        }
+        mocker.patch("routes.v1.tables.query_async", return_value=[row])
+
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=10,
+            offset=0,
+            columns="*",
+            filter_expr=None,
+            settings=mock_settings,
+        )
+
+        assert json.loads(response.body)["data"] == [
+            {
+                "amount": 12.5,
+                "quantity": 3,
+                "created_at": "2025-01-02T03:04:05",
+                "payload": "/wA=",
+            }
+        ]
+
+    async def test_table_function_rejects_unknown_columns(
+        self, mock_settings, mocker, table_schemas
+    ):
+        """Test that unknown columns are rejected without running a query."""
+        table_schemas["test_catalog.test_schema.test_table"] = [
+            ColumnInfo(name="id", type_name=ColumnTypeName.LONG)
+        ]
+        mock_query = mocker.patch("routes.v1.tables.query_async")
+
+        with pytest.raises(AppValidationError) as exc_info:
+            await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=10,
+                offset=0,
+                columns="id, nme",
+                filter_expr=None,
+                settings=mock_settings,
+            )
+
+        assert exc_info.value.details["unknown_columns"] == ["nme"]
+        mock_query.assert_not_called()
+
+    async def test_table_function_schema_mismatch_refreshes_schema(
+        self, mock_settings, mocker, table_schemas
+    ):
+        """Test that a query failing on a missing column reloads the schema."""
+        table_schemas["test_catalog.test_schema.test_table"] = [
+            ColumnInfo(name="id", type_name=ColumnTypeName.LONG)
+        ]
+        mocker.patch(
+            "routes.v1.tables.query_async",
+            side_effect=Exception("[UNRESOLVED_COLUMN] `id` cannot be resolved"),
+        )
+        call = dict(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=10,
+            offset=0,
+            columns="id",
+            filter_expr=None,
+            settings=mock_settings,
+        )
+
+        with pytest.raises(DatabaseError):
+            await table(**call)
+
+        # The column was dropped, which the reloaded schema now reflects
+        table_schemas["test_catalog.test_schema.test_table"] = [
+            ColumnInfo(name="key", type_name=ColumnTypeName.LONG)
+        ]
+        with pytest.raises(AppValidationError):
+            await table(**call)
+
+    async def test_table_function_typed_serialization(
+        self, mock_settings, mocker, table_schemas
+    ):
+        """Test that typed columns are converted using the cached schema."""
+        table_schemas["test_catalog.test_schema.test_table"] = [
+            ColumnInfo(name="amount", type_name=ColumnTypeName.DECIMAL, type_scale=2),
+            ColumnInfo(name="units", type_name=ColumnTypeName.DECIMAL, type_scale=0),
+        ]
+        mocker.patch(
+            "routes.v1.tables.query_async",
+            return_value=[{"amount": Decimal("2.50"), "units": Decimal("7")}],
+        )
+
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=10,
+            offset=0,
+            columns="amount, units",
+            filter_expr=None,
+            settings=mock_settings,
+        )
+
+        assert json.loads(response.body)["data"] == [{"amount": 2.5, "units": 7}]
+
+    async def test_table_function_expressions_are_not_converted(
+        self, mock_settings, mocker, table_schemas
+    ):
+        """Test that expressions named like a typed column keep their values."""
+        table_schemas["test_catalog.test_schema.test_table"] = [
+            ColumnInfo(name="name", type_name=ColumnTypeName.STRING),
+            ColumnInfo(name="amount", type_name=ColumnTypeName.DECIMAL, type_scale=2),
+            ColumnInfo(name="units", type_name=ColumnTypeName.DECIMAL, type_scale=0),
+        ]
+        mocker.patch(
+            "routes.v1.tables.query_async",
+            return_value=[{"units": Decimal("2.5000"), "Amount": "widget"}],
+        )
+
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=10,
+            offset=0,
+            columns="avg(units) AS units, name AS Amount",
+            filter_expr=None,
+            settings=mock_settings,
+        )
+
+        assert json.loads(response.body)["data"] == [{"units": 2.5, "Amount": "widget"}]
+
+    async def test_table_function_wide_integers(self, mock_settings, mocker):
+        """Test that integers beyond 64 bits are returned as strings."""
+        mocker.patch(
+            "routes.v1.tables.query_async",
+            return_value=[
+                {
+                    "units": Decimal("7"),
+                    "wide": Decimal("123456789012345678901234567890"),
+                    "raw": 2**70,
+                }
+            ],
+        )
+
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=10,
+            offset=0,
+            columns="*",
+            filter_expr=None,
+            settings=mock_settings,
+        )
+
+        assert json.loads(response.body)["data"] == [
+            {
+                "units": 7,
+                "wide": "123456789012345678901234567890",
+                "raw": str(2**70),
+            }
+        ]
 
     async def test_table_function_missing_warehouse(self, mock_settings_no_warehouse):
         """Test function raises error when warehouse ID is missing."""
@@ -94,11 +317,11 @@ class TestTableFunction:
         """Test function handles database errors correctly."""
 
         # Setup - create a function that raises an exception
-        def mock_query_error(*args, **kwargs):
+        async def mock_query_error(*args, **kwargs):
             raise Exception("Database connection failed")
 
         # Apply the monkeypatch
-        mocker.patch("routes.v1.tables.query", mock_query_error)
+        mocker.patch("routes.v1.tables.query_async", mock_query_error)
 
         # Call function and expect exception
         with pytest.raises(DatabaseError) as exc_info:
@@ -122,16 +345,18 @@ class TestTableFunction:
         filter_test_data = [{"id": 6, "timestamp": "2025-04-01"}]
 
         # Create a test function with assertions
-        def mock_query_with_filter(sql_query, warehouse_id, as_dict=True):
+        async def mock_query_with_filter(
+            sql_query, warehouse_id, as_dict=True, parameters=None
+        ):
             assert "WHERE id > 5 AND timestamp > '2025-04-01'" in sql_query
             assert "LIMIT 20 OFFSET 10" in sql_query
             return filter_test_data
 
         # Apply the monkeypatch
-        mocker.patch("routes.v1.tables.query", mock_query_with_filter)
+        mocker.patch("routes.v1.tables.query_async", mock_query_with_filter)
 
         # Call function with filter
-        result = await table(
+        response = await table(
             catalog="test_catalog",
             schema="test_schema",
             table="test_table",
@@ -141,10 +366,845 @@ class TestTableFunction:
             filter_expr="id > 5 AND timestamp > '2025-04-01'",
             settings=mock_settings,
         )
+        result = json.loads(response.body)
 
         # Assert result
-        assert len(result.data) == 1
-        assert result.count == 1
+        assert len(result["data"]) == 1
+        assert result["count"] == 1
+
+    @pytest.mark.parametrize("response_format", ["arrow", "parquet"])
+    async def test_table_function_binary_formats(
+        self, mock_settings, mocker, response_format
+    ):
+        """Test that binary formats are built from the Arrow result."""
+        # Setup
+        arrow_table = pa.table({"id": [1, 2], "name": ["Test", "Test2"]})
+        mock_query_arrow = mocker.patch(
+            "routes.v1.tables.query_arrow_async", return_value=arrow_table
+        )
+        mock_query = mocker.patch("routes.v1.tables.query_async")
+
+        # Call function with a binary format
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=10,
+            offset=0,
+            columns="id,name",
+            filter_expr=None,
+            settings=mock_settings,
+            format=response_format,
+        )
+
+        # Assert the body decodes back to the same table
+        if response_format == "arrow":
+            decoded = pa.ipc.open_stream(response.body).read_all()
+            assert response.media_type == "application/vnd.apache.arrow.stream"
+        else:
+            decoded = pq.read_table(io.BytesIO(response.body))
+            assert response.media_type == "application/vnd.apache.parquet"
+        assert decoded.equals(arrow_table)
+        assert response.headers["X-Row-Count"] == "2"
+        mock_query_arrow.assert_awaited_once()
+        mock_query.assert_not_called()
+
+    async def test_table_function_columnar_shape(self, mock_settings, mocker):
+        """Test that the columnar shape lists column names once."""
+        arrow_table = pa.table(
+            {
+                "id": [1, 2],
+                "amount": pa.array(
+                    [Decimal("1.50"), Decimal("2.25")], type=pa.decimal128(5, 2)
+                ),
+                "created_at": [datetime(2025, 1, 1), datetime(2025, 1, 2)],
+            }
+        )
+        mocker.patch("routes.v1.tables.query_arrow_async", return_value=arrow_table)
+        mock_query = mocker.patch("routes.v1.tables.query_async")
+
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=10,
+            offset=0,
+            columns="*",
+            filter_expr=None,
+            settings=mock_settings,
+            shape="columnar",
+        )
+
+        assert response.media_type == "application/json"
+        assert json.loads(response.body) == {
+            "columns": ["id", "amount", "created_at"],
+            "data": [
+                [1, 2],
+                [1.5, 2.25],
+                ["2025-01-01T00:00:00", "2025-01-02T00:00:00"],
+            ],
+            "count": 2,
+            "total": None,
+            "next_cursor": None,
+        }
+        mock_query.assert_not_called()
+
+    async def test_table_function_columnar_keyset(self, mock_settings, mocker):
+        """Test that the columnar shape pages by key like the rows shape."""
+        mocker.patch(
+            "routes.v1.tables.query_arrow_async",
+            return_value=pa.table({"name": ["a", "b", "c"], "id": [1, 2, 3]}),
+        )
+
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=2,
+            offset=0,
+            columns="name",
+            filter_expr=None,
+            settings=mock_settings,
+            order_by="id",
+            shape="columnar",
+        )
+
+        body = json.loads(response.body)
+        assert body["columns"] == ["name"]
+        assert body["data"] == [["a", "b"]]
+        assert body["next_cursor"] is not None
+
+    async def test_table_function_shape_requires_json(self, mock_settings):
+        """Test that a shape cannot be combined with a binary format."""
+        with pytest.raises(ValidationError):
+            await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=10,
+                offset=0,
+                columns="*",
+                filter_expr=None,
+                settings=mock_settings,
+                format="arrow",
+                shape="columnar",
+            )
+
+    async def test_table_function_keyset_pagination(self, mock_settings, mocker):
+        """Test that order_by pages by key and returns a cursor."""
+        calls = []
+
+        async def mock_query(sql_query, warehouse_id, as_dict=True, parameters=None):
+            calls.append((sql_query, parameters))
+            # One extra row tells the route there is a next page
+            if not parameters:
+                return [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}, {"id": 3}]
+            return [{"id": 3, "name": "c"}]
+
+        mocker.patch("routes.v1.tables.query_async", mock_query)
+
+        async def fetch_page(cursor=None):
+            response = await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=2,
+                offset=0,
+                columns="name",
+                filter_expr=None,
+                settings=mock_settings,
+                order_by="id",
+                cursor=cursor,
+            )
+            return json.loads(response.body)
+
+        first = await fetch_page()
+        second = await fetch_page(first["next_cursor"])
+
+        assert first["data"] == [{"name": "a"}, {"name": "b"}]
+        assert first["next_cursor"] is not None
+        assert second["data"] == [{"name": "c"}]
+        assert second["next_cursor"] is None
+
+        first_sql, first_params = calls[0]
+        assert "ORDER BY `id`" in first_sql
+        assert "LIMIT 3" in first_sql
+        assert "OFFSET" not in first_sql
+        assert "SELECT name, `id`" in first_sql
+        assert first_params == []
+
+        second_sql, second_params = calls[1]
+        assert "WHERE (`id` > ? OR `id` IS NULL)" in second_sql
+        assert second_params == [2]
+
+    async def test_table_function_keyset_key_case(
+        self, mock_settings, mocker, table_schemas
+    ):
+        """Test that order_by matches its column whatever the case."""
+        table_schemas["test_catalog.test_schema.test_table"] = [
+            ColumnInfo(name="Id", type_name=ColumnTypeName.LONG),
+            ColumnInfo(name="name", type_name=ColumnTypeName.STRING),
+        ]
+        mock_query = mocker.patch(
+            "routes.v1.tables.query_async",
+            return_value=[{"name": "a", "Id": 1}, {"name": "b", "Id": 2}],
+        )
+
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=1,
+            offset=0,
+            columns="name",
+            filter_expr=None,
+            settings=mock_settings,
+            order_by="ID",
+        )
+
+        body = json.loads(response.body)
+        assert body["data"] == [{"name": "a"}]
+        assert body["next_cursor"] is not None
+        assert "ORDER BY `Id`" in mock_query.call_args.args[0]
+
+    @pytest.mark.parametrize("shape", ["rows", "columnar"])
+    async def test_table_function_keyset_walks_null_keys(
+        self, mock_settings, mocker, shape
+    ):
+        """Test that paging through more NULL keys than a page loses no row."""
+        records = [{"id": i, "name": f"r{i}"} for i in (1, 2)] + [
+            {"id": None, "name": f"null{i}"} for i in range(5)
+        ]
+
+        def run(sql_query, parameters):
+            if "`id` > ?" in sql_query:
+                rows = [
+                    r for r in records if r["id"] is None or r["id"] > parameters[0]
+                ]
+            elif "`id` IS NULL" in sql_query:
+                rows = [r for r in records if r["id"] is None]
+            else:
+                rows = list(records)
+            rows.sort(key=lambda r: (r["id"] is None, r["id"] or 0))
+            offset = re.search(r"OFFSET (\d+)", sql_query)
+            start = int(offset.group(1)) if offset else 0
+            limit = int(re.search(r"LIMIT (\d+)", sql_query).group(1))
+            return [dict(r) for r in rows[start : start + limit]]
+
+        async def mock_query(sql_query, warehouse_id, as_dict=True, parameters=None):
+            return run(sql_query, parameters)
+
+        async def mock_query_arrow(sql_query, warehouse_id, parameters=None):
+            return pa.Table.from_pylist(
+                run(sql_query, parameters),
+                schema=pa.schema([("id", pa.int64()), ("name", pa.string())]),
+            )
+
+        mocker.patch("routes.v1.tables.query_async", mock_query)
+        mocker.patch("routes.v1.tables.query_arrow_async", mock_query_arrow)
+
+        names, cursor, pages = [], None, 0
+        while True:
+            response = await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=2,
+                offset=0,
+                columns="name",
+                filter_expr=None,
+                settings=mock_settings,
+                order_by="id",
+                cursor=cursor,
+                shape=shape,
+            )
+            body = json.loads(response.body)
+            if shape == "columnar":
+                names.extend(body["data"][0])
+            else:
+                names.extend(row["name"] for row in body["data"])
+            pages += 1
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        assert names == [r["name"] for r in records]
+        assert pages == 4
+
+    async def test_table_function_include_total(self, mock_settings, mocker):
+        """Test that the total is counted alongside the page query."""
+        started = []
+        both_started = asyncio.Event()
+
+        async def mock_query(
+            sql_query,
+            warehouse_id,
+            as_dict=True,
+            parameters=None,
+            cache_ttl=None,
+        ):
+            started.append(sql_query)
+            if len(started) == 2:
+                both_started.set()
+            # Neither query finishes until both are running
+            await asyncio.wait_for(both_started.wait(), timeout=1)
+            if "COUNT(*)" in sql_query:
+                assert "WHERE id > 1" in sql_query
+                assert "LIMIT" not in sql_query
+                assert cache_ttl == mock_settings.count_cache_ttl_seconds
+                return [{"total": 42}]
+            return [{"id": 2, "name": "Test2"}]
+
+        mocker.patch("routes.v1.tables.query_async", mock_query)
+
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=1,
+            offset=0,
+            columns="*",
+            filter_expr="id > 1",
+            settings=mock_settings,
+            include_total=True,
+        )
+        result = json.loads(response.body)
+
+        assert result["total"] == 42
+        assert result["count"] == 1
+        assert len(started) == 2
+
+    async def test_table_function_include_total_binary(self, mock_settings, mocker):
+        """Test that binary formats return the total as a header."""
+        mocker.patch(
+            "routes.v1.tables.query_arrow_async",
+            return_value=pa.table({"id": [1]}),
+        )
+        mocker.patch("routes.v1.tables.query_async", return_value=[{"total": 7}])
+
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=1,
+            offset=0,
+            columns="*",
+            filter_expr=None,
+            settings=mock_settings,
+            format="arrow",
+            include_total=True,
+        )
+
+        assert response.headers["X-Total-Count"] == "7"
+
+    async def test_table_function_timeout_cancels_query(
+        self, mock_settings, hanging_query
+    ):
+        """Test that a query running past timeout_seconds is cancelled."""
+        with pytest.raises(QueryTimeoutError) as exc_info:
+            await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=10,
+                offset=0,
+                columns="*",
+                filter_expr=None,
+                settings=mock_settings,
+                timeout_seconds=0.05,
+            )
+
+        await asyncio.sleep(0)
+        assert exc_info.value.status_code == 504
+        assert hanging_query["cancelled"]
+
+    async def test_table_function_default_timeout(self, mock_settings, hanging_query):
+        """Test that the server-wide timeout applies without timeout_seconds."""
+        mock_settings.query_timeout_seconds = 0.05
+
+        with pytest.raises(QueryTimeoutError):
+            await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=10,
+                offset=0,
+                columns="*",
+                filter_expr=None,
+                settings=mock_settings,
+            )
+
+    async def test_table_function_timeout_covers_version_lookup(
+        self, mock_settings, mocker, table_version
+    ):
+        """Test that the version lookup and the query share one time limit."""
+
+        async def slow(result, *args, **kwargs):
+            await asyncio.sleep(0.04)
+            return result
+
+        table_version.side_effect = partial(slow, None)
+        mocker.patch("routes.v1.tables.query_async", side_effect=partial(slow, []))
+
+        with pytest.raises(QueryTimeoutError) as exc_info:
+            await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=10,
+                offset=0,
+                columns="*",
+                filter_expr=None,
+                settings=mock_settings,
+                timeout_seconds=0.06,
+            )
+
+        assert exc_info.value.details == {"timeout_seconds": 0.06}
+
+    async def test_table_function_disconnect_cancels_query(
+        self, mock_settings, hanging_query
+    ):
+        """Test that a client disconnect cancels the query."""
+        response = await table(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            limit=10,
+            offset=0,
+            columns="*",
+            filter_expr=None,
+            settings=mock_settings,
+            request=DisconnectedRequest(),
+        )
+
+        await asyncio.sleep(0)
+        assert response.status_code == 499
+        assert hanging_query["cancelled"]
+
+    async def test_table_function_keyset_rejects_offset(self, mock_settings):
+        """Test that order_by cannot be combined with offset."""
+        with pytest.raises(ValidationError):
+            await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=10,
+                offset=10,
+                columns="*",
+                filter_expr=None,
+                settings=mock_settings,
+                order_by="id",
+            )
+
+    async def test_table_function_keyset_rejects_bad_key(self, mock_settings):
+        """Test that the ordering key must be a plain column name."""
+        with pytest.raises(AppValidationError):
+            await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=10,
+                offset=0,
+                columns="*",
+                filter_expr=None,
+                settings=mock_settings,
+                order_by="id; DROP TABLE x",
+            )
+
+    async def test_table_function_invalid_format(self, mock_settings):
+        """Test that an unsupported format is rejected."""
+        with pytest.raises(ValidationError):
+            await table(
+                catalog="test_catalog",
+                schema="test_schema",
+                table="test_table",
+                limit=10,
+                offset=0,
+                columns="*",
+                filter_expr=None,
+                settings=mock_settings,
+                format="xml",
+            )
+
+
+@pytest.mark.asyncio
+class TestAggregateTable:
+    """Test suite for the aggregate_table function."""
+
+    async def _aggregate(self, settings, **overrides):
+        kwargs = dict(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            aggregates="count(*), percentile(latency, 0.95)",
+            group_by="region",
+            filter_expr=None,
+            limit=1000,
+            settings=settings,
+        )
+        kwargs.update(overrides)
+        return await aggregate_table(**kwargs)
+
+    async def test_aggregate_pushes_down_group_by(self, mock_settings, mocker):
+        """Test that one GROUP BY statement computes every aggregate."""
+        mock_query = mocker.patch(
+            "routes.v1.tables.query_async",
+            return_value=[
+                {"region": "EMEA", "count": 3, "p95_latency": 0.4},
+                {"region": "US", "count": 5, "p95_latency": 0.3},
+            ],
+        )
+
+        response = await self._aggregate(mock_settings, filter_expr="latency > 0")
+
+        sql = " ".join(mock_query.call_args[0][0].split())
+        assert sql == (
+            "SELECT `region`, COUNT(*) AS `count`, "
+            "PERCENTILE_APPROX(`latency`, 0.95) AS `p95_latency` "
+            "FROM test_catalog.test_schema.test_table WHERE latency > 0 "
+            "GROUP BY `region` ORDER BY `region` LIMIT 1001"
+        )
+        assert json.loads(response.body) == {
+            "data": [
+                {"region": "EMEA", "count": 3, "p95_latency": 0.4},
+                {"region": "US", "count": 5, "p95_latency": 0.3},
+            ],
+            "count": 2,
+            "truncated": False,
+        }
+
+    async def test_aggregate_reports_truncation(self, mock_settings, mocker):
+        """Test that groups beyond the limit are dropped and flagged."""
+        mocker.patch(
+            "routes.v1.tables.query_async",
+            return_value=[{"region": r, "count": 1} for r in "abc"],
+        )
+
+        response = await self._aggregate(mock_settings, aggregates="count(*)", limit=2)
+
+        body = json.loads(response.body)
+        assert [row["region"] for row in body["data"]] == ["a", "b"]
+        assert body["truncated"] is True
+
+    async def test_aggregate_columnar(self, mock_settings, mocker):
+        """Test that groups can be returned one array per column."""
+        mocker.patch(
+            "routes.v1.tables.query_arrow_async",
+            return_value=pa.table({"region": ["EMEA", "US"], "count": [3, 5]}),
+        )
+
+        response = await self._aggregate(
+            mock_settings, aggregates="count(*)", shape="columnar"
+        )
+
+        assert json.loads(response.body) == {
+            "columns": ["region", "count"],
+            "data": [["EMEA", "US"], [3, 5]],
+            "count": 2,
+            "truncated": False,
+        }
+
+    @pytest.mark.parametrize(
+        "overrides",
+        [
+            {"group_by": "region; DROP TABLE t"},
+            {"aggregates": "stddev(latency)"},
+            {"aggregates": "sum(latency) + 1"},
+            {"aggregates": "max(latency) AS region"},
+        ],
+    )
+    async def test_aggregate_rejects_invalid_identifiers(
+        self, mock_settings, mocker, overrides
+    ):
+        """Test that nothing is pushed down unless every identifier is valid."""
+        mock_query = mocker.patch("routes.v1.tables.query_async")
+
+        with pytest.raises(AppValidationError):
+            await self._aggregate(mock_settings, **overrides)
+
+        mock_query.assert_not_called()
+
+    async def test_aggregate_rejects_unknown_columns(
+        self, mock_settings, mocker, table_schemas
+    ):
+        """Test that columns missing from the table's schema are rejected."""
+        table_schemas["test_catalog.test_schema.test_table"] = [
+            ColumnInfo(name="region", type_name=ColumnTypeName.STRING)
+        ]
+        mock_query = mocker.patch("routes.v1.tables.query_async")
+
+        with pytest.raises(AppValidationError) as exc_info:
+            await self._aggregate(mock_settings)
+
+        assert exc_info.value.details["unknown_columns"] == ["latency"]
+        mock_query.assert_not_called()
+
+    async def test_aggregate_validates_limit(self, mock_settings):
+        """Test that the number of groups is bounded."""
+        with pytest.raises(ValidationError):
+            await self._aggregate(mock_settings, limit=10001)
+
+    async def test_aggregate_query_error(self, mock_settings, mocker):
+        """Test that query failures are wrapped in a DatabaseError."""
+        mocker.patch(
+            "routes.v1.tables.query_async", side_effect=Exception("Query failed")
+        )
+
+        with pytest.raises(DatabaseError):
+            await self._aggregate(mock_settings)
+
+    async def test_aggregate_missing_warehouse(self, mock_settings_no_warehouse):
+        """Test that a missing warehouse ID raises ConfigurationError."""
+        with pytest.raises(ConfigurationError):
+            await self._aggregate(mock_settings_no_warehouse)
+
+
+@pytest.mark.asyncio
+class TestPreviewTable:
+    """Test suite for the preview_table function."""
+
+    @pytest.fixture
+    def sample(self, mocker):
+        """Patch the sample and statistics statements."""
+        query_arrow = mocker.patch(
+            "routes.v1.tables.query_arrow_async",
+            return_value=pa.table({"id": [1, 2], "name": ["a", None]}),
+        )
+        query = mocker.patch(
+            "routes.v1.tables.query_async",
+            return_value=[
+                {
+                    "rows": 4,
+                    "n0": 4,
+                    "d0": 4,
+                    "lo0": 1,
+                    "hi0": 4,
+                    "n1": 3,
+                    "d1": 2,
+                    "lo1": "a",
+                    "hi1": "b",
+                }
+            ],
+        )
+        return query_arrow, query
+
+    async def _preview(self, settings, **overrides):
+        kwargs = dict(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            columns="*",
+            limit=100,
+            settings=settings,
+        )
+        kwargs.update(overrides)
+        return await preview_table(**kwargs)
+
+    async def test_preview_samples_version(self, mock_settings, sample, table_version):
+        """Test that the sample and statistics read one version's sample."""
+        query_arrow, query = sample
+        table_version.return_value = 12
+        mock_settings.preview_sample_rows = 5000
+
+        response = await self._preview(mock_settings)
+
+        source = "test_catalog.test_schema.test_table VERSION AS OF 12 "
+        source += "TABLESAMPLE (5000 ROWS)"
+        sample_sql = " ".join(query_arrow.call_args[0][0].split())
+        assert sample_sql == f"SELECT * FROM {source} LIMIT 100"
+        assert " ".join(query.call_args[0][0].split()).endswith(f"FROM {source}")
+        # Pinned to a version, the results are cached for longer
+        assert query_arrow.call_args[1]["cache_ttl"] == 3600
+        assert query.call_args[1]["cache_ttl"] == 3600
+
+        assert json.loads(response.body) == {
+            "data": [{"id": 1, "name": "a"}, {"id": 2, "name": None}],
+            "count": 2,
+            "version": 12,
+            "sample_rows": 4,
+            "stats": {
+                "id": {"null_fraction": 0.0, "approx_distinct": 4, "min": 1, "max": 4},
+                "name": {
+                    "null_fraction": 0.25,
+                    "approx_distinct": 2,
+                    "min": "a",
+                    "max": "b",
+                },
+            },
+        }
+
+    async def test_preview_sample_percent(self, mock_settings, sample):
+        """Test that a percentage sample is random but repeatable."""
+        query_arrow, _ = sample
+
+        await self._preview(mock_settings, sample_percent=1)
+
+        sample_sql = " ".join(query_arrow.call_args[0][0].split())
+        assert "TABLESAMPLE (1 PERCENT) REPEATABLE (0)" in sample_sql
+        # Without a version the usual cache lifetime applies
+        assert query_arrow.call_args[1]["cache_ttl"] is None
+
+    async def test_preview_without_stats(self, mock_settings, sample):
+        """Test that statistics can be skipped."""
+        _, query = sample
+
+        response = await self._preview(mock_settings, stats=False)
+
+        query.assert_not_called()
+        assert json.loads(response.body)["stats"] is None
+
+    @pytest.mark.parametrize("sample_percent", [0, 101])
+    async def test_preview_validates_sample_percent(
+        self, mock_settings, sample_percent
+    ):
+        """Test that the sample percentage is bounded."""
+        with pytest.raises(ValidationError):
+            await self._preview(mock_settings, sample_percent=sample_percent)
+
+    async def test_preview_query_error(self, mock_settings, mocker):
+        """Test that query failures are wrapped in a DatabaseError."""
+        mocker.patch(
+            "routes.v1.tables.query_arrow_async", side_effect=Exception("Query failed")
+        )
+
+        with pytest.raises(DatabaseError):
+            await self._preview(mock_settings)
+
+
+@pytest.fixture
+def stream_batches(mocker):
+    """Patch the Arrow stream with fixed batches and track when it is closed."""
+    state = {"closed": False, "sql": None}
+
+    def _patch(batches):
+        async def mock_stream(sql_query, warehouse_id, batch_size):
+            state["sql"] = sql_query
+            state["batch_size"] = batch_size
+            try:
+                for batch in batches:
+                    yield batch
+            finally:
+                state["closed"] = True
+
+        mocker.patch("routes.v1.tables.stream_query_arrow_async", mock_stream)
+        return state
+
+    return _patch
+
+
+async def _collect(response):
+    return b"".join([chunk async for chunk in response.body_iterator])
+
+
+@pytest.mark.asyncio
+class TestStreamTable:
+    """Test suite for the stream_table function."""
+
+    async def _stream(self, settings, **overrides):
+        kwargs = dict(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            columns="id,name",
+            filter_expr=None,
+            limit=None,
+            format="ndjson",
+            batch_size=None,
+            settings=settings,
+        )
+        kwargs.update(overrides)
+        return await stream_table(**kwargs)
+
+    async def test_stream_table_ndjson(self, mock_settings, stream_batches):
+        """Test that batches are written as newline-delimited JSON."""
+        state = stream_batches(
+            [
+                pa.table({"id": [1, 2], "name": ["a", "b"]}),
+                pa.table({"id": [3], "name": ["c"]}),
+            ]
+        )
+
+        response = await self._stream(mock_settings, limit=5000, batch_size=2)
+        body = await _collect(response)
+
+        assert response.media_type == "application/x-ndjson"
+        assert body.decode().splitlines() == [
+            '{"id":1,"name":"a"}',
+            '{"id":2,"name":"b"}',
+            '{"id":3,"name":"c"}',
+        ]
+        assert "LIMIT 5000" in state["sql"]
+        assert state["batch_size"] == 2
+        assert state["closed"]
+
+    async def test_stream_table_csv_writes_header_once(
+        self, mock_settings, stream_batches
+    ):
+        """Test that CSV output has a single header row."""
+        stream_batches(
+            [
+                pa.table({"id": [1], "name": ["a"]}),
+                pa.table({"id": [2], "name": ["b"]}),
+            ]
+        )
+
+        response = await self._stream(mock_settings, format="csv")
+        body = await _collect(response)
+
+        assert response.media_type == "text/csv"
+        assert body.decode().splitlines() == ['"id","name"', '1,"a"', '2,"b"']
+
+    async def test_stream_table_closes_stream_when_client_stops(
+        self, mock_settings, stream_batches
+    ):
+        """Test that the warehouse stream is closed when the body is abandoned."""
+        state = stream_batches([pa.table({"id": [i]}) for i in range(100)])
+
+        response = await self._stream(mock_settings)
+        body_iterator = response.body_iterator
+        await anext(body_iterator)
+        assert not state["closed"]
+
+        await body_iterator.aclose()
+
+        assert state["closed"]
+
+    async def test_stream_table_database_error(self, mock_settings, mocker):
+        """Test that a failing statement is reported before streaming starts."""
+
+        async def mock_stream_error(*args, **kwargs):
+            raise Exception("Database connection failed")
+            yield  # pragma: no cover
+
+        mocker.patch("routes.v1.tables.stream_query_arrow_async", mock_stream_error)
+
+        with pytest.raises(DatabaseError) as exc_info:
+            await self._stream(mock_settings)
+
+        assert "Failed to query table" in str(exc_info.value)
+
+    async def test_stream_table_timeout(self, mock_settings, mocker):
+        """Test that a statement slow to return its first batch is cancelled."""
+        state = {"closed": False}
+
+        async def slow_stream(sql_query, warehouse_id, batch_size):
+            try:
+                await asyncio.Event().wait()
+                yield pa.table({"id": [1]})
+            finally:
+                state["closed"] = True
+
+        mocker.patch("routes.v1.tables.stream_query_arrow_async", slow_stream)
+
+        with pytest.raises(QueryTimeoutError):
+            await self._stream(mock_settings, timeout_seconds=0.05)
+
+        assert state["closed"]
+
+    async def test_stream_table_invalid_format(self, mock_settings):
+        """Test that an unsupported export format is rejected."""
+        with pytest.raises(ValidationError):
+            await self._stream(mock_settings, format="xml")
 
 
 @pytest.mark.asyncio
@@ -156,16 +1216,18 @@ class TestInsertTableData:
         # Setup test data
         test_data = [{"id": 1, "name": "Test1"}, {"id": 2, "name": "Test2"}]
 
-        # Create a test function to replace insert_data
-        def mock_insert_data(table_path, data, warehouse_id):
+        # Create a test function to replace insert_data_async
+        async def mock_insert_data(table_path, data, warehouse_id):
             assert table_path == "test_catalog.test_schema.test_table"
             assert data == test_data
             assert warehouse_id == "test-warehouse-123"
             # Return the actual number of records inserted
-            return len(data)
+            return InsertResult(
+                batches=[InsertBatchResult(index=0, rows=len(data), rowcount=2)]
+            )
 
         # Apply the monkeypatch
-        mocker.patch("routes.v1.tables.insert_data", mock_insert_data)
+        mocker.patch("routes.v1.tables.insert_data_async", mock_insert_data)
 
         # Create request object
         request = TableInsertRequest(
@@ -182,21 +1244,22 @@ class TestInsertTableData:
         assert result.data == test_data
         assert result.count == 2  # Number of records inserted
         assert result.total == 2  # Should match count for inserts
+        assert [batch.status for batch in result.batches] == ["inserted"]
 
     async def test_insert_table_data_empty(self, mock_settings, mocker):
         """Test table data insertion with empty data list."""
         # Setup test data
         test_data = []
 
-        # Create a test function to replace insert_data
-        def mock_insert_data(table_path, data, warehouse_id):
+        # Create a test function to replace insert_data_async
+        async def mock_insert_data(table_path, data, warehouse_id):
             assert table_path == "test_catalog.test_schema.test_table"
             assert data == test_data
             assert warehouse_id == "test-warehouse-123"
-            return 0  # Return 0 for empty data
+            return InsertResult(batches=[])  # No batches for empty data
 
         # Apply the monkeypatch
-        mocker.patch("routes.v1.tables.insert_data", mock_insert_data)
+        mocker.patch("routes.v1.tables.insert_data_async", mock_insert_data)
 
         # Create request object
         request = TableInsertRequest(
@@ -242,11 +1305,11 @@ class TestInsertTableData:
         test_data = [{"id": 1, "name": "Test"}]
 
         # Create a function that raises an exception
-        def mock_insert_data_error(*args, **kwargs):
+        async def mock_insert_data_error(*args, **kwargs):
             raise Exception("Database connection failed")
 
         # Apply the monkeypatch
-        mocker.patch("routes.v1.tables.insert_data", mock_insert_data_error)
+        mocker.patch("routes.v1.tables.insert_data_async", mock_insert_data_error)
 
         # Create request object
         request = TableInsertRequest(
@@ -262,3 +1325,291 @@ class TestInsertTableData:
 
         # Assert exception details
         assert "Failed to insert data" in str(exc_info.value)
+
+    async def test_insert_table_data_reports_failed_batches(
+        self, mock_settings, mocker
+    ):
+        """Test that a failed batch is reported along with the others."""
+        result = InsertResult(
+            batches=[
+                InsertBatchResult(index=0, rows=2, rowcount=2),
+                InsertBatchResult(index=1, rows=2, error="Bad value"),
+                InsertBatchResult(index=2, rows=1),
+            ]
+        )
+
+        async def mock_insert_data_error(*args, **kwargs):
+            raise InsertError("Failed to insert data: batch 2 of 3 failed", result)
+
+        mocker.patch("routes.v1.tables.insert_data_async", mock_insert_data_error)
+
+        request = TableInsertRequest(
+            catalog="test_catalog",
+            schema="test_schema",
+            table="test_table",
+            data=[{"id": i} for i in range(5)],
+        )
+
+        with pytest.raises(DatabaseError) as exc_info:
+            await insert_table_data(request, mock_settings)
+
+        batches = exc_info.value.details["batches"]
+        assert [batch["status"] for batch in batches] == [
+            "inserted",
+            "failed",
+            "skipped",
+        ]
+        assert batches[1]["error"] == "Bad value"
+
+
+class TestIngestTableData:
+    """End-to-end ingest tests against the in-memory warehouse and Files API."""
+
+    @pytest.fixture
+    def warehouse(self, mocker, app_instance):
+        """Serve the app from an in-memory warehouse with a staging volume."""
+        warehouse = FakeWarehouse()
+        mocker.patch(
+            "services.db.connector.get_connection",
+            side_effect=lambda wid: warehouse.connect(),
+        )
+        mocker.patch(
+            "services.ingest.get_workspace_client",
+            return_value=mocker.Mock(files=warehouse.files),
+        )
+
+        settings = Settings()
+        settings.databricks_warehouse_id = "test-warehouse-123"
+        settings.staging_volume_path = "/Volumes/main/default/staging"
+        settings.bulk_ingest_min_rows = 3
+        app_instance.dependency_overrides[get_settings] = lambda: settings
+        yield warehouse
+        app_instance.dependency_overrides.clear()
+        connector.query_cache.clear()
+
+    def _statement_kinds(self, warehouse):
+        return [statement.split()[0] for statement in warehouse.statements]
+
+    def test_small_payload_is_inserted(self, client, warehouse):
+        """Test that payloads below the threshold use INSERT statements."""
+        response = client.post(
+            "/api/v1/table",
+            json={
+                "catalog": "main",
+                "schema": "default",
+                "table": "target",
+                "data": [{"id": 1}, {"id": 2}],
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.json()["mode"] == "insert"
+        assert self._statement_kinds(warehouse) == ["INSERT"]
+        assert warehouse.tables["main.default.target"] == [{"id": 1}, {"id": 2}]
+
+    def test_large_payload_is_copied(self, client, warehouse):
+        """Test that payloads at the threshold go through COPY INTO."""
+        records = [{"id": i, "name": f"n{i}"} for i in range(3)]
+
+        response = client.post(
+            "/api/v1/table",
+            json={
+                "catalog": "main",
+                "schema": "default",
+                "table": "target",
+                "data": records,
+            },
+        )
+
+        assert response.status_code == 200
+        assert response.json()["mode"] == "copy"
+        assert response.json()["count"] == 3
+        assert self._statement_kinds(warehouse) == ["COPY"]
+        assert warehouse.tables["main.default.target"] == records
+        assert warehouse.files.files == {}
+
+    def test_large_payload_with_mismatched_record(self, client, warehouse):
+        """Test that COPY INTO rejects records with other columns, like INSERT."""
+        records = [{"id": 1}, {"id": 2}, {"id": 3, "name": "c"}]
+
+        response = client.post(
+            "/api/v1/table",
+            json={
+                "catalog": "main",
+                "schema": "default",
+                "table": "target",
+                "data": records,
+            },
+        )
+
+        assert response.status_code == 500
+        assert "record 2 has columns" in response.json()["message"]
+        assert warehouse.statements == []
+        assert warehouse.files.files == {}
+
+    @pytest.mark.parametrize(
+        "body_format, body",
+        [
+            ("ndjson", b'{"id": 1}\n{"id": 2}\n{"id": 3}\n{"id": 4}\n'),
+            ("csv", b"id\n1\n2\n3\n4\n"),
+        ],
+    )
+    def test_ingest_body(self, client, warehouse, body_format, body):
+        """Test that NDJSON and CSV bodies are loaded with COPY INTO."""
+        response = client.post(
+            "/api/v1/table/ingest",
+            params={
+                "catalog": "main",
+                "schema": "default",
+                "table": "target",
+                "format": body_format,
+            },
+            content=body,
+        )
+
+        assert response.status_code == 200
+        assert response.json()["count"] == 4
+        assert response.json()["data"] == []
+        assert self._statement_kinds(warehouse) == ["COPY"]
+        assert [r["id"] for r in warehouse.tables["main.default.target"]] == [
+            1,
+            2,
+            3,
+            4,
+        ]
+
+    def test_ingest_body_forced_insert(self, client, warehouse):
+        """Test that mode=insert loads a large body with INSERT statements."""
+        response = client.post(
+            "/api/v1/table/ingest",
+            params={
+                "catalog": "main",
+                "schema": "default",
+                "table": "target",
+                "format": "csv",
+                "mode": "insert",
+            },
+            content=b"id\n1\n2\n3\n",
+        )
+
+        assert response.status_code == 200
+        assert response.json()["mode"] == "insert"
+        assert self._statement_kinds(warehouse) == ["INSERT"]
+
+    def test_ingest_invalid_body(self, client, warehouse):
+        """Test that an unparseable body is rejected before touching SQL."""
+        response = client.post(
+            "/api/v1/table/ingest",
+            params={"catalog": "main", "schema": "default", "table": "target"},
+            content=b'{"id": ',
+        )
+
+        assert response.status_code == 400
+        assert warehouse.statements == []
+
+
+class TestTableETags:
+    """End-to-end ETag tests against the in-memory warehouse."""
+
+    @pytest.fixture
+    def table_version(self):
+        """Use the real version lookup."""
+
+    @pytest.fixture
+    def warehouse(self, mocker, app_instance):
+        """Serve the app from an in-memory warehouse."""
+        warehouse = FakeWarehouse()
+        warehouse.tables["main.default.items"] = [{"id": 1}, {"id": 2}]
+        mocker.patch(
+            "services.db.connector.get_connection",
+            side_effect=lambda wid: warehouse.connect(),
+        )
+
+        settings = Settings()
+        settings.databricks_warehouse_id = "test-warehouse-123"
+        app_instance.dependency_overrides[get_settings] = lambda: settings
+        yield warehouse
+        app_instance.dependency_overrides.clear()
+        connector.query_cache.clear()
+        versions._unversioned.clear()
+
+    PARAMS = {"catalog": "main", "schema": "default", "table": "items"}
+
+    def _selects(self, warehouse):
+        return [s for s in warehouse.statements if s.startswith("SELECT")]
+
+    def test_not_modified_skips_data_query(self, client, warehouse):
+        """Test that a current If-None-Match gets a 304 without a query."""
+        first = client.get("/api/v1/table", params=self.PARAMS)
+        etag = first.headers["etag"]
+        assert etag.startswith('W/"')
+        assert len(self._selects(warehouse)) == 1
+
+        second = client.get(
+            "/api/v1/table", params=self.PARAMS, headers={"If-None-Match": etag}
+        )
+
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
+        assert second.content == b""
+        assert len(self._selects(warehouse)) == 1
+        # The version lookup was cached and shared between the requests
+        history = [s for s in warehouse.statements if s.startswith("DESCRIBE")]
+        assert len(history) == 1
+
+    def test_etag_depends_on_query(self, client, warehouse):
+        """Test that different queries of the same version differ in ETag."""
+        rows = client.get("/api/v1/table", params=self.PARAMS)
+        columnar = client.get(
+            "/api/v1/table", params={**self.PARAMS, "shape": "columnar"}
+        )
+        limited = client.get("/api/v1/table", params={**self.PARAMS, "limit": 1})
+
+        etags = {r.headers["etag"] for r in (rows, columnar, limited)}
+        assert len(etags) == 3
+
+    def test_insert_changes_etag(self, client, warehouse):
+        """Test that writing through the API invalidates the cached version."""
+        etag = client.get("/api/v1/table", params=self.PARAMS).headers["etag"]
+
+        client.post("/api/v1/table", json={**self.PARAMS, "data": [{"id": 3}]})
+        response = client.get(
+            "/api/v1/table", params=self.PARAMS, headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["count"] == 3
+
+    def test_external_commit_is_not_served_from_stale_rows(
+        self, client, warehouse, mocker
+    ):
+        """Test that rows always come from the version behind the ETag."""
+        clock = mocker.patch("services.db.cache.time.monotonic", return_value=0.0)
+        etag = client.get("/api/v1/table", params=self.PARAMS).headers["etag"]
+
+        # A commit made outside the API, once the cached version has expired
+        # but the cached rows have not
+        warehouse.tables["main.default.items"].append({"id": 3})
+        warehouse.versions["main.default.items"] = 1
+        clock.return_value = 15.0
+        response = client.get(
+            "/api/v1/table", params=self.PARAMS, headers={"If-None-Match": etag}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert response.json()["count"] == 3
+        assert "VERSION AS OF 1" in self._selects(warehouse)[-1]
+
+    def test_unversioned_table_has_no_etag(self, client, warehouse, mocker):
+        """Test that tables without a history are served without an ETag."""
+        mocker.patch(
+            "services.db.versions.query_async",
+            side_effect=Exception("DESCRIBE HISTORY is only supported for Delta"),
+        )
+
+        response = client.get("/api/v1/table", params=self.PARAMS)
+
+        assert response.status_code == 200
+        assert "etag" not in response.headers
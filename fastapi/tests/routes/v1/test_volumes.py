@@ -0,0 +1,435 @@
+"""Tests for the volumes module."""
+
+import io
+import re
+
+import pytest
+from databricks.sdk.errors import AlreadyExists, NotFound
+from databricks.sdk.service.files import (
+    DirectoryEntry,
+    DownloadResponse,
+    GetMetadataResponse,
+)
+
+from config.settings import Settings, get_settings
+from routes.v1.volumes import guess_media_type
+from services.file_cache import FileCache
+from services.listing import listing_cache
+from services.streaming import StreamInterrupted
+
+FILE_PATH = "/Volumes/main/data/files/large.csv"
+LAST_MODIFIED = "Wed, 21 Oct 2015 07:28:00 GMT"
+DATA = bytes(range(256)) * 40
+
+
+class TestGuessMediaType:
+    """Tests for choosing the media type of a downloaded file."""
+
+    @pytest.mark.parametrize(
+        "file_name, expected",
+        [
+            ("data.csv", "text/csv"),
+            ("part-0000.parquet", "application/vnd.apache.parquet"),
+            ("archive.zip", "application/zip"),
+            ("data.csv.gz", "application/gzip"),
+            ("data.json.zst", "application/zstd"),
+            ("no_extension", "application/octet-stream"),
+        ],
+    )
+    def test_guess_media_type(self, file_name, expected):
+        """Test that compressed files are recognizable by media type."""
+        assert guess_media_type(file_name) == expected
+
+
+@pytest.fixture(autouse=True)
+def file_cache(mocker, tmp_path):
+    """Cache downloaded files in a fresh directory for each test."""
+    cache = FileCache(str(tmp_path), max_bytes=len(DATA), max_file_bytes=len(DATA))
+    mocker.patch("routes.v1.volumes.file_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def volume(mocker):
+    """Serve DATA as a volume file, recording the ranges read from storage."""
+    state = {"ranges": [], "downloads": 0}
+    w = mocker.patch("routes.v1.volumes.w")
+    w.files.get_metadata.return_value = GetMetadataResponse(
+        content_length=len(DATA), content_type="text/csv", last_modified=LAST_MODIFIED
+    )
+
+    def download(file_path):
+        state["downloads"] += 1
+        return DownloadResponse(contents=io.BytesIO(DATA))
+
+    def do(method, path, headers, raw):
+        start, end = map(int, re.match(r"bytes=(\d+)-(\d+)", headers["Range"]).groups())
+        state["ranges"].append((start, end))
+        return {"contents": io.BytesIO(DATA[start : end + 1])}
+
+    w.files.download.side_effect = download
+    w.api_client.do.side_effect = do
+    return w, state
+
+
+def _download(client, **headers):
+    return client.get(
+        "/api/v1/download",
+        params={"file_path": FILE_PATH},
+        headers={"Accept-Encoding": "gzip", **headers},
+    )
+
+
+class TestDownloadFile:
+    """Tests for downloading volume files, whole or in ranges."""
+
+    def test_whole_file(self, client, volume):
+        """Test that a plain request gets the file with its validators."""
+        response = _download(client, **{"Accept-Encoding": "identity"})
+
+        assert response.status_code == 200
+        assert response.content == DATA
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.headers["content-length"] == str(len(DATA))
+        assert response.headers["last-modified"] == LAST_MODIFIED
+        assert response.headers["etag"].startswith('"')
+
+    def test_whole_file_is_compressed(self, client, volume):
+        """Test that a full download is compressed, without offering ranges."""
+        response = _download(client)
+
+        assert response.status_code == 200
+        assert response.content == DATA
+        assert response.headers["content-encoding"] == "gzip"
+        assert "accept-ranges" not in response.headers
+        assert response.headers["etag"].startswith('W/"')
+
+    def test_range_is_not_compressed(self, client, volume):
+        """Test that byte offsets of a range refer to the file itself."""
+        response = _download(client, Range="bytes=0-9")
+
+        assert response.status_code == 206
+        assert "content-encoding" not in response.headers
+
+    def test_single_range(self, client, volume):
+        """Test that a range is read from storage on its own."""
+        _, state = volume
+
+        response = _download(client, Range="bytes=9000-")
+
+        assert response.status_code == 206
+        assert response.content == DATA[9000:]
+        assert response.headers["content-range"] == f"bytes 9000-10239/{len(DATA)}"
+        assert response.headers["content-length"] == "1240"
+        assert state == {"ranges": [(9000, 10239)], "downloads": 0}
+
+    def test_multiple_ranges(self, client, volume):
+        """Test that several ranges are sent as multipart/byteranges."""
+        _, state = volume
+
+        response = _download(client, Range="bytes=0-9, -10")
+
+        assert response.status_code == 206
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1]
+        assert int(response.headers["content-length"]) == len(response.content)
+
+        parts = response.content.split(f"--{boundary}".encode())
+        assert parts[0] == b"" and parts[-1] == b"--\r\n"
+        assert parts[1] == (
+            b"\r\nContent-Type: text/csv\r\n"
+            b"Content-Range: bytes 0-9/10240\r\n\r\n" + DATA[:10] + b"\r\n"
+        )
+        assert parts[2] == (
+            b"\r\nContent-Type: text/csv\r\n"
+            b"Content-Range: bytes 10230-10239/10240\r\n\r\n" + DATA[-10:] + b"\r\n"
+        )
+        assert state["ranges"] == [(0, 9), (10230, 10239)]
+
+    def test_if_range_current(self, client, volume):
+        """Test that ranges are served while the file is unchanged."""
+        etag = _download(client, **{"Accept-Encoding": "identity"}).headers["etag"]
+
+        assert (
+            _download(client, Range="bytes=0-9", **{"If-Range": etag}).status_code
+            == 206
+        )
+        response = _download(client, Range="bytes=0-9", **{"If-Range": LAST_MODIFIED})
+        assert response.status_code == 206
+
+    def test_if_range_changed(self, client, volume):
+        """Test that the whole file is sent once the file has changed."""
+        response = _download(client, Range="bytes=0-9", **{"If-Range": '"stale"'})
+
+        assert response.status_code == 200
+        assert response.content == DATA
+
+    def test_range_not_satisfiable(self, client, volume):
+        """Test that ranges past the end of the file are rejected."""
+        response = _download(client, Range="bytes=20000-")
+
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(DATA)}"
+
+    def test_cached_file(self, client, volume, file_cache):
+        """Test that repeated downloads are served from the disk cache."""
+        _, state = volume
+
+        responses = [_download(client) for _ in range(3)]
+
+        assert all(response.content == DATA for response in responses)
+        assert responses[2].headers["etag"] == responses[0].headers["etag"]
+        assert state["downloads"] == 1
+        assert file_cache.stats()["hits"] == 2
+
+    def test_cached_file_changed(self, client, volume):
+        """Test that a cached file is downloaded again once it has changed."""
+        w, state = volume
+        first = _download(client)
+        w.files.get_metadata.return_value = GetMetadataResponse(
+            content_length=len(DATA), last_modified="Thu, 22 Oct 2015 07:28:00 GMT"
+        )
+
+        second = _download(client)
+
+        assert second.content == DATA
+        assert second.headers["etag"] != first.headers["etag"]
+        assert state["downloads"] == 2
+
+    def test_large_file_not_cached(self, client, volume, file_cache):
+        """Test that files above the cache's size limit are streamed."""
+        _, state = volume
+        file_cache.max_file_bytes = len(DATA) - 1
+
+        for _ in range(2):
+            assert _download(client).content == DATA
+
+        assert state["downloads"] == 2
+        assert file_cache.stats()["entries"] == 0
+
+    def test_missing_file(self, client, volume):
+        """Test that a missing file is reported as 404."""
+        w, _ = volume
+        w.files.get_metadata.side_effect = NotFound("no such file")
+
+        assert _download(client).status_code == 404
+
+
+@pytest.fixture
+def uploads(mocker, app_instance):
+    """Accept volume uploads, recording the parts read from the body."""
+    state = {"parts": [], "kwargs": None}
+    upload_stream = mocker.patch("routes.v1.volumes.upload_stream")
+    settings = Settings(upload_part_size=1000, upload_parallelism=3)
+    app_instance.dependency_overrides[get_settings] = lambda: settings
+
+    def upload(client, file_path, contents, **kwargs):
+        state["kwargs"] = kwargs
+        while True:
+            part = contents.read(kwargs["part_size"])
+            if not part:
+                return
+            state["parts"].append(part)
+
+    upload_stream.side_effect = upload
+    yield upload_stream, state
+    app_instance.dependency_overrides.clear()
+
+
+class TestUploadFile:
+    """Tests for PUT /api/v1/upload."""
+
+    def test_upload_in_parts(self, client, uploads):
+        """Test that the body reaches storage in whole parts."""
+        upload_stream, state = uploads
+
+        response = client.put(
+            "/api/v1/upload",
+            params={"file_path": FILE_PATH, "overwrite": "true"},
+            content=iter([DATA[:3000], DATA[3000:]]),
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {"file_path": FILE_PATH, "size": len(DATA)}
+        assert b"".join(state["parts"]) == DATA
+        assert [len(part) for part in state["parts"]][:-1] == [1000] * 10
+        assert upload_stream.call_args.args[1] == FILE_PATH
+        assert state["kwargs"] == {
+            "overwrite": True,
+            "part_size": 1000,
+            "parallelism": 3,
+        }
+
+    def test_existing_file(self, client, uploads):
+        """Test that refusing to overwrite a file is reported as a conflict."""
+        upload_stream, _ = uploads
+        upload_stream.side_effect = AlreadyExists("exists")
+
+        response = client.put(
+            "/api/v1/upload", params={"file_path": FILE_PATH}, content=DATA
+        )
+
+        assert response.status_code == 409
+
+    def test_missing_directory(self, client, uploads):
+        """Test that a missing volume is reported as not found."""
+        upload_stream, _ = uploads
+        upload_stream.side_effect = NotFound("no such volume")
+
+        response = client.put(
+            "/api/v1/upload", params={"file_path": FILE_PATH}, content=DATA
+        )
+
+        assert response.status_code == 404
+
+    def test_interrupted_body(self, client, uploads, mocker):
+        """Test that an interrupted body is a bad request, writing nothing."""
+        upload_stream, _ = uploads
+        mocker.patch(
+            "routes.v1.volumes.drain_into",
+            side_effect=StreamInterrupted("client disconnected"),
+        )
+
+        response = client.put(
+            "/api/v1/upload",
+            params={"file_path": FILE_PATH, "overwrite": "true"},
+            content=DATA,
+        )
+
+        assert response.status_code == 400
+        upload_stream.assert_not_called()
+
+
+@pytest.fixture
+def directories(mocker):
+    """Serve a directory of five files and a subdirectory of three."""
+    root = "/Volumes/main/data/files"
+    tree = {
+        root: [
+            DirectoryEntry(path=f"{root}/sub/", name="sub", is_directory=True),
+            *(
+                DirectoryEntry(
+                    path=f"{root}/f{i}.csv",
+                    name=f"f{i}.csv",
+                    is_directory=False,
+                    file_size=10,
+                    last_modified=1700000000000,
+                )
+                for i in range(5)
+            ),
+        ],
+        f"{root}/sub": [
+            DirectoryEntry(
+                path=f"{root}/sub/g{i}.csv",
+                name=f"g{i}.csv",
+                is_directory=False,
+                file_size=20,
+            )
+            for i in range(3)
+        ],
+    }
+    w = mocker.patch("routes.v1.volumes.w")
+
+    def list_directory_contents(directory_path):
+        if directory_path not in tree:
+            raise NotFound(f"No such directory: {directory_path}")
+        return iter(tree[directory_path])
+
+    w.files.list_directory_contents.side_effect = list_directory_contents
+    yield w
+    listing_cache.clear()
+
+
+def _list_all(client, **params):
+    """Follow page tokens through a whole listing."""
+    paths, token, pages = [], None, 0
+    while True:
+        response = client.get(
+            "/api/v1/volumes/list",
+            params={"path": "/Volumes/main/data/files/", **params, "page_token": token},
+        )
+        assert response.status_code == 200
+        body = response.json()
+        paths += [entry["path"] for entry in body["entries"]]
+        pages += 1
+        token = body["next_page_token"]
+        if token is None:
+            return paths, pages
+
+
+class TestListVolumeDirectory:
+    """Tests for GET /api/v1/volumes/list."""
+
+    def test_list_directory(self, client, directories):
+        """Test that a directory's entries are listed with their metadata."""
+        response = client.get(
+            "/api/v1/volumes/list", params={"path": "/Volumes/main/data/files"}
+        )
+
+        assert response.status_code == 200
+        body = response.json()
+        assert body["path"] == "/Volumes/main/data/files"
+        assert body["next_page_token"] is None
+        assert body["entries"][0] == {
+            "path": "/Volumes/main/data/files/f0.csv",
+            "name": "f0.csv",
+            "is_directory": False,
+            "size": 10,
+            "last_modified": 1700000000000,
+        }
+        assert body["entries"][-1]["path"] == "/Volumes/main/data/files/sub"
+        assert body["entries"][-1]["is_directory"]
+
+    def test_recursive_pages(self, client, directories):
+        """Test that a recursive listing is paged and read from storage once."""
+        paths, pages = _list_all(client, recursive="true", page_size=3)
+
+        assert len(paths) == 9
+        assert paths == sorted(paths)
+        assert "/Volumes/main/data/files/sub/g2.csv" in paths
+        assert pages == 3
+        assert directories.files.list_directory_contents.call_count == 2
+
+    def test_upload_invalidates_listing(self, client, directories, mocker):
+        """Test that an upload makes the next listing read storage again."""
+        _list_all(client)
+        mocker.patch(
+            "routes.v1.volumes.upload_stream",
+            side_effect=lambda *args, **kwargs: args[2].read(),
+        )
+
+        client.put(
+            "/api/v1/upload",
+            params={"file_path": "/Volumes/main/data/files/new.csv"},
+            content=b"a,b",
+        )
+        _list_all(client)
+
+        assert directories.files.list_directory_contents.call_count == 2
+
+    def test_invalid_page_token(self, client, directories):
+        """Test that a token from another listing is rejected."""
+        token = client.get(
+            "/api/v1/volumes/list",
+            params={"path": "/Volumes/main/data/files", "page_size": 1},
+        ).json()["next_page_token"]
+
+        response = client.get(
+            "/api/v1/volumes/list",
+            params={
+                "path": "/Volumes/main/data/files",
+                "recursive": "true",
+                "page_token": token,
+            },
+        )
+
+        assert response.status_code == 400
+
+    def test_missing_directory(self, client, directories):
+        """Test that a missing directory is reported as 404."""
+        response = client.get(
+            "/api/v1/volumes/list", params={"path": "/Volumes/main/data/missing"}
+        )
+
+        assert response.status_code == 404
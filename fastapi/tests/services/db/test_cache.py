@@ -0,0 +1,190 @@
+"""Tests for the query result cache."""
+
+import pytest
+from prometheus_client import REGISTRY
+
+from services.db import cache as cache_module
+from services.db.cache import (
+    QueryCache,
+    estimate_rows_size,
+    normalize_sql,
+    referenced_tables,
+)
+
+
+@pytest.fixture
+def clock(mocker):
+    """Control the monotonic clock used by the cache."""
+    now = {"value": 1000.0}
+    mocker.patch.object(cache_module.time, "monotonic", lambda: now["value"])
+    return now
+
+
+class TestNormalizeSql:
+    """Test suite for SQL normalization."""
+
+    def test_collapses_whitespace(self):
+        """Test that formatting differences produce the same key."""
+        assert normalize_sql("  SELECT *\n\tFROM  t\n  LIMIT 10 ") == (
+            "SELECT * FROM t LIMIT 10"
+        )
+
+    def test_preserves_quoted_literals(self):
+        """Test that whitespace inside string literals is significant."""
+        assert normalize_sql("SELECT * FROM t WHERE a = 'x   y'") == (
+            "SELECT * FROM t WHERE a = 'x   y'"
+        )
+        assert normalize_sql("WHERE a = 'x y'") != normalize_sql("WHERE a = 'x  y'")
+
+
+class TestReferencedTables:
+    """Test suite for table extraction."""
+
+    def test_finds_from_and_join_tables(self):
+        """Test that FROM and JOIN targets are found and normalized."""
+        sql = "SELECT * FROM Main.Sales.`Orders` o JOIN main.sales.items i ON 1 = 1"
+        assert referenced_tables(sql) == {"main.sales.orders", "main.sales.items"}
+
+    def test_finds_history_table(self):
+        """Test that version lookups are invalidated along with the table."""
+        assert referenced_tables("DESCRIBE HISTORY main.default.t LIMIT 1") == {
+            "main.default.t"
+        }
+
+    def test_ignores_string_literals(self):
+        """Test that table-like text in literals is not treated as a table."""
+        sql = "SELECT * FROM a.b.c WHERE note = 'copied from x.y.z'"
+        assert referenced_tables(sql) == {"a.b.c"}
+
+
+class TestQueryCache:
+    """Test suite for QueryCache."""
+
+    def test_get_returns_cached_value(self):
+        """Test a basic put and get round trip with counters."""
+        cache = QueryCache(max_entries=10, max_bytes=1000, default_ttl=60)
+
+        assert cache.get("k") is None
+        cache.put("k", "value", size=10)
+
+        assert cache.get("k") == "value"
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_entries_expire_after_ttl(self, clock):
+        """Test that entries are dropped once their TTL has passed."""
+        cache = QueryCache(max_entries=10, max_bytes=1000, default_ttl=60)
+        cache.put("default", 1, size=1)
+        cache.put("short", 2, size=1, ttl=5)
+
+        clock["value"] += 10
+        assert cache.get("short") is None
+        assert cache.get("default") == 1
+
+        clock["value"] += 60
+        assert cache.get("default") is None
+        assert cache.stats()["entries"] == 0
+
+    def test_evicts_least_recently_used_by_count(self):
+        """Test that the entry count bound evicts the LRU entry."""
+        cache = QueryCache(max_entries=2, max_bytes=1000, default_ttl=60)
+        cache.put("a", 1, size=1)
+        cache.put("b", 2, size=1)
+        cache.get("a")
+        cache.put("c", 3, size=1)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.stats()["evictions"] == 1
+
+    def test_evicts_until_within_byte_budget(self):
+        """Test that the size bound evicts as many entries as needed."""
+        cache = QueryCache(max_entries=10, max_bytes=100, default_ttl=60)
+        cache.put("a", 1, size=40)
+        cache.put("b", 2, size=40)
+        cache.put("c", 3, size=90)
+
+        assert cache.get("a") is None
+        assert cache.get("b") is None
+        assert cache.stats()["bytes"] == 90
+
+    def test_skips_values_larger_than_budget(self):
+        """Test that a single oversized value is not cached."""
+        cache = QueryCache(max_entries=10, max_bytes=100, default_ttl=60)
+        cache.put("a", 1, size=10)
+        cache.put("huge", 2, size=101)
+
+        assert cache.get("huge") is None
+        assert cache.get("a") == 1
+
+    def test_invalidate_table_removes_tagged_entries(self):
+        """Test that invalidation only removes entries for that table."""
+        cache = QueryCache(max_entries=10, max_bytes=1000, default_ttl=60)
+        cache.put("orders", 1, size=1, tables=frozenset({"main.sales.orders"}))
+        cache.put("items", 2, size=1, tables=frozenset({"main.sales.items"}))
+
+        removed = cache.invalidate_table("Main.Sales.`Orders`")
+
+        assert removed == 1
+        assert cache.get("orders") is None
+        assert cache.get("items") == 2
+
+    def test_put_skips_results_that_raced_with_a_write(self):
+        """Test that a result computed before an invalidation is discarded."""
+        cache = QueryCache(max_entries=10, max_bytes=1000, default_ttl=60)
+        tables = frozenset({"main.sales.orders"})
+        versions = cache.table_versions(tables)
+
+        cache.invalidate_table("main.sales.orders")
+        cache.put("orders", 1, size=1, tables=tables, versions=versions)
+
+        assert cache.get("orders") is None
+
+    def test_zero_ttl_is_not_cached(self):
+        """Test that values put with a zero TTL are not cached."""
+        cache = QueryCache(max_entries=10, max_bytes=1000, default_ttl=0)
+        cache.put("k", 1, size=1)
+
+        assert not cache.caches()
+        assert cache.get("k") is None
+
+    def test_own_ttl_overrides_zero_default(self):
+        """Test that a zero default TTL leaves values with their own TTL cached."""
+        cache = QueryCache(max_entries=10, max_bytes=1000, default_ttl=0)
+        cache.put("count", 42, size=1, ttl=60)
+
+        assert cache.caches(60)
+        assert cache.get("count") == 42
+
+    def test_counters_are_exported(self):
+        """Test that hits, misses, evictions and invalidations reach Prometheus."""
+
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0
+
+        names = [
+            ("databricks_query_cache_requests_total", {"result": "hit"}),
+            ("databricks_query_cache_requests_total", {"result": "miss"}),
+            ("databricks_query_cache_evictions_total", {}),
+            ("databricks_query_cache_invalidations_total", {}),
+        ]
+        before = [sample(name, **labels) for name, labels in names]
+        cache = QueryCache(max_entries=1, max_bytes=1000, default_ttl=60)
+        cache.put("a", 1, size=1)
+        cache.put("b", 2, size=1, tables=frozenset({"main.sales.orders"}))
+        cache.get("a")
+        cache.get("b")
+        cache.invalidate_table("main.sales.orders")
+
+        after = [sample(name, **labels) for name, labels in names]
+        assert [a - b for a, b in zip(after, before)] == [1, 1, 1, 1]
+        assert REGISTRY.get_sample_value("databricks_query_cache_entries") == 0
+
+
+def test_estimate_rows_size_scales_with_rows():
+    """Test that the size estimate grows with the number of rows."""
+    small = estimate_rows_size([(1, "a")] * 10)
+    large = estimate_rows_size([(1, "a")] * 1000)
+
+    assert 0 < small < large
@@ -0,0 +1,77 @@
+"""Tests for cancelling running warehouse statements."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from services.db.cancel import (
+    StatementCanceller,
+    StatementCancelledError,
+    cancellable,
+    current_canceller,
+)
+
+
+class TestStatementCanceller:
+    """Test suite for StatementCanceller."""
+
+    def test_cancel_cancels_running_statements(self):
+        """Test that cursors registered while running are cancelled."""
+        canceller = StatementCanceller()
+        cursor = MagicMock()
+
+        with canceller.track(cursor):
+            canceller.cancel()
+
+        cursor.cancel.assert_called_once()
+
+    def test_finished_statements_are_not_cancelled(self):
+        """Test that cursors are unregistered when their block exits."""
+        canceller = StatementCanceller()
+        cursor = MagicMock()
+
+        with canceller.track(cursor):
+            pass
+        canceller.cancel()
+
+        cursor.cancel.assert_not_called()
+
+    def test_statements_after_cancel_fail(self):
+        """Test that a statement cannot start once the call is cancelled."""
+        canceller = StatementCanceller()
+        canceller.cancel()
+
+        with pytest.raises(StatementCancelledError):
+            with canceller.track(MagicMock()):
+                pass
+
+    def test_cancel_ignores_cursor_errors(self):
+        """Test that a failing cancel does not stop the others."""
+        canceller = StatementCanceller()
+        failing, other = MagicMock(), MagicMock()
+        failing.cancel.side_effect = Exception("Already closed")
+
+        with canceller.track(failing), canceller.track(other):
+            canceller.cancel()
+
+        other.cancel.assert_called_once()
+
+    def test_cancellable_uses_current_canceller(self):
+        """Test that cursors register with the canceller of the context."""
+        canceller = StatementCanceller()
+        cursor = MagicMock()
+        token = current_canceller.set(canceller)
+        try:
+            with cancellable(cursor):
+                canceller.cancel()
+        finally:
+            current_canceller.reset(token)
+
+        cursor.cancel.assert_called_once()
+
+    def test_cancellable_without_canceller(self):
+        """Test that cursors run normally outside a cancellable call."""
+        cursor = MagicMock()
+
+        with cancellable(cursor) as tracked:
+            assert tracked is cursor
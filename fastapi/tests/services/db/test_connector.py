@@ -1,8 +1,36 @@
 """Tests for the database connector module using pytest best practices."""
 
+import asyncio
+import threading
+import time
+
 import pandas as pd
+import pyarrow as pa
 import pytest
-from services.db.connector import get_connection, query, insert_data, close_connections
+from prometheus_client import REGISTRY
+from services.db import connector
+from services.db.connector import (
+    get_connection,
+    query,
+    query_arrow,
+    query_async,
+    stream_query_arrow,
+    stream_query_arrow_async,
+    insert_data,
+    insert_data_async,
+    close_connections,
+    prune_connections_periodically,
+    InsertError,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_connector():
+    """Drop any connection pools and cached results created by a test."""
+    yield
+    close_connections()
+    connector.query_cache.clear()
+    connector.query_flights.reset()
 
 
 @pytest.fixture
@@ -44,6 +72,7 @@ def mock_cursor(mocker):
 def mock_connection(mocker, mock_cursor):
     """Create a mock database connection."""
     conn = mocker.MagicMock()
+    conn.__enter__.return_value = conn
     conn.cursor.return_value.__enter__.return_value = mock_cursor
     return conn
 
@@ -58,13 +87,42 @@ class TestDatabaseConnector:
         expected_http_path = f"/sql/1.0/warehouses/{warehouse_id}"
 
         # Act
-        get_connection(warehouse_id)
+        with get_connection(warehouse_id):
+            pass
 
         # Assert
         mock_sql.connect.assert_called_once()
         call_kwargs = mock_sql.connect.call_args.kwargs
         assert call_kwargs["http_path"] == expected_http_path
 
+    def test_get_connection_reuses_pooled_connection(self, mock_sql):
+        """Test that a returned connection is reused by the next checkout."""
+        # Act
+        with get_connection("warehouse-id") as first:
+            pass
+        with get_connection("warehouse-id") as second:
+            pass
+
+        # Assert
+        assert first is second
+        mock_sql.connect.assert_called_once()
+
+    def test_get_connection_pools_per_warehouse(self, mock_sql):
+        """Test that each warehouse gets its own pool and connection."""
+        # Act
+        with get_connection("warehouse-a"), get_connection("warehouse-b"):
+            pass
+        with get_connection("warehouse-a"), get_connection("warehouse-b"):
+            pass
+
+        # Assert
+        assert mock_sql.connect.call_count == 2
+        paths = {c.kwargs["http_path"] for c in mock_sql.connect.call_args_list}
+        assert paths == {
+            "/sql/1.0/warehouses/warehouse-a",
+            "/sql/1.0/warehouses/warehouse-b",
+        }
+
     def test_query_returns_dict_results(self, mocker, mock_connection, mock_cursor):
         """Test that query returns results as dictionaries when as_dict=True."""
         # Arrange
@@ -101,10 +159,65 @@ class TestDatabaseConnector:
         assert result.iloc[0]["name"] == "Test"
         mock_cursor.execute.assert_called_once_with(test_query)
 
+    def test_query_arrow_returns_arrow_table(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that query_arrow returns the cursor's Arrow result untouched."""
+        # Arrange
+        arrow_table = pa.table({"id": [1], "name": ["Test"]})
+        mock_cursor.fetchall_arrow.return_value = arrow_table
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        # Act
+        result = query_arrow("SELECT * FROM catalog.schema.table", "warehouse-id")
+
+        # Assert
+        assert result is arrow_table
+        mock_cursor.fetchall.assert_not_called()
+
+    def test_stream_query_arrow_yields_batches(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that stream_query_arrow yields fetchmany_arrow batches."""
+        # Arrange
+        batches = [pa.table({"id": [1, 2]}), pa.table({"id": [3]})]
+        mock_cursor.fetchmany_arrow.side_effect = batches + [pa.table({"id": []})]
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        # Act
+        result = list(stream_query_arrow("SELECT id FROM t", "warehouse-id", 2))
+
+        # Assert
+        assert result == batches
+        mock_cursor.fetchmany_arrow.assert_called_with(2)
+        mock_cursor.fetchall.assert_not_called()
+
+    def test_stream_query_arrow_yields_empty_first_batch(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that an empty result still yields one batch with the schema."""
+        # Arrange
+        empty = pa.table({"id": pa.array([], type=pa.int64())})
+        mock_cursor.fetchmany_arrow.return_value = empty
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        # Act
+        result = list(stream_query_arrow("SELECT id FROM t", "warehouse-id", 2))
+
+        # Assert
+        assert result == [empty]
+
     def test_query_handles_exceptions(self, mocker):
         """Test that query properly handles and wraps exceptions."""
         # Arrange
         mock_conn = mocker.MagicMock()
+        mock_conn.__enter__.return_value = mock_conn
         mock_conn.cursor.return_value.__enter__.side_effect = ValueError(
             "Database connection error"
         )
@@ -117,16 +230,162 @@ class TestDatabaseConnector:
         assert "Query failed" in str(exc_info.value)
         assert "Database connection error" in str(exc_info.value)
 
-    def test_close_connections_clears_cache(self, mocker):
-        """Test that close_connections clears the connection cache."""
+    def test_close_connections_drains_pools(self, mock_sql):
+        """Test that close_connections closes pooled connections."""
         # Arrange
-        mock_cache_clear = mocker.patch.object(get_connection, "cache_clear")
+        with get_connection("warehouse-id") as conn:
+            pass
 
         # Act
         close_connections()
 
         # Assert
-        mock_cache_clear.assert_called_once()
+        conn.close.assert_called_once()
+        assert connector._pools == {}
+
+    @pytest.mark.asyncio
+    async def test_idle_connections_are_pruned_without_traffic(self, mocker):
+        """Test that the background pruner prunes and refills every pool."""
+        pools = [mocker.Mock(), mocker.Mock()]
+        mocker.patch.dict(connector._pools, {"wh-1": pools[0], "wh-2": pools[1]})
+
+        pruner = asyncio.ensure_future(prune_connections_periodically(0.01))
+        await asyncio.sleep(0.05)
+        pruner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pruner
+
+        assert all(pool.prune.call_count >= 2 for pool in pools)
+        assert all(pool.fill.call_count == pool.prune.call_count for pool in pools)
+
+
+class TestQueryCache:
+    """Tests for result caching in the connector."""
+
+    def test_repeated_query_is_served_from_cache(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that an identical query does not reach the warehouse twice."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        first = query("SELECT * FROM catalog.schema.table", "warehouse-id")
+        second = query("SELECT *\n  FROM catalog.schema.table ", "warehouse-id")
+
+        assert first == second
+        assert first is not second
+        mock_cursor.execute.assert_called_once()
+        assert connector.query_cache.stats()["hits"] == 1
+        assert connector.query_cache.stats()["misses"] == 1
+
+    def test_cache_is_keyed_by_warehouse(self, mocker, mock_connection, mock_cursor):
+        """Test that the same SQL on another warehouse is not shared."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        query("SELECT * FROM catalog.schema.table", "warehouse-a")
+        query("SELECT * FROM catalog.schema.table", "warehouse-b")
+
+        assert mock_cursor.execute.call_count == 2
+
+    def test_cached_rows_serve_dataframes(self, mocker, mock_connection, mock_cursor):
+        """Test that a cached result can be returned in either format."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        rows = query("SELECT * FROM catalog.schema.table", "warehouse-id")
+        frame = query(
+            "SELECT * FROM catalog.schema.table", "warehouse-id", as_dict=False
+        )
+
+        assert frame.to_dict("records") == rows
+        mock_cursor.execute.assert_called_once()
+
+    def test_insert_invalidates_cached_reads(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that inserting into a table drops its cached results."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        select = "SELECT * FROM catalog.schema.table"
+
+        query(select, "warehouse-id")
+        query("SELECT * FROM catalog.schema.other", "warehouse-id")
+        insert_data("catalog.schema.table", [{"id": 2, "name": "x"}], "warehouse-id")
+        query(select, "warehouse-id")
+        query("SELECT * FROM catalog.schema.other", "warehouse-id")
+
+        executed = [c.args[0] for c in mock_cursor.execute.call_args_list]
+        assert executed.count(select) == 2
+        assert connector.query_cache.stats()["invalidations"] == 1
+
+    def test_parameters_are_bound_and_part_of_the_key(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that bound parameters reach the cursor and split the cache."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        select = "SELECT * FROM catalog.schema.table WHERE id > ?"
+
+        query(select, "warehouse-id", parameters=[1])
+        query(select, "warehouse-id", parameters=[1])
+        query(select, "warehouse-id", parameters=[2])
+
+        assert [c.args for c in mock_cursor.execute.call_args_list] == [
+            (select, [1]),
+            (select, [2]),
+        ]
+
+    def test_cache_ttl_overrides_default(self, mocker, mock_connection, mock_cursor):
+        """Test that a per-query TTL controls how long the result is kept."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        clock = mocker.patch("services.db.cache.time.monotonic", return_value=0.0)
+        select = "SELECT * FROM catalog.schema.table"
+
+        query(select, "warehouse-id", cache_ttl=5)
+        clock.return_value = 4.0
+        query(select, "warehouse-id", cache_ttl=5)
+        clock.return_value = 6.0
+        query(select, "warehouse-id", cache_ttl=5)
+
+        assert mock_cursor.execute.call_count == 2
+
+    def test_cache_ttl_applies_when_default_is_zero(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that disabling default caching keeps queries with their own TTL."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        mocker.patch.object(connector.query_cache, "default_ttl", 0)
+        select = "SELECT * FROM catalog.schema.table"
+
+        query(select, "warehouse-id")
+        query(select, "warehouse-id")
+        query(select, "warehouse-id", cache_ttl=5)
+        query(select, "warehouse-id", cache_ttl=5)
+
+        assert mock_cursor.execute.call_count == 3
+
+    def test_failed_query_is_not_cached(self, mocker, mock_connection, mock_cursor):
+        """Test that errors are not cached."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        mock_cursor.execute.side_effect = [Exception("Warehouse busy"), None]
+
+        with pytest.raises(Exception):
+            query("SELECT * FROM catalog.schema.table", "warehouse-id")
+        result = query("SELECT * FROM catalog.schema.table", "warehouse-id")
+
+        assert result == [{"id": 1, "name": "Test"}]
 
 
 class TestInsertData:
@@ -150,7 +409,8 @@ class TestInsertData:
         )
 
         # Assert the result
-        assert result == 2  # Number of rows affected
+        assert result.rowcount == 2  # Number of rows affected
+        assert [batch.status for batch in result.batches] == ["inserted"]
 
         # Verify the SQL query was built correctly
         mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
@@ -183,7 +443,8 @@ class TestInsertData:
         )
 
         # Should return 0 and not execute any query
-        assert result == 0
+        assert result.rowcount == 0
+        assert result.batches == []
         mock_connection.cursor.assert_not_called()
 
     def test_insert_data_error(self, mocker, mock_connection):
@@ -229,3 +490,325 @@ class TestInsertData:
 
         # Verify error message
         assert "Failed to insert data" in str(exc_info.value)
+        mock_connection.cursor.assert_not_called()
+
+    def test_insert_data_splits_by_rows(self, mocker, mock_connection, mock_cursor):
+        """Test that large inserts are split into bounded statements."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        data = [{"id": i, "name": f"n{i}"} for i in range(5)]
+
+        result = insert_data("c.s.t", data, "warehouse-id", max_rows=2, parallelism=1)
+
+        params = [c.args[1] for c in mock_cursor.execute.call_args_list]
+        assert params == [[0, "n0", 1, "n1"], [2, "n2", 3, "n3"], [4, "n4"]]
+        assert [batch.rows for batch in result.batches] == [2, 2, 1]
+        assert result.rowcount == 5
+
+    def test_insert_data_splits_by_parameters(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that the parameter limit bounds the rows per statement."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        data = [{"id": i, "name": f"n{i}"} for i in range(5)]
+
+        insert_data("c.s.t", data, "warehouse-id", max_rows=100, max_parameters=5)
+
+        # Two columns per row, so at most two rows fit in five parameters
+        assert all(len(c.args[1]) <= 5 for c in mock_cursor.execute.call_args_list)
+        assert mock_cursor.execute.call_count == 3
+
+    def test_insert_data_runs_batches_in_parallel(self, mocker):
+        """Test that batches run concurrently, up to the parallelism bound."""
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_execute(sql_query, parameters):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+        def make_connection():
+            conn = mocker.MagicMock()
+            conn.__enter__.return_value = conn
+            cursor = conn.cursor.return_value.__enter__.return_value
+            cursor.execute.side_effect = slow_execute
+            cursor.rowcount = 1
+            return conn
+
+        mocker.patch(
+            "services.db.connector.get_connection",
+            side_effect=lambda wid: make_connection(),
+        )
+        data = [{"id": i} for i in range(8)]
+
+        result = insert_data("c.s.t", data, "warehouse-id", max_rows=1, parallelism=3)
+
+        assert peak == 3
+        assert result.rowcount == 8
+
+    def test_insert_data_reports_failed_batch(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that a failed batch stops later batches and is reported."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        mock_cursor.rowcount = 1
+        mock_cursor.execute.side_effect = [None, Exception("Bad value"), None]
+        data = [{"id": i} for i in range(3)]
+
+        with pytest.raises(InsertError) as exc_info:
+            insert_data("c.s.t", data, "warehouse-id", max_rows=1, parallelism=1)
+
+        assert "batch 2 of 3 failed: Bad value" in str(exc_info.value)
+        statuses = [batch.status for batch in exc_info.value.result.batches]
+        assert statuses == ["inserted", "failed", "skipped"]
+        assert exc_info.value.result.rowcount == 1
+
+
+@pytest.mark.asyncio
+class TestAsyncConnector:
+    """Test suite for the event-loop friendly connector API."""
+
+    async def test_query_async_returns_results(self, mocker, mock_connection):
+        """Test that query_async returns the same results as query."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        result = await query_async("SELECT * FROM catalog.schema.table", "wh")
+
+        assert result == [{"id": 1, "name": "Test"}]
+
+    async def test_query_async_converts_rows_off_the_event_loop(
+        self, mocker, mock_connection
+    ):
+        """Test that rows are turned into dictionaries on the database pool."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        to_result = connector._to_result
+        threads = []
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+            return to_result(*args)
+
+        mocker.patch.object(connector, "_to_result", side_effect=record_thread)
+
+        result = await query_async("SELECT * FROM catalog.schema.table", "wh")
+
+        assert result == [{"id": 1, "name": "Test"}]
+        assert len(threads) == 1 and threads[0].startswith("databricks-sql")
+
+    async def test_stream_query_arrow_async_closes_cursor_on_early_exit(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that stopping a stream early closes the cursor promptly."""
+        mock_cursor.fetchmany_arrow.return_value = pa.table({"id": [1]})
+        cursor_context = mock_connection.cursor.return_value
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        stream = stream_query_arrow_async("SELECT id FROM t", "wh", 1)
+        first = await anext(stream)
+        cursor_context.__exit__.assert_not_called()
+        await stream.aclose()
+
+        assert first.num_rows == 1
+        cursor_context.__exit__.assert_called_once()
+
+    async def test_cancelled_query_cancels_statement(self, mocker, mock_connection):
+        """Test that abandoning a query cancels it on the warehouse."""
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+        started = threading.Event()
+        cancelled = threading.Event()
+
+        def blocking_execute(*args, **kwargs):
+            started.set()
+            if not cancelled.wait(timeout=5):
+                raise AssertionError("statement was not cancelled")
+            raise Exception("Statement cancelled")
+
+        mock_cursor.execute.side_effect = blocking_execute
+        mock_cursor.cancel.side_effect = cancelled.set
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        task = asyncio.ensure_future(query_async("SELECT * FROM t", "wh"))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        task.cancel()
+
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert await asyncio.get_running_loop().run_in_executor(None, cancelled.wait, 5)
+
+    async def test_closing_stream_cancels_running_statement(
+        self, mocker, mock_connection
+    ):
+        """Test that closing a stream mid-statement cancels the statement."""
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+        started = threading.Event()
+        cancelled = threading.Event()
+
+        def blocking_execute(*args, **kwargs):
+            started.set()
+            cancelled.wait(timeout=5)
+            raise Exception("Statement cancelled")
+
+        mock_cursor.execute.side_effect = blocking_execute
+        mock_cursor.cancel.side_effect = cancelled.set
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        stream = stream_query_arrow_async("SELECT * FROM t", "wh", 10)
+        task = asyncio.ensure_future(anext(stream))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        task.cancel()
+
+        start = time.monotonic()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert cancelled.is_set()
+        assert time.monotonic() - start < 1
+
+    async def test_insert_data_async_returns_rowcount(self, mocker, mock_connection):
+        """Test that insert_data_async returns the number of inserted rows."""
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        result = await insert_data_async(
+            "catalog.schema.table", [{"id": 1, "name": "Test"}], "wh"
+        )
+
+        assert result.rowcount == 1
+
+    async def test_insert_data_async_bounds_parallelism(self, mocker):
+        """Test that async inserts keep at most `parallelism` batches in flight."""
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        def slow_execute(sql_query, parameters):
+            nonlocal active, peak
+            with lock:
+                active += 1
+                peak = max(peak, active)
+            time.sleep(0.05)
+            with lock:
+                active -= 1
+
+        def make_connection():
+            conn = mocker.MagicMock()
+            conn.__enter__.return_value = conn
+            cursor = conn.cursor.return_value.__enter__.return_value
+            cursor.execute.side_effect = slow_execute
+            cursor.rowcount = 1
+            return conn
+
+        mocker.patch(
+            "services.db.connector.get_connection",
+            side_effect=lambda wid: make_connection(),
+        )
+
+        result = await insert_data_async(
+            "c.s.t",
+            [{"id": i} for i in range(6)],
+            "wh",
+            max_rows=1,
+            parallelism=2,
+        )
+
+        assert peak == 2
+        assert [batch.status for batch in result.batches] == ["inserted"] * 6
+
+    async def test_concurrent_queries_do_not_block_each_other(self, mocker):
+        """Test that N slow queries finish in about one query's latency."""
+        latency = 0.2
+        concurrency = 8
+
+        def connection_factory(*args, **kwargs):
+            cursor = mocker.MagicMock()
+            cursor.description = [("id",)]
+            cursor.execute.side_effect = lambda *a, **k: time.sleep(latency)
+            cursor.fetchall.return_value = [(1,)]
+            conn = mocker.MagicMock()
+            conn.__enter__.return_value = conn
+            conn.cursor.return_value.__enter__.return_value = cursor
+            return conn
+
+        mocker.patch(
+            "services.db.connector.get_connection", side_effect=connection_factory
+        )
+
+        start = time.perf_counter()
+        results = await asyncio.gather(
+            *(query_async(f"SELECT {i}", "wh") for i in range(concurrency))
+        )
+        elapsed = time.perf_counter() - start
+
+        assert len(results) == concurrency
+        assert elapsed < latency * 2
+
+    async def test_identical_concurrent_queries_share_one_statement(
+        self, mocker, mock_connection, mock_cursor
+    ):
+        """Test that identical in-flight queries are coalesced."""
+        mock_cursor.execute.side_effect = lambda *a, **k: time.sleep(0.1)
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+
+        results = await asyncio.gather(
+            *(
+                query_async("SELECT * FROM catalog.schema.table", "wh")
+                for _ in range(10)
+            )
+        )
+
+        assert all(r == [{"id": 1, "name": "Test"}] for r in results)
+        # Each caller gets its own list, not a shared mutable result
+        assert len({id(r) for r in results}) == 10
+        mock_cursor.execute.assert_called_once()
+        assert connector.query_flights.stats()["executions"] == 1
+        assert connector.query_flights.stats()["shared"] == 9
+        assert (
+            REGISTRY.get_sample_value("databricks_query_flight_executions_total") == 1
+        )
+        assert REGISTRY.get_sample_value("databricks_query_flight_shared_total") == 9
+        assert REGISTRY.get_sample_value("databricks_query_flight_in_flight") == 0
+
+    async def test_event_loop_stays_responsive(self, mocker, mock_connection):
+        """Test that the event loop keeps running while a query blocks."""
+        mock_cursor = mock_connection.cursor.return_value.__enter__.return_value
+        mock_cursor.execute.side_effect = lambda *a, **k: time.sleep(0.2)
+        mocker.patch(
+            "services.db.connector.get_connection", return_value=mock_connection
+        )
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker_task = asyncio.create_task(ticker())
+        await query_async("SELECT 1", "wh")
+        ticker_task.cancel()
+
+        assert ticks >= 10
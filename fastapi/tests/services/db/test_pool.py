@@ -0,0 +1,221 @@
+"""Tests for the SQL connection pool."""
+
+import threading
+import time
+
+import pytest
+
+from errors.exceptions import DatabaseError
+from services.db import pool as pool_module
+from services.db.pool import ConnectionPool
+
+
+@pytest.fixture
+def clock(mocker):
+    """Control the monotonic clock used by the pool."""
+    now = {"value": 1000.0}
+    mocker.patch.object(pool_module.time, "monotonic", lambda: now["value"])
+    return now
+
+
+@pytest.fixture
+def connect(mocker):
+    """Create a connection factory returning fresh mock connections."""
+
+    def _connect():
+        conn = mocker.MagicMock()
+        conn.open = True
+        return conn
+
+    return mocker.MagicMock(side_effect=_connect)
+
+
+class TestConnectionPool:
+    """Test suite for ConnectionPool."""
+
+    def test_reuses_idle_connection(self, connect):
+        """Test that a released connection is handed out again."""
+        pool = ConnectionPool(connect, max_size=2)
+
+        with pool.connection() as first:
+            pass
+        with pool.connection() as second:
+            pass
+
+        assert first is second
+        assert connect.call_count == 1
+
+    def test_concurrent_checkouts_get_distinct_connections(self, connect):
+        """Test that concurrent checkouts never share a connection."""
+        pool = ConnectionPool(connect, max_size=2)
+
+        with pool.connection() as first, pool.connection() as second:
+            assert first is not second
+            assert pool.stats()["in_use"] == 2
+
+        assert pool.stats() == {
+            "size": 2,
+            "idle": 2,
+            "in_use": 0,
+            "waiting": 0,
+            "max_size": 2,
+        }
+
+    def test_checkout_times_out_when_exhausted(self, connect):
+        """Test that checkout fails once the pool is full for too long."""
+        pool = ConnectionPool(connect, max_size=1, checkout_timeout=0.05)
+
+        with pool.connection():
+            with pytest.raises(DatabaseError) as exc_info:
+                with pool.connection():
+                    pass
+
+        assert "Timed out waiting for a SQL connection" in str(exc_info.value)
+
+    def test_waiter_gets_released_connection(self, connect):
+        """Test that a blocked checkout proceeds when a connection is returned."""
+        pool = ConnectionPool(connect, max_size=1, checkout_timeout=5)
+        results = []
+
+        def worker():
+            with pool.connection() as conn:
+                results.append(conn)
+
+        with pool.connection() as held:
+            thread = threading.Thread(target=worker)
+            thread.start()
+            time.sleep(0.05)
+
+        thread.join(timeout=5)
+        assert results == [held]
+
+    def test_evicts_idle_connections_above_min_size(self, connect, clock):
+        """Test that idle connections are closed after the idle timeout."""
+        pool = ConnectionPool(connect, min_size=1, max_size=3, idle_timeout=60)
+
+        with pool.connection() as first, pool.connection() as second:
+            pass
+
+        clock["value"] += 61
+        pool.prune()
+
+        # One connection is kept to honour min_size
+        assert pool.stats()["size"] == 1
+        closed = [c for c in (first, second) if c.close.called]
+        assert len(closed) == 1
+
+    def test_evicts_connections_past_max_lifetime(self, connect, clock):
+        """Test that old connections are replaced even when min_size is set."""
+        pool = ConnectionPool(
+            connect, min_size=1, max_size=1, max_lifetime=100, ping_after=1000
+        )
+
+        with pool.connection() as first:
+            pass
+
+        clock["value"] += 101
+
+        with pool.connection() as second:
+            pass
+
+        assert first is not second
+        first.close.assert_called_once()
+
+    def test_discards_closed_connection_on_checkout(self, connect):
+        """Test that a connection closed by the server is not reused."""
+        pool = ConnectionPool(connect, max_size=1)
+
+        with pool.connection() as first:
+            pass
+        first.open = False
+
+        with pool.connection() as second:
+            pass
+
+        assert first is not second
+        assert pool.stats()["size"] == 1
+
+    def test_pings_connections_idle_past_threshold(self, connect, clock):
+        """Test that a failed liveness query replaces the connection."""
+        pool = ConnectionPool(connect, max_size=1, ping_after=30)
+
+        with pool.connection() as first:
+            pass
+        first.cursor.return_value.__enter__.return_value.execute.side_effect = (
+            Exception("Session expired")
+        )
+
+        clock["value"] += 31
+
+        with pool.connection() as second:
+            pass
+
+        assert first is not second
+        first.close.assert_called_once()
+
+    def test_failed_connect_frees_slot(self, mocker):
+        """Test that a failed connection attempt does not leak pool capacity."""
+        connect = mocker.MagicMock(side_effect=Exception("Warehouse unavailable"))
+        pool = ConnectionPool(connect, max_size=1)
+
+        with pytest.raises(Exception):
+            with pool.connection():
+                pass
+
+        assert pool.stats()["size"] == 0
+
+    def test_fill_opens_min_size_connections(self, connect):
+        """Test that filling opens idle connections up to min_size."""
+        pool = ConnectionPool(connect, min_size=3, max_size=5)
+
+        with pool.connection():
+            pool.fill()
+            assert pool.stats()["size"] == 3
+
+        pool.fill()
+        assert connect.call_count == 3
+        assert pool.stats()["idle"] == 3
+
+    def test_fill_refills_after_eviction(self, connect, clock):
+        """Test that connections past their lifetime are replaced by filling."""
+        pool = ConnectionPool(connect, min_size=2, max_size=2, max_lifetime=100)
+        pool.fill()
+
+        clock["value"] += 101
+        pool.prune()
+        assert pool.stats()["size"] == 0
+        pool.fill()
+
+        assert pool.stats()["idle"] == 2
+        assert connect.call_count == 4
+
+    def test_failed_fill_frees_slot(self, mocker):
+        """Test that a connection failing to open stops filling."""
+        connect = mocker.MagicMock(side_effect=Exception("Warehouse unavailable"))
+        pool = ConnectionPool(connect, min_size=2, max_size=2)
+
+        pool.fill()
+
+        assert connect.call_count == 1
+        assert pool.stats()["size"] == 0
+
+    def test_close_drains_idle_and_returned_connections(self, connect):
+        """Test that close shuts idle connections and those returned later."""
+        pool = ConnectionPool(connect, max_size=2)
+        in_use_ctx = pool.connection()
+        in_use = in_use_ctx.__enter__()
+
+        with pool.connection() as idle:
+            pass
+
+        pool.close()
+        idle.close.assert_called_once()
+        in_use.close.assert_not_called()
+
+        in_use_ctx.__exit__(None, None, None)
+        in_use.close.assert_called_once()
+        assert pool.stats()["size"] == 0
+
+        with pytest.raises(DatabaseError):
+            with pool.connection():
+                pass
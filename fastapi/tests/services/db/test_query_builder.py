@@ -0,0 +1,287 @@
+"""Tests for the SQL query builder."""
+
+import pytest
+
+from errors.exceptions import ValidationError
+from services.db.query_builder import (
+    build_aggregate_query,
+    build_copy_into_query,
+    build_count_query,
+    build_insert_query,
+    build_sample_source,
+    build_select_query,
+    build_stats_query,
+    decode_cursor,
+    encode_cursor,
+    insert_batch_size,
+    parse_aggregate,
+    parse_aggregates,
+    quote_identifier,
+    split_columns,
+)
+
+
+def _compact(sql):
+    return " ".join(sql.split())
+
+
+class TestIdentifiers:
+    """Test suite for identifier validation."""
+
+    @pytest.mark.parametrize("name", ["id", "created_at", "_private", "Col2"])
+    def test_valid_identifiers_are_quoted(self, name):
+        """Test that simple identifiers are accepted and quoted."""
+        assert quote_identifier(name) == f"`{name}`"
+
+    @pytest.mark.parametrize("name", ["", "1id", "id; DROP TABLE t", "a`b", "a.b"])
+    def test_invalid_identifiers_are_rejected(self, name):
+        """Test that anything but a plain identifier is rejected."""
+        with pytest.raises(ValidationError):
+            quote_identifier(name)
+
+    def test_split_columns(self):
+        """Test that column lists are split and trimmed."""
+        assert split_columns(" id, name ,,value ") == ["id", "name", "value"]
+
+
+class TestBuildSelectQuery:
+    """Test suite for build_select_query."""
+
+    def test_offset_pagination(self):
+        """Test the plain LIMIT/OFFSET statement."""
+        sql, parameters = build_select_query(
+            "c.s.t", columns="id,name", filter_expr="id > 5", limit=10, offset=20
+        )
+
+        assert (
+            _compact(sql) == "SELECT id,name FROM c.s.t WHERE id > 5 LIMIT 10 OFFSET 20"
+        )
+        assert parameters == []
+
+    def test_keyset_first_page(self):
+        """Test that the first keyset page only orders by the key."""
+        sql, parameters = build_select_query("c.s.t", limit=11, order_by="id")
+
+        assert _compact(sql) == "SELECT * FROM c.s.t ORDER BY `id` NULLS LAST LIMIT 11"
+        assert parameters == []
+
+    def test_keyset_next_page_binds_key(self):
+        """Test that later pages filter on the key with a bound parameter."""
+        sql, parameters = build_select_query(
+            "c.s.t",
+            filter_expr="a = 1 OR b = 2",
+            limit=11,
+            order_by="id",
+            after=42,
+            has_after=True,
+        )
+
+        assert _compact(sql) == (
+            "SELECT * FROM c.s.t WHERE (a = 1 OR b = 2) "
+            "AND (`id` > ? OR `id` IS NULL) ORDER BY `id` NULLS LAST LIMIT 11"
+        )
+        assert parameters == [42]
+
+    def test_keyset_after_null_key(self):
+        """Test that a page ending on a NULL key continues among NULL keys."""
+        sql, parameters = build_select_query(
+            "c.s.t", limit=11, offset=3, order_by="id", after=None, has_after=True
+        )
+
+        assert _compact(sql) == (
+            "SELECT * FROM c.s.t WHERE `id` IS NULL "
+            "ORDER BY `id` NULLS LAST LIMIT 11 OFFSET 3"
+        )
+        assert parameters == []
+
+    def test_count_query_uses_filter(self):
+        """Test that the count statement applies the same filter."""
+        sql = build_count_query("c.s.t", filter_expr="a = 1")
+
+        assert _compact(sql) == "SELECT COUNT(*) AS total FROM c.s.t WHERE a = 1"
+
+
+class TestAggregates:
+    """Test suite for aggregate parsing and GROUP BY statements."""
+
+    @pytest.mark.parametrize(
+        "spec, expected",
+        [
+            ("count(*)", "COUNT(*) AS `count`"),
+            ("COUNT(id)", "COUNT(`id`) AS `count_id`"),
+            ("sum(`amount`)", "SUM(`amount`) AS `sum_amount`"),
+            ("avg(price) AS mean", "AVG(`price`) AS `mean`"),
+            (
+                "approx_count_distinct(user_id)",
+                "APPROX_COUNT_DISTINCT(`user_id`) AS `approx_count_distinct_user_id`",
+            ),
+            (
+                "median(latency)",
+                "PERCENTILE_APPROX(`latency`, 0.5) AS `median_latency`",
+            ),
+            (
+                "percentile(latency, 0.95)",
+                "PERCENTILE_APPROX(`latency`, 0.95) AS `p95_latency`",
+            ),
+            (
+                "percentile(latency,0.999)",
+                "PERCENTILE_APPROX(`latency`, 0.999) AS `p99_9_latency`",
+            ),
+        ],
+    )
+    def test_parse_aggregate(self, spec, expected):
+        """Test that aggregates are rendered with quoted identifiers."""
+        assert parse_aggregate(spec).sql() == expected
+
+    @pytest.mark.parametrize(
+        "spec",
+        [
+            "stddev(x)",
+            "sum(*)",
+            "sum(x; DROP TABLE t)",
+            "sum(a.b)",
+            "sum(x, 0.5)",
+            "percentile(x)",
+            "percentile(x, 1.5)",
+            "count(*) AS `a b`",
+            "sum(x) + 1",
+        ],
+    )
+    def test_invalid_aggregates_are_rejected(self, spec):
+        """Test that anything outside the supported forms is rejected."""
+        with pytest.raises(ValidationError):
+            parse_aggregate(spec)
+
+    def test_parse_aggregates_keeps_commas_inside_calls(self):
+        """Test that the list is split between aggregates only."""
+        parsed = parse_aggregates("count(*), percentile(x, 0.5), max(x)", [])
+
+        assert [aggregate.alias for aggregate in parsed] == ["count", "p50_x", "max_x"]
+
+    def test_parse_aggregates_rejects_duplicate_names(self):
+        """Test that result columns must have distinct names."""
+        with pytest.raises(ValidationError):
+            parse_aggregates("sum(x), sum(x)", [])
+        with pytest.raises(ValidationError):
+            parse_aggregates("max(x) AS region", ["region"])
+        with pytest.raises(ValidationError):
+            parse_aggregates(" , ", [])
+
+    def test_build_aggregate_query(self):
+        """Test that grouping, filter and aggregates are pushed down."""
+        sql = build_aggregate_query(
+            "c.s.t",
+            ["region", "day"],
+            [parse_aggregate("count(*)"), parse_aggregate("avg(price)")],
+            filter_expr="price > 0",
+            limit=101,
+        )
+
+        assert _compact(sql) == (
+            "SELECT `region`, `day`, COUNT(*) AS `count`, AVG(`price`) AS `avg_price` "
+            "FROM c.s.t WHERE price > 0 GROUP BY `region`, `day` "
+            "ORDER BY `region`, `day` LIMIT 101"
+        )
+
+    def test_build_aggregate_query_without_groups(self):
+        """Test that aggregating the whole table has no GROUP BY."""
+        sql = build_aggregate_query("c.s.t", [], [parse_aggregate("count(*)")])
+
+        assert _compact(sql) == "SELECT COUNT(*) AS `count` FROM c.s.t"
+
+
+class TestPreviewQueries:
+    """Test suite for table sample and statistics statements."""
+
+    @pytest.mark.parametrize(
+        "kwargs, expected",
+        [
+            ({}, "c.s.t"),
+            ({"sample_rows": 1000}, "c.s.t TABLESAMPLE (1000 ROWS)"),
+            (
+                {"version": 7, "sample_percent": 0.5, "sample_rows": 1000, "seed": 3},
+                "c.s.t VERSION AS OF 7 TABLESAMPLE (0.5 PERCENT) REPEATABLE (3)",
+            ),
+            (
+                {"sample_percent": 0.00001},
+                "c.s.t TABLESAMPLE (0.00001 PERCENT) REPEATABLE (0)",
+            ),
+        ],
+    )
+    def test_build_sample_source(self, kwargs, expected):
+        """Test that samples are read at a version with a fixed seed."""
+        assert build_sample_source("c.s.t", **kwargs) == expected
+
+    def test_build_stats_query(self):
+        """Test that every statistic is computed in one statement."""
+        sql = build_stats_query(
+            "c.s.t TABLESAMPLE (10 ROWS)",
+            [("id", "ordered"), ("raw", "distinct"), ("odd`name", "count")],
+        )
+
+        assert _compact(sql) == (
+            "SELECT COUNT(*) AS `rows`, COUNT(`id`) AS `n0`, "
+            "APPROX_COUNT_DISTINCT(`id`) AS `d0`, MIN(`id`) AS `lo0`, "
+            "MAX(`id`) AS `hi0`, COUNT(`raw`) AS `n1`, "
+            "APPROX_COUNT_DISTINCT(`raw`) AS `d1`, COUNT(`odd``name`) AS `n2` "
+            "FROM c.s.t TABLESAMPLE (10 ROWS)"
+        )
+
+
+class TestInsertBatches:
+    """Tests for batched INSERT statements."""
+
+    def test_build_insert_query(self):
+        """Test that each row gets its own group of markers."""
+        sql = build_insert_query("c.s.t", ["id", "name"], 2)
+
+        assert _compact(sql) == "INSERT INTO c.s.t (id, name) VALUES (?, ?), (?, ?)"
+
+    @pytest.mark.parametrize(
+        "columns, max_rows, max_parameters, expected",
+        [(2, 1000, 5000, 1000), (10, 1000, 5000, 500), (10, 1000, 5, 1)],
+    )
+    def test_insert_batch_size(self, columns, max_rows, max_parameters, expected):
+        """Test that batches respect both the row and parameter limits."""
+        assert insert_batch_size(columns, max_rows, max_parameters) == expected
+
+
+class TestCopyInto:
+    """Tests for COPY INTO statements."""
+
+    def test_build_copy_into_query(self):
+        """Test that the source and file names are quoted literals."""
+        sql = build_copy_into_query("c.s.t", "/Volumes/c/s/v/it's", ["a.parquet"])
+
+        assert _compact(sql) == (
+            "COPY INTO c.s.t FROM '/Volumes/c/s/v/it\\'s' "
+            "FILEFORMAT = PARQUET FILES = ('a.parquet')"
+        )
+
+
+class TestCursor:
+    """Test suite for pagination cursors."""
+
+    @pytest.mark.parametrize("value", [42, "abc", 1.5, None])
+    def test_round_trip(self, value):
+        """Test that a cursor decodes to the encoded key value."""
+        assert decode_cursor(encode_cursor("id", value), "id") == (value, 0)
+
+    def test_null_key_cursor_counts_nulls(self):
+        """Test that a cursor after a NULL key carries the NULL keys returned."""
+        assert decode_cursor(encode_cursor("id", None, 5), "id") == (None, 5)
+
+    def test_cursor_is_url_safe(self):
+        """Test that cursors can be passed in a query string as-is."""
+        cursor = encode_cursor("id", "a/b+c?")
+        assert all(c.isalnum() or c in "-_=" for c in cursor)
+
+    def test_rejects_cursor_for_other_key(self):
+        """Test that a cursor cannot be reused with a different order_by."""
+        with pytest.raises(ValidationError):
+            decode_cursor(encode_cursor("id", 1), "name")
+
+    def test_rejects_garbage(self):
+        """Test that malformed cursors are rejected."""
+        with pytest.raises(ValidationError):
+            decode_cursor("not-a-cursor", "id")
@@ -0,0 +1,112 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+
+import pytest
+
+from services.db.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """Test suite for SingleFlight."""
+
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test that callers with the same key share a single call."""
+        group = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(*(group.do("k", fetch) for _ in range(10)))
+
+        assert results == ["result"] * 10
+        assert calls == 1
+        assert group.stats() == {"executions": 1, "shared": 9, "in_flight": 0}
+
+    async def test_different_keys_run_separately(self):
+        """Test that different keys are not coalesced."""
+        group = SingleFlight()
+
+        async def fetch(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        results = await asyncio.gather(
+            group.do("a", lambda: fetch("a")), group.do("b", lambda: fetch("b"))
+        )
+
+        assert results == ["a", "b"]
+        assert group.stats()["executions"] == 2
+
+    async def test_sequential_calls_are_not_coalesced(self):
+        """Test that a finished call is not reused by later callers."""
+        group = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await group.do("k", fetch) == 1
+        assert await group.do("k", fetch) == 2
+
+    async def test_exceptions_are_shared(self):
+        """Test that every waiter sees the failure of the shared call."""
+        group = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(group.do("k", fail) for _ in range(3)), return_exceptions=True
+        )
+
+        assert all(isinstance(r, ValueError) for r in results)
+        assert group.stats()["executions"] == 1
+
+    async def test_cancelling_one_waiter_keeps_call_running(self):
+        """Test that one cancelled caller does not cancel the shared call."""
+        group = SingleFlight()
+        started = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            await asyncio.sleep(0.05)
+            return "result"
+
+        first = asyncio.create_task(group.do("k", fetch))
+        await started.wait()
+        second = asyncio.create_task(group.do("k", fetch))
+        await asyncio.sleep(0)
+
+        first.cancel()
+
+        assert await second == "result"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    async def test_cancelling_all_waiters_cancels_call(self):
+        """Test that the shared call is cancelled once nobody waits for it."""
+        group = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiter = asyncio.create_task(group.do("k", fetch))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+
+        await asyncio.wait_for(cancelled.wait(), timeout=1)
+        assert group.stats()["in_flight"] == 0
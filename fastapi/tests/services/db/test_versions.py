@@ -0,0 +1,106 @@
+"""Tests for Delta table versions and ETags."""
+
+import pytest
+
+from services.db import connector, versions
+from services.db.versions import compute_etag, etag_matches, table_version_async
+from tests.fakes import FakeWarehouse
+
+
+@pytest.fixture
+def warehouse(mocker):
+    """Route the connector to an in-memory warehouse."""
+    warehouse = FakeWarehouse()
+    warehouse.tables["main.default.items"] = [{"id": 1}]
+    mocker.patch(
+        "services.db.connector.get_connection",
+        side_effect=lambda wid: warehouse.connect(),
+    )
+    yield warehouse
+    connector.query_cache.clear()
+    versions._unversioned.clear()
+
+
+class TestTableVersion:
+    """Tests for looking up Delta table versions."""
+
+    @pytest.mark.asyncio
+    async def test_version_is_cached(self, warehouse):
+        """Test that repeated lookups share one DESCRIBE HISTORY."""
+        warehouse.versions["main.default.items"] = 7
+
+        first = await table_version_async("main.default.items", "wid", 10.0)
+        second = await table_version_async("main.default.items", "wid", 10.0)
+
+        assert first == second == 7
+        assert warehouse.statements == ["DESCRIBE HISTORY main.default.items LIMIT 1"]
+
+    @pytest.mark.asyncio
+    async def test_unversioned_table_is_remembered(self, warehouse):
+        """Test that a table without a history is not looked up every request."""
+        warehouse.views.add("main.default.view")
+
+        assert await table_version_async("main.default.view", "wid", 10.0) is None
+        assert await table_version_async("main.default.view", "wid", 10.0) is None
+
+        assert len(warehouse.statements) == 1
+
+    @pytest.mark.asyncio
+    async def test_unversioned_tables_are_bounded(self, warehouse, mocker):
+        """Test that only the most recent tables without a history are kept."""
+        mocker.patch.object(versions, "_UNVERSIONED_MAX_ENTRIES", 2)
+        for name in ("a", "b", "c"):
+            warehouse.views.add(f"main.default.{name}")
+            await table_version_async(f"main.default.{name}", "wid", 10.0)
+
+        assert list(versions._unversioned) == ["main.default.b", "main.default.c"]
+
+    @pytest.mark.asyncio
+    async def test_expired_unversioned_tables_are_dropped(self, warehouse):
+        """Test that tables are forgotten once their entry expires."""
+        warehouse.views.update({"main.default.a", "main.default.b"})
+
+        await table_version_async("main.default.a", "wid", 0.0)
+        await table_version_async("main.default.b", "wid", 10.0)
+
+        assert list(versions._unversioned) == ["main.default.b"]
+
+    @pytest.mark.asyncio
+    async def test_failed_lookup_is_retried(self, warehouse, mocker):
+        """Test that a transient failure does not mark the table unversioned."""
+        warehouse.versions["main.default.items"] = 7
+        mocker.patch(
+            "services.db.versions.query_async",
+            side_effect=[Exception("Connection reset by peer"), [{"version": 7}]],
+        )
+
+        assert await table_version_async("main.default.items", "wid", 10.0) is None
+        assert await table_version_async("main.default.items", "wid", 10.0) == 7
+
+
+class TestETags:
+    """Tests for computing and comparing ETags."""
+
+    def test_etag_depends_on_version_and_query(self):
+        """Test that the ETag changes with the version and the query."""
+        etag = compute_etag("c.s.t", 1, "SELECT *", [], "json")
+
+        assert etag == compute_etag("c.s.t", 1, "SELECT *", [], "json")
+        assert etag != compute_etag("c.s.t", 2, "SELECT *", [], "json")
+        assert etag != compute_etag("c.s.t", 1, "SELECT *", [], "arrow")
+        assert etag.startswith('W/"') and etag.endswith('"')
+
+    @pytest.mark.parametrize(
+        "if_none_match, expected",
+        [
+            ('W/"abc"', True),
+            ('"abc"', True),
+            ('"other", W/"abc"', True),
+            ("*", True),
+            ('"other"', False),
+            (None, False),
+        ],
+    )
+    def test_etag_matches(self, if_none_match, expected):
+        """Test weak comparison against If-None-Match lists."""
+        assert etag_matches(if_none_match, 'W/"abc"') is expected
@@ -0,0 +1,79 @@
+"""Tests for the response encoders."""
+
+from datetime import datetime
+from decimal import Decimal
+
+import orjson
+import pyarrow as pa
+
+from services.encoding import FastJSONResponse, to_columnar, to_ndjson
+
+
+class TestToNdjson:
+    """Test suite for to_ndjson."""
+
+    ROWS = pa.Table.from_pylist(
+        [
+            {
+                "data": b"\x00\xff",
+                "ratio": float("nan"),
+                "at": datetime(2024, 5, 1, 12, 30),
+                "price": Decimal("9.50"),
+                "units": Decimal("3"),
+            },
+            {"data": None, "ratio": 0.5, "at": None, "price": None, "units": None},
+        ]
+    )
+
+    def test_lines_are_valid_json(self):
+        """Test that every line parses, with NaN as null and base64 binary."""
+        lines = to_ndjson(self.ROWS).splitlines()
+
+        first = orjson.loads(lines[0])
+        assert first == {
+            "data": "AP8=",
+            "ratio": None,
+            "at": "2024-05-01T12:30:00",
+            "price": 9.5,
+            "units": 3,
+        }
+        assert orjson.loads(lines[1])["ratio"] == 0.5
+
+    def test_lines_match_table_rows(self):
+        """Test that each line encodes a row like a JSON table page does."""
+        rows = self.ROWS.to_pylist()
+        page = orjson.loads(FastJSONResponse({"data": rows}).body)["data"]
+
+        lines = to_ndjson(self.ROWS).splitlines()
+
+        assert [orjson.loads(line) for line in lines] == page
+
+    def test_empty_batch(self):
+        """Test that an empty batch encodes to nothing."""
+        assert to_ndjson(self.ROWS.slice(0, 0)) == b""
+
+
+class TestToColumnar:
+    """Test suite for to_columnar."""
+
+    def test_decimals_match_rows_shape(self):
+        """Test that decimal columns encode the same values as table rows."""
+        values = {
+            "serial": (pa.decimal128(38, 0), ["12345678901234567890", "5", "-7"]),
+            "units": (pa.decimal128(18, 0), ["999999999999999999", "1", "-2"]),
+            "price": (pa.decimal128(10, 2), ["9.50", "0.01", "-3.25"]),
+        }
+        table = pa.table(
+            {
+                name: pa.array([Decimal(v) for v in data] + [None], type=type_)
+                for name, (type_, data) in values.items()
+            }
+        )
+        rows = orjson.loads(FastJSONResponse({"data": table.to_pylist()}).body)
+
+        columnar = orjson.loads(FastJSONResponse(to_columnar(table)).body)
+
+        assert columnar["data"] == [
+            [row[name] for row in rows["data"]] for name in columnar["columns"]
+        ]
+        assert columnar["data"][0] == ["12345678901234567890", 5, -7, None]
@@ -0,0 +1,213 @@
+"""Tests for the disk cache of volume files."""
+
+import io
+import os
+
+import pytest
+
+from services.file_cache import FileCache
+
+
+class Downloads:
+    """Serve file contents, counting the downloads."""
+
+    def __init__(self):
+        self.count = 0
+
+    def of(self, data):
+        self.count += 1
+        return io.BytesIO(data)
+
+
+class FailingDownload(io.BytesIO):
+    """A download that fails after its first chunk."""
+
+    def read(self, size=-1):
+        if self.tell():
+            raise OSError("storage unavailable")
+        return super().read(size)
+
+
+@pytest.fixture
+def downloads():
+    return Downloads()
+
+
+def _cached_files(cache):
+    return sorted(os.listdir(cache.directory))
+
+
+def _read_all(stream, chunk_size=2):
+    chunks = []
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                return b"".join(chunks)
+            chunks.append(chunk)
+    finally:
+        stream.close()
+
+
+def _open(cache, file_path, etag, data, downloads):
+    """Get a file from the cache, downloading it through the cache on a miss."""
+    entry = cache.get(file_path, etag, len(data))
+    if entry is None:
+        contents = cache.fill(file_path, etag, len(data), downloads.of(data))
+        assert _read_all(contents) == data
+        entry = cache.get(file_path, etag, len(data))
+    return entry
+
+
+class TestFileCache:
+    """Test suite for FileCache."""
+
+    def test_miss_then_hit(self, tmp_path, downloads):
+        """Test that a file is downloaded once and then read from disk."""
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+
+        for _ in range(3):
+            entry = _open(cache, "/Volumes/a", '"1"', b"hello", downloads)
+            with open(entry.local_path, "rb") as f:
+                assert f.read() == b"hello"
+            cache.release(entry)
+
+        assert downloads.count == 1
+        assert cache.stats() == {
+            "hits": 3,
+            "misses": 1,
+            "evictions": 0,
+            "entries": 1,
+            "bytes": 5,
+        }
+
+    def test_download_is_sent_while_cached(self, tmp_path, downloads):
+        """Test that a download's chunks are read before it is all cached."""
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+        contents = cache.fill("/Volumes/a", '"1"', 5, downloads.of(b"hello"))
+
+        assert contents.read(2) == b"he"
+        assert cache.get("/Volumes/a", '"1"', 5) is None
+
+        assert _read_all(contents) == b"llo"
+        assert cache.get("/Volumes/a", '"1"', 5) is not None
+
+    def test_empty_file(self, tmp_path, downloads):
+        """Test that an empty file is cached."""
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+
+        entry = _open(cache, "/Volumes/a", '"1"', b"", downloads)
+
+        assert os.path.getsize(entry.local_path) == 0
+
+    def test_changed_file_is_downloaded_again(self, tmp_path, downloads):
+        """Test that an entry is not served once the file's ETag changes."""
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+        old = _open(cache, "/Volumes/a", '"1"', b"old", downloads)
+        cache.release(old)
+
+        new = _open(cache, "/Volumes/a", '"2"', b"new", downloads)
+
+        with open(new.local_path, "rb") as f:
+            assert f.read() == b"new"
+        assert not os.path.exists(old.local_path)
+        assert downloads.count == 2
+        assert cache.stats()["entries"] == 1
+
+    def test_least_recently_used_is_evicted(self, tmp_path, downloads):
+        """Test that the cache stays within its size by evicting old files."""
+        cache = FileCache(str(tmp_path), max_bytes=10, max_file_bytes=10)
+        for path in ["/Volumes/a", "/Volumes/b", "/Volumes/a", "/Volumes/c"]:
+            cache.release(_open(cache, path, '"1"', b"data", downloads))
+
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["bytes"] == 8
+        # b was the least recently used
+        cache.release(_open(cache, "/Volumes/a", '"1"', b"data", downloads))
+        assert downloads.count == 3
+        assert len(_cached_files(cache)) == 2
+
+    def test_files_being_read_outlive_eviction(self, tmp_path, downloads):
+        """Test that an evicted file is only deleted once it has been sent."""
+        cache = FileCache(str(tmp_path), max_bytes=4, max_file_bytes=4)
+        held = _open(cache, "/Volumes/a", '"1"', b"aaaa", downloads)
+        cache.release(_open(cache, "/Volumes/b", '"1"', b"bbbb", downloads))
+
+        assert os.path.exists(held.local_path)
+        cache.release(held)
+        assert not os.path.exists(held.local_path)
+
+    def test_large_files_are_not_cached(self, tmp_path, downloads):
+        """Test that files above the size limit bypass the cache."""
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=4)
+        contents = downloads.of(b"hello")
+
+        assert cache.get("/Volumes/a", '"1"', 5) is None
+        assert cache.fill("/Volumes/a", '"1"', 5, contents) is contents
+        assert cache.stats()["misses"] == 0
+
+    def test_size_mismatch_is_not_cached(self, tmp_path, downloads):
+        """Test that a file changed during its download is not cached."""
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+
+        for data in [b"hello", b"he"]:
+            contents = cache.fill("/Volumes/a", '"1"', 3, downloads.of(data))
+            assert _read_all(contents) == data
+
+        assert cache.get("/Volumes/a", '"1"', 3) is None
+        assert _cached_files(cache) == []
+
+    def test_failed_download(self, tmp_path):
+        """Test that a failed download is raised and leaves no file behind."""
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+        contents = cache.fill("/Volumes/a", '"1"', 5, FailingDownload(b"hello"))
+
+        with pytest.raises(OSError):
+            _read_all(contents)
+
+        assert _cached_files(cache) == []
+        # The next download of the file is cached
+        retry = io.BytesIO(b"hello")
+        assert cache.fill("/Volumes/a", '"1"', 5, retry) is not retry
+
+    def test_abandoned_download_is_discarded(self, tmp_path, downloads):
+        """Test that a download closed before its end is not cached."""
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+        contents = cache.fill("/Volumes/a", '"1"', 5, downloads.of(b"hello"))
+
+        contents.read(2)
+        contents.close()
+
+        assert _cached_files(cache) == []
+        assert cache.get("/Volumes/a", '"1"', 5) is None
+
+    def test_concurrent_downloads_are_cached_once(self, tmp_path, downloads):
+        """Test that only one download of a file at a time is cached."""
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+        first = cache.fill("/Volumes/a", '"1"', 5, downloads.of(b"hello"))
+        second = downloads.of(b"hello")
+
+        assert cache.fill("/Volumes/a", '"1"', 5, second) is second
+        assert _read_all(first) == b"hello"
+        assert cache.fill("/Volumes/a", '"2"', 5, second) is not second
+
+    def test_leftover_files_are_removed(self, tmp_path, downloads):
+        """Test that files cached by a previous process are deleted."""
+        (tmp_path / "stale.cached").write_bytes(b"stale")
+        (tmp_path / "notes.txt").write_bytes(b"keep")
+        cache = FileCache(str(tmp_path), max_bytes=100, max_file_bytes=100)
+
+        cache.release(_open(cache, "/Volumes/a", '"1"', b"hello", downloads))
+
+        assert not (tmp_path / "stale.cached").exists()
+        assert (tmp_path / "notes.txt").exists()
+
+    def test_close_removes_directory(self, tmp_path, downloads):
+        """Test that closing the cache deletes its directory."""
+        cache = FileCache(str(tmp_path / "1234"), max_bytes=100, max_file_bytes=100)
+        cache.release(_open(cache, "/Volumes/a", '"1"', b"hello", downloads))
+
+        cache.close()
+
+        assert not (tmp_path / "1234").exists()
+        assert cache.stats()["entries"] == 0
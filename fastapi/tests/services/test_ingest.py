@@ -0,0 +1,164 @@
+"""Tests for staged bulk ingest, using the in-memory warehouse and Files API."""
+
+import pytest
+
+from errors.exceptions import ConfigurationError, ValidationError
+from services.db import connector
+from services.ingest import (
+    bulk_ingest,
+    bulk_ingest_async,
+    choose_ingest_mode,
+    read_records,
+    records_to_arrow,
+)
+from tests.fakes import FakeWarehouse
+
+STAGING = "/Volumes/main/default/staging"
+
+
+@pytest.fixture
+def warehouse(mocker):
+    """Route the connector to an in-memory warehouse."""
+    warehouse = FakeWarehouse()
+    mocker.patch(
+        "services.db.connector.get_connection",
+        side_effect=lambda wid: warehouse.connect(),
+    )
+    yield warehouse
+    connector.close_connections()
+    connector.query_cache.clear()
+
+
+class TestChooseIngestMode:
+    """Tests for choosing between INSERT and COPY INTO."""
+
+    @pytest.mark.parametrize(
+        "rows, staging, expected",
+        [(10, STAGING, "insert"), (5000, STAGING, "copy"), (5000, None, "insert")],
+    )
+    def test_auto_mode_uses_payload_size(self, rows, staging, expected):
+        """Test that auto copies large payloads when staging is configured."""
+        assert choose_ingest_mode(rows, "auto", staging, 5000) == expected
+
+    def test_explicit_mode_is_kept(self):
+        """Test that an explicit mode overrides the size heuristic."""
+        assert choose_ingest_mode(1, "copy", STAGING, 5000) == "copy"
+        assert choose_ingest_mode(10**6, "insert", STAGING, 5000) == "insert"
+
+    def test_copy_requires_staging_volume(self):
+        """Test that copy mode fails clearly without a staging volume."""
+        with pytest.raises(ConfigurationError):
+            choose_ingest_mode(1, "copy", None, 5000)
+
+
+class TestReadRecords:
+    """Tests for parsing NDJSON and CSV bodies."""
+
+    def test_reads_ndjson(self):
+        """Test that each NDJSON line becomes a record."""
+        table = read_records(
+            b'{"id": 1, "name": "a"}\n{"id": 2, "name": "b"}\n', "ndjson"
+        )
+
+        assert table.to_pylist() == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+
+    def test_reads_csv(self):
+        """Test that the CSV header names the columns."""
+        table = read_records(b"id,name\n1,a\n2,b\n", "csv")
+
+        assert table.to_pylist() == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+
+    @pytest.mark.parametrize("body", [b"", b"  \n", b'{"id": 1\n'])
+    def test_rejects_invalid_bodies(self, body):
+        """Test that empty or malformed bodies are validation errors."""
+        with pytest.raises(ValidationError):
+            read_records(body, "ndjson")
+
+
+class TestRecordsToArrow:
+    """Tests for converting inserted records to Arrow."""
+
+    def test_converts_records(self):
+        """Test that each record becomes a row."""
+        records = [{"id": 1, "name": "a"}, {"id": 2, "name": None}]
+
+        assert records_to_arrow(records).to_pylist() == records
+
+    def test_rejects_records_with_other_columns(self):
+        """Test that a column missing from the first record is not dropped."""
+        with pytest.raises(Exception, match="record 1 has columns"):
+            records_to_arrow([{"id": 1}, {"id": 2, "name": "b"}])
+
+
+class TestBulkIngest:
+    """Tests for loading records through a staged Parquet file."""
+
+    def test_stages_file_and_copies_into_table(self, warehouse):
+        """Test that records land in the table through one COPY INTO."""
+        records = [{"id": i, "name": f"n{i}"} for i in range(3)]
+
+        inserted = bulk_ingest(
+            "main.default.target",
+            records_to_arrow(records),
+            "warehouse-id",
+            STAGING,
+            files=warehouse.files,
+        )
+
+        assert inserted == 3
+        assert warehouse.tables["main.default.target"] == records
+        [statement] = warehouse.statements
+        assert statement.startswith(
+            f"COPY INTO main.default.target FROM '{STAGING}' FILEFORMAT = PARQUET"
+        )
+        # The staged file is removed once loaded
+        assert warehouse.files.files == {}
+        assert warehouse.files.deleted[0].startswith(f"{STAGING}/ingest-")
+
+    def test_removes_staged_file_when_copy_fails(self, warehouse, mocker):
+        """Test that a failed COPY INTO does not leave the file behind."""
+        mocker.patch(
+            "services.ingest.execute_statement",
+            side_effect=Exception("Query failed: schema mismatch"),
+        )
+
+        with pytest.raises(Exception, match="schema mismatch"):
+            bulk_ingest(
+                "main.default.target",
+                records_to_arrow([{"id": 1}]),
+                "warehouse-id",
+                STAGING,
+                files=warehouse.files,
+            )
+
+        assert warehouse.files.files == {}
+
+    def test_invalidates_cached_reads(self, warehouse):
+        """Test that cached reads of the target table are dropped."""
+        warehouse.tables["main.default.target"] = [{"id": 0}]
+        select = "SELECT * FROM main.default.target"
+        assert connector.query(select, "warehouse-id") == [{"id": 0}]
+
+        bulk_ingest(
+            "main.default.target",
+            records_to_arrow([{"id": 1}]),
+            "warehouse-id",
+            STAGING,
+            files=warehouse.files,
+        )
+
+        assert connector.query(select, "warehouse-id") == [{"id": 0}, {"id": 1}]
+
+    @pytest.mark.asyncio
+    async def test_bulk_ingest_async(self, warehouse):
+        """Test that the async variant loads the records too."""
+        inserted = await bulk_ingest_async(
+            "main.default.target",
+            records_to_arrow([{"id": 1}, {"id": 2}]),
+            "warehouse-id",
+            STAGING,
+            files=warehouse.files,
+        )
+
+        assert inserted == 2
+        assert len(warehouse.tables["main.default.target"]) == 2
@@ -0,0 +1,256 @@
+"""Tests for volume directory listings."""
+
+import threading
+import time
+
+import pytest
+from databricks.sdk.errors import NotFound
+
+from services.listing import (
+    ListingCache,
+    decode_page_token,
+    encode_page_token,
+    invalidate_listings,
+    list_volume,
+    listing_cache,
+    normalize_directory,
+    paginate,
+    walk,
+)
+
+# Ten directories of ten files each below /Volumes/v
+TREE = {
+    "/Volumes/v": [f"/Volumes/v/d{i}/" for i in range(10)],
+    **{
+        f"/Volumes/v/d{i}": [f"/Volumes/v/d{i}/f{j}" for j in range(10)]
+        for i in range(10)
+    },
+}
+
+
+class FakeVolume:
+    """List directories of TREE, tracking how many are listed at once."""
+
+    def __init__(self, tree=TREE, delay=0.0):
+        self.tree = tree
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, directory):
+        with self._lock:
+            self.calls.append(directory)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if directory not in self.tree:
+                raise NotFound(f"No such directory: {directory}")
+            return [
+                {
+                    "path": normalize_directory(path),
+                    "is_directory": path.endswith("/"),
+                }
+                for path in self.tree[directory]
+            ]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+@pytest.fixture(autouse=True)
+def clear_listings():
+    yield
+    listing_cache.clear()
+
+
+def test_normalize_directory():
+    """Test that directories are compared without redundant slashes."""
+    assert normalize_directory("/Volumes/a/b/") == "/Volumes/a/b"
+    assert normalize_directory("//Volumes//a/./b") == "/Volumes/a/b"
+    assert normalize_directory("") == "/"
+
+
+class TestPagination:
+    """Tests for pages and page tokens."""
+
+    ENTRIES = [{"path": f"/Volumes/v/f{i}"} for i in range(5)]
+
+    def test_pages_continue_after_the_last_path(self):
+        """Test that a page starts after the previous page's last path."""
+        page, more = paginate(self.ENTRIES, 2)
+        assert [e["path"] for e in page] == ["/Volumes/v/f0", "/Volumes/v/f1"]
+        assert more
+
+        page, more = paginate(self.ENTRIES, 2, after="/Volumes/v/f3")
+        assert [e["path"] for e in page] == ["/Volumes/v/f4"]
+        assert not more
+
+    def test_deleted_last_path(self):
+        """Test that a page continues correctly if its last path has gone."""
+        entries = [e for e in self.ENTRIES if e["path"] != "/Volumes/v/f1"]
+
+        page, _ = paginate(entries, 2, after="/Volumes/v/f1")
+
+        assert [e["path"] for e in page] == ["/Volumes/v/f2", "/Volumes/v/f3"]
+
+    def test_token_round_trip(self):
+        """Test that a token carries the last path of its listing."""
+        token = encode_page_token("/Volumes/v", True, "/Volumes/v/f1")
+
+        assert decode_page_token(token, "/Volumes/v", True) == "/Volumes/v/f1"
+
+    @pytest.mark.parametrize(
+        "token, root, recursive",
+        [
+            ("not a token", "/Volumes/v", False),
+            (encode_page_token("/Volumes/v", False, "x"), "/Volumes/w", False),
+            (encode_page_token("/Volumes/v", False, "x"), "/Volumes/v", True),
+        ],
+    )
+    def test_invalid_tokens(self, token, root, recursive):
+        """Test that malformed tokens and tokens of other listings are rejected."""
+        with pytest.raises(ValueError):
+            decode_page_token(token, root, recursive)
+
+
+@pytest.mark.asyncio
+class TestWalk:
+    """Test suite for walk."""
+
+    async def test_single_directory(self):
+        """Test that a plain listing lists only the directory itself."""
+        volume = FakeVolume()
+
+        entries = await walk(volume, "/Volumes/v", recursive=False, max_walkers=4)
+
+        assert len(entries) == 10
+        assert volume.calls == ["/Volumes/v"]
+
+    async def test_recursive_walk_is_bounded(self):
+        """Test that subdirectories are listed concurrently, within the limit."""
+        volume = FakeVolume(delay=0.02)
+
+        entries = await walk(volume, "/Volumes/v", recursive=True, max_walkers=3)
+
+        assert len(entries) == 110
+        assert [e["path"] for e in entries] == sorted(e["path"] for e in entries)
+        assert 1 < volume.max_active <= 3
+
+    async def test_deleted_subdirectory_is_skipped(self):
+        """Test that a subdirectory deleted during the walk is skipped."""
+        tree = dict(TREE)
+        del tree["/Volumes/v/d3"]
+
+        entries = await walk(FakeVolume(tree), "/Volumes/v", True, 4)
+
+        assert len(entries) == 100
+
+    async def test_missing_root(self):
+        """Test that a missing directory is reported."""
+        with pytest.raises(NotFound):
+            await walk(FakeVolume(), "/Volumes/missing", True, 4)
+
+
+@pytest.mark.asyncio
+class TestListVolume:
+    """Test suite for list_volume."""
+
+    async def test_listing_is_cached(self):
+        """Test that a listing is read from storage once while cached."""
+        volume = FakeVolume()
+
+        for _ in range(3):
+            entries = await list_volume(volume, "/Volumes/v", True, 4)
+
+        assert len(entries) == 110
+        assert len(volume.calls) == 11
+
+    async def test_written_files_invalidate_listings(self):
+        """Test that writing a file drops the listings of its directories."""
+        volume = FakeVolume()
+        await list_volume(volume, "/Volumes/v", True, 4)
+        await list_volume(volume, "/Volumes/v/d1", False, 4)
+        await list_volume(volume, "/Volumes/v/d2", False, 4)
+
+        invalidate_listings("/Volumes/v/d1/new.csv")
+        volume.calls.clear()
+
+        # d2 is still cached; its parent and d1 are listed again
+        await list_volume(volume, "/Volumes/v/d2", False, 4)
+        assert volume.calls == []
+        await list_volume(volume, "/Volumes/v/d1", False, 4)
+        assert volume.calls == ["/Volumes/v/d1"]
+        await list_volume(volume, "/Volumes/v", True, 4)
+        assert len(volume.calls) == 12
+
+    async def test_paths_are_case_sensitive(self):
+        """Test that directories differing only in case are listed separately."""
+        tree = {"/Volumes/v/Data": ["/Volumes/v/Data/a"], "/Volumes/v/data": []}
+        volume = FakeVolume(tree)
+
+        upper = await list_volume(volume, "/Volumes/v/Data", False, 4)
+        lower = await list_volume(volume, "/Volumes/v/data", False, 4)
+
+        assert [e["path"] for e in upper] == ["/Volumes/v/Data/a"]
+        assert lower == []
+        assert volume.calls == ["/Volumes/v/Data", "/Volumes/v/data"]
+
+    async def test_listing_racing_a_write_is_not_cached(self):
+        """Test that a listing taken while a file was written is not kept."""
+        volume = FakeVolume()
+        walk_directory = volume.__call__
+
+        def list_directory(directory):
+            invalidate_listings("/Volumes/v/d1/new.csv")
+            return walk_directory(directory)
+
+        await list_volume(list_directory, "/Volumes/v/d1", False, 4)
+        await list_volume(volume, "/Volumes/v/d1", False, 4)
+
+        assert volume.calls == ["/Volumes/v/d1", "/Volumes/v/d1"]
+
+
+class TestListingCache:
+    """Test suite for ListingCache."""
+
+    ENTRIES = [{"path": "/Volumes/v/f", "is_directory": False}]
+
+    def test_expired_listing(self, mocker):
+        """Test that a listing is dropped once its TTL has passed."""
+        cache = ListingCache(max_entries=10, max_bytes=1000, ttl=30)
+        clock = mocker.patch("services.listing.time.monotonic", return_value=100.0)
+        cache.put("/Volumes/v", False, self.ENTRIES, 10, cache.generation())
+
+        assert cache.get("/Volumes/v", False) == self.ENTRIES
+        clock.return_value = 131.0
+        assert cache.get("/Volumes/v", False) is None
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache stays within its size by evicting old listings."""
+        cache = ListingCache(max_entries=10, max_bytes=25, ttl=30)
+        for directory in ["/Volumes/a", "/Volumes/b", "/Volumes/a", "/Volumes/c"]:
+            if cache.get(directory, False) is None:
+                cache.put(directory, False, self.ENTRIES, 10, cache.generation())
+
+        assert cache.get("/Volumes/b", False) is None
+        assert cache.get("/Volumes/a", False) == self.ENTRIES
+        assert cache.get("/Volumes/c", False) == self.ENTRIES
+
+    def test_invalidate_directory(self):
+        """Test that both listings of a directory, and only those, are dropped."""
+        cache = ListingCache(max_entries=10, max_bytes=1000, ttl=30)
+        for directory, recursive in [
+            ("/Volumes/v", False),
+            ("/Volumes/v", True),
+            ("/Volumes/v/d", True),
+        ]:
+            cache.put(directory, recursive, self.ENTRIES, 10, cache.generation())
+
+        cache.invalidate_directory("/Volumes/v")
+
+        assert cache.get("/Volumes/v", False) is None
+        assert cache.get("/Volumes/v", True) is None
+        assert cache.get("/Volumes/v/d", True) == self.ENTRIES
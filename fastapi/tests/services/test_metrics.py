@@ -0,0 +1,87 @@
+"""Tests for metrics and per-request timings."""
+
+from prometheus_client import CollectorRegistry, generate_latest
+
+from services.metrics import (
+    QUERY_PHASE_SECONDS,
+    PoolCollector,
+    Timings,
+    current_timings,
+    observe,
+    timed,
+)
+
+
+def _phase_count(phase):
+    return QUERY_PHASE_SECONDS.labels(phase)._sum.get(), sum(
+        bucket.get() for bucket in QUERY_PHASE_SECONDS.labels(phase)._buckets
+    )
+
+
+class TestTimings:
+    """Test suite for request timings."""
+
+    def test_server_timing_format(self):
+        """Test that phases are reported in milliseconds."""
+        timings = Timings()
+        timings.add("execute", 0.25)
+        timings.add("fetch", 0.0104)
+
+        assert timings.server_timing() == "execute;dur=250.0, fetch;dur=10.4"
+
+    def test_repeated_phases_accumulate(self):
+        """Test that a phase seen twice reports its total time."""
+        timings = Timings()
+        timings.add("fetch", 0.1)
+        timings.add("fetch", 0.2)
+
+        assert timings.phases["fetch"] == 0.1 + 0.2
+
+    def test_observe_records_histogram_and_request(self):
+        """Test that phases go to the histogram and the current request."""
+        timings = Timings()
+        token = current_timings.set(timings)
+        _, before = _phase_count("convert")
+        try:
+            observe("convert", 0.5)
+            with timed("convert"):
+                pass
+        finally:
+            current_timings.reset(token)
+
+        _, after = _phase_count("convert")
+        assert after - before == 2
+        assert timings.phases["convert"] >= 0.5
+
+    def test_observe_outside_a_request(self):
+        """Test that phases outside a request only reach the histogram."""
+        observe("execute", 0.01)
+
+        assert current_timings.get() is None
+
+
+class TestPoolCollector:
+    """Test suite for the pool gauges."""
+
+    def test_reports_pool_usage(self):
+        """Test that each warehouse's pool is reported with its saturation."""
+        registry = CollectorRegistry()
+        registry.register(
+            PoolCollector(
+                lambda: {
+                    "wh": {
+                        "size": 4,
+                        "idle": 1,
+                        "in_use": 3,
+                        "waiting": 2,
+                        "max_size": 4,
+                    }
+                }
+            )
+        )
+
+        output = generate_latest(registry).decode()
+
+        assert 'databricks_sql_pool_in_use{warehouse="wh"} 3.0' in output
+        assert 'databricks_sql_pool_waiting{warehouse="wh"} 2.0' in output
+        assert 'databricks_sql_pool_saturation{warehouse="wh"} 0.75' in output
@@ -0,0 +1,70 @@
+"""Tests for table previews."""
+
+import pyarrow as pa
+
+from services.preview import column_stats, stats_columns
+from services.schema import ColumnSchema, TableSchema
+
+
+class TestStatsColumns:
+    """Test suite for choosing the statistics of each column."""
+
+    def test_from_arrow_types(self):
+        """Test that nested and binary columns get fewer statistics."""
+        schema = pa.schema(
+            [
+                ("id", pa.int64()),
+                ("name", pa.string()),
+                ("raw", pa.binary()),
+                ("tags", pa.list_(pa.string())),
+            ]
+        )
+
+        assert stats_columns(schema) == [
+            ("id", "ordered"),
+            ("name", "ordered"),
+            ("raw", "distinct"),
+            ("tags", "count"),
+        ]
+
+    def test_table_types_take_precedence(self):
+        """Test that complex columns returned as JSON strings are recognised."""
+        schema = pa.schema([("ID", pa.int64()), ("attrs", pa.string())])
+        table_schema = TableSchema(
+            table_path="c.s.t",
+            columns={
+                "id": ColumnSchema(name="id", type_name="LONG"),
+                "attrs": ColumnSchema(name="attrs", type_name="MAP"),
+            },
+        )
+
+        assert stats_columns(schema, table_schema) == [
+            ("ID", "ordered"),
+            ("attrs", "count"),
+        ]
+
+
+class TestColumnStats:
+    """Test suite for reading a statistics statement's result."""
+
+    def test_column_stats(self):
+        """Test that counts are turned into null fractions."""
+        row = {"rows": 200, "n0": 200, "d0": 180, "lo0": 1, "hi0": 990, "n1": 150}
+
+        stats = column_stats(row, [("id", "ordered"), ("tags", "count")])
+
+        assert stats == {
+            "id": {"null_fraction": 0.0, "approx_distinct": 180, "min": 1, "max": 990},
+            "tags": {
+                "null_fraction": 0.25,
+                "approx_distinct": None,
+                "min": None,
+                "max": None,
+            },
+        }
+
+    def test_empty_sample(self):
+        """Test that an empty sample has no null fraction."""
+        stats = column_stats({"rows": 0, "n0": 0}, [("id", "count")])
+
+        assert stats["id"]["null_fraction"] is None
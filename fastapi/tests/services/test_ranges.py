@@ -0,0 +1,95 @@
+"""Tests for HTTP byte ranges."""
+
+import pytest
+
+from services.ranges import (
+    MAX_RANGES,
+    RangeNotSatisfiable,
+    closing_boundary,
+    file_etag,
+    if_range_matches,
+    multipart_length,
+    parse_range,
+    part_header,
+)
+
+LAST_MODIFIED = "Wed, 21 Oct 2015 07:28:00 GMT"
+
+
+class TestParseRange:
+    """Test suite for parse_range."""
+
+    @pytest.mark.parametrize(
+        "header, expected",
+        [
+            ("bytes=0-99", [(0, 99)]),
+            ("bytes=900-", [(900, 999)]),
+            ("bytes=-100", [(900, 999)]),
+            ("bytes=-5000", [(0, 999)]),
+            ("bytes=990-5000", [(990, 999)]),
+            ("bytes=0-9, 20-29", [(0, 9), (20, 29)]),
+            # Unordered, overlapping and adjacent ranges are merged
+            ("bytes=20-29,0-9,5-14,15-19", [(0, 29)]),
+            ("bytes=0-9, 2000-3000", [(0, 9)]),
+        ],
+    )
+    def test_satisfiable(self, header, expected):
+        """Test that ranges are clamped to the file and merged."""
+        assert parse_range(header, 1000) == expected
+
+    @pytest.mark.parametrize(
+        "header", [None, "", "items=0-9", "bytes=", "bytes=abc", "bytes=9-0", "bytes=-"]
+    )
+    def test_ignored(self, header):
+        """Test that malformed headers are ignored, sending the whole file."""
+        assert parse_range(header, 1000) is None
+
+    @pytest.mark.parametrize("header", ["bytes=1000-", "bytes=2000-3000", "bytes=-0"])
+    def test_not_satisfiable(self, header):
+        """Test that ranges entirely past the end are rejected."""
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range(header, 1000)
+
+    def test_many_ranges_are_coalesced(self):
+        """Test that many small ranges are served as one span."""
+        header = "bytes=" + ",".join(
+            f"{i * 10}-{i * 10 + 1}" for i in range(MAX_RANGES + 1)
+        )
+
+        assert parse_range(header, 1000) == [(0, MAX_RANGES * 10 + 1)]
+
+
+class TestIfRange:
+    """Test suite for if_range_matches."""
+
+    def test_if_range(self):
+        """Test that ranges are only served for an unchanged file."""
+        etag = file_etag("/Volumes/a/b/c/f.csv", 10, LAST_MODIFIED)
+
+        assert if_range_matches(None, etag, LAST_MODIFIED)
+        assert if_range_matches(etag, etag, LAST_MODIFIED)
+        assert if_range_matches(LAST_MODIFIED, etag, LAST_MODIFIED)
+        assert not if_range_matches(f"W/{etag}", etag, LAST_MODIFIED)
+        assert not if_range_matches('"other"', etag, LAST_MODIFIED)
+        assert not if_range_matches("Thu, 22 Oct 2015 07:28:00 GMT", etag, None)
+
+    def test_etag_changes_with_the_file(self):
+        """Test that the ETag follows the size and modification time."""
+        etag = file_etag("/f", 10, LAST_MODIFIED)
+
+        assert etag.startswith('"')
+        assert file_etag("/f", 11, LAST_MODIFIED) != etag
+        assert file_etag("/f", 10, "Thu, 22 Oct 2015 07:28:00 GMT") != etag
+
+
+def test_multipart_length():
+    """Test that the announced length matches the framed body."""
+    ranges = [(0, 9), (100, 149)]
+    body = b"".join(
+        part_header("b0undary", "text/csv", start, end, 1000)
+        + b"x" * (end - start + 1)
+        + b"\r\n"
+        for start, end in ranges
+    ) + closing_boundary("b0undary")
+
+    assert multipart_length("b0undary", "text/csv", ranges, 1000) == len(body)
@@ -0,0 +1,201 @@
+"""Tests for the cached table schema registry."""
+
+from decimal import Decimal
+
+import pytest
+from databricks.sdk.service.catalog import ColumnInfo, ColumnTypeName
+
+from errors.exceptions import ValidationError
+from services import schema
+from services.encoding import FastJSONResponse
+from services.schema import (
+    SchemaRegistry,
+    column_converters,
+    convert_rows,
+    filter_columns,
+    is_schema_mismatch,
+    plain_result_columns,
+    requested_columns,
+    validate_columns,
+)
+
+COLUMNS = [
+    ColumnInfo(name="id", type_name=ColumnTypeName.LONG),
+    ColumnInfo(name="Amount", type_name=ColumnTypeName.DECIMAL, type_scale=2),
+    ColumnInfo(
+        name="units", type_name=ColumnTypeName.DECIMAL, type_precision=10, type_scale=0
+    ),
+    ColumnInfo(
+        name="serial", type_name=ColumnTypeName.DECIMAL, type_precision=38, type_scale=0
+    ),
+    ColumnInfo(name="payload", type_name=ColumnTypeName.BINARY),
+]
+
+
+@pytest.fixture
+def registry(table_schemas):
+    table_schemas["main.default.items"] = COLUMNS
+    return SchemaRegistry(ttl=60)
+
+
+class TestColumnExtraction:
+    """Tests for finding the columns a request names."""
+
+    def test_requested_columns(self):
+        """Test that plain and backticked names are found, not expressions."""
+        columns = "id, `Amount`, upper(name) AS n, *"
+
+        assert requested_columns(columns) == ["id", "Amount"]
+
+    def test_filter_columns(self):
+        """Test that backticked names outside literals are found."""
+        filter_expr = "`id` > 1 AND note = 'see `x`' AND amount > 0"
+
+        assert filter_columns(filter_expr) == ["id"]
+        assert filter_columns(None) == []
+
+
+class TestSchemaRegistry:
+    """Test suite for SchemaRegistry."""
+
+    @pytest.mark.asyncio
+    async def test_schema_is_cached(self, registry, mocker):
+        """Test that a table's schema is loaded once per TTL."""
+        load = mocker.spy(schema.SchemaRegistry, "_load")
+
+        first = await registry.get_async("main.default.items")
+        second = await registry.get_async("Main.Default.Items")
+
+        assert first is second
+        assert [col.name for col in first.columns.values()] == [
+            "id",
+            "Amount",
+            "units",
+            "serial",
+            "payload",
+        ]
+        assert load.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_table_is_not_validated(self, registry):
+        """Test that tables Unity Catalog cannot describe have no schema."""
+        assert await registry.get_async("main.default.missing") is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_reloads_schema(self, registry, table_schemas):
+        """Test that an invalidated schema is loaded again."""
+        await registry.get_async("main.default.items")
+        table_schemas["main.default.items"] = COLUMNS + [
+            ColumnInfo(name="added", type_name=ColumnTypeName.STRING)
+        ]
+
+        registry.invalidate("main.default.items")
+        table_schema = await registry.get_async("main.default.items")
+
+        assert table_schema.column("added") is not None
+
+    @pytest.mark.asyncio
+    async def test_disabled_registry(self, table_schemas):
+        """Test that a TTL of 0 disables the registry."""
+        table_schemas["main.default.items"] = COLUMNS
+
+        assert await SchemaRegistry(ttl=0).get_async("main.default.items") is None
+
+
+class TestValidation:
+    """Tests for rejecting unknown columns."""
+
+    @pytest.mark.asyncio
+    async def test_unknown_columns_are_rejected(self, registry):
+        """Test that unknown columns fail with the available ones listed."""
+        table_schema = await registry.get_async("main.default.items")
+
+        validate_columns(table_schema, ["ID", "amount"])
+        with pytest.raises(ValidationError) as exc_info:
+            validate_columns(table_schema, ["id", "nme"])
+
+        assert exc_info.value.status_code == 400
+        assert exc_info.value.details["unknown_columns"] == ["nme"]
+
+    @pytest.mark.parametrize(
+        "message, expected",
+        [
+            (
+                "[UNRESOLVED_COLUMN.WITH_SUGGESTION] A column `x` cannot be resolved",
+                True,
+            ),
+            ("[TABLE_OR_VIEW_NOT_FOUND] The table cannot be found", False),
+        ],
+    )
+    def test_is_schema_mismatch(self, message, expected):
+        """Test that only schema errors trigger a refresh."""
+        assert is_schema_mismatch(Exception(message)) is expected
+
+
+class TestTypedConversion:
+    """Tests for converting typed columns before encoding."""
+
+    @pytest.mark.asyncio
+    async def test_converts_typed_columns(self, registry):
+        """Test that decimals and binary values become JSON-native values."""
+        table_schema = await registry.get_async("main.default.items")
+        rows = [
+            {
+                "id": 1,
+                "amount": Decimal("1.50"),
+                "units": Decimal("3"),
+                "serial": Decimal("123456789012345678901234567890"),
+                "payload": b"\xff",
+            },
+            {
+                "id": 2,
+                "amount": None,
+                "units": Decimal("4"),
+                "serial": Decimal("5"),
+                "payload": None,
+            },
+        ]
+
+        convert_rows(rows, column_converters(table_schema, rows[0]))
+
+        assert rows == [
+            {
+                "id": 1,
+                "amount": 1.5,
+                "units": 3,
+                "serial": "123456789012345678901234567890",
+                "payload": "/w==",
+            },
+            {"id": 2, "amount": None, "units": 4, "serial": 5, "payload": None},
+        ]
+        assert type(rows[0]["units"]) is int
+
+    @pytest.mark.asyncio
+    async def test_conversion_matches_encoder(self, registry):
+        """Test that rows encode the same whether or not they were converted."""
+        table_schema = await registry.get_async("main.default.items")
+        rows = [
+            {
+                "amount": Decimal("1.50"),
+                "units": Decimal("3"),
+                "serial": serial,
+                "payload": b"\x00\xff",
+            }
+            for serial in (Decimal("5"), Decimal("123456789012345678901234567890"))
+        ]
+        expected = FastJSONResponse(rows).body
+
+        convert_rows(rows, column_converters(table_schema, rows[0]))
+
+        assert FastJSONResponse(rows).body == expected
+
+    def test_plain_result_columns(self):
+        """Test that aliases and expressions named like columns are not plain."""
+        names = ["id", "units", "Amount", "total"]
+
+        assert plain_result_columns(
+            "id, avg(units) AS units, name AS Amount, concat(a, b) total", names
+        ) == ["id"]
+        assert plain_result_columns("*", ["id", "units"]) == ["id", "units"]
+        assert plain_result_columns("*, units * 2 units", ["id", "units"]) == ["id"]
+        assert plain_result_columns("`id`, Units", ["id", "Units"]) == ["id", "Units"]
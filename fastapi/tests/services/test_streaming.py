@@ -0,0 +1,196 @@
+"""Tests for non-blocking streaming of blocking reads."""
+
+import asyncio
+import io
+import threading
+
+import pytest
+
+from services.streaming import StreamInterrupted, drain_into, read_ahead
+
+
+class CountingStream(io.BytesIO):
+    """A stream recording its reads and the threads they ran on."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+        self.threads = set()
+        self.chunk_size = None
+
+    def set_chunk_size(self, chunk_size):
+        self.chunk_size = chunk_size
+
+    def read(self, n=-1):
+        self.reads += 1
+        self.threads.add(threading.current_thread().name)
+        return super().read(n)
+
+
+class FailingStream(CountingStream):
+    """A stream failing after its first chunk."""
+
+    def read(self, n=-1):
+        if self.reads:
+            raise OSError("connection reset")
+        return super().read(n)
+
+
+@pytest.mark.asyncio
+class TestReadAhead:
+    """Test suite for read_ahead."""
+
+    async def test_reads_whole_stream(self):
+        """Test that chunks arrive in order and the stream is closed."""
+        stream = CountingStream(b"abcdefghij")
+
+        chunks = [chunk async for chunk in read_ahead(stream, 4, 2)]
+
+        assert chunks == [b"abcd", b"efgh", b"ij"]
+        assert stream.chunk_size == 4
+        assert stream.closed
+        # Reads ran on the file I/O pool, not on the event loop
+        assert all(name.startswith("volume-io") for name in stream.threads)
+
+    async def test_read_ahead_is_bounded(self):
+        """Test that reading pauses while the buffer is full."""
+        stream = CountingStream(b"x" * 100)
+        chunks = read_ahead(stream, 1, 3)
+
+        assert await anext(chunks) == b"x"
+        await asyncio.sleep(0.05)
+
+        # The chunk taken, three buffered and one waiting for room
+        assert stream.reads <= 5
+        await chunks.aclose()
+        assert stream.closed
+
+    async def test_errors_reach_the_consumer(self):
+        """Test that a failed read is raised after the chunks before it."""
+        chunks = read_ahead(FailingStream(b"abcdefgh"), 4, 2)
+
+        assert await anext(chunks) == b"abcd"
+        with pytest.raises(OSError):
+            await anext(chunks)
+
+
+async def _chunks(*chunks, error=None):
+    for chunk in chunks:
+        yield chunk
+    if error is not None:
+        raise error
+
+
+def _read_parts(part_size):
+    """Build a writer reading a stream in parts, as a multipart upload does."""
+    parts = []
+
+    def write(stream):
+        while True:
+            part = stream.read(part_size)
+            if not part:
+                return
+            parts.append((part, threading.current_thread().name))
+
+    return write, parts
+
+
+@pytest.mark.asyncio
+class TestDrainInto:
+    """Test suite for drain_into."""
+
+    async def test_reads_are_exact(self):
+        """Test that reads return whole parts regardless of chunk sizes."""
+        write, parts = _read_parts(4)
+
+        size = await drain_into(_chunks(b"ab", b"cdefg", b"", b"hij"), write, 2)
+
+        assert size == 10
+        assert [part for part, _ in parts] == [b"abcd", b"efgh", b"ij"]
+        assert all(name.startswith("volume-io") for _, name in parts)
+
+    async def test_buffering_is_bounded(self):
+        """Test that the source is consumed only a few chunks ahead of the writer."""
+        produced = 0
+        started = threading.Event()
+        proceed = threading.Event()
+
+        async def source():
+            nonlocal produced
+            for _ in range(100):
+                produced += 1
+                yield b"x"
+
+        def write(stream):
+            stream.read(1)
+            started.set()
+            proceed.wait()
+            stream.read()
+
+        task = asyncio.ensure_future(drain_into(source(), write, 3))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        await asyncio.sleep(0.05)
+
+        # The chunk read, three buffered and one waiting for room
+        assert produced <= 5
+        proceed.set()
+        assert await task == 100
+
+    async def test_source_errors_fail_the_writer(self):
+        """Test that a failed source is raised from the writer's next read."""
+        write, parts = _read_parts(4)
+
+        with pytest.raises(StreamInterrupted) as excinfo:
+            await drain_into(_chunks(b"abcdef", error=OSError("reset")), write, 2)
+
+        # The writer never saw the end of a short stream
+        assert [part for part, _ in parts] == [b"abcd"]
+        assert isinstance(excinfo.value.__cause__, OSError)
+
+    async def test_source_errors_are_raised_if_the_writer_swallows_them(self):
+        """Test that a writer ignoring a failed read does not hide the failure."""
+
+        def write(stream):
+            try:
+                stream.read()
+            except StreamInterrupted:
+                pass
+
+        with pytest.raises(StreamInterrupted):
+            await drain_into(_chunks(b"ab", error=OSError("reset")), write, 2)
+
+    async def test_writer_errors_are_raised(self):
+        """Test that a failed write is raised and the source is abandoned."""
+
+        def write(stream):
+            stream.read(1)
+            raise OSError("storage unavailable")
+
+        async def endless():
+            while True:
+                yield b"x"
+
+        with pytest.raises(OSError, match="storage unavailable"):
+            await drain_into(endless(), write, 2)
+
+    async def test_cancellation_releases_the_writer(self):
+        """Test that a cancelled drain fails the read of a waiting writer."""
+        finished = threading.Event()
+        never = asyncio.Event()
+
+        async def stalled():
+            yield b"x"
+            await never.wait()
+
+        def write(stream):
+            try:
+                stream.read()
+            finally:
+                finished.set()
+
+        task = asyncio.ensure_future(drain_into(stalled(), write, 2))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert finished.is_set()
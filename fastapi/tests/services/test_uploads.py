@@ -0,0 +1,204 @@
+"""Tests for parallel multipart volume uploads."""
+
+import io
+import threading
+import time
+
+import pytest
+
+import services.uploads as uploads
+from services.uploads import (
+    PresignedUrlsUnavailable,
+    RetryablePartError,
+    upload_parts,
+    upload_stream,
+)
+
+
+class FakeSession:
+    """A multipart session recording its parts, in memory."""
+
+    def __init__(self, failures=None):
+        self.parts = {}
+        self.attempts = {}
+        self.failures = failures or {}
+        self.completed = None
+        self.aborted = False
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        return True
+
+    def upload_part(self, part_number, data):
+        with self._lock:
+            self.attempts[part_number] = self.attempts.get(part_number, 0) + 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            failures = self.failures.get(part_number, [])
+            error = failures.pop(0) if failures else None
+        time.sleep(0.01)
+        with self._lock:
+            self.in_flight -= 1
+        if error is not None:
+            raise error
+        self.parts[part_number] = data
+        return f"etag-{part_number}"
+
+    def complete(self, etags):
+        self.completed = etags
+
+    def abort(self):
+        self.aborted = True
+
+
+class FailingStream(io.BytesIO):
+    """A stream whose reads fail after `good_reads` of them."""
+
+    def __init__(self, data, good_reads):
+        super().__init__(data)
+        self.good_reads = good_reads
+
+    def read(self, n=-1):
+        if not self.good_reads:
+            raise OSError("connection reset")
+        self.good_reads -= 1
+        return super().read(n)
+
+
+def _upload_threads():
+    return [t for t in threading.enumerate() if t.name.startswith("volume-upload")]
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(mocker):
+    mocker.patch.object(uploads, "_RETRY_DELAY_SECONDS", 0)
+
+
+class TestUploadParts:
+    """Test suite for upload_parts."""
+
+    def test_parts_sent_in_parallel(self):
+        """Test that parts go out concurrently, within the bound, and complete."""
+        session = FakeSession()
+        data = bytes(range(256)) * 40
+
+        upload_parts(session, io.BytesIO(data[100:]), 100, 3, data[:100])
+
+        assert session.completed == {n: f"etag-{n}" for n in range(1, 104)}
+        assert b"".join(session.parts[n] for n in sorted(session.parts)) == data
+        assert 1 < session.max_in_flight <= 3
+        assert not session.aborted
+        assert not _upload_threads()
+
+    def test_failed_part_is_retried(self):
+        """Test that a transient part failure only retries that part."""
+        session = FakeSession(failures={2: [RetryablePartError("503")] * 2})
+
+        upload_parts(session, io.BytesIO(b"x" * 250), 100, 2, b"x" * 100)
+
+        assert session.attempts == {1: 1, 2: 3, 3: 1, 4: 1}
+        assert len(session.completed) == 4
+
+    def test_failed_read_aborts(self):
+        """Test that a failed read aborts the session, leaving no threads."""
+        session = FakeSession()
+
+        with pytest.raises(OSError):
+            upload_parts(session, FailingStream(b"x" * 1000, 3), 100, 2, b"x" * 100)
+
+        assert session.aborted
+        assert session.completed is None
+        assert not _upload_threads()
+
+    def test_part_failing_for_good_aborts(self):
+        """Test that a part failing on every attempt aborts the session."""
+        session = FakeSession(failures={3: [RetryablePartError("503")] * 10})
+
+        with pytest.raises(RetryablePartError):
+            upload_parts(session, io.BytesIO(b"x" * 1000), 100, 2, b"x" * 100)
+
+        assert session.attempts[3] == uploads._PART_ATTEMPTS
+        assert session.aborted
+        assert session.completed is None
+        assert not _upload_threads()
+
+
+class TestUploadStream:
+    """Test suite for upload_stream."""
+
+    def test_short_stream_sent_at_once(self, mocker):
+        """Test that a stream shorter than a part skips the multipart upload."""
+        client = mocker.MagicMock()
+        session = mocker.patch.object(uploads, "MultipartSession")
+
+        upload_stream(client, "/Volumes/a b.csv", io.BytesIO(b"abc"), True, 100, 4)
+
+        session.assert_not_called()
+        method, path = client.api_client.do.call_args.args
+        assert (method, path) == ("PUT", "/api/2.0/fs/files/Volumes/a%20b.csv")
+        assert client.api_client.do.call_args.kwargs["data"] == b"abc"
+
+    def test_refused_presigned_urls_fall_back(self, mocker):
+        """Test that storage refusing the first part sends the whole stream at once."""
+        client = mocker.MagicMock()
+        fake = FakeSession(failures={1: [PresignedUrlsUnavailable("denied")]})
+        mocker.patch.object(uploads, "MultipartSession", return_value=fake)
+        data = b"x" * 100 + b"y" * 150
+
+        upload_stream(client, "/Volumes/f.csv", io.BytesIO(data), False, 100, 4)
+
+        assert fake.aborted
+        sent = client.api_client.do.call_args.kwargs["data"]
+        assert b"".join(sent) == data
+
+
+class TestMultipartSession:
+    """Test suite for MultipartSession."""
+
+    @pytest.fixture
+    def storage(self, mocker):
+        storage = mocker.MagicMock()
+        mocker.patch.object(uploads, "_storage_session", return_value=storage)
+        return storage
+
+    @pytest.fixture
+    def session(self, mocker):
+        client = mocker.MagicMock()
+        client.api_client.do.side_effect = [
+            {"multipart_upload": {"session_token": "token"}},
+            {"upload_part_urls": [{"url": "https://storage/part-2", "headers": []}]},
+        ]
+        session = uploads.MultipartSession(client, "/Volumes/f.csv", True)
+        assert session.start()
+        return session
+
+    def test_upload_part(self, session, storage):
+        """Test that a part is sent to its presigned URL and its ETag kept."""
+        storage.put.return_value.status_code = 200
+        storage.put.return_value.headers = {"ETag": '"abc"'}
+
+        assert session.upload_part(2, b"data") == '"abc"'
+
+        request = session._client.api_client.do.call_args.kwargs["body"]
+        assert request["session_token"] == "token"
+        assert request["start_part_number"] == 2
+        assert storage.put.call_args.args == ("https://storage/part-2",)
+        assert storage.put.call_args.kwargs["data"] == b"data"
+
+    @pytest.mark.parametrize(
+        "status, text, error",
+        [
+            (503, "", RetryablePartError),
+            (403, "<Message>Request has expired</Message>", RetryablePartError),
+            (403, "<Code>AccessDenied</Code>", PresignedUrlsUnavailable),
+        ],
+    )
+    def test_part_errors(self, session, storage, status, text, error):
+        """Test that storage errors are told apart for retries and fallback."""
+        storage.put.return_value.status_code = status
+        storage.put.return_value.text = text
+
+        with pytest.raises(error):
+            session.upload_part(2, b"data")
@@ -33,6 +33,13 @@ class TestMainApplication:
         assert response.status_code == status.HTTP_200_OK
         assert "text/html" in response.headers["content-type"]
 
+    def test_table_response_schema(self, app_instance):
+        """Test that GET /api/v1/table documents its JSON body as TableResponse."""
+        operation = app_instance.openapi()["paths"]["/api/v1/table"]["get"]
+        content = operation["responses"]["200"]["content"]["application/json"]
+
+        assert content["schema"] == {"$ref": "#/components/schemas/TableResponse"}
+
     @pytest.mark.parametrize(
         "endpoint", ["/not-found", "/api/invalid", "/api/v1/nonexistent"]
     )
@@ -1,3 +1,4 @@
+import pandas as pd
 import streamlit as st
 from databricks import sql
 from databricks.sdk.core import Config
@@ -29,13 +30,77 @@ def get_connection(http_path):
     )
 
 
-def read_table(table_name, conn):
+PREVIEW_ROWS = 1000
+
+
+def read_table(table_name, conn, preview=False):
     with conn.cursor() as cursor:
         query = f"SELECT * FROM {table_name}"
+        if preview:
+            # Read a sample instead of scanning the whole table
+            query += f" TABLESAMPLE ({PREVIEW_ROWS} ROWS)"
         cursor.execute(query)
         return cursor.fetchall_arrow().to_pandas()
 
 
+def get_table_version(table_name, conn):
+    with conn.cursor() as cursor:
+        try:
+            cursor.execute(f"DESCRIBE HISTORY {table_name} LIMIT 1")
+        except Exception:
+            return None  # Not a Delta table, e.g. a view
+        return cursor.fetchone().version
+
+
+def read_column_stats(table_name, columns, conn):
+    # Approximate statistics of every column, in a single pass over the sample
+    select_list = ["COUNT(*) AS `rows`"]
+    for i, (column, type_name) in enumerate(columns):
+        name = "`" + column.replace("`", "``") + "`"
+        select_list.append(f"COUNT({name}) AS `n{i}`")
+        if type_name in ("ARRAY", "MAP", "STRUCT", "VARIANT"):
+            # Complex values cannot be ordered or counted distinct
+            select_list += [f"NULL AS `d{i}`", f"NULL AS `lo{i}`", f"NULL AS `hi{i}`"]
+            continue
+        select_list += [
+            f"APPROX_COUNT_DISTINCT({name}) AS `d{i}`",
+            f"CAST(MIN({name}) AS STRING) AS `lo{i}`",
+            f"CAST(MAX({name}) AS STRING) AS `hi{i}`",
+        ]
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"SELECT {', '.join(select_list)} "
+            f"FROM {table_name} TABLESAMPLE ({PREVIEW_ROWS} ROWS)"
+        )
+        row = cursor.fetchone().asDict()
+
+    rows = row["rows"] or 1
+    return pd.DataFrame(
+        [
+            {
+                "column": column,
+                "null fraction": 1 - row[f"n{i}"] / rows,
+                "approx. distinct": row[f"d{i}"],
+                "min": row[f"lo{i}"],
+                "max": row[f"hi{i}"],
+            }
+            for i, (column, _) in enumerate(columns)
+        ]
+    )
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def preview_table(table_name, version, _conn):
+    # A preview only changes with the table, so it is cached per Delta version
+    # (tables without a version, such as views, are re-read after the TTL)
+    df = read_table(table_name, _conn, preview=True)
+    columns = [
+        (column.name, column.type_name.value if column.type_name else None)
+        for column in w.tables.get(table_name).columns
+    ]
+    return df, read_column_stats(table_name, columns, _conn)
+
+
 def get_schema_names(catalog_name):
     schemas = w.schemas.list(catalog_name=catalog_name)
     return [schema.name for schema in schemas]
@@ -68,8 +133,19 @@ with tab_a:
         if http_path_input and table_name and table_name != "":
             http_path = warehouse_paths[http_path_input]
             conn = get_connection(http_path)
-            df = read_table(f"{catalog_name}.{schema_name}.{table_name}", conn)
-            st.dataframe(df)
+            full_name = f"{catalog_name}.{schema_name}.{table_name}"
+            preview = st.toggle(
+                f"Preview (sample of {PREVIEW_ROWS} rows with approximate column statistics)",
+                value=True,
+            )
+            if preview:
+                version = get_table_version(full_name, conn)
+                df, stats = preview_table(full_name, version, conn)
+                st.dataframe(df)
+                st.dataframe(stats, hide_index=True)
+            else:
+                df = read_table(full_name, conn)
+                st.dataframe(df)
 
 
 with tab_b:
@@ -91,9 +167,11 @@ with tab_b:
                 credentials_provider=lambda: cfg.authenticate,
             )
 
-        def read_table(table_name, conn):
+        def read_table(table_name, conn, preview=False):
             with conn.cursor() as cursor:
                 query = f"SELECT * FROM {table_name}"
+                if preview:  # Sample 1000 rows instead of scanning the whole table
+                    query += " TABLESAMPLE (1000 ROWS)"
                 cursor.execute(query)
                 return cursor.fetchall_arrow().to_pandas()
 
@@ -107,7 +185,7 @@ with tab_b:
 
         if http_path_input and table_name:
             conn = get_connection(http_path_input)
-            df = read_table(table_name, conn)
+            df = read_table(table_name, conn, preview=True)
             st.dataframe(df)
         """
     )